@@ -26,7 +26,10 @@ class Module:
         # Importación lazy: solo cuando se necesita, después de que el módulo esté inicializado
         try:
             from .src.functionalities import Funcionalities
+            from .src.resources.identity_resolver import identity_resolver
             self.container.register("auth", lambda: Funcionalities(self.container))
+            # Resolución sub -> identity con caché, compartida por los demás módulos
+            self.container.register("identity_resolver", lambda: identity_resolver)
         except Exception as e:
             self.log(f"ERROR al registrar servicio: {e}")
             import traceback
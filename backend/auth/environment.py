@@ -6,3 +6,7 @@ AUTH_APP_ID = os.getenv("AUTH_APP_ID", None)
 AUTH_APP_ACCESS_TOKEN = os.getenv("AUTH_APP_ACCESS_TOKEN", None)
 AUTH_APP_CONTEXT_ID = os.getenv("AUTH_APP_CONTEXT_ID", None)
 TENANT = os.getenv("AUTH_TENANT", None)
+
+# Caché de resolución sub -> identity
+IDENTITY_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_IDENTITY_CACHE_MAX_ENTRIES", "10000"))
+IDENTITY_CACHE_TTL = float(os.getenv("AUTH_IDENTITY_CACHE_TTL", "300"))  # segundos
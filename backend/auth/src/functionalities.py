@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 from fastapi.datastructures import Headers
 from .models.identities import IdentityModel
 from .resources.authx_service import AuthXService
+from .resources.identity_resolver import invalidate_identity
 # Importar environment del módulo auth usando importación relativa
 from ..environment import (
     AUTHX_BASE_URL, AUTH_APP_ID, AUTH_APP_ACCESS_TOKEN,
@@ -177,6 +178,8 @@ class Funcionalities:
                 setattr(identity, key, value)
             
             db.commit()
+            # La identidad cacheada para la resolución sub -> identity queda obsoleta
+            invalidate_identity(sub=identity.sub, identity_id=identity.id)
             db.refresh(identity)
             return IdentityResponse.model_validate(identity)
         except Exception as e:
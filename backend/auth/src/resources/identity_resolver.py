@@ -0,0 +1,154 @@
+"""
+Resolución del sub del token a la identidad (tabla identities) con caché LRU+TTL.
+
+Las rutas de escritura (registros, balances, lotes, despachos) validan en cada
+llamada que el sub del token corresponda a una identidad activa. La identidad casi
+no cambia, por lo que se guarda en memoria:
+- LRU acotada a IDENTITY_CACHE_MAX_ENTRIES entradas, cada una válida IDENTITY_CACHE_TTL segundos
+- solo se guardan identidades activas (un sub no encontrado se vuelve a consultar)
+- resolve_identities resuelve varios subs con una sola consulta para los que no están en caché
+- update_identity (y cualquier cambio de disabled_at) debe llamar a invalidate_identity
+
+El TTL acota cuánto tarda en verse en otros procesos un cambio hecho fuera de este.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Union
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from ..models.identities import IdentityModel
+from ...environment import IDENTITY_CACHE_MAX_ENTRIES, IDENTITY_CACHE_TTL
+
+
+@dataclass(frozen=True)
+class ResolvedIdentity:
+    """Datos de una identidad activa (compatibles con los schemas *Nested por from_attributes)"""
+    id: UUID
+    sub: str
+    username: Optional[str] = None
+    email: Optional[str] = None
+    eid: Optional[str] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+
+
+_IDENTITY_COLUMNS = (
+    IdentityModel.id,
+    IdentityModel.sub,
+    IdentityModel.username,
+    IdentityModel.email,
+    IdentityModel.eid,
+    IdentityModel.first_name,
+    IdentityModel.last_name,
+)
+
+
+class IdentityResolver:
+    """Caché LRU+TTL sub -> ResolvedIdentity."""
+
+    def __init__(self, max_entries: int = IDENTITY_CACHE_MAX_ENTRIES, ttl: float = IDENTITY_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_cached(self, sub: str, now: float) -> Optional[ResolvedIdentity]:
+        entry = self._entries.get(sub)
+        if entry is None:
+            return None
+        identity, expires_at = entry
+        if expires_at <= now:
+            del self._entries[sub]
+            return None
+        self._entries.move_to_end(sub)
+        return identity
+
+    def _store(self, identities: Iterable[ResolvedIdentity], now: float) -> None:
+        expires_at = now + self.ttl
+        for identity in identities:
+            self._entries[identity.sub] = (identity, expires_at)
+            self._entries.move_to_end(identity.sub)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def resolve_many(self, db: Session, subs: Iterable[Union[str, UUID]]) -> Dict[str, ResolvedIdentity]:
+        """
+        Resuelve varios subs; los que no están en caché se consultan en una sola query.
+
+        Returns:
+            Diccionario sub -> ResolvedIdentity (los subs sin identidad activa no aparecen)
+        """
+        wanted = {str(sub) for sub in subs if sub is not None}
+        if not wanted:
+            return {}
+        now = time.monotonic()
+        with self._lock:
+            resolved = {}
+            for sub in wanted:
+                identity = self._get_cached(sub, now)
+                if identity is not None:
+                    resolved[sub] = identity
+        missing = wanted - resolved.keys()
+        if missing:
+            rows = db.query(*_IDENTITY_COLUMNS).filter(
+                IdentityModel.sub.in_(missing),
+                IdentityModel.disabled_at.is_(None)
+            ).all()
+            loaded = [ResolvedIdentity(**row._asdict()) for row in rows]
+            with self._lock:
+                self._store(loaded, now)
+            resolved.update({identity.sub: identity for identity in loaded})
+        return resolved
+
+    def resolve(self, db: Session, sub: Union[str, UUID, None]) -> Optional[ResolvedIdentity]:
+        """Resuelve un sub a su identidad activa, o None si no existe o está deshabilitada."""
+        if sub is None:
+            return None
+        return self.resolve_many(db, [sub]).get(str(sub))
+
+    def invalidate(self, sub: Union[str, UUID, None] = None, identity_id: Optional[UUID] = None) -> None:
+        """Elimina la identidad de la caché por sub y/o por id."""
+        with self._lock:
+            if sub is not None:
+                self._entries.pop(str(sub), None)
+            if identity_id is not None:
+                stale = [key for key, (identity, _) in self._entries.items() if identity.id == identity_id]
+                for key in stale:
+                    del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+identity_resolver = IdentityResolver()
+
+
+def resolve_identity(db: Session, sub: Union[str, UUID, None]) -> Optional[ResolvedIdentity]:
+    return identity_resolver.resolve(db, sub)
+
+
+def resolve_identities(db: Session, subs: Iterable[Union[str, UUID]]) -> Dict[str, ResolvedIdentity]:
+    return identity_resolver.resolve_many(db, subs)
+
+
+def require_identity(db: Session, sub: Union[str, UUID]) -> ResolvedIdentity:
+    """
+    Resuelve el sub del token a su identidad activa.
+
+    Raises:
+        ValueError: Si no existe una identidad activa con ese sub
+    """
+    identity = identity_resolver.resolve(db, sub)
+    if identity is None:
+        print(f"⚠️ Identity {sub} from token not found in identities table")
+        raise ValueError("Identidad no encontrada")
+    return identity
+
+
+def invalidate_identity(sub: Union[str, UUID, None] = None, identity_id: Optional[UUID] = None) -> None:
+    identity_resolver.invalidate(sub=sub, identity_id=identity_id)
@@ -5,7 +5,7 @@ from io import BytesIO
 from sqlalchemy.orm import Session
 
 from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from openpyxl.styles import Font, PatternFill, Border, Side
 
 from .models.bulk_upload_job import BulkUploadJobModel, BulkUploadStatus
 from .models.bulk_upload_job_row import BulkUploadJobRowModel
@@ -289,42 +289,13 @@ class Funcionalities:
         return job
 
     def get_template_excel(self, form_id: UUID) -> Tuple[BytesIO, str]:
-        """Genera plantilla Excel dinámica desde el schema del formulario. Retorna (bio, form_name)."""
+        """
+        Plantilla Excel dinámica desde el schema del formulario. Retorna (bio, form_name).
+        Los bytes se generan una vez por schema (artefacto compilado de data_collector).
+        """
         data_collector = self.container.get("data_collector")
-        form_with_schema = data_collector.get_form_by_id(form_id)
-        if not form_with_schema or not form_with_schema.schema:
-            raise ValueError("Formulario no encontrado o sin schema")
-        entity_name = getattr(form_with_schema, "entity_name", None)
-        columns = data_collector.get_schema_columns_for_template(
-            form_with_schema.schema,
-            entity_name=entity_name,
-        )
-        if not columns:
-            raise ValueError("El schema del formulario no tiene columnas para la plantilla")
-        form_name = (form_with_schema.name or "datos").strip()
-        form_name = "".join(c if c.isalnum() or c in " -_" else "_" for c in form_name) or "datos"
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Datos"[:31]
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF", size=11)
-        thin = Side(style="thin")
-        border = Border(left=thin, right=thin, top=thin, bottom=thin)
-        for col_num, col in enumerate(columns, 1):
-            # Usar display_name del info del modelo (ej: "Código" en vez de "code") para cabeceras legibles
-            cell = ws.cell(row=1, column=col_num, value=col.get("display_name") or col["name"])
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-            cell.border = border
-        for col_num, col in enumerate(columns, 1):
-            hint = "Identificador" if col.get("is_logical_identifier") else ""
-            cell = ws.cell(row=2, column=col_num, value=hint)
-            cell.border = border
-        bio = BytesIO()
-        wb.save(bio)
-        bio.seek(0)
-        return bio, form_name
+        content, form_name = data_collector.get_form_template_excel(form_id)
+        return BytesIO(content), form_name
 
 
     def process_upload_background(self, job_id: UUID, file_content: bytes) -> None:
@@ -365,7 +336,7 @@ class Funcionalities:
                 process_register_to_entity,
                 find_model_by_entity_name,
             )
-            from modules.data_collector.src.resources.form_auto_creator import get_logical_identifier_field
+            from modules.data_collector.src.resources.register_mentions import save_register_mentions
         except ImportError:
             from backend.modules.data_collector.src.models.core_registers import CoreRegisterModel, RegisterStatus
             from backend.modules.data_collector.src.models.forms import FormModel, FormPurpose
@@ -373,7 +344,7 @@ class Funcionalities:
                 process_register_to_entity,
                 find_model_by_entity_name,
             )
-            from backend.modules.data_collector.src.resources.form_auto_creator import get_logical_identifier_field
+            from backend.modules.data_collector.src.resources.register_mentions import save_register_mentions
 
         job = db.query(BulkUploadJobModel).filter(BulkUploadJobModel.id == job_id).first()
         if not job:
@@ -394,17 +365,16 @@ class Funcionalities:
                 error_count += 1
                 _finish_job(" - Formulario no encontrado")
                 return
-            columns = data_collector.get_schema_columns_for_template(
-            form_with_schema.schema,
-            entity_name=getattr(form_with_schema, "entity_name", None),
-        )
+            columns = data_collector.get_form_template_columns(job.form_id)
             if not columns:
                 errors_list.append({"row_index": 0, "column_name": "", "message": "Schema sin columnas", "value": None})
                 error_count += 1
                 _finish_job(" - Schema sin columnas")
                 return
-            logical_id_field = get_logical_identifier_field(form_with_schema.schema)
             schema_form_id = form_with_schema.schema_id
+            logical_id_field = data_collector.get_schema_logical_identifier(schema_form_id)
+            # Identificador lógico de cada entidad referenciada (una consulta por entidad en todo el job)
+            related_lid_cache = {}
             if not schema_form_id:
                 errors_list.append({"row_index": 0, "column_name": "", "message": "Formulario sin schema_id", "value": None})
                 error_count += 1
@@ -615,15 +585,15 @@ class Funcionalities:
                         if type_value == "entity":
                             related_entity = spec.get("foreign_key_table")
                             if related_entity and value:
-                                related_form = data_collector.get_form_by_entity_name(related_entity)
+                                if related_entity not in related_lid_cache:
+                                    related_lid_cache[related_entity] = data_collector.get_entity_logical_identifier(related_entity)
                                 rel_model = find_model_by_entity_name(related_entity)
                                 row = None
-                                if related_form and related_form.schema:
-                                    lid_field = get_logical_identifier_field(related_form.schema)
-                                    if lid_field and rel_model:
-                                        # Normalizar a string para evitar "varchar = integer" (Excel devuelve int)
-                                        norm_val = _normalize_for_text(value) or value
-                                        row = db.query(rel_model).filter(getattr(rel_model, lid_field) == str(norm_val)).first()
+                                lid_field = related_lid_cache[related_entity]
+                                if lid_field and rel_model:
+                                    # Normalizar a string para evitar "varchar = integer" (Excel devuelve int)
+                                    norm_val = _normalize_for_text(value) or value
+                                    row = db.query(rel_model).filter(getattr(rel_model, lid_field) == str(norm_val)).first()
                                 if row is None and rel_model:
                                     # Sin formulario: intentar buscar por id, name o code
                                     val_str = str(_normalize_for_text(value) or value).strip()
@@ -736,9 +706,11 @@ class Funcionalities:
                             entity_name=job.entity_name,
                         )
                         db.add(register)
-                        db.commit()
-                        db.refresh(register)
+                        db.flush()
+                        save_register_mentions(db, register)
                         _log(f"[BULK_UPLOAD] Fila {row_num}: guardando en entidad...")
+                        # Registro y entidad en una sola transacción: si la proyección falla
+                        # se revierte la fila completa y se reporta como error
                         process_register_to_entity(register, db, FormModel, FormPurpose)
                         db.commit()
                         _insert_row(row_num, dict(row_dict), {})
@@ -32,11 +32,20 @@ class Module:
         # Importación lazy: solo cuando se necesita, después de que el módulo esté inicializado
         try:
             from .src.functionalities import Funcionalities
+            from .src.resources.model_registry import invalidate_model_registry
+            # Los modelos de los módulos cargados hasta ahora deben entrar en el registro
+            invalidate_model_registry()
             self.container.register("data_collector", lambda: Funcionalities(self.container))
             self.log("servicio data_collector registrado correctamente")
             
             # Actualizar configuración del trigger al iniciar
             self._update_trigger_config()
+            
+            # Retomar proyecciones asíncronas que quedaron en cola
+            self._resume_projection_workers()
+            
+            # Índices de typeahead y de campos únicos (en segundo plano)
+            self._ensure_lookup_indexes()
         except Exception as e:
             self.log(f"ERROR al registrar servicio: {e}")
             import traceback
@@ -180,6 +189,64 @@ class Module:
                 traceback.print_exc()
             # No lanzar excepción para no bloquear el inicio del módulo
 
+    def _resume_projection_workers(self):
+        """
+        Inicia el pool de workers de proyección si quedaron trabajos en
+        core_register_projection_jobs (ej. tras un reinicio).
+        """
+        try:
+            from .src.resources.projection_worker import resume_pending_projections
+            if resume_pending_projections(self.container):
+                self.log("workers de proyección iniciados para trabajos pendientes")
+        except Exception as e:
+            # La tabla puede no existir aún; no bloquear el inicio del módulo
+            self.log(f"No se pudieron retomar las proyecciones pendientes: {e}")
+            try:
+                self.container.get("core_db", "databases").rollback()
+            except Exception:
+                pass
+
+    def _ensure_lookup_indexes(self):
+        """
+        Crea en segundo plano los índices que falten (CREATE INDEX CONCURRENTLY puede
+        tardar en tablas grandes):
+        - typeahead de las entidades referenciables
+        - campos marcados como únicos en los schemas de los formularios
+        - columnas por las que filtran los campos entity de los schemas
+        """
+        from .src.environment import TYPEAHEAD_ENSURE_INDEXES, UNIQUE_FIELD_ENSURE_INDEXES, FILTER_ENSURE_INDEXES
+        if not TYPEAHEAD_ENSURE_INDEXES and not UNIQUE_FIELD_ENSURE_INDEXES and not FILTER_ENSURE_INDEXES:
+            return
+
+        import threading
+
+        def _run():
+            svc = self.container.get("data_collector")
+            if TYPEAHEAD_ENSURE_INDEXES:
+                try:
+                    ensured = svc.ensure_entity_typeahead_indexes()
+                    if ensured:
+                        self.log(f"índices de typeahead asegurados para: {', '.join(sorted(ensured))}")
+                except Exception as e:
+                    # La tabla referencable_entities puede no existir aún
+                    self.log(f"No se pudieron asegurar los índices de typeahead: {e}")
+            if UNIQUE_FIELD_ENSURE_INDEXES:
+                try:
+                    executed = svc.ensure_unique_field_indexes()
+                    if executed:
+                        self.log(f"índices de campos únicos asegurados: {len(executed)}")
+                except Exception as e:
+                    self.log(f"No se pudieron asegurar los índices de campos únicos: {e}")
+            if FILTER_ENSURE_INDEXES:
+                try:
+                    executed = svc.ensure_entity_filter_indexes()
+                    if executed:
+                        self.log(f"índices de filtros de entidades asegurados: {len(executed)}")
+                except Exception as e:
+                    self.log(f"No se pudieron asegurar los índices de filtros de entidades: {e}")
+
+        threading.Thread(target=_run, name="lookup-indexes", daemon=True).start()
+
     def register_routes(self, app):
         self.log("registrando rutas")
         # Importación lazy: solo cuando se necesita, después de que el módulo esté inicializado
@@ -0,0 +1,36 @@
+"""add core_registers idempotency_key
+
+Revision ID: f6b9d3e2a8c4
+Revises: e5a8c2d1f7b3
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f6b9d3e2a8c4'
+down_revision = 'e5a8c2d1f7b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    Agrega core_registers.idempotency_key (carga por lotes desde dispositivos offline)
+    con un índice único parcial: un reintento con la misma clave no crea otro registro.
+    """
+    op.execute("ALTER TABLE core_registers ADD COLUMN IF NOT EXISTS idempotency_key VARCHAR(255);")
+    op.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_core_registers_idempotency_key
+            ON core_registers (idempotency_key)
+            WHERE idempotency_key IS NOT NULL;
+    """)
+
+
+def downgrade() -> None:
+    """
+    Elimina el índice y la columna idempotency_key.
+    """
+    op.execute("DROP INDEX IF EXISTS uq_core_registers_idempotency_key;")
+    op.execute("ALTER TABLE core_registers DROP COLUMN IF EXISTS idempotency_key;")
@@ -0,0 +1,52 @@
+"""backfill core_register_mentions
+
+Revision ID: d4c1e7a9b2f0
+Revises: 
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd4c1e7a9b2f0'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    Llena core_register_mentions con las entidades mencionadas en core_registers.detail.
+    A partir de aquí create_register y la carga masiva mantienen la tabla al insertar.
+    Para reconstruirla en caliente usar Funcionalities.backfill_register_mentions().
+    """
+    op.execute("""
+        INSERT INTO core_register_mentions (register_id, entity_id, field_name, form_id, created_at)
+        SELECT DISTINCT r.id, mention.entity_id::uuid, item->>'name', r.form_id, r.created_at
+        FROM core_registers r
+        CROSS JOIN LATERAL unnest(r.detail) AS item
+        CROSS JOIN LATERAL (
+            SELECT item->'value'->>'id' AS entity_id
+            WHERE jsonb_typeof(item->'value') = 'object'
+            UNION ALL
+            SELECT val_item->>'id'
+            FROM jsonb_array_elements(
+                CASE WHEN jsonb_typeof(item->'value') = 'array' THEN item->'value' ELSE '[]'::jsonb END
+            ) AS val_item
+            WHERE jsonb_typeof(val_item) = 'object'
+            UNION ALL
+            SELECT item->>'value'
+            WHERE item->>'type_value' = 'entity' AND jsonb_typeof(item->'value') = 'string'
+        ) AS mention
+        WHERE item->>'name' IS NOT NULL
+          AND lower(mention.entity_id) ~ '^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$'
+        ON CONFLICT (register_id, field_name, entity_id) DO NOTHING;
+    """)
+
+
+def downgrade() -> None:
+    """
+    Vacía core_register_mentions (la tabla se define en el modelo CoreRegisterMentionModel).
+    """
+    op.execute("DELETE FROM core_register_mentions;")
@@ -0,0 +1,117 @@
+"""create core_register_values trigger
+
+Revision ID: b8d1f5a4c0e6
+Revises: f6b9d3e2a8c4
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b8d1f5a4c0e6'
+down_revision = 'f6b9d3e2a8c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    Mantiene core_register_values (tabla definida en CoreRegisterValueModel) con un
+    trigger sobre core_registers: una fila por campo del detail (y por elemento en
+    listas) con el valor como texto, número y fecha, para filtrar registros por
+    respuesta y validar campos únicos con índices B-tree.
+
+    Los registros deshabilitados no tienen valores. Se omiten medias y valores de
+    texto demasiado largos para un índice B-tree.
+    """
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION core_register_try_timestamp(value TEXT)
+        RETURNS TIMESTAMP AS $$
+        BEGIN
+            RETURN value::timestamp;
+        EXCEPTION WHEN others THEN
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql STABLE;
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION core_register_value_rows(detail JSONB[])
+        RETURNS TABLE(field_name TEXT, value_text TEXT, value_num NUMERIC, value_ts TIMESTAMP) AS $$
+            SELECT item->>'name',
+                   val.value_text,
+                   CASE WHEN btrim(val.value_text) ~ '^-?[0-9]+([.][0-9]+)?$' THEN btrim(val.value_text)::numeric END,
+                   CASE WHEN val.value_text ~ '^[0-9]{4}-[0-9]{2}-[0-9]{2}' THEN core_register_try_timestamp(val.value_text) END
+            FROM unnest(detail) AS item
+            CROSS JOIN LATERAL (
+                SELECT CASE
+                    WHEN jsonb_typeof(item->'value') = 'object' THEN item->'value'->>'id'
+                    ELSE item->'value' #>> '{}'
+                END AS value_text
+                WHERE jsonb_typeof(item->'value') IN ('string', 'number', 'boolean', 'object')
+                UNION ALL
+                SELECT CASE
+                    WHEN jsonb_typeof(elem) = 'object' THEN elem->>'id'
+                    ELSE elem #>> '{}'
+                END
+                FROM jsonb_array_elements(
+                    CASE WHEN jsonb_typeof(item->'value') = 'array' THEN item->'value' ELSE '[]'::jsonb END
+                ) AS elem
+            ) AS val
+            WHERE item->>'name' IS NOT NULL
+              AND coalesce(item->>'type_value', '') <> 'media'
+              AND val.value_text IS NOT NULL
+              AND octet_length(val.value_text) <= 2000;
+        $$ LANGUAGE sql STABLE;
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION sync_core_register_values()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' THEN
+                DELETE FROM core_register_values WHERE register_id = NEW.id;
+            END IF;
+            IF NEW.disabled_at IS NULL AND NEW.form_id IS NOT NULL AND NEW.detail IS NOT NULL THEN
+                INSERT INTO core_register_values (register_id, form_id, field_name, value_text, value_num, value_ts)
+                SELECT NEW.id, NEW.form_id, v.field_name, v.value_text, v.value_num, v.value_ts
+                FROM core_register_value_rows(NEW.detail) AS v;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    op.execute("""
+        DROP TRIGGER IF EXISTS trigger_core_register_values ON core_registers;
+
+        CREATE TRIGGER trigger_core_register_values
+        AFTER INSERT OR UPDATE OF detail, form_id, disabled_at ON core_registers
+        FOR EACH ROW
+        EXECUTE FUNCTION sync_core_register_values();
+    """)
+
+    # Poblar con los registros existentes
+    op.execute("""
+        DELETE FROM core_register_values;
+
+        INSERT INTO core_register_values (register_id, form_id, field_name, value_text, value_num, value_ts)
+        SELECT r.id, r.form_id, v.field_name, v.value_text, v.value_num, v.value_ts
+        FROM core_registers r
+        CROSS JOIN LATERAL core_register_value_rows(r.detail) AS v
+        WHERE r.disabled_at IS NULL
+          AND r.form_id IS NOT NULL;
+    """)
+
+
+def downgrade() -> None:
+    """
+    Elimina el trigger y las funciones y vacía core_register_values.
+    """
+    op.execute("DROP TRIGGER IF EXISTS trigger_core_register_values ON core_registers;")
+    op.execute("DROP FUNCTION IF EXISTS sync_core_register_values();")
+    op.execute("DROP FUNCTION IF EXISTS core_register_value_rows(JSONB[]);")
+    op.execute("DROP FUNCTION IF EXISTS core_register_try_timestamp(TEXT);")
+    op.execute("DELETE FROM core_register_values;")
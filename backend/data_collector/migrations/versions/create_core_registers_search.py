@@ -0,0 +1,122 @@
+"""create core_registers search index
+
+Revision ID: e5a8c2d1f7b3
+Revises: d4c1e7a9b2f0
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e5a8c2d1f7b3'
+down_revision = 'd4c1e7a9b2f0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    Agrega a core_registers las columnas de búsqueda mantenidas por trigger:
+    - search_text: valores visibles del detail, en minúsculas y sin tildes (índice trigram)
+    - search_vector: tsvector en español sin tildes (índice FTS)
+    """
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent;")
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+
+    # Configuración de texto en español que ignora tildes
+    op.execute("""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'es_unaccent') THEN
+                CREATE TEXT SEARCH CONFIGURATION es_unaccent (COPY = spanish);
+                ALTER TEXT SEARCH CONFIGURATION es_unaccent
+                    ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+            END IF;
+        END
+        $$;
+    """)
+
+    op.execute("""
+        ALTER TABLE core_registers ADD COLUMN IF NOT EXISTS search_text TEXT;
+        ALTER TABLE core_registers ADD COLUMN IF NOT EXISTS search_vector TSVECTOR;
+    """)
+
+    # Texto visible del detail: valores simples, display_name de entidades y elementos
+    # de listas. Se excluyen medias e ids (UUID), que no son visibles para el usuario.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION core_register_search_text(detail JSONB[])
+        RETURNS TEXT AS $$
+            SELECT NULLIF(lower(unaccent(string_agg(val, ' '))), '')
+            FROM (
+                SELECT CASE
+                    WHEN jsonb_typeof(item->'value') IN ('string', 'number', 'boolean') THEN item->>'value'
+                    WHEN jsonb_typeof(item->'value') = 'object' THEN item->'value'->>'display_name'
+                END AS val
+                FROM unnest(detail) AS item
+                WHERE coalesce(item->>'type_value', '') <> 'media'
+                UNION ALL
+                SELECT CASE
+                    WHEN jsonb_typeof(elem) = 'object' THEN elem->>'display_name'
+                    ELSE elem #>> '{}'
+                END
+                FROM unnest(detail) AS item
+                CROSS JOIN LATERAL jsonb_array_elements(
+                    CASE WHEN jsonb_typeof(item->'value') = 'array' THEN item->'value' ELSE '[]'::jsonb END
+                ) AS elem
+                WHERE coalesce(item->>'type_value', '') <> 'media'
+            ) AS values_
+            WHERE val IS NOT NULL
+              AND val <> ''
+              AND lower(val) !~ '^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$';
+        $$ LANGUAGE sql STABLE;
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION update_core_register_search()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            NEW.search_text := core_register_search_text(NEW.detail);
+            NEW.search_vector := to_tsvector('es_unaccent', coalesce(NEW.search_text, ''));
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    op.execute("""
+        DROP TRIGGER IF EXISTS trigger_core_register_search ON core_registers;
+
+        CREATE TRIGGER trigger_core_register_search
+        BEFORE INSERT OR UPDATE OF detail ON core_registers
+        FOR EACH ROW
+        EXECUTE FUNCTION update_core_register_search();
+    """)
+
+    # Poblar los registros existentes
+    op.execute("""
+        UPDATE core_registers
+        SET search_text = core_register_search_text(detail),
+            search_vector = to_tsvector('es_unaccent', coalesce(core_register_search_text(detail), ''));
+    """)
+
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_core_registers_search_trgm
+            ON core_registers USING gin (search_text gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS idx_core_registers_search_vector
+            ON core_registers USING gin (search_vector);
+    """)
+
+
+def downgrade() -> None:
+    """
+    Elimina el trigger, las funciones, los índices y las columnas de búsqueda.
+    """
+    op.execute("DROP TRIGGER IF EXISTS trigger_core_register_search ON core_registers;")
+    op.execute("DROP FUNCTION IF EXISTS update_core_register_search();")
+    op.execute("DROP FUNCTION IF EXISTS core_register_search_text(JSONB[]);")
+    op.execute("DROP INDEX IF EXISTS idx_core_registers_search_vector;")
+    op.execute("DROP INDEX IF EXISTS idx_core_registers_search_trgm;")
+    op.execute("""
+        ALTER TABLE core_registers DROP COLUMN IF EXISTS search_vector;
+        ALTER TABLE core_registers DROP COLUMN IF EXISTS search_text;
+    """)
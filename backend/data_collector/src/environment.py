@@ -0,0 +1,33 @@
+import os
+
+# Proyección asíncrona de registros a entidades (POST /registers?async_projection=true)
+PROJECTION_WORKERS = int(os.getenv("DATA_COLLECTOR_PROJECTION_WORKERS", "2"))
+PROJECTION_WORKER_MODE = os.getenv("DATA_COLLECTOR_PROJECTION_WORKER_MODE", "thread")  # thread | process
+PROJECTION_POLL_INTERVAL = float(os.getenv("DATA_COLLECTOR_PROJECTION_POLL_INTERVAL", "2"))  # segundos
+PROJECTION_MAX_ATTEMPTS = int(os.getenv("DATA_COLLECTOR_PROJECTION_MAX_ATTEMPTS", "3"))
+PROJECTION_LOCK_TIMEOUT = int(os.getenv("DATA_COLLECTOR_PROJECTION_LOCK_TIMEOUT", "300"))  # segundos
+
+# Typeahead de entidades referenciables (GET /entities/{entity_name}/typeahead)
+TYPEAHEAD_MAX_LIMIT = int(os.getenv("DATA_COLLECTOR_TYPEAHEAD_MAX_LIMIT", "50"))
+TYPEAHEAD_ENSURE_INDEXES = os.getenv("DATA_COLLECTOR_TYPEAHEAD_ENSURE_INDEXES", "true").lower() in ("1", "true", "yes")
+
+# Índices de los campos marcados is_unique en los schemas (validación de campos únicos)
+UNIQUE_FIELD_ENSURE_INDEXES = os.getenv("DATA_COLLECTOR_UNIQUE_FIELD_ENSURE_INDEXES", "true").lower() in ("1", "true", "yes")
+
+# Caché de artefactos compilados de schema_forms (entradas por proceso)
+SCHEMA_ARTIFACT_CACHE_SIZE = int(os.getenv("DATA_COLLECTOR_SCHEMA_ARTIFACT_CACHE_SIZE", "256"))
+
+# Cuerpos JSON pre-serializados para GET condicionales (ETag / If-None-Match)
+HTTP_BODY_CACHE_SIZE = int(os.getenv("DATA_COLLECTOR_HTTP_BODY_CACHE_SIZE", "256"))  # entradas
+HTTP_BODY_CACHE_MAX_BYTES = int(os.getenv("DATA_COLLECTOR_HTTP_BODY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Autogeneración de formularios desde config.yaml al iniciar (ver resources/form_manifest.py)
+FORM_GENERATION_WORKERS = int(os.getenv("DATA_COLLECTOR_FORM_GENERATION_WORKERS", "1"))  # >1: schemas en paralelo
+FORM_GENERATION_FORCE = os.getenv("DATA_COLLECTOR_FORM_GENERATION_FORCE", "false").lower() in ("1", "true", "yes")  # ignorar el manifiesto
+
+# Catálogo de action_tools en memoria: cada cuánto se compara su sello con la BD (cambios de otros procesos)
+TOOL_CATALOG_REFRESH_SECONDS = float(os.getenv("DATA_COLLECTOR_TOOL_CATALOG_REFRESH_SECONDS", "60"))
+
+# Filtros de entidades (query_filter.py): filtros compilados en caché e índices de las columnas filtradas
+FILTER_CACHE_SIZE = int(os.getenv("DATA_COLLECTOR_FILTER_CACHE_SIZE", "512"))
+FILTER_ENSURE_INDEXES = os.getenv("DATA_COLLECTOR_FILTER_ENSURE_INDEXES", "true").lower() in ("1", "true", "yes")
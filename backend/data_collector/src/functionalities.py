@@ -1,27 +1,32 @@
 import logging
 import logging
 from datetime import datetime
-from typing import Optional, List, Dict, Any, TypedDict, Union
+from typing import Optional, List, Dict, Any, TypedDict, Union, Iterator, Tuple
 
 logger = logging.getLogger(__name__)
 
 logger = logging.getLogger(__name__)
-from uuid import UUID
+from uuid import UUID, uuid4
 from sqlalchemy.orm import Session
 from sqlalchemy import func, inspect
 # Usar importaciones relativas para evitar problemas durante la inicialización del módulo
 from .models.forms import FormModel, FormPurpose
 from .models.action_tools import ActionToolModel
 from .models.core_registers import CoreRegisterModel, RegisterStatus
+from .models.core_register_mentions import CoreRegisterMentionModel
+from .models.core_register_projection_jobs import CoreRegisterProjectionJobModel
 from .models.schema_forms import SchemaFormModel
 from .models.referencable_entities import ReferencableEntityModel
 from .schemas import (
     FormCreate, FormUpdate, FormResponse, PaginatedFormResponse, FormWithSchemaResponse,
     ActionToolCreate, ActionToolUpdate, ActionToolResponse, PaginatedActionToolResponse,
     CoreRegisterCreate, CoreRegisterUpdate, CoreRegisterResponse, PaginatedCoreRegisterResponse,
+    RegisterProjectionResponse,
+    CoreRegisterBatchCreate, CoreRegisterBatchItemResult, CoreRegisterBatchResponse,
     ReferencableEntityResponse, PaginatedReferencableEntityResponse,
-    EntityDataItemResponse, PaginatedEntityDataResponse,
-    UniqueFieldValidationResponse, UniqueFieldComplementaryValidationResponse
+    EntityDataItemResponse, PaginatedEntityDataResponse, EntityTypeaheadResponse,
+    UniqueFieldValidationResponse, UniqueFieldComplementaryValidationResponse,
+    UniqueFieldBatchValidationRequest, UniqueFieldBatchValidationResponse, MAX_UNIQUE_VALIDATION_VALUES
 )
 from .models.schema_forms import SchemaFormModel
 from .resources.schema_processor import process_schema_add_data_input_to_metadata
@@ -30,12 +35,28 @@ from .resources.register_processor import (
     extract_entity_data_from_detail,
     process_register_to_entity
 )
-from .resources.form_auto_creator import (
-    get_logical_identifier_field,
-    _get_logical_identifier_fields,
-    get_schema_columns_for_template,
-)
+from .resources.form_auto_creator import _get_logical_identifier_fields
 from .resources import resolve_display_name
+from .resources.detail_enricher import enrich_details_batch
+from .resources.register_mentions import save_register_mentions, save_new_registers_mentions, backfill_register_mentions
+from .resources.projection_worker import enqueue_projection, get_projection_pool
+from .resources.pagination import paginate, resolve_sort_column
+from .resources.register_search import register_search_filter
+from .resources.register_values import register_value_conditions
+from .resources.unique_validation import (
+    find_existing_entity_values, find_existing_complementary_values, get_unique_fields,
+    register_value_texts, unique_field_index_ddl, value_to_text
+)
+from .resources.excel_export import (
+    EXPORT_BATCH_SIZE, ExportSizeEstimator, build_export_columns, build_template_excel, collect_media_ids,
+    format_detail_value, iter_file_chunks, media_key
+)
+from .resources.model_registry import get_model_registry
+from .resources.tool_catalog import invalidate_tool_catalog
+from .resources.schema_artifacts import (
+    compile_schema_form, copy_template_columns, get_compiled_schema_form, get_compiled_schema_forms,
+    resolve_template_columns
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -124,6 +145,31 @@ class Funcionalities:
             per_page=per_page
         )
     
+    def _collection_version(self, model) -> Tuple:
+        """
+        Versión de una tabla de catálogo (forms, action_tools) para ETags: cantidad de filas
+        y últimas fechas de creación y actualización (archivar también actualiza updated_at).
+        """
+        db = self._get_db()
+        row = db.query(
+            func.count(model.id),
+            func.max(model.created_at),
+            func.max(model.updated_at)
+        ).one()
+        return tuple(value.isoformat() if isinstance(value, datetime) else value for value in row)
+    
+    def get_forms_version(self) -> Tuple:
+        """Versión de la lista de formularios (cambia al crear, editar o archivar uno)."""
+        return self._collection_version(FormModel)
+    
+    def get_form_version(self, form_id: UUID) -> Optional[Tuple]:
+        """Versión de un formulario con su schema: (schema_id, updated_at). None si no existe."""
+        db = self._get_db()
+        row = db.query(FormModel.schema_id, FormModel.updated_at).filter(FormModel.id == form_id).first()
+        if not row:
+            return None
+        return (str(row.schema_id) if row.schema_id else None, row.updated_at.isoformat() if row.updated_at else None)
+    
     def create_form(self, form_data: FormCreate) -> FormResponse:
         """Crea un nuevo formulario"""
         db = self._get_db()
@@ -246,6 +292,10 @@ class Funcionalities:
             per_page=per_page
         )
     
+    def get_tools_version(self) -> Tuple:
+        """Versión de la lista de tools (cambia al crear o editar una)."""
+        return self._collection_version(ActionToolModel)
+    
     def create_tool(self, tool_data: ActionToolCreate) -> ActionToolResponse:
         """Crea una nueva tool"""
         db = self._get_db()
@@ -254,6 +304,7 @@ class Funcionalities:
             db.add(tool)
             db.commit()
             db.refresh(tool)
+            invalidate_tool_catalog()
             return ActionToolResponse.model_validate(tool)
         except Exception as e:
             db.rollback()
@@ -278,67 +329,38 @@ class Funcionalities:
             tool.updated_at = datetime.utcnow()
             db.commit()
             db.refresh(tool)
+            invalidate_tool_catalog()
             return ActionToolResponse.model_validate(tool)
         except Exception as e:
             db.rollback()
             raise e
     
     # Core Register methods
-    def _get_entity_representative_value(self, entity_name: str, entity_id: Any, representative_value: str, db) -> Optional[str]:
+    def _enrich_details_with_display_names(
+        self,
+        registers: List[CoreRegisterModel],
+        db: Session
+    ) -> List[Optional[DetailArray]]:
         """
-        Obtiene el valor representativo de una entidad usando su representative_value template.
+        Enriquece el detail de una página de registros agregando display_name y
+        valores representativos de entidades.
+        
+        Resuelve toda la página en lote: una consulta para los schema_forms, una para las
+        entidades referenciables y una consulta IN (...) por tipo de entidad mencionada,
+        sin importar cuántos registros o campos de entidad haya.
         
         Args:
-            entity_name: Nombre de la entidad
-            entity_id: ID de la entidad
-            representative_value: Template del representative_value (ej: "{{first_name}} {{last_name}}")
+            registers: Registros de la página (en el orden de la respuesta)
             db: Sesión de base de datos
             
         Returns:
-            Valor representativo construido o None si no se puede obtener
+            Lista de details enriquecidos, en el mismo orden que registers
         """
-        try:
-            # Importar la función que encuentra el modelo por entity_name
-            from .resources.form_auto_creator import find_model_by_entity_name
-            
-            # Buscar el modelo correspondiente
-            model_class = find_model_by_entity_name(entity_name)
-            if not model_class:
-                print(f"⚠️  No se encontró modelo para entity_name: {entity_name}")
-                return None
-            
-            # Buscar el registro en la BD
-            entity_record = db.query(model_class).filter(
-                model_class.id == entity_id
-            ).first()
-            
-            if not entity_record:
-                print(f"⚠️  No se encontró registro con id {entity_id} en {entity_name}")
-                return None
-            
-            # Construir el valor representativo usando el template
-            import re
-            result = representative_value
-            
-            # Buscar todos los placeholders {{campo}}
-            placeholders = re.findall(r'\{\{(\w+)\}\}', representative_value)
-            
-            for placeholder in placeholders:
-                # Obtener el valor del atributo
-                attr_value = getattr(entity_record, placeholder, None)
-                if attr_value is not None:
-                    result = result.replace(f'{{{{{placeholder}}}}}', str(attr_value))
-                else:
-                    result = result.replace(f'{{{{{placeholder}}}}}', '')
-            
-            # Limpiar espacios múltiples
-            result = ' '.join(result.split())
-            
-            return result.strip() if result.strip() else None
-            
-        except Exception as e:
-            print(f"❌ Error al obtener valor representativo de {entity_name}: {e}")
-            return None
+        return enrich_details_batch(
+            ((register.detail, register.schema_form_id) for register in registers),
+            db,
+            find_model_by_entity_name
+        )
     
     def _enrich_detail_with_display_names(
         self, 
@@ -359,95 +381,7 @@ class Funcionalities:
         """
         if not detail:
             return detail
-        
-        # Obtener el schema_form
-        schema_form = db.query(SchemaFormModel).filter(
-            SchemaFormModel.id == schema_form_id
-        ).first()
-        
-        if not schema_form or not schema_form.schema:
-            return detail
-        
-        # Crear mapas desde las instructions del schema
-        display_name_map = {}
-        entity_info_map = {}  # name -> {entity_name, representative_value}
-        instructions = schema_form.schema.get('instructions', [])
-        
-        for instruction_data in instructions:
-            if isinstance(instruction_data, dict):
-                name = instruction_data.get('name')
-                display_name = instruction_data.get('display_name')
-                
-                if name and display_name:
-                    display_name_map[name] = display_name
-                
-                # Verificar si es una entidad (type_value == "entity")
-                schema_gather = instruction_data.get('schema_gather', {})
-                type_value = schema_gather.get('type_value')
-                
-                if type_value == 'entity' and name:
-                    # Buscar el entity_type en schema_input
-                    schema_input = instruction_data.get('schema_input', [])
-                    entity_type_value = None
-                    
-                    # Buscar el input con name "entity_type"
-                    for input_item in schema_input:
-                        if isinstance(input_item, dict) and input_item.get('name') == 'entity_type':
-                            # El value puede estar como string directo o como lista de objetos
-                            value = input_item.get('value')
-                            if isinstance(value, list) and len(value) > 0:
-                                # Si es lista, tomar el primer elemento
-                                first_item = value[0]
-                                if isinstance(first_item, dict):
-                                    entity_type_value = first_item.get('value')
-                                else:
-                                    entity_type_value = first_item
-                            elif isinstance(value, str):
-                                entity_type_value = value
-                            break
-                    
-                    if entity_type_value:
-                        # Obtener el representative_value de la entidad referenciable
-                        ref_entity = db.query(ReferencableEntityModel).filter(
-                            ReferencableEntityModel.entity_name == entity_type_value,
-                            ReferencableEntityModel.disabled_at.is_(None)
-                        ).first()
-                        
-                        if ref_entity and ref_entity.representative_value:
-                            entity_info_map[name] = {
-                                'entity_name': entity_type_value,
-                                'representative_value': ref_entity.representative_value
-                            }
-        
-        # Enriquecer cada elemento del detail con su display_name y valores representativos
-        enriched_detail = []
-        for item in detail:
-            if isinstance(item, dict):
-                item_copy = item.copy()
-                item_name = item.get('name')
-                item_value = item.get('value')
-                
-                # Agregar display_name
-                if item_name and item_name in display_name_map:
-                    item_copy['display_name'] = display_name_map[item_name]
-                
-                # Agregar valor representativo para entidades
-                if item_name and item_name in entity_info_map and item_value:
-                    entity_info = entity_info_map[item_name]
-                    entity_display = self._get_entity_representative_value(
-                        entity_info['entity_name'],
-                        item_value,
-                        entity_info['representative_value'],
-                        db
-                    )
-                    if entity_display:
-                        item_copy['entity_display_value'] = entity_display
-                
-                enriched_detail.append(item_copy)
-            else:
-                enriched_detail.append(item)
-        
-        return enriched_detail
+        return enrich_details_batch([(detail, schema_form_id)], db, find_model_by_entity_name)[0]
     
     def get_registers_by_form(
         self, 
@@ -458,73 +392,32 @@ class Funcionalities:
         order: Optional[str] = "asc", 
         search: str = "",
         start_date: Optional[str] = None,
-        end_date: Optional[str] = None
+        end_date: Optional[str] = None,
+        cursor: Optional[str] = None,
+        count: str = "exact",
+        filters: Optional[str] = None
     ) -> PaginatedCoreRegisterResponse:
         """
         Lista todos los registros de un formulario paginados (solo los no deshabilitados)
         
         Args:
             form_id: ID del formulario
-            page: Número de página
+            page: Número de página (se ignora si se envía cursor)
             per_page: Registros por página
             sort_by: Campo para ordenar
             order: Orden ascendente o descendente
-            search: Texto de búsqueda en detail
+            search: Texto de búsqueda en los valores del detail (sin distinguir tildes; sin sort_by ordena por relevancia)
             start_date: Fecha inicial (filtro por created_at) en formato YYYY-MM-DD
             end_date: Fecha final (filtro por created_at) en formato YYYY-MM-DD
+            cursor: Cursor de la página siguiente (next_cursor de la respuesta anterior)
+            count: Modo de conteo del total: exact, estimated o none
+            filters: Condiciones sobre las respuestas separadas por coma (ej: 'certificacion=organic,area>2'),
+                resueltas con core_register_values (ver register_values.parse_register_filters)
         """
         db = self._get_db()
         from datetime import datetime as dt
         
-        # Query base con conversión de geometry a texto directamente
-        base_query = db.query(CoreRegisterModel).filter(
-            CoreRegisterModel.form_id == form_id,
-            CoreRegisterModel.disabled_at.is_(None)
-        )
-        
-        # Aplicar búsqueda si se proporciona (buscar en detail que es JSONB)
-        if search:
-            # Buscar en el JSON detail convirtiendo a texto
-            from sqlalchemy import String
-            base_query = base_query.filter(
-                func.cast(CoreRegisterModel.detail, String).ilike(f"%{search}%")
-            )
-        
-        # Filtro por rango de fechas
-        if start_date:
-            try:
-                start_dt = dt.strptime(start_date, "%Y-%m-%d")
-                base_query = base_query.filter(
-                    func.date(CoreRegisterModel.created_at) >= start_dt.date()
-                )
-            except ValueError:
-                raise ValueError(f"Formato de fecha inicio inválido: {start_date}. Use YYYY-MM-DD")
-        
-        if end_date:
-            try:
-                end_dt = dt.strptime(end_date, "%Y-%m-%d")
-                base_query = base_query.filter(
-                    func.date(CoreRegisterModel.created_at) <= end_dt.date()
-                )
-            except ValueError:
-                raise ValueError(f"Formato de fecha fin inválido: {end_date}. Use YYYY-MM-DD")
-        
-        # Aplicar ordenamiento
-        if sort_by:
-            sort_column = getattr(CoreRegisterModel, sort_by, None)
-            if sort_column is not None:
-                if order and order.lower() == "desc":
-                    base_query = base_query.order_by(sort_column.desc())
-                else:
-                    base_query = base_query.order_by(sort_column.asc())
-        else:
-            # Ordenamiento por defecto
-            base_query = base_query.order_by(CoreRegisterModel.created_at.desc())
-        
-        total = base_query.count()
-        offset = (page - 1) * per_page
-        
-        # Query con conversión de geometry a texto para los resultados
+        # Query con conversión de geometry a texto directamente
         query = db.query(
             CoreRegisterModel,
             func.ST_AsText(CoreRegisterModel.location).label('location_text')
@@ -533,14 +426,17 @@ class Funcionalities:
             CoreRegisterModel.disabled_at.is_(None)
         )
         
-        # Aplicar búsqueda también en la query de resultados
-        if search:
-            from sqlalchemy import String
-            query = query.filter(
-                func.cast(CoreRegisterModel.detail, String).ilike(f"%{search}%")
-            )
+        # Búsqueda de texto (sin tildes) sobre los valores visibles del detail
+        search_rank = None
+        if search and search.strip():
+            search_match, search_rank = register_search_filter(search)
+            query = query.filter(search_match)
         
-        # Aplicar filtros de fecha también en la query de resultados
+        # Filtros estructurados por respuesta (core_register_values)
+        if filters:
+            query = query.filter(*register_value_conditions(form_id, filters))
+        
+        # Filtro por rango de fechas
         if start_date:
             try:
                 start_dt = dt.strptime(start_date, "%Y-%m-%d")
@@ -548,7 +444,7 @@ class Funcionalities:
                     func.date(CoreRegisterModel.created_at) >= start_dt.date()
                 )
             except ValueError:
-                pass  # Ya validado en base_query
+                raise ValueError(f"Formato de fecha inicio inválido: {start_date}. Use YYYY-MM-DD")
         
         if end_date:
             try:
@@ -557,31 +453,38 @@ class Funcionalities:
                     func.date(CoreRegisterModel.created_at) <= end_dt.date()
                 )
             except ValueError:
-                pass  # Ya validado en base_query
+                raise ValueError(f"Formato de fecha fin inválido: {end_date}. Use YYYY-MM-DD")
         
-        # Aplicar ordenamiento también en la query de resultados
-        if sort_by:
-            sort_column = getattr(CoreRegisterModel, sort_by, None)
-            if sort_column is not None:
-                if order and order.lower() == "desc":
-                    query = query.order_by(sort_column.desc())
-                else:
-                    query = query.order_by(sort_column.asc())
+        # Ordenamiento por (sort_column, id); por defecto relevancia si hay búsqueda, si no created_at desc
+        sort_column = resolve_sort_column(CoreRegisterModel, sort_by, None)
+        if sort_column is not None:
+            descending = bool(order and order.lower() == "desc")
+        elif search_rank is not None:
+            sort_column, descending = search_rank, True
         else:
-            query = query.order_by(CoreRegisterModel.created_at.desc())
+            sort_column, descending = CoreRegisterModel.created_at, True
         
-        results = query.offset(offset).limit(per_page).all()
+        result_page = paginate(
+            query,
+            sort_column=sort_column,
+            id_column=CoreRegisterModel.id,
+            descending=descending,
+            page=page,
+            per_page=per_page,
+            cursor=cursor,
+            count=count
+        )
+        results = result_page.items
+        
+        # Enriquecer el detail de toda la página en lote
+        enriched_details = self._enrich_details_with_display_names(
+            [register for register, _ in results],
+            db
+        )
         
         # Construir respuestas con location convertido a texto
         register_responses = []
-        for register, location_text in results:
-            # Enriquecer el detail con display_names
-            enriched_detail = self._enrich_detail_with_display_names(
-                register.detail,
-                register.schema_form_id,
-                db
-            )
-            
+        for (register, location_text), enriched_detail in zip(results, enriched_details):
             register_dict = {
                 'id': register.id,
                 'form_id': register.form_id,
@@ -602,9 +505,10 @@ class Funcionalities:
         
         return PaginatedCoreRegisterResponse(
             items=register_responses,
-            total=total,
+            total=result_page.total,
             page=page,
-            per_page=per_page
+            per_page=per_page,
+            next_cursor=result_page.next_cursor
         )
     
     def create_form_schema(self, form_id: UUID, schema: Dict[str, Any]) -> FormWithSchemaResponse:
@@ -686,6 +590,10 @@ class Funcionalities:
             db.commit()
             db.refresh(form)
             
+            # Índices de los campos únicos del nuevo schema (en segundo plano)
+            if get_unique_fields(processed_schema):
+                self._ensure_unique_field_indexes_in_background([form_id])
+            
             # Construir la respuesta con el form y el schema
             form_dict = {
                 "id": form.id,
@@ -760,12 +668,9 @@ class Funcionalities:
         if not form:
             return None
         
-        # Obtener el schema si existe schema_id
-        schema = None
-        if form.schema_id:
-            schema_form = db.query(SchemaFormModel).filter(SchemaFormModel.id == form.schema_id).first()
-            if schema_form:
-                schema = schema_form.schema
+        # Schema desde el artefacto compilado (cacheado por schema_form_id)
+        compiled = get_compiled_schema_form(db, form.schema_id)
+        schema = compiled.schema if compiled else None
         
         # Construir la respuesta con el form y el schema
         form_dict = {
@@ -840,93 +745,113 @@ class Funcionalities:
         Para columnas tipo entity (FK): si la entidad referenciada tiene form con form_purpose=entity,
         usa {prefix}_{logical_id} (ej: farmer_dni) en vez de farmer_id.
         Cada form se crea desde una entidad: entity_name permite buscar display_name de cada attr en el modelo.
+        
+        Para un formulario existente usar get_form_template_columns (cacheado por schema_form_id).
         """
-        columns = get_schema_columns_for_template(schema)
-        filtered = []
-        for col in columns:
-            if col.get("type_value") != "entity":
-                filtered.append(col)
-                continue
-            fk_table = col.get("foreign_key_table")
-            if not fk_table and col.get("name", "").endswith("_id"):
-                prefix = col["name"][:-3]
-                fk_table = f"{prefix}s"
-                col["foreign_key_table"] = fk_table
-            if not fk_table:
-                continue
-            related_form = self.get_form_by_entity_name(fk_table)
-            if not related_form or not related_form.schema:
-                continue
-            lid_field = get_logical_identifier_field(related_form.schema)
-            if not lid_field:
-                continue
-            original_name = col["name"]
-            prefix = original_name[:-3] if original_name.endswith("_id") else original_name
-            new_name = f"{prefix}_{lid_field}"
-            col["schema_field_name"] = original_name
-            col["name"] = new_name
-            col["display_name"] = new_name
-            try:
-                rel_model = find_model_by_entity_name(fk_table)
-                if rel_model and hasattr(rel_model, "__table__") and lid_field in rel_model.__table__.c:
-                    sa_col = rel_model.__table__.c[lid_field]
-                    if getattr(sa_col, "info", None) and isinstance(sa_col.info, dict) and sa_col.info.get("display_name"):
-                        col["display_name"] = sa_col.info["display_name"]
-            except Exception:
-                pass
-            filtered.append(col)
-        columns = filtered
-        # display_name desde el modelo (column.info["display_name"]) - usar sqlalchemy.inspect
-        model_class = None
-        if entity_name:
-            model_class = find_model_by_entity_name(entity_name)
-        if not model_class:
-            try:
-                from core.models.registry import get_registry
-                non_entity_names = {c.get("name") for c in columns if c.get("type_value") != "entity" and c.get("name")}
-                if non_entity_names:
-                    best_match, best_count = None, 0
-                    for _tablename, mod in get_registry().get_all_models().items():
-                        if not hasattr(mod, "__table__"):
-                            continue
-                        table_names = set(mod.__table__.c.keys())
-                        match_count = len(non_entity_names & table_names)
-                        if match_count > best_count:
-                            best_count, best_match = match_count, mod
-                    if best_match:
-                        model_class = best_match
-            except Exception:
-                pass
-        if model_class and hasattr(model_class, "__table__"):
-            table = model_class.__table__
-            display_map = {}
-            try:
-                for key in table.c.keys():
-                    try:
-                        sa_col = table.c[key]
-                    except (KeyError, TypeError):
-                        continue
-                    if getattr(sa_col, "info", None) and isinstance(sa_col.info, dict) and sa_col.info.get("display_name"):
-                        display_map[key] = sa_col.info["display_name"]
-            except Exception:
-                pass
-            for col in columns:
-                if col.get("type_value") == "entity":
-                    continue
-                attr_name = col.get("name")
-                if attr_name and attr_name in display_map:
-                    col["display_name"] = display_map[attr_name]
-        return columns
+        compiled = compile_schema_form(None, schema)
+        related = self._get_entity_forms_logical_identifiers(compiled.foreign_key_tables)
+        return resolve_template_columns(
+            compiled,
+            entity_name,
+            {name: lid for name, (_, lid) in related.items()},
+            find_model_by_entity_name,
+            lambda: get_model_registry().get_all_models()
+        )
+    
+    def _get_entity_forms_logical_identifiers(self, entity_names) -> Dict[str, Tuple[UUID, Optional[str]]]:
+        """
+        Para cada entidad, el schema_id de su formulario de entidad y el identificador
+        lógico de ese schema (desde el artefacto compilado). Una consulta para todas.
+        """
+        names = {name.strip().lower() for name in entity_names if name and name.strip()}
+        if not names:
+            return {}
+        db = self._get_db()
+        rows = db.query(FormModel.entity_name, FormModel.schema_id).filter(
+            FormModel.disabled_at.is_(None),
+            FormModel.form_purpose == FormPurpose.entity,
+            func.lower(FormModel.entity_name).in_(names),
+        ).all()
+        schema_ids = {}
+        for entity_name, schema_id in rows:
+            schema_ids.setdefault(entity_name.lower(), schema_id)
+        compiled = get_compiled_schema_forms(db, [schema_id for schema_id in schema_ids.values() if schema_id])
+        result = {}
+        for entity_name, schema_id in schema_ids.items():
+            artifact = compiled.get(schema_id)
+            if artifact is not None:
+                result[entity_name] = (schema_id, artifact.logical_identifier)
+        return result
+    
+    def get_entity_logical_identifier(self, entity_name: str) -> Optional[str]:
+        """Identificador lógico del formulario de entidad de entity_name (o None)."""
+        related = self._get_entity_forms_logical_identifiers([entity_name])
+        entry = related.get(entity_name.strip().lower()) if entity_name else None
+        return entry[1] if entry else None
+    
+    def get_schema_logical_identifier(self, schema_form_id: Optional[UUID]) -> Optional[str]:
+        """Identificador lógico de un schema_form (desde su artefacto compilado)."""
+        compiled = get_compiled_schema_form(self._get_db(), schema_form_id)
+        return compiled.logical_identifier if compiled else None
+    
+    def _get_form_template(self, form_id: UUID):
+        """
+        Formulario y variante de plantilla cacheada en el artefacto de su schema.
+        La variante depende de entity_name y de los schemas de los formularios de las
+        entidades referenciadas (si cambian, se construye otra).
+        """
+        db = self._get_db()
+        form = db.query(FormModel).filter(FormModel.id == form_id).first()
+        if not form:
+            return None, None
+        compiled = get_compiled_schema_form(db, form.schema_id)
+        if not compiled:
+            return form, None
+        related = self._get_entity_forms_logical_identifiers(compiled.foreign_key_tables)
+        key = (form.entity_name, tuple(sorted((name, str(schema_id)) for name, (schema_id, _) in related.items())))
+        template = compiled.get_template(key, lambda: resolve_template_columns(
+            compiled,
+            form.entity_name,
+            {name: lid for name, (_, lid) in related.items()},
+            find_model_by_entity_name,
+            lambda: get_model_registry().get_all_models()
+        ))
+        return form, template
+    
+    def get_form_template_columns(self, form_id: UUID) -> List[Dict[str, Any]]:
+        """Columnas de la plantilla Excel de un formulario (desde el artefacto compilado de su schema)."""
+        _, template = self._get_form_template(form_id)
+        return copy_template_columns(list(template.columns)) if template else []
+    
+    def get_form_template_excel(self, form_id: UUID) -> Tuple[bytes, str]:
+        """
+        Plantilla Excel de carga masiva de un formulario. Los bytes se generan una vez
+        por variante de plantilla y quedan en el artefacto compilado.
+        
+        Returns:
+            (bytes del Excel, nombre de archivo seguro a partir del nombre del formulario)
+        """
+        form, template = self._get_form_template(form_id)
+        if not form or not template:
+            raise ValueError("Formulario no encontrado o sin schema")
+        if not template.columns:
+            raise ValueError("El schema del formulario no tiene columnas para la plantilla")
+        form_name = (form.name or "datos").strip()
+        form_name = "".join(c if c.isalnum() or c in " -_" else "_" for c in form_name) or "datos"
+        return template.get_excel(build_template_excel), form_name
     
     # Core Register methods
     
-    def create_register(self, register_data: CoreRegisterCreate) -> CoreRegisterResponse:
+    def create_register(self, register_data: CoreRegisterCreate, async_projection: bool = False) -> CoreRegisterResponse:
         """
         Crea un nuevo registro en core_registers.
         Si el formulario tiene form_purpose=ENTITY, también guarda los datos en la tabla correspondiente.
         
         Args:
             register_data: Datos del registro a crear
+            async_projection: Si es True y el formulario es ENTITY, el registro se guarda con
+                status=partial y la proyección a la entidad la realiza el pool de workers
+                (consultar el resultado con get_register_projection)
             
         Returns:
             CoreRegisterResponse con el registro creado
@@ -944,7 +869,7 @@ class Funcionalities:
             
             # Convertir location de WKT string a Geometry si existe
             from geoalchemy2 import WKTElement
-            from sqlalchemy import func as sql_func
+            from sqlalchemy import func as sql_func, insert
             
             location_geom = None
             if register_data.location:
@@ -952,24 +877,20 @@ class Funcionalities:
                 location_geom = WKTElement(register_data.location, srid=4326)
             
             # Asegurar que identity_id existe en identities para no violar FK
+            # (resolución sub -> identity con caché del módulo auth)
             identity_id_to_use = register_data.identity_id
+            identity = None
             if identity_id_to_use is not None:
-                from modules.auth.src.models.identities import IdentityModel
-                identity_query = db.query(IdentityModel).filter(
-                    IdentityModel.sub == identity_id_to_use,
-                    IdentityModel.disabled_at.is_(None)
-                ).first()
-                identity_exists = identity_query is not None
-                if not identity_exists:
-                    print(f"⚠️ Identity {identity_id_to_use} from token not found in identities table; saving register without identity_id")
-                    raise ValueError("Identidad no encontrada")
-                    # identity_id_to_use = None
+                from modules.auth.src.resources.identity_resolver import require_identity
+                identity = require_identity(db, identity_id_to_use)
             
             # Crear el registro
             # status se establece por defecto como success (el schema no lo incluye)
             # error se establece como None (el schema no lo incluye)
             # entity_id se establece como None inicialmente, se actualizará si se procesa la entidad
+            # El id se genera aquí para poder proyectar la entidad antes del INSERT del registro
             register = CoreRegisterModel(
+                id=uuid4(),
                 form_id=register_data.form_id,
                 schema_form_id=register_data.schema_form_id,
                 detail=register_data.detail,
@@ -978,44 +899,60 @@ class Funcionalities:
                 location=location_geom,
                 entity_name=entity_name,  # Obtenido del formulario
                 entity_id=None,  # Se actualizará si se procesa la entidad
-                identity_id=identity_query.id,  # Usuario quien registra (None si no existe en identities)
+                identity_id=identity.id if identity else None,  # Usuario quien registra
                 duration=register_data.duration  # Tiempo que demoró el registro
             )
-            db.add(register)
-            db.commit()
-            db.refresh(register)
             
             # Si el formulario tiene form_purpose=ENTITY, procesar y guardar en la tabla correspondiente
-            # (misma lógica que antes ejecutaba el trigger vía API interna)
-            if form.form_purpose == FormPurpose.entity:
+            # (misma lógica que antes ejecutaba el trigger vía API interna).
+            # La proyección corre en un savepoint de esta misma transacción: si falla, solo se
+            # revierte el savepoint y el registro se guarda con status=failed.
+            project_async = async_projection and form.form_purpose == FormPurpose.entity
+            if project_async:
+                register.status = RegisterStatus.partial
+            elif form.form_purpose == FormPurpose.entity:
                 try:
-                    entity_id = process_register_to_entity(register, db, FormModel, FormPurpose)
-                    if entity_id:
-                        register.status = RegisterStatus.success
-                        register.error = None
-                    else:
+                    entity_id = process_register_to_entity(register, db, FormModel, FormPurpose, form=form)
+                    if not entity_id:
                         register.status = RegisterStatus.failed
                         register.error = {'message': 'No se pudo procesar el registro a entidad'}
-                    db.commit()
-                    db.refresh(register)
                 except Exception as e:
-                    db.rollback()
                     import traceback
-                    register = db.query(CoreRegisterModel).filter(CoreRegisterModel.id == register.id).first()
-                    if register:
-                        register.status = RegisterStatus.failed
-                        register.error = {'message': str(e), 'traceback': traceback.format_exc()}
-                        db.commit()
-                        db.refresh(register)
-            
-            # Convertir location a texto para la respuesta
-            location_text = None
-            if register.location:
-                result = db.query(sql_func.ST_AsText(register.location)).filter(
-                    CoreRegisterModel.id == register.id
-                ).first()
-                if result:
-                    location_text = result[0]
+                    register.status = RegisterStatus.failed
+                    register.error = {'message': str(e), 'traceback': traceback.format_exc()}
+            
+            # Un solo INSERT del registro en su estado final; RETURNING devuelve los valores
+            # generados por la base de datos y la ubicación como texto
+            table = CoreRegisterModel.__table__
+            inserted = db.execute(
+                insert(table).values(
+                    id=register.id,
+                    form_id=register.form_id,
+                    schema_form_id=register.schema_form_id,
+                    detail=register.detail,
+                    status=register.status,
+                    error=register.error,
+                    location=register.location,
+                    entity_name=register.entity_name,
+                    entity_id=register.entity_id,
+                    identity_id=register.identity_id,
+                    duration=register.duration
+                ).returning(
+                    table.c.created_at,
+                    table.c.updated_at,
+                    table.c.disabled_at,
+                    sql_func.ST_AsText(table.c.location).label('location_text')
+                )
+            ).one()
+            # Indexar las entidades mencionadas en la misma transacción del registro
+            save_register_mentions(db, register)
+            if project_async:
+                enqueue_projection(db, register.id)
+            db.commit()
+            if project_async:
+                get_projection_pool(self.container).notify()
+            
+            location_text = inserted.location_text
             
             # Construir respuesta
             # Enriquecer el detail con display_names
@@ -1037,9 +974,9 @@ class Funcionalities:
                 'entity_id': register.entity_id,
                 'identity_id': register.identity_id,
                 'duration': register.duration,
-                'created_at': register.created_at,
-                'updated_at': register.updated_at,
-                'disabled_at': register.disabled_at
+                'created_at': inserted.created_at,
+                'updated_at': inserted.updated_at,
+                'disabled_at': inserted.disabled_at
             }
             
             return CoreRegisterResponse(**register_dict)
@@ -1051,6 +988,278 @@ class Funcionalities:
             traceback.print_exc()
             raise e
     
+    def create_registers_batch(self, batch: CoreRegisterBatchCreate, identity_sub: Optional[UUID] = None) -> CoreRegisterBatchResponse:
+        """
+        Crea varios registros en core_registers en una sola transacción (sincronización offline).
+        
+        - Formularios, schemas e identidades se resuelven una vez por lote; sin token, cada
+          registro usa la identidad de su propio identity_id
+        - Los registros con idempotency_key ya guardada (o repetida en el lote) se informan
+          como duplicate con el registro existente, sin volver a crearlos
+        - Identidad, formulario y ubicación (WKT) se validan por registro; los inválidos se
+          informan como error sin afectar a los demás
+        - Las entidades de formularios ENTITY se proyectan en una pasada (cada una en su
+          savepoint) o se encolan si batch.async_projection
+        - Los registros se insertan con un único INSERT multi-fila; si éste falla, se
+          reintenta cada registro (proyección e inserción) en su propio savepoint y los
+          que fallen se informan como error
+        
+        Args:
+            batch: Registros del lote
+            identity_sub: sub del token; reemplaza el identity_id enviado en cada registro
+            
+        Returns:
+            CoreRegisterBatchResponse con un resultado por registro, en el orden recibido
+            
+        Raises:
+            ValueError: Si la identidad del token no existe
+        """
+        from geoalchemy2 import WKTElement
+        from sqlalchemy import text
+        from modules.auth.src.resources.identity_resolver import require_identity, resolve_identities
+        
+        db = self._get_db()
+        items = batch.registers
+        results: List[Optional[CoreRegisterBatchItemResult]] = [None] * len(items)
+        
+        def item_error(index: int, message: str) -> CoreRegisterBatchItemResult:
+            return CoreRegisterBatchItemResult(
+                index=index, idempotency_key=items[index].idempotency_key, result="error",
+                error={'message': message}
+            )
+        
+        try:
+            # Identidades: la del token para todo el lote, o la de cada registro
+            # (una sola consulta, con caché del módulo auth)
+            token_identity_id = require_identity(db, identity_sub).id if identity_sub is not None else None
+            identities = {} if identity_sub is not None else resolve_identities(
+                db, {item.identity_id for item in items if item.identity_id}
+            )
+            
+            # Idempotencia: bloquear las claves del lote (evita carreras entre reintentos
+            # concurrentes) y buscar las que ya fueron guardadas
+            keys = sorted({item.idempotency_key for item in items if item.idempotency_key})
+            existing_by_key = {}
+            if keys:
+                db.execute(
+                    text("SELECT pg_advisory_xact_lock(hashtext(k)) FROM unnest(CAST(:keys AS TEXT[])) AS k"),
+                    {"keys": keys}
+                )
+                existing_by_key = {
+                    row.idempotency_key: row
+                    for row in db.query(
+                        CoreRegisterModel.id,
+                        CoreRegisterModel.status,
+                        CoreRegisterModel.entity_id,
+                        CoreRegisterModel.idempotency_key
+                    ).filter(CoreRegisterModel.idempotency_key.in_(keys)).all()
+                }
+            
+            # Formularios y schemas: una consulta cada uno
+            form_ids = {item.form_id for item in items}
+            forms = {form.id: form for form in db.query(FormModel).filter(FormModel.id.in_(form_ids)).all()}
+            schema_forms = dict(
+                db.query(SchemaFormModel.id, SchemaFormModel.form_id).filter(
+                    SchemaFormModel.id.in_({item.schema_form_id for item in items})
+                ).all()
+            )
+            
+            registers = []
+            keys_in_batch = {}
+            for index, item in enumerate(items):
+                key = item.idempotency_key
+                if key and key in existing_by_key:
+                    existing = existing_by_key[key]
+                    results[index] = CoreRegisterBatchItemResult(
+                        index=index, idempotency_key=key, result="duplicate",
+                        register_id=existing.id, status=existing.status, entity_id=existing.entity_id
+                    )
+                    continue
+                if key and key in keys_in_batch:
+                    # Se completa al final con el resultado del primer registro con la clave
+                    continue
+                
+                form = forms.get(item.form_id)
+                if not form:
+                    results[index] = item_error(index, f"Formulario con id {item.form_id} no encontrado")
+                    continue
+                if schema_forms.get(item.schema_form_id) != item.form_id:
+                    results[index] = item_error(index, f"Schema form con id {item.schema_form_id} no pertenece al formulario {item.form_id}")
+                    continue
+                
+                identity_id = token_identity_id
+                if identity_sub is None and item.identity_id:
+                    identity = identities.get(str(item.identity_id))
+                    if identity is None:
+                        results[index] = item_error(index, "Identidad no encontrada")
+                        continue
+                    identity_id = identity.id
+                
+                if item.location:
+                    try:
+                        with db.begin_nested():
+                            db.execute(text("SELECT ST_GeomFromText(:wkt, 4326)"), {"wkt": item.location})
+                    except Exception:
+                        results[index] = item_error(index, f"Ubicación inválida: {item.location}")
+                        continue
+                
+                registers.append((index, form, CoreRegisterModel(
+                    id=uuid4(),
+                    form_id=item.form_id,
+                    schema_form_id=item.schema_form_id,
+                    detail=item.detail,
+                    status=RegisterStatus.success,
+                    error=None,
+                    location=WKTElement(item.location, srid=4326) if item.location else None,
+                    entity_name=form.entity_name,
+                    entity_id=None,
+                    identity_id=identity_id,
+                    duration=item.duration,
+                    idempotency_key=key
+                )))
+                if key:
+                    keys_in_batch[key] = index
+            
+            def project(form, register) -> None:
+                # Proyección a la entidad (savepoint por registro dentro de process_register_to_entity)
+                register.entity_id = None
+                register.entity_name = form.entity_name
+                register.status = RegisterStatus.success
+                register.error = None
+                if form.form_purpose != FormPurpose.entity:
+                    return
+                if batch.async_projection:
+                    register.status = RegisterStatus.partial
+                    return
+                try:
+                    entity_id = process_register_to_entity(register, db, FormModel, FormPurpose, form=form)
+                    if not entity_id:
+                        register.status = RegisterStatus.failed
+                        register.error = {'message': 'No se pudo procesar el registro a entidad'}
+                except Exception as e:
+                    register.status = RegisterStatus.failed
+                    register.error = {'message': str(e)}
+            
+            if registers:
+                try:
+                    # Camino rápido: proyecciones y un único INSERT multi-fila
+                    with db.begin_nested():
+                        for _, form, register in registers:
+                            project(form, register)
+                        self._insert_batch_registers(db, [register for _, _, register in registers])
+                except Exception as e:
+                    # Algún registro viola una restricción: proyección e inserción por registro
+                    print(f"⚠️  INSERT multi-fila del lote falló, reintentando por registro: {e}")
+                    inserted = []
+                    for index, form, register in registers:
+                        try:
+                            with db.begin_nested():
+                                project(form, register)
+                                self._insert_batch_registers(db, [register])
+                            inserted.append((index, form, register))
+                        except Exception as item_exc:
+                            results[index] = item_error(index, str(getattr(item_exc, "orig", None) or item_exc))
+                    registers = inserted
+            db.commit()
+            
+            if batch.async_projection and any(register.status == RegisterStatus.partial for _, _, register in registers):
+                get_projection_pool(self.container).notify()
+            
+            for index, _, register in registers:
+                results[index] = CoreRegisterBatchItemResult(
+                    index=index,
+                    idempotency_key=register.idempotency_key,
+                    result="created",
+                    register_id=register.id,
+                    status=register.status,
+                    entity_id=register.entity_id,
+                    error=register.error
+                )
+            
+            # Claves repetidas dentro del lote: mismo resultado que la primera aparición
+            for index, item in enumerate(items):
+                if results[index] is None:
+                    first = results[keys_in_batch[item.idempotency_key]]
+                    update = {"index": index} if first.result == "error" else {"index": index, "result": "duplicate"}
+                    results[index] = first.model_copy(update=update)
+            
+            return CoreRegisterBatchResponse(
+                results=results,
+                created=sum(1 for result in results if result.result == "created"),
+                duplicated=sum(1 for result in results if result.result == "duplicate"),
+                errors=sum(1 for result in results if result.result == "error")
+            )
+            
+        except Exception as e:
+            db.rollback()
+            print(f"❌ Error al crear lote de registros: {e}")
+            raise e
+    
+    @staticmethod
+    def _insert_batch_registers(db, registers: List[CoreRegisterModel]) -> None:
+        """INSERT multi-fila de registros del lote, con sus menciones y su cola de proyección."""
+        from sqlalchemy import insert
+        
+        db.execute(insert(CoreRegisterModel.__table__).values([
+            {
+                'id': register.id,
+                'form_id': register.form_id,
+                'schema_form_id': register.schema_form_id,
+                'detail': register.detail,
+                'status': register.status,
+                'error': register.error,
+                'location': register.location,
+                'entity_name': register.entity_name,
+                'entity_id': register.entity_id,
+                'identity_id': register.identity_id,
+                'duration': register.duration,
+                'idempotency_key': register.idempotency_key
+            }
+            for register in registers
+        ]))
+        save_new_registers_mentions(db, registers)
+        for register in registers:
+            if register.status == RegisterStatus.partial:
+                enqueue_projection(db, register.id)
+    
+    def get_register_projection(self, register_id: UUID) -> RegisterProjectionResponse:
+        """
+        Estado de la proyección de un registro a su entidad.
+        
+        Mientras el registro esté en status=partial la proyección asíncrona sigue
+        pendiente; al terminar el status es success (con entity_id) o failed (con error).
+        
+        Raises:
+            ValueError: Si el registro no existe
+        """
+        db = self._get_db()
+        row = db.query(
+            CoreRegisterModel.id,
+            CoreRegisterModel.status,
+            CoreRegisterModel.entity_name,
+            CoreRegisterModel.entity_id,
+            CoreRegisterModel.error,
+            CoreRegisterProjectionJobModel.attempts
+        ).outerjoin(
+            CoreRegisterProjectionJobModel,
+            CoreRegisterProjectionJobModel.register_id == CoreRegisterModel.id
+        ).filter(
+            CoreRegisterModel.id == register_id,
+            CoreRegisterModel.disabled_at.is_(None)
+        ).first()
+        if not row:
+            raise ValueError(f"Registro con id {register_id} no encontrado")
+        
+        return RegisterProjectionResponse(
+            register_id=row.id,
+            status=row.status,
+            pending=row.status == RegisterStatus.partial and row.attempts is not None,
+            entity_name=row.entity_name,
+            entity_id=row.entity_id,
+            error=row.error,
+            attempts=row.attempts or 0
+        )
+    
     def generate_form_entities(self, config: Dict[str, Any]) -> None:
         """
         Genera formularios automáticamente basados en la configuración del config.yaml.
@@ -1060,17 +1269,26 @@ class Funcionalities:
         Para cada form definido, crea automáticamente un formulario que recolecta
         los atributos de la entidad mencionada.
         
+        Es incremental: los formularios cuya huella (modelo, entrada en config.yaml,
+        entidades referenciables y versión de tools) coincide con la del manifiesto
+        form_generation_manifest se omiten sin generar su schema. Los demás se generan,
+        en paralelo si FORM_GENERATION_WORKERS > 1, y se guardan uno a uno.
+        
         Args:
             config: Configuración completa del config.yaml
         """
         # Importar funciones necesarias desde resources (específicas del módulo data_collector)
-        from .resources.form_auto_creator import (
-            find_model_by_entity_name,
-            generate_schema_from_model,
-            _get_attributes_signature,
-            _get_schema_attributes_signature,
-            get_model_attributes
+        from .resources.form_auto_creator import find_model_by_entity_name, generate_schema_from_model
+        from .resources.form_manifest import (
+            FormGenerationJob,
+            form_manifest_key,
+            compute_form_fingerprint,
+            referencable_entities_version,
+            load_manifest,
+            is_form_unchanged,
+            generate_schemas
         )
+        from .environment import FORM_GENERATION_WORKERS, FORM_GENERATION_FORCE
         from sqlalchemy.orm import Session
         from sqlalchemy import text
         
@@ -1091,26 +1309,47 @@ class Funcionalities:
                     # Si ya existe, mantener el primero encontrado (o podrías hacer merge)
                     if ref_entity_name not in global_referencable_entities_map:
                         global_referencable_entities_map[ref_entity_name] = ref_entity
-                        print(f"  📋 Entidad referenciable global registrada: '{ref_entity_name}' -> representative_value: {ref_entity.get('representative_value', 'N/A')}")
         
         print(f"  ✅ Total de entidades referenciables encontradas: {len(global_referencable_entities_map)}")
         
+        db = self._get_db()
+        if isinstance(db, Session):
+            # Verificar si la transacción está en un estado válido
+            try:
+                db.execute(text("SELECT 1"))
+            except Exception as trans_error:
+                print(f"    ⚠️  Transacción abortada, haciendo rollback: {trans_error}")
+                db.rollback()
+        
+        # Entradas comunes a todas las huellas y estado actual de los formularios (una consulta cada una)
+        referencable_version = referencable_entities_version(db, global_referencable_entities_map)
+        try:
+            tools_version = self.get_tools_version()
+        except Exception:
+            db.rollback()
+            tools_version = None
+        manifest = {} if FORM_GENERATION_FORCE else load_manifest(db)
+        try:
+            active_schema_ids = {
+                row.id: row.schema_id
+                for row in db.query(FormModel.id, FormModel.schema_id).filter(FormModel.disabled_at.is_(None))
+            }
+        except Exception:
+            db.rollback()
+            active_schema_ids = {}
+        
         forms_created = 0
+        forms_updated = 0
+        forms_unchanged = 0
         forms_skipped = 0
+        jobs = []
         
         for module_config in modules_config:
             module_name = module_config.get("name")
             forms_config = module_config.get("forms", [])
             
-            if not forms_config:
-                continue
-            
-            print(f"  📦 Módulo {module_name}: {len(forms_config)} formulario(s) definido(s)")
-            
-            for form_config in forms_config:
+            for form_config in forms_config or []:
                 form_name = form_config.get("name")
-                form_id = form_config.get("id")  # Leer ID del config.yaml si existe
-                form_description = form_config.get("description", "")
                 entity_name = form_config.get("entity")
                 # IMPORTANTE: entityMap debe estar dentro de cada formulario en 'forms', NO en 'referencable_entities'
                 # entityMap permite personalizar campos del formulario (displayName, description, inputs, etc.)
@@ -1123,245 +1362,175 @@ class Funcionalities:
                     # Compatibilidad hacia atrás: si es una lista, usar merge por defecto
                     entity_map_mode = "merge"
                     entity_map = entity_map_config if isinstance(entity_map_config, list) else []
-                form_display_name = form_config.get("display_name")  # Obtener display_name del formulario
                 
                 if not form_name or not entity_name:
-                    print(f"    ⚠️  Formulario sin nombre o entidad, saltando...")
+                    print(f"    ⚠️  Formulario sin nombre o entidad en módulo {module_name}, saltando...")
                     forms_skipped += 1
                     continue
                 
                 # Convertir entity_name a minúsculas
-                entity_name = entity_name.lower() if entity_name else None
+                entity_name = entity_name.lower()
                 
-                try:
-                    # Buscar el modelo de la entidad
-                    model_class = find_model_by_entity_name(entity_name, self.container)
-                    if not model_class:
-                        print(f"    ⚠️  No se encontró modelo para entidad '{entity_name}', saltando formulario '{form_name}'")
-                        forms_skipped += 1
-                        continue
-                    
-                    print(f"    🔍 Entidad '{entity_name}' encontrada, generando schema...")
-                    if entity_map:
-                        print(f"    📝 Usando entityMap con mode='{entity_map_mode}' y {len(entity_map)} campos personalizados")
-                    if form_display_name:
-                        print(f"    📝 Usando display_name del formulario: {form_display_name}")
-                    
-                    # Usar el mapa GLOBAL de entidades referenciables (de todos los módulos)
-                    # Esto permite que cualquier ForeignKey encuentre su representative_value
-                    # sin importar en qué módulo esté definida la entidad referenciada
-                    referencable_entities_map = global_referencable_entities_map
-                    
-                    # Generar el schema desde el modelo (una instrucción por atributo usando tools)
-                    schema = generate_schema_from_model(
-                        model_class, 
-                        form_name, 
-                        self.container, 
-                        entity_map=entity_map,
-                        entity_map_mode=entity_map_mode,
-                        form_display_name=form_display_name,
-                        referencable_entities_map=referencable_entities_map
-                    )
-                    
-                    # Verificar si el formulario ya existe
-                    db = self._get_db()
-                    if isinstance(db, Session):
-                        # Verificar si la transacción está en un estado válido
-                        try:
-                            db.execute(text("SELECT 1"))
-                        except Exception as trans_error:
-                            print(f"    ⚠️  Transacción abortada, haciendo rollback: {trans_error}")
-                            try:
-                                db.rollback()
-                            except Exception as rollback_error:
-                                print(f"    ⚠️  Error al hacer rollback: {rollback_error}")
-                        
-                        # Obtener los atributos actuales de la entidad
-                        current_attributes = get_model_attributes(model_class)
-                        current_attr_signature = _get_attributes_signature(current_attributes)
-                        
-                        # Buscar formulario existente
-                        # Prioridad: 1) Por ID si se proporciona, 2) Por nombre+entidad
-                        try:
-                            if form_id:
-                                # Si se proporciona un ID en el config, buscar por ID primero
-                                from uuid import UUID as UUID_TYPE
-                                try:
-                                    form_uuid = UUID_TYPE(form_id) if isinstance(form_id, str) else form_id
-                                    existing_form = db.query(FormModel).filter(
-                                        FormModel.id == form_uuid,
-                                        FormModel.disabled_at.is_(None)
-                                    ).first()
-                                except (ValueError, AttributeError):
-                                    print(f"    ⚠️  ID inválido en config: {form_id}, buscando por nombre/entidad")
-                                    existing_form = db.query(FormModel).filter(
-                                        FormModel.name == form_name,
-                                        FormModel.entity_name == entity_name,
-                                        FormModel.form_purpose == FormPurpose.entity,
-                                        FormModel.disabled_at.is_(None)
-                                    ).first()
-                            else:
-                                # Si no hay ID, buscar por nombre y entidad (comportamiento anterior)
-                                existing_form = db.query(FormModel).filter(
-                                    FormModel.name == form_name,
-                                    FormModel.entity_name == entity_name,
-                                    FormModel.form_purpose == FormPurpose.entity,
-                                    FormModel.disabled_at.is_(None)
-                                ).first()
-                        except Exception as query_error:
-                            print(f"    ⚠️  Error en consulta, haciendo rollback: {query_error}")
-                            try:
-                                db.rollback()
-                                existing_form = db.query(FormModel).filter(
-                                    FormModel.name == form_name,
-                                    FormModel.entity_name == entity_name,
-                                    FormModel.form_purpose == FormPurpose.entity,
-                                    FormModel.disabled_at.is_(None)
-                                ).first()
-                            except Exception as retry_error:
-                                print(f"    ❌ Error al reintentar consulta: {retry_error}")
-                                raise retry_error
-                        
-                        if existing_form:
-                            # Verificar si el schema necesita actualizarse
-                            schema_form = db.query(SchemaFormModel).filter(
-                                SchemaFormModel.form_id == existing_form.id
-                            ).first()
-                            
-                            if schema_form and schema_form.schema:
-                                # Comparar firmas de schema (incluye is_logical_identifier desde entityMap)
-                                # Usar el schema generado (con entityMap aplicado) vs el existente en BD
-                                current_schema_signature = _get_schema_attributes_signature(schema)
-                                existing_schema_signature = _get_schema_attributes_signature(schema_form.schema)
-                                
-                                if current_schema_signature != existing_schema_signature:
-                                    print(f"    🔄 Cambios detectados en entidad '{entity_name}', generando nuevo schema para formulario '{existing_form.name}'...")
-                                    
-                                    # Generar nuevo schema
-                                    new_schema = generate_schema_from_model(
-                                        model_class, 
-                                        form_name, 
-                                        self.container, 
-                                        entity_map=entity_map,
-                                        entity_map_mode=entity_map_mode,
-                                        form_display_name=form_display_name,
-                                        referencable_entities_map=referencable_entities_map
-                                    )
-                                    
-                                    # Crear un nuevo schema_form
-                                    try:
-                                        new_schema_response = self._create_schema_form_internal(
-                                            form_id=existing_form.id,
-                                            schema=new_schema
-                                        )
-                                        print(f"    ✅ Nuevo schema creado y asignado al formulario '{existing_form.name}' (Schema ID: {new_schema_response.id})")
-                                    except Exception as schema_error:
-                                        print(f"    ❌ Error al crear schema para formulario '{existing_form.name}': {schema_error}")
-                                        import traceback
-                                        traceback.print_exc()
-                                        try:
-                                            db.rollback()
-                                        except:
-                                            pass
-                                        raise schema_error
-                                else:
-                                    print(f"    ✓ Formulario '{existing_form.name}' ya existe y la entidad no ha cambiado, omitiendo actualización")
-                            else:
-                                # Si no hay schema, crear uno nuevo
-                                print(f"    🔄 Formulario '{existing_form.name}' existe pero no tiene schema, creando schema...")
-                                try:
-                                    schema_response = self._create_schema_form_internal(
-                                        form_id=existing_form.id,
-                                        schema=schema
-                                    )
-                                    print(f"    ✅ Schema creado para '{existing_form.name}' (ID: {schema_response.id})")
-                                except Exception as schema_error:
-                                    print(f"    ❌ Error al crear schema para formulario '{existing_form.name}': {schema_error}")
-                                    import traceback
-                                    traceback.print_exc()
-                                    try:
-                                        db.rollback()
-                                    except:
-                                        pass
-                                    raise schema_error
-                            
-                            forms_skipped += 1
-                            continue
-                    
-                    # Crear el formulario usando el servicio
-                    from .models.forms import ChannelName, FormType
-                    
-                    # Preparar datos del formulario, incluyendo ID si se proporcionó en config
-                    form_data_dict = {
-                        "channel_name": ChannelName.identi_connect,
-                        "flow_type": FormType.linear,
-                        "name": form_name,
-                        "description": form_description,
-                        "entity_name": entity_name,
-                        "form_purpose": FormPurpose.entity
-                    }
-                    
-                    # Agregar ID si se proporcionó en el config.yaml
-                    if form_id:
-                        from uuid import UUID as UUID_TYPE
-                        try:
-                            form_uuid = UUID_TYPE(form_id) if isinstance(form_id, str) else form_id
-                            form_data_dict["id"] = form_uuid
-                            print(f"    📝 Usando ID personalizado del config: {form_uuid}")
-                        except (ValueError, AttributeError) as id_error:
-                            print(f"    ⚠️  ID inválido en config: {form_id}, se generará automáticamente. Error: {id_error}")
-                    
-                    form_data = FormCreate(**form_data_dict)
-                    
-                    # Crear el formulario
-                    try:
-                        form_response = self.create_form(form_data)
-                        print(f"    ✅ Formulario '{form_name}' creado (ID: {form_response.id})")
-                    except Exception as form_error:
-                        print(f"    ❌ Error al crear formulario '{form_name}': {form_error}")
-                        import traceback
-                        traceback.print_exc()
-                        try:
-                            db.rollback()
-                        except:
-                            pass
-                        raise form_error
-                    
-                    # Crear el schema_form
-                    try:
-                        schema_response = self._create_schema_form_internal(
-                            form_id=form_response.id,
-                            schema=schema
-                        )
-                        print(f"    ✅ Schema creado para '{form_name}' (ID: {schema_response.id})")
-                    except Exception as schema_error:
-                        print(f"    ❌ Error al crear schema para formulario '{form_name}': {schema_error}")
-                        import traceback
-                        traceback.print_exc()
-                        try:
-                            db.rollback()
-                        except:
-                            pass
-                        raise schema_error
-                    
-                    forms_created += 1
-                    
-                except Exception as e:
-                    print(f"    ❌ Error al crear formulario '{form_name}': {e}")
-                    import traceback
-                    traceback.print_exc()
-                    
-                    # Hacer rollback de la transacción si hay un error
-                    db = self._get_db()
-                    if isinstance(db, Session):
-                        try:
-                            db.rollback()
-                        except Exception as rollback_error:
-                            print(f"    ⚠️  Error al hacer rollback: {rollback_error}")
-                    
+                # Buscar el modelo de la entidad (registro precalculado, O(1))
+                model_class = find_model_by_entity_name(entity_name, self.container)
+                if not model_class:
+                    print(f"    ⚠️  No se encontró modelo para entidad '{entity_name}', saltando formulario '{form_name}'")
                     forms_skipped += 1
+                    continue
+                
+                form_key = form_manifest_key(module_name, form_config)
+                fingerprint = compute_form_fingerprint(model_class, form_config, referencable_version, tools_version)
+                if is_form_unchanged(manifest.get(form_key), fingerprint, active_schema_ids):
+                    forms_unchanged += 1
+                    continue
+                
+                jobs.append(FormGenerationJob(
+                    module_name=module_name,
+                    form_key=form_key,
+                    form_name=form_name,
+                    form_id=form_config.get("id"),  # Leer ID del config.yaml si existe
+                    form_description=form_config.get("description", ""),
+                    entity_name=entity_name,
+                    entity_map=entity_map,
+                    entity_map_mode=entity_map_mode,
+                    form_display_name=form_config.get("display_name"),
+                    model_class=model_class,
+                    fingerprint=fingerprint
+                ))
+        
+        if jobs:
+            print(f"  🔄 Formularios con cambios o sin manifiesto: {len(jobs)} (sin cambios: {forms_unchanged})")
+        
+        def _build_schema(job: FormGenerationJob, container) -> Dict[str, Any]:
+            # Generar el schema desde el modelo (una instrucción por atributo usando tools)
+            print(f"    🔍 Entidad '{job.entity_name}' ({job.module_name}), generando schema para '{job.form_name}'...")
+            return generate_schema_from_model(
+                job.model_class,
+                job.form_name,
+                container,
+                entity_map=job.entity_map,
+                entity_map_mode=job.entity_map_mode,
+                form_display_name=job.form_display_name,
+                referencable_entities_map=global_referencable_entities_map
+            )
         
-        print(f"✅ Formularios automáticos procesados: {forms_created} creados, {forms_skipped} omitidos/errores")
+        for job, error in generate_schemas(jobs, self.container, _build_schema, FORM_GENERATION_WORKERS):
+            if error is not None:
+                print(f"    ❌ Error al generar schema para formulario '{job.form_name}': {error}")
+                forms_skipped += 1
+                continue
+            try:
+                result = self._apply_generated_form(job)
+                if result == "created":
+                    forms_created += 1
+                elif result == "updated":
+                    forms_updated += 1
+                else:
+                    forms_unchanged += 1
+            except Exception as e:
+                print(f"    ❌ Error al crear formulario '{job.form_name}': {e}")
+                import traceback
+                traceback.print_exc()
+                
+                # Hacer rollback de la transacción si hay un error
+                db = self._get_db()
+                if isinstance(db, Session):
+                    try:
+                        db.rollback()
+                    except Exception as rollback_error:
+                        print(f"    ⚠️  Error al hacer rollback: {rollback_error}")
+                
+                forms_skipped += 1
+        
+        print(
+            f"✅ Formularios automáticos procesados: {forms_created} creados, {forms_updated} actualizados, "
+            f"{forms_unchanged} sin cambios, {forms_skipped} omitidos/errores"
+        )
+    
+    def _apply_generated_form(self, job) -> str:
+        """
+        Crea el formulario de un FormGenerationJob o le asigna un schema nuevo si el
+        generado difiere del vigente, y registra la huella en el manifiesto.
+        
+        Returns:
+            'created', 'updated' o 'unchanged'
+        """
+        from .resources.form_auto_creator import _get_schema_attributes_signature
+        from .resources.form_manifest import save_manifest_entry
+        from .models.forms import ChannelName, FormType
+        
+        db = self._get_db()
+        
+        # ID del config.yaml, si es válido
+        form_uuid = None
+        if job.form_id:
+            try:
+                form_uuid = job.form_id if isinstance(job.form_id, UUID) else UUID(str(job.form_id))
+            except (ValueError, AttributeError):
+                print(f"    ⚠️  ID inválido en config: {job.form_id}, buscando por nombre/entidad")
+        
+        # Buscar formulario existente
+        # Prioridad: 1) Por ID si se proporciona, 2) Por nombre+entidad
+        if form_uuid:
+            existing_form = db.query(FormModel).filter(
+                FormModel.id == form_uuid,
+                FormModel.disabled_at.is_(None)
+            ).first()
+        else:
+            existing_form = db.query(FormModel).filter(
+                FormModel.name == job.form_name,
+                FormModel.entity_name == job.entity_name,
+                FormModel.form_purpose == FormPurpose.entity,
+                FormModel.disabled_at.is_(None)
+            ).first()
+        
+        if existing_form:
+            result = "unchanged"
+            schema_form = None
+            if existing_form.schema_id:
+                schema_form = db.query(SchemaFormModel).filter(
+                    SchemaFormModel.id == existing_form.schema_id
+                ).first()
+            
+            # Comparar firmas de schema (incluye is_logical_identifier desde entityMap):
+            # el schema generado (con entityMap aplicado) vs el vigente en BD
+            if not schema_form or not schema_form.schema:
+                print(f"    🔄 Formulario '{existing_form.name}' existe pero no tiene schema, creando schema...")
+                result = "updated"
+            elif _get_schema_attributes_signature(job.schema) != _get_schema_attributes_signature(schema_form.schema):
+                print(f"    🔄 Cambios detectados en entidad '{job.entity_name}', generando nuevo schema para formulario '{existing_form.name}'...")
+                result = "updated"
+            
+            if result == "updated":
+                schema_form = self._create_schema_form_internal(form_id=existing_form.id, schema=job.schema)
+                print(f"    ✅ Nuevo schema creado y asignado al formulario '{existing_form.name}' (Schema ID: {schema_form.id})")
+            else:
+                print(f"    ✓ Formulario '{existing_form.name}' ya existe y la entidad no ha cambiado, omitiendo actualización")
+            
+            save_manifest_entry(db, job.form_key, existing_form.id, existing_form.schema_id, job.fingerprint)
+            return result
+        
+        # Preparar datos del formulario, incluyendo ID si se proporcionó en config
+        form_data_dict = {
+            "channel_name": ChannelName.identi_connect,
+            "flow_type": FormType.linear,
+            "name": job.form_name,
+            "description": job.form_description,
+            "entity_name": job.entity_name,
+            "form_purpose": FormPurpose.entity
+        }
+        if form_uuid:
+            form_data_dict["id"] = form_uuid
+            print(f"    📝 Usando ID personalizado del config: {form_uuid}")
+        
+        form_response = self.create_form(FormCreate(**form_data_dict))
+        print(f"    ✅ Formulario '{job.form_name}' creado (ID: {form_response.id})")
+        
+        schema_form = self._create_schema_form_internal(form_id=form_response.id, schema=job.schema)
+        print(f"    ✅ Schema creado para '{job.form_name}' (ID: {schema_form.id})")
+        
+        save_manifest_entry(db, job.form_key, form_response.id, schema_form.id, job.fingerprint)
+        return "created"
     
     # Referencable Entities methods
     def get_referencable_entities(
@@ -1476,7 +1645,7 @@ class Funcionalities:
             from .models.referencable_entities import ReferencableEntityModel
             
             # Verificar que la entidad esté registrada como referenciable
-            referencable = db.query(ReferencableEntityModel).filter(
+            referencable = db.query(ReferencableEntityModel.representative_value).filter(
                 ReferencableEntityModel.entity_name == entity_name.lower(),
                 ReferencableEntityModel.disabled_at.is_(None)
             ).first()
@@ -1491,57 +1660,26 @@ class Funcionalities:
             if not model_class:
                 raise ValueError(f"No se encontró el modelo para la entidad '{entity_name}'")
             
-            # Construir query
-            # Convertir campos de geometría a WKT en la query para evitar problemas de serialización
-            from sqlalchemy import func
-            from geoalchemy2 import Geometry
-            
-            # Identificar columnas de geometría
-            has_geometry = any(isinstance(col.type, Geometry) for col in model_class.__table__.columns)
-            
-            if has_geometry:
-                # Si hay columnas de geometría, construir query con ST_AsText para convertirlas a WKT
-                select_columns = []
-                for column in model_class.__table__.columns:
-                    if isinstance(column.type, Geometry):
-                        # Convertir geometría a WKT string
-                        select_columns.append(func.ST_AsText(column).label(column.name))
-                    else:
-                        select_columns.append(column)
-                query = db.query(*select_columns).filter(model_class.disabled_at.is_(None))
+            # Descriptor precalculado: columnas de texto/geometría y plantilla compilada.
+            # representative_value: prioridad al parámetro, luego al de la BD
+            from .resources.entity_descriptor import get_entity_descriptor
+            descriptor = get_entity_descriptor(
+                entity_name.lower(),
+                model_class,
+                representative_value or referencable.representative_value
+            )
+            
+            # Construir query: solo id y las columnas que usa la plantilla
+            # (las geometrías se leen como WKT)
+            if descriptor.needs_full_model:
+                query = db.query(model_class)
             else:
-                query = db.query(model_class).filter(model_class.disabled_at.is_(None))
+                query = db.query(*descriptor.projection()).select_from(model_class)
+            query = query.filter(model_class.disabled_at.is_(None))
             
             # Aplicar búsqueda si se proporciona (buscar en todos los campos de texto)
             if search:
-                search_filters = []
-                for column in model_class.__table__.columns:
-                    # Verificar si es un tipo de texto (String, Text, VARCHAR, etc.)
-                    column_type_str = str(column.type).lower()
-                    is_text_type = (
-                        'varchar' in column_type_str or 
-                        'string' in column_type_str or 
-                        'text' in column_type_str or
-                        'char' in column_type_str
-                    )
-                    
-                    # También verificar python_type si está disponible (manejar excepciones)
-                    if not is_text_type:
-                        try:
-                            if hasattr(column.type, 'python_type'):
-                                python_type = column.type.python_type
-                                is_text_type = python_type == str
-                        except (NotImplementedError, AttributeError, TypeError):
-                            # Algunos tipos (como Geometry) no implementan python_type
-                            # Continuar sin usar python_type
-                            pass
-                    
-                    if is_text_type:
-                        # Usar getattr para obtener el atributo del modelo, no la columna directamente
-                        model_column = getattr(model_class, column.name, None)
-                        if model_column is not None:
-                            search_filters.append(model_column.ilike(f"%{search}%"))
-                
+                search_filters = descriptor.search_filters(search)
                 if search_filters:
                     from sqlalchemy import or_
                     query = query.filter(or_(*search_filters))
@@ -1563,12 +1701,10 @@ class Funcionalities:
                         query = query.order_by(sort_column.asc())
                 else:
                     # Ordenar por id por defecto si el campo no existe
-                    if hasattr(model_class, 'id'):
-                        query = query.order_by(model_class.id.desc() if order and order.lower() == "desc" else model_class.id.asc())
+                    query = query.order_by(descriptor.id_column.desc() if order and order.lower() == "desc" else descriptor.id_column.asc())
             else:
                 # Ordenar por id por defecto
-                if hasattr(model_class, 'id'):
-                    query = query.order_by(model_class.id.desc())
+                query = query.order_by(descriptor.id_column.desc())
             
             # Contar total
             total = query.count()
@@ -1577,82 +1713,12 @@ class Funcionalities:
             offset = (page - 1) * per_page
             items = query.offset(offset).limit(per_page).all()
             
-            # Obtener representative_value: prioridad al parámetro, luego al de la BD
-            representative_value_template = representative_value or (referencable.representative_value if referencable else None)
-            
-            # Convertir items a diccionarios y procesar representative_value
             items_dict = []
-            import re
-            
             for item in items:
-                item_dict = {}
-                item_id = None
-                
-                # Convertir el item a diccionario
-                # Si usamos select_columns con ST_AsText, los valores de geometría ya vienen como strings WKT
-                for column in model_class.__table__.columns:
-                    value = getattr(item, column.name)
-                    # Guardar el ID para usarlo después
-                    if column.primary_key:
-                        item_id = str(value) if isinstance(value, UUID) else value
-                    # Convertir UUIDs a strings
-                    if isinstance(value, UUID):
-                        item_dict[column.name] = str(value)
-                    # Convertir datetime a strings ISO
-                    elif isinstance(value, datetime):
-                        item_dict[column.name] = value.isoformat()
-                    # Si el valor es None, mantenerlo como None
-                    elif value is None:
-                        item_dict[column.name] = None
-                    # Si es un WKBElement/WKTElement (puede pasar si no usamos ST_AsText), convertirlo
-                    elif hasattr(value, '__class__') and value.__class__.__name__ in ('WKBElement', 'WKTElement'):
-                        try:
-                            # Intentar acceder al atributo 'desc' que contiene el WKT
-                            if hasattr(value, 'desc'):
-                                item_dict[column.name] = value.desc
-                            else:
-                                # Si no tiene 'desc', convertir a string (puede ser que ya sea WKT)
-                                item_dict[column.name] = str(value) if value else None
-                        except Exception:
-                            item_dict[column.name] = None
-                    else:
-                        item_dict[column.name] = value
-                
-                # Si no se encontró ID, intentar obtenerlo del campo 'id'
-                if item_id is None:
-                    item_id = item_dict.get('id')
-                    if isinstance(item_id, UUID):
-                        item_id = str(item_id)
-                
-                # Procesar representative_value para generar el campo 'name'
-                name_value = ""
-                if representative_value_template:
-                    # Reemplazar {{columna}} con los valores reales
-                    name_value = representative_value_template
-                    # Buscar todos los placeholders {{columna}}
-                    placeholders = re.findall(r'\{\{(\w+)\}\}', representative_value_template)
-                    for placeholder in placeholders:
-                        # Obtener el valor de la columna (puede estar en item_dict o en el objeto item)
-                        column_value = item_dict.get(placeholder)
-                        if column_value is None:
-                            # Intentar obtener directamente del objeto si no está en el dict
-                            try:
-                                column_value = getattr(item, placeholder, None)
-                                if isinstance(column_value, UUID):
-                                    column_value = str(column_value)
-                                elif isinstance(column_value, datetime):
-                                    column_value = column_value.isoformat()
-                            except:
-                                column_value = ""
-                        # Reemplazar el placeholder con el valor (convertir a string)
-                        name_value = name_value.replace(f"{{{{{placeholder}}}}}", str(column_value) if column_value is not None else "")
-                else:
-                    # Si no hay representative_value, usar el ID como name
-                    name_value = str(item_id) if item_id else ""
-                
+                item_id = item.id
                 items_dict.append(EntityDataItemResponse(
-                    id=item_id,
-                    name=name_value
+                    id=str(item_id) if isinstance(item_id, UUID) else item_id,
+                    name=descriptor.render(item)
                 ))
             
             return PaginatedEntityDataResponse(
@@ -1667,6 +1733,154 @@ class Funcionalities:
             traceback.print_exc()
             raise ValueError(f"Error al obtener datos de la entidad '{entity_name}': {str(e)}")
     
+    def typeahead_entity_data(
+        self,
+        entity_name: str,
+        q: str,
+        limit: int = 10,
+        representative_value: Optional[str] = None,
+        filter: Optional[str] = None
+    ) -> EntityTypeaheadResponse:
+        """
+        Top-K de datos de una entidad referenciable para typeahead (sin COUNT).
+
+        Busca sobre el valor representativo renderizado en minúsculas (la misma
+        expresión que indexa ensure_entity_typeahead_indexes):
+        1. coincidencias por prefijo, en orden alfabético (índice B-tree text_pattern_ops)
+        2. si faltan resultados y el término tiene 3+ caracteres, coincidencias por
+           similitud de trigramas (índice GIN), ordenadas por word_similarity
+
+        Args:
+            entity_name: Nombre de la entidad
+            q: Texto escrito por el usuario
+            limit: Cantidad máxima de resultados
+            representative_value: Template opcional para el campo 'name'
+            filter: Filtro(s) opcional con el mismo formato que get_entity_data
+        """
+        from .environment import TYPEAHEAD_MAX_LIMIT
+        from .resources.entity_descriptor import get_entity_descriptor
+        from .resources.register_search import escape_like
+
+        db = self._get_db()
+        limit = max(1, min(limit, TYPEAHEAD_MAX_LIMIT))
+        term = (q or "").strip().lower()
+
+        referencable = db.query(ReferencableEntityModel.representative_value).filter(
+            ReferencableEntityModel.entity_name == entity_name.lower(),
+            ReferencableEntityModel.disabled_at.is_(None)
+        ).first()
+        if not referencable:
+            raise ValueError(f"La entidad '{entity_name}' no está registrada como referenciable")
+
+        model_class = find_model_by_entity_name(entity_name.lower())
+        if not model_class:
+            raise ValueError(f"No se encontró el modelo para la entidad '{entity_name}'")
+
+        descriptor = get_entity_descriptor(
+            entity_name.lower(),
+            model_class,
+            representative_value or referencable.representative_value
+        )
+
+        def _base_query():
+            if descriptor.needs_full_model:
+                query = db.query(model_class)
+            else:
+                query = db.query(*descriptor.projection()).select_from(model_class)
+            query = query.filter(model_class.disabled_at.is_(None))
+            if filter:
+                from .resources.query_filter import apply_filter
+                filter_applied = apply_filter(query, model_class, filter, db, entity_name, self.container)
+                if filter_applied is not None:
+                    query = filter_applied
+            return query
+
+        if descriptor.needs_full_model:
+            # La plantilla usa atributos que no son columnas: no hay expresión SQL
+            # del valor representativo, se busca en las columnas de texto
+            query = _base_query()
+            if term:
+                from sqlalchemy import or_
+                search_filters = descriptor.search_filters(term)
+                if search_filters:
+                    query = query.filter(or_(*search_filters))
+            items = query.order_by(descriptor.id_column).limit(limit).all()
+        else:
+            expression = descriptor.typeahead_expression()
+            items = _base_query().filter(
+                expression.like(f"{escape_like(term)}%", escape="\\")
+            ).order_by(expression, descriptor.id_column).limit(limit).all()
+
+            if len(items) < limit and len(term) >= 3:
+                found_ids = [item.id for item in items]
+                similar_query = _base_query().filter(expression.op('%>')(term))
+                if found_ids:
+                    similar_query = similar_query.filter(descriptor.id_column.notin_(found_ids))
+                items += similar_query.order_by(
+                    func.word_similarity(term, expression).desc(),
+                    expression
+                ).limit(limit - len(items)).all()
+
+        return EntityTypeaheadResponse(items=[
+            EntityDataItemResponse(
+                id=str(item.id) if isinstance(item.id, UUID) else item.id,
+                name=descriptor.render(item)
+            )
+            for item in items
+        ])
+
+    def ensure_entity_typeahead_indexes(self, entity_names: Optional[List[str]] = None) -> Dict[str, List[str]]:
+        """
+        Crea (CONCURRENTLY, sin bloquear escrituras) los índices de typeahead sobre el
+        valor representativo renderizado de cada entidad referenciable:
+        GIN trigram y B-tree text_pattern_ops.
+
+        Las entidades cuya plantilla usa columnas sin cast inmutable a texto (fechas,
+        geometrías o atributos que no son columnas) se omiten: no admiten índice de expresión.
+
+        Args:
+            entity_names: Entidades a indexar (por defecto, todas las referenciables)
+
+        Returns:
+            Diccionario entity_name -> nombres de índices asegurados
+        """
+        from .resources.concurrent_index import create_index_concurrently
+        from .resources.entity_descriptor import get_entity_descriptor, typeahead_index_ddl, typeahead_index_names
+
+        from sqlalchemy import select
+
+        # Conexión propia en autocommit: CREATE INDEX CONCURRENTLY no puede ejecutarse
+        # dentro de una transacción y espera a las transacciones abiertas sobre la tabla.
+        # No usa la sesión compartida, así que puede llamarse desde un hilo en segundo plano.
+        engine = self._get_db().get_bind()
+        ensured = {}
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            statement = select(
+                ReferencableEntityModel.entity_name,
+                ReferencableEntityModel.representative_value
+            ).where(ReferencableEntityModel.disabled_at.is_(None))
+            if entity_names:
+                statement = statement.where(
+                    ReferencableEntityModel.entity_name.in_([name.lower() for name in entity_names])
+                )
+            referencables = connection.execute(statement).all()
+
+            for referencable in referencables:
+                model_class = find_model_by_entity_name(referencable.entity_name)
+                if not model_class:
+                    continue
+                descriptor = get_entity_descriptor(referencable.entity_name, model_class, referencable.representative_value)
+                if not descriptor.typeahead_indexable:
+                    logger.info("Typeahead de '%s' sin índice: la plantilla no es indexable", referencable.entity_name)
+                    continue
+                try:
+                    for ddl in typeahead_index_ddl(descriptor, engine.dialect):
+                        create_index_concurrently(connection, ddl)
+                    ensured[referencable.entity_name] = list(typeahead_index_names(descriptor))
+                except Exception as e:
+                    logger.error("Error al crear índices de typeahead para '%s': %s", referencable.entity_name, e)
+        return ensured
+    
     def export_core_registers_to_excel(
         self,
         form_id: UUID,
@@ -1676,9 +1890,16 @@ class Funcionalities:
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
         max_file_size_mb: float = 50.0
-    ) -> tuple[bytes, str]:
+    ) -> tuple[Iterator[bytes], str]:
         """
-        Exporta core_registers a Excel con los filtros aplicados.
+        Exporta core_registers a Excel con los filtros aplicados, sin cargar todos los registros en memoria.
+        
+        - Los registros se leen con un cursor del lado del servidor (yield_per) y se escriben
+          con openpyxl en modo write-only, por lo que el consumo de memoria es constante.
+        - Las columnas dinámicas se toman de las instructions de los schemas del formulario
+          (name -> display_name), sin recorrer previamente los registros.
+        - El tamaño se estima en cada bloque de registros (ExportSizeEstimator): si ya supera
+          max_file_size_mb la exportación se corta sin generar el resto del archivo.
         
         Manejo especial para campos tipo 'entity':
         - Si value es un objeto {id, display_name}, muestra el display_name
@@ -1694,21 +1915,24 @@ class Funcionalities:
             max_file_size_mb: Tamaño máximo del archivo en MB (default 50.0)
         
         Returns:
-            tuple[bytes, str]: Tupla con (contenido del archivo Excel, nombre sugerido del archivo)
+            tuple[Iterator[bytes], str]: Tupla con (iterador de bloques del archivo Excel, nombre sugerido del archivo)
         
         Raises:
             ValueError: Si el tamaño del archivo excede max_file_size_mb
         """
         from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
         from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-        from io import BytesIO
+        from openpyxl.utils import get_column_letter
         from datetime import datetime as dt
-        from sqlalchemy import String
+        from itertools import islice
+        import tempfile
         
         db = self._get_db()
         
         # Obtener auth_service para consultar usernames
         auth_service = self.container.get("auth")
+        storage_service = self.container.get("storage_s3")
         
         # 1. Construir query con filtros (similar a get_registers_by_form)
         query = db.query(
@@ -1719,11 +1943,10 @@ class Funcionalities:
             CoreRegisterModel.disabled_at.is_(None)
         )
         
-        # Aplicar búsqueda en detail
-        if search:
-            query = query.filter(
-                func.cast(CoreRegisterModel.detail, String).ilike(f"%{search}%")
-            )
+        # Aplicar búsqueda de texto en detail
+        if search and search.strip():
+            search_match, _ = register_search_filter(search)
+            query = query.filter(search_match)
         
         # Filtro por rango de fechas
         if start_date:
@@ -1754,37 +1977,21 @@ class Funcionalities:
         else:
             query = query.order_by(CoreRegisterModel.created_at.desc())
         
-        # 2. Obtener todos los registros
-        total_records = query.count()
-        results = query.all()
-        
-        # 3. Obtener información del formulario
+        # 2. Obtener información del formulario
         form = db.query(FormModel).filter(FormModel.id == form_id).first()
         form_name = form.name if form else "Formulario"
         
-        # 4. Analizar estructura del detail para determinar columnas dinámicas
-        all_field_names = set()
-        field_display_names = {}  # Mapeo name -> display_name
-        
-        for register, _ in results:
-            if register.detail:
-                for item in register.detail:
-                    if isinstance(item, dict) and 'name' in item:
-                        field_name = item['name']
-                        all_field_names.add(field_name)
-                        # Usar display_name si existe
-                        if 'display_name' in item and field_name not in field_display_names:
-                            field_display_names[field_name] = item['display_name']
-        
-        # Ordenar campos alfabéticamente
-        detail_fields = sorted(list(all_field_names))
-        
-        # 5. Crear Excel
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Registros"[:31]  # Max 31 caracteres
-        
-        # 6. Definir headers (columnas fijas + columnas dinámicas del detail)
+        # 3. Columnas dinámicas desde los schemas del formulario (vigente primero)
+        schemas = db.query(SchemaFormModel.schema).filter(
+            SchemaFormModel.form_id == form_id
+        ).order_by(SchemaFormModel.created_at.desc()).all()
+        detail_columns = build_export_columns(schema for schema, in schemas)
+        
+        # 4. Crear Excel en modo write-only (las filas se escriben a disco a medida que se agregan)
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Registros"[:31])  # Max 31 caracteres
+        
+        # 5. Definir headers (columnas fijas + columnas dinámicas del detail)
         fixed_headers = [
             "ID Registro",
             "Fecha Creación",
@@ -1795,14 +2002,17 @@ class Funcionalities:
             "Duración (seg)",
             "Ubicación"
         ]
+        headers = fixed_headers + [header for _, header in detail_columns]
         
-        # Usar display_name si existe, sino usar el nombre del campo
-        detail_headers = [field_display_names.get(field, field) for field in detail_fields]
-        headers = fixed_headers + detail_headers
+        # En modo write-only el ancho debe definirse antes de escribir filas:
+        # se usa el largo del header (entre 10 y 50 caracteres)
+        for col_num, header in enumerate(headers, 1):
+            ws.column_dimensions[get_column_letter(col_num)].width = min(max(len(header) + 2, 10), 50)
         
         # Aplicar estilo a headers
         header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
         header_font = Font(bold=True, color="FFFFFF", size=11)
+        header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
         thin_border = Border(
             left=Side(style='thin'),
             right=Side(style='thin'),
@@ -1810,112 +2020,98 @@ class Funcionalities:
             bottom=Side(style='thin')
         )
         
-        for col_num, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col_num, value=header)
+        header_cells = []
+        for header in headers:
+            cell = WriteOnlyCell(ws, value=header)
             cell.fill = header_fill
             cell.font = header_font
-            cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
+            cell.alignment = header_alignment
             cell.border = thin_border
+            header_cells.append(cell)
+        ws.append(header_cells)
         
-        # 7. Llenar datos
+        # 6. Llenar datos leyendo por bloques con cursor del lado del servidor
         # Cache para usernames (evitar consultas repetidas)
         username_cache = {}
+        media_urls = {}
+        
+        def resolve_media_url(media_id):
+            return media_urls.get(media_key(media_id), '')
+        
+        # Tamaño estimado a medida que se escriben las filas: se corta en cuanto
+        # supera el límite, sin generar el resto del archivo
+        max_file_size_bytes = max_file_size_mb * 1024 * 1024
+        size_estimator = ExportSizeEstimator()
+        
+        total_records = 0
+        rows_iterator = iter(query.yield_per(EXPORT_BATCH_SIZE))
+        while True:
+            batch = list(islice(rows_iterator, EXPORT_BATCH_SIZE))
+            if not batch:
+                break
+            total_records += len(batch)
+            
+            # Detail de cada registro indexado por nombre de campo
+            batch_details = []
+            for register, _ in batch:
+                detail_dict = {}
+                if register.detail:
+                    for item in register.detail:
+                        if isinstance(item, dict) and 'name' in item:
+                            detail_dict[item['name']] = item
+                batch_details.append(detail_dict)
+            
+            # URLs de los medias del bloque en una sola consulta
+            media_ids = collect_media_ids(
+                detail_dict.get(field_name) for detail_dict in batch_details for field_name, _ in detail_columns
+            )
+            media_urls = {
+                media_key(media_id): url
+                for media_id, url in storage_service.get_urls_by_media_ids(media_ids, 604800).items()
+            } if media_ids else {}
+            
+            for (register, location_text), detail_dict in zip(batch, batch_details):
+                # Obtener username desde identidad
+                username = ""
+                if register.identity_id:
+                    if register.identity_id not in username_cache:
+                        try:
+                            identity = auth_service.get_identity(register.identity_id)
+                            username_cache[register.identity_id] = identity.sub if identity else ""
+                        except:
+                            username_cache[register.identity_id] = ""
+                    username = username_cache[register.identity_id]
+                
+                row = [
+                    str(register.id),
+                    register.created_at,
+                    username,
+                    register.status.value if register.status else "",
+                    register.entity_name or "",
+                    str(register.entity_id) if register.entity_id else "",
+                    float(register.duration) if register.duration else None,
+                    location_text or ""
+                ]
+                for field_name, _ in detail_columns:
+                    item = detail_dict.get(field_name)
+                    row.append(format_detail_value(item, resolve_media_url) if item else "")
+                ws.append(row)
+                size_estimator.add_row(row)
+            
+            estimated_size = size_estimator.flush()
+            if estimated_size > max_file_size_bytes:
+                wb.close()
+                raise ValueError(
+                    f"El tamaño del archivo ya supera {estimated_size / (1024 * 1024):.2f} MB tras "
+                    f"{total_records:,} registros y excede el límite máximo permitido ({max_file_size_mb:.2f} MB). "
+                    f"Por favor, aplique filtros adicionales (como rango de fechas) para reducir el volumen de datos."
+                )
         
-        for row_num, (register, location_text) in enumerate(results, 2):
-            # Obtener username desde identidad
-            username = ""
-            if register.identity_id:
-                if register.identity_id not in username_cache:
-                    try:
-                        identity = auth_service.get_identity(register.identity_id)
-                        username_cache[register.identity_id] = identity.sub if identity else ""
-                    except:
-                        username_cache[register.identity_id] = ""
-                username = username_cache[register.identity_id]
-            
-            # Crear diccionario de campos del detail para acceso rápido
-            detail_dict = {}
-            if register.detail:
-                for item in register.detail:
-                    if isinstance(item, dict) and 'name' in item:
-                        value_data = item.get('value')
-                        
-                        # Detectar si value es una entidad por su estructura
-                        # Caso 1: value es un objeto único {id, display_name}
-                        if isinstance(value_data, dict) and 'id' in value_data and 'display_name' in value_data:
-                            value = value_data.get('display_name', '')
-                        
-                        # Caso 2: value es un array [{id, display_name}, ...]
-                        elif isinstance(value_data, list) and len(value_data) > 0:
-                            # Verificar si es un array de entidades
-                            if all(isinstance(obj, dict) and 'id' in obj and 'display_name' in obj for obj in value_data):
-                                display_names = [obj.get('display_name', '') for obj in value_data]
-                                value = ', '.join(display_names) if display_names else ''
-                            else:
-                                # Array de valores simples
-                                value = ', '.join(str(v) for v in value_data)
-                        
-                        # Caso 3: value es un valor simple (string, number, etc.)
-                        else:
-                            # verificar si es un media
-                            type_detail = item.get('type_value')
-                            if type_detail and type_detail == 'media':
-                                # obtengo el media usando la funcionalidad get_media_by_id
-                                storage_service = self.container.get("storage_s3")
-                                media_url = storage_service.get_url_by_media_id(value_data, 604800)
-                                if media_url:
-                                    value = media_url
-                                else:
-                                    value = ''
-                            else:
-                                value = value_data if value_data is not None else ''
-                        
-                        detail_dict[item['name']] = value
-            
-            # Escribir columnas fijas
-            col = 1
-            ws.cell(row=row_num, column=col, value=str(register.id)); col += 1
-            ws.cell(row=row_num, column=col, value=register.created_at); col += 1
-            ws.cell(row=row_num, column=col, value=username); col += 1
-            ws.cell(row=row_num, column=col, value=register.status.value if register.status else ""); col += 1
-            ws.cell(row=row_num, column=col, value=register.entity_name or ""); col += 1
-            ws.cell(row=row_num, column=col, value=str(register.entity_id) if register.entity_id else ""); col += 1
-            ws.cell(row=row_num, column=col, value=float(register.duration) if register.duration else None); col += 1
-            ws.cell(row=row_num, column=col, value=location_text or ""); col += 1
-            
-            # Escribir columnas dinámicas del detail
-            for field_name in detail_fields:
-                value = detail_dict.get(field_name, "")
-                # Convertir listas a texto (solo para tipos que no sean entity, que ya están procesados)
-                if isinstance(value, list):
-                    value = ", ".join([str(v) for v in value])
-                # Convertir dicts a string legible
-                elif isinstance(value, dict):
-                    value = str(value)
-                ws.cell(row=row_num, column=col, value=str(value) if value else "")
-                col += 1
-        
-        # 8. Ajustar ancho de columnas automáticamente
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            
-            for cell in column:
-                try:
-                    if cell.value:
-                        cell_length = len(str(cell.value))
-                        if cell_length > max_length:
-                            max_length = cell_length
-                except:
-                    pass
-            
-            # Límite entre 10 y 50 caracteres
-            adjusted_width = min(max(max_length + 2, 10), 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # 9. Agregar hoja de información/metadatos
+        # 7. Agregar hoja de información/metadatos
         ws_info = wb.create_sheet("Información")
-        ws_info.append(["Informe de Exportación"])
+        title_cell = WriteOnlyCell(ws_info, value="Informe de Exportación")
+        title_cell.font = Font(bold=True, size=14)
+        ws_info.append([title_cell])
         ws_info.append(["Formulario:", form_name])
         ws_info.append(["Total de registros:", total_records])
         ws_info.append(["Fecha de exportación:", dt.now().strftime("%Y-%m-%d %H:%M:%S")])
@@ -1927,35 +2123,31 @@ class Funcionalities:
         if end_date:
             ws_info.append(["  - Fecha hasta:", end_date])
         
-        # Estilo para la hoja de información
-        for row in ws_info.iter_rows(min_row=1, max_row=1):
-            for cell in row:
-                cell.font = Font(bold=True, size=14)
-        
-        # 10. Guardar en memoria
-        buffer = BytesIO()
-        wb.save(buffer)
-        wb.close()  # Cerrar el workbook explícitamente
-        buffer.seek(0)
-        excel_bytes = buffer.getvalue()
-        buffer.close()  # Cerrar el buffer
-        
-        # 11. VALIDACIÓN: Verificar tamaño del archivo
-        file_size_mb = len(excel_bytes) / (1024 * 1024)  # Convertir bytes a MB
-        if file_size_mb > max_file_size_mb:
-            raise ValueError(
-                f"El tamaño del archivo generado ({file_size_mb:.2f} MB) excede el límite máximo "
-                f"permitido ({max_file_size_mb:.2f} MB). "
-                f"Total de registros: {total_records:,}. "
-                f"Por favor, aplique filtros adicionales (como rango de fechas) para reducir el volumen de datos."
-            )
+        # 8. Guardar en un archivo temporal (no en memoria)
+        output_file = tempfile.TemporaryFile(suffix=".xlsx")
+        try:
+            wb.save(output_file)
+            wb.close()
+            
+            # 9. VALIDACIÓN: Verificar tamaño del archivo
+            file_size_mb = output_file.tell() / (1024 * 1024)  # Convertir bytes a MB
+            if file_size_mb > max_file_size_mb:
+                raise ValueError(
+                    f"El tamaño del archivo generado ({file_size_mb:.2f} MB) excede el límite máximo "
+                    f"permitido ({max_file_size_mb:.2f} MB). "
+                    f"Total de registros: {total_records:,}. "
+                    f"Por favor, aplique filtros adicionales (como rango de fechas) para reducir el volumen de datos."
+                )
+        except Exception:
+            output_file.close()
+            raise
         
-        # 12. Generar nombre de archivo sugerido
+        # 10. Generar nombre de archivo sugerido
         form_name_clean = form_name.replace(" ", "_").lower()
         timestamp = dt.now().strftime('%Y%m%d_%H%M%S')
         filename = f"{form_name_clean}_{timestamp}.xlsx"
         
-        return excel_bytes, filename
+        return iter_file_chunks(output_file), filename
     
     def get_registers_by_entity_mention(
         self, 
@@ -1968,8 +2160,8 @@ class Funcionalities:
     ) -> PaginatedCoreRegisterResponse:
         """
         Lista todos los registros donde una entidad específica ha sido mencionada.
-        Busca en core_registers.detail donde value contenga el entity_id.
-        Detecta entidades por su estructura (presencia de campos 'id' y 'display_name').
+        Usa el índice core_register_mentions, que se mantiene al crear registros
+        (ver resources/register_mentions.py).
         
         Soporta dos estructuras de value:
         - Objeto único: {"id": "...", "display_name": "..."}
@@ -1986,48 +2178,27 @@ class Funcionalities:
         Returns:
             PaginatedCoreRegisterResponse con los registros encontrados
         """
-        from sqlalchemy import text, and_, String
         db = self._get_db()
         
-        # Convertir entity_id a string para búsqueda en JSON
-        entity_id_str = str(entity_id)
-        
         # Query base para contar
         base_query = db.query(CoreRegisterModel).filter(
             CoreRegisterModel.disabled_at.is_(None)
         )
         
-        # Subquery para buscar en el array JSONB detail
-        # Busca elementos donde value contenga el entity_id (detecta entidades por estructura)
-        # Considera dos casos:
-        # 1. value es un objeto: {id, display_name}
-        # 2. value es un array: [{id, display_name}, ...]
-        # Nota: detail es ARRAY(JSONB), por eso usamos unnest() primero
-        entity_filter = text("""
-            EXISTS (
-                SELECT 1 
-                FROM unnest(core_registers.detail) AS item
-                WHERE (
-                    -- Caso 1: value es un objeto único con id
-                    (item->'value' ? 'id' AND item->'value'->>'id' = :entity_id_str)
-                    OR
-                    -- Caso 2: value es un array de objetos
-                    (jsonb_typeof(item->'value') = 'array' AND EXISTS (
-                        SELECT 1
-                        FROM jsonb_array_elements(item->'value') AS val_item
-                        WHERE val_item ? 'id' AND val_item->>'id' = :entity_id_str
-                    ))
-                )
-            )
-        """)
+        # Semi-join contra el índice core_register_mentions (entity_id, created_at)
+        # en lugar de desempaquetar core_registers.detail de todos los registros
+        entity_filter = db.query(CoreRegisterMentionModel.register_id).filter(
+            CoreRegisterMentionModel.register_id == CoreRegisterModel.id,
+            CoreRegisterMentionModel.entity_id == entity_id
+        ).exists()
         
-        base_query = base_query.filter(entity_filter.bindparams(entity_id_str=entity_id_str))
+        base_query = base_query.filter(entity_filter)
         
         # Aplicar búsqueda adicional si se proporciona
-        if search:
-            base_query = base_query.filter(
-                func.cast(CoreRegisterModel.detail, String).ilike(f"%{search}%")
-            )
+        search_match = None
+        if search and search.strip():
+            search_match, _ = register_search_filter(search)
+            base_query = base_query.filter(search_match)
         
         # Aplicar ordenamiento para el conteo
         if sort_by:
@@ -2053,13 +2224,11 @@ class Funcionalities:
         )
         
         # Aplicar el mismo filtro de entidad
-        query = query.filter(entity_filter.bindparams(entity_id_str=entity_id_str))
+        query = query.filter(entity_filter)
         
         # Aplicar búsqueda adicional también en la query de resultados
-        if search:
-            query = query.filter(
-                func.cast(CoreRegisterModel.detail, String).ilike(f"%{search}%")
-            )
+        if search_match is not None:
+            query = query.filter(search_match)
         
         # Aplicar ordenamiento también en la query de resultados
         if sort_by:
@@ -2075,24 +2244,27 @@ class Funcionalities:
         # Obtener resultados paginados
         results = query.offset(offset).limit(per_page).all()
         
+        # Enriquecer el detail de toda la página en lote
+        enriched_details = self._enrich_details_with_display_names(
+            [register for register, _ in results],
+            db
+        )
+        
+        # Obtener información de los formularios de la página en una sola consulta
+        form_ids = {register.form_id for register, _ in results}
+        forms_by_id = {}
+        if form_ids:
+            forms_by_id = {
+                form_id_row: {'id': form_id_row, 'name': form_name}
+                for form_id_row, form_name in db.query(FormModel.id, FormModel.name).filter(
+                    FormModel.id.in_(list(form_ids))
+                ).all()
+            }
+        
         # Construir respuestas con location convertido a texto
         register_responses = []
-        for register, location_text in results:
-            # Enriquecer el detail con display_names
-            enriched_detail = self._enrich_detail_with_display_names(
-                register.detail,
-                register.schema_form_id,
-                db
-            )
-            
-            # Obtener información del formulario
-            form = db.query(FormModel).filter(FormModel.id == register.form_id).first()
-            form_info = None
-            if form:
-                form_info = {
-                    'id': form.id,
-                    'name': form.name
-                }
+        for (register, location_text), enriched_detail in zip(results, enriched_details):
+            form_info = forms_by_id.get(register.form_id)
             
             register_dict = {
                 'id': register.id,
@@ -2121,6 +2293,24 @@ class Funcionalities:
             items=register_responses
         )
     
+    def backfill_register_mentions(self, batch_size: int = 1000) -> Dict[str, int]:
+        """
+        Reconstruye el índice core_register_mentions desde core_registers.detail.
+        
+        Uso interno (mantenimiento), no se expone como API. Procesa los registros en
+        lotes por id y confirma cada lote, por lo que es seguro volver a ejecutarlo.
+        
+        Args:
+            batch_size: Cantidad de registros por lote
+            
+        Returns:
+            Diccionario con registers procesados, mentions insertadas y batches
+        """
+        db = self._get_db()
+        result = backfill_register_mentions(db, batch_size=batch_size)
+        print(f"✅ core_register_mentions reconstruido: {result['registers']} registros, {result['mentions']} menciones")
+        return result
+    
     def validate_unique_field(
         self, 
         entity_name: str, 
@@ -2159,48 +2349,13 @@ class Funcionalities:
             if not model_class:
                 raise ValueError(f"No se encontró modelo para entidad '{entity_name}'")
             
-            # Verificar si el campo existe en el modelo como columna
-            if hasattr(model_class, field_name):
-                # Caso 1: El campo existe como columna en el modelo
-                query = db.query(model_class).filter(
-                    getattr(model_class, field_name) == field_value,
-                    model_class.disabled_at.is_(None)
-                )
-            else:
-                # Caso 2: El campo NO existe como columna, buscar en entity_value (JSONB)
-                # Verificar que el modelo tenga el campo entity_value
-                if not hasattr(model_class, 'entity_value'):
-                    raise ValueError(f"El campo '{field_name}' no existe en la entidad '{entity_name}' y no hay campo 'entity_value' para atributos dinámicos")
-                
-                # Buscar en el campo JSONB entity_value
-                # Convertir el valor a string para comparación JSON
-                if isinstance(field_value, str):
-                    value_str = field_value
-                else:
-                    import json
-                    value_str = json.dumps(field_value)
-                
-                # Query usando el operador ->> para acceder a la clave del JSONB
-                from sqlalchemy import text
-                
-                query = db.query(model_class).filter(
-                    text(f"entity_value->>:field_name = :field_value").bindparams(
-                        field_name=field_name,
-                        field_value=value_str
-                    ),
-                    model_class.disabled_at.is_(None)
-                )
-            
-            # Excluir la entidad especificada si existe (para updates)
-            if entity_exclude_id:
-                query = query.filter(model_class.id != entity_exclude_id)
-            
-            # Ejecutar la query - verificar si existe algún registro
-            existing_entity = query.first()
+            existing = find_existing_entity_values(
+                db, model_class, field_name, [field_value], exclude_id=entity_exclude_id
+            )
             
             # Retornar si existe o no
             return UniqueFieldValidationResponse(
-                exist=existing_entity is not None
+                exist=bool(existing)
             )
                 
         except Exception as e:
@@ -2217,7 +2372,12 @@ class Funcionalities:
         """
         Valida si un valor es único en un registro complementario.
         
-        Busca en el campo JSONB 'detail' de core_registers.
+        Busca en core_register_values (valores del detail de core_registers mantenidos
+        por trigger), no en el texto completo de 'value' de cada campo del detail:
+        - valores objeto (entidades): coinciden por su 'id'
+        - listas: coinciden si algún elemento es igual al valor (no la lista entera)
+        - escalares: por su texto, como antes
+        - no se validan campos media ni valores de más de 2000 bytes (no se indexan)
 
         Args:
             entity_field: Diccionario con el campo y valor a validar (ej: {"dni": "12345678"})
@@ -2238,43 +2398,11 @@ class Funcionalities:
             field_name = list(entity_field.keys())[0]
             field_value = entity_field[field_name]
             
-            # Caso 1: Buscar en detail (JSONB)
-            if not hasattr(CoreRegisterModel, 'detail'):
-                raise ValueError(f"El campo '{field_name}' no existe en el registro y no hay campo 'detail' para atributos dinámicos")
-                
-            # Buscar en el campo JSONB detail
-            # Convertir el valor a string para comparación JSON
-            if isinstance(field_value, str):
-                value_str = field_value
-            else:
-                import json
-                value_str = json.dumps(field_value)
-                
-            # Query usando el operador ->> para acceder a la clave del JSONB
-            from sqlalchemy import text
-                
-            query = db.query(CoreRegisterModel).filter(
-                CoreRegisterModel.form_id == form_id,
-                CoreRegisterModel.disabled_at.is_(None),
-                text("""
-                    EXISTS (
-                        SELECT 1
-                        FROM unnest(detail) AS d
-                        WHERE d->>'name' = :field_name
-                        AND d->>'value' = :field_value
-                    )
-                """).bindparams(
-                    field_name=field_name,
-                    field_value=value_str
-                )
-            )
-            
-            # Ejecutar la query - verificar si existe algún registro
-            existing_entity = query.first()
+            existing = find_existing_complementary_values(db, form_id, field_name, [field_value])
             
             # Retornar si existe o no
             return UniqueFieldComplementaryValidationResponse(
-                exist=existing_entity is not None
+                exist=bool(existing)
             )
                 
         except Exception as e:
@@ -2283,3 +2411,169 @@ class Funcionalities:
             traceback.print_exc()
             raise
 
+    def validate_unique_fields_batch(
+        self,
+        validation: UniqueFieldBatchValidationRequest
+    ) -> UniqueFieldBatchValidationResponse:
+        """
+        Valida varios campos únicos, cada uno con varios valores, en una entidad
+        (entity_name) o en los registros complementarios de un formulario (form_id).
+        
+        Cada campo se resuelve con una sola consulta `= ANY(:values)`. Con form_id la
+        comparación sigue las reglas de validate_unique_field_complementary (objetos por
+        'id', listas por elemento).
+        
+        Returns:
+            UniqueFieldBatchValidationResponse con los valores existentes y los
+            repetidos dentro del propio lote, por campo
+        """
+        if bool(validation.entity_name) == bool(validation.form_id):
+            raise ValueError("Debe indicarse entity_name o form_id (solo uno)")
+        if not validation.fields:
+            raise ValueError("fields debe contener al menos un campo")
+        total_values = sum(len(values) for values in validation.fields.values())
+        if total_values > MAX_UNIQUE_VALIDATION_VALUES:
+            raise ValueError(f"El lote no puede superar {MAX_UNIQUE_VALIDATION_VALUES} valores")
+        
+        db = self._get_db()
+        model_class = None
+        if validation.entity_name:
+            model_class = find_model_by_entity_name(validation.entity_name)
+            if not model_class:
+                raise ValueError(f"No se encontró modelo para entidad '{validation.entity_name}'")
+        
+        existing = {}
+        duplicated = {}
+        for field_name, values in validation.fields.items():
+            if model_class is not None:
+                found = find_existing_entity_values(
+                    db, model_class, field_name, values, exclude_id=validation.entity_exclude_id
+                )
+            else:
+                found = find_existing_complementary_values(db, validation.form_id, field_name, values)
+            
+            seen = set()
+            field_existing = []
+            field_duplicated = []
+            for value in values:
+                if value is None:
+                    continue
+                # Complementarios: mismos textos que core_register_values (objetos por 'id', listas por elemento)
+                texts = [value_to_text(value)] if model_class is not None else register_value_texts(value)
+                if not texts:
+                    continue
+                if any(text_value in found for text_value in texts) and value not in field_existing:
+                    field_existing.append(value)
+                value_key = tuple(texts)
+                if value_key in seen:
+                    if value not in field_duplicated:
+                        field_duplicated.append(value)
+                else:
+                    seen.add(value_key)
+            existing[field_name] = field_existing
+            duplicated[field_name] = field_duplicated
+        
+        return UniqueFieldBatchValidationResponse(existing=existing, duplicated=duplicated)
+
+    def _ensure_unique_field_indexes_in_background(self, form_ids: Optional[List[UUID]] = None) -> None:
+        """Ejecuta ensure_unique_field_indexes en un hilo (CREATE INDEX CONCURRENTLY puede tardar)."""
+        import threading
+        
+        def _run():
+            try:
+                self.ensure_unique_field_indexes(form_ids)
+            except Exception as e:
+                logger.error("Error al asegurar índices de campos únicos: %s", e)
+        
+        threading.Thread(target=_run, name="unique-field-indexes", daemon=True).start()
+
+    def ensure_entity_filter_indexes(self) -> List[str]:
+        """
+        Crea (CONCURRENTLY) los índices que necesitan los filtros de entidades: los de
+        los campos entity de los schemas vigentes y los filtros ya compilados en este
+        proceso. Solo se indexan las columnas filtradas que el modelo no indexa.
+        
+        Usa su propia conexión en autocommit (puede llamarse desde un hilo en segundo plano).
+        
+        Returns:
+            Sentencias ejecutadas
+        """
+        from sqlalchemy import select
+        from .resources.concurrent_index import create_index_concurrently
+        from .resources.query_filter import compile_filter, filter_index_ddl, get_compiled_filters
+        from .resources.schema_artifacts import compile_schema_form
+        
+        engine = self._get_db().get_bind()
+        executed = []
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            schemas = connection.execute(
+                select(SchemaFormModel.id, SchemaFormModel.schema)
+                .join(FormModel, FormModel.schema_id == SchemaFormModel.id)
+                .where(FormModel.disabled_at.is_(None))
+            ).all()
+            
+            compiled_filters = get_compiled_filters()
+            for row in schemas:
+                for entity_type, filter_str in compile_schema_form(row.id, row.schema).entity_filters:
+                    model_class = find_model_by_entity_name(entity_type)
+                    if model_class:
+                        compiled_filters.append(compile_filter(entity_type, model_class, filter_str))
+            
+            for ddl in filter_index_ddl(compiled_filters):
+                try:
+                    create_index_concurrently(connection, ddl)
+                    executed.append(ddl)
+                except Exception as e:
+                    logger.error("Error al crear índice de filtro: %s (%s)", e, ddl)
+        return executed
+    
+    def ensure_unique_field_indexes(self, form_ids: Optional[List[UUID]] = None) -> List[str]:
+        """
+        Crea (CONCURRENTLY) los índices de los campos marcados is_unique o
+        is_logical_identifier en los schemas de los formularios de entidad: columna o
+        entity_value->>'campo' de la tabla de la entidad. Los formularios complementarios
+        se validan con core_register_values y no necesitan índices propios.
+        
+        Usa su propia conexión en autocommit (puede llamarse desde un hilo en segundo plano).
+        
+        Args:
+            form_ids: Formularios a procesar (por defecto, todos los que tienen schema)
+        
+        Returns:
+            Sentencias ejecutadas
+        """
+        from sqlalchemy import select
+        from .resources.concurrent_index import create_index_concurrently
+        
+        engine = self._get_db().get_bind()
+        executed = []
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            statement = select(
+                FormModel.id, FormModel.entity_name, FormModel.form_purpose, SchemaFormModel.schema
+            ).join(SchemaFormModel, SchemaFormModel.id == FormModel.schema_id).where(FormModel.disabled_at.is_(None))
+            if form_ids:
+                statement = statement.where(FormModel.id.in_(form_ids))
+            forms = connection.execute(statement).all()
+            
+            ddl_statements = []
+            for form in forms:
+                unique_fields = get_unique_fields(form.schema)
+                if not unique_fields:
+                    continue
+                # Los registros complementarios se validan con core_register_values,
+                # que ya tiene índices por (form_id, field_name, value_text)
+                if form.form_purpose != FormPurpose.entity or not form.entity_name:
+                    continue
+                model_class = find_model_by_entity_name(form.entity_name)
+                if not model_class:
+                    continue
+                ddl_statements.extend(unique_field_index_ddl(model_class, name) for name in unique_fields)
+            
+            for ddl in dict.fromkeys(ddl for ddl in ddl_statements if ddl):
+                try:
+                    create_index_concurrently(connection, ddl)
+                    executed.append(ddl)
+                except Exception as e:
+                    logger.error("Error al crear índice de campo único: %s (%s)", e, ddl)
+        return executed
+
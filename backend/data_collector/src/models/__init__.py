@@ -2,12 +2,20 @@ from .forms import FormModel, ChannelName, FormType, ViewerType, FormPurpose
 from .action_tools import ActionToolModel, ChannelType
 from .schema_forms import SchemaFormModel, SchemaFormType
 from .core_registers import CoreRegisterModel, RegisterStatus
+from .core_register_mentions import CoreRegisterMentionModel
+from .core_register_projection_jobs import CoreRegisterProjectionJobModel, ProjectionJobStatus
+from .core_register_values import CoreRegisterValueModel
 from .referencable_entities import ReferencableEntityModel
+from .form_generation_manifest import FormGenerationManifestModel
 
 __all__ = [
     'FormModel', 'ChannelName', 'FormType', 'ViewerType', 'FormPurpose',
     'ActionToolModel', 'ChannelType',
     'SchemaFormModel', 'SchemaFormType',
     'CoreRegisterModel', 'RegisterStatus',
-    'ReferencableEntityModel'
+    'CoreRegisterMentionModel',
+    'CoreRegisterProjectionJobModel', 'ProjectionJobStatus',
+    'CoreRegisterValueModel',
+    'ReferencableEntityModel',
+    'FormGenerationManifestModel'
 ]
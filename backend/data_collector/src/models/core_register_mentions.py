@@ -0,0 +1,40 @@
+from dataclasses import dataclass
+from sqlalchemy import Column, String, TIMESTAMP, ForeignKey, Index, UniqueConstraint, text
+from sqlalchemy.dialects.postgresql import UUID
+
+from core.models.base_class import Model
+
+@dataclass
+class CoreRegisterMentionModel(Model):
+    """ CoreRegisterMentionModel - Índice de entidades mencionadas en core_registers.detail """
+    
+    __tablename__ = "core_register_mentions"
+    __table_args__ = (
+        UniqueConstraint('register_id', 'field_name', 'entity_id', name='uq_core_register_mention'),
+        Index('idx_core_register_mentions_entity_created', 'entity_id', 'created_at'),
+        Index('idx_core_register_mentions_form', 'form_id'),
+        {"schema": "public", "extend_existing": True}
+    )
+    
+    id = Column(UUID(as_uuid=True),
+                primary_key=True,
+                server_default=text('uuid_generate_v4()'),
+                unique=True,
+                nullable=False)
+    register_id = Column(UUID(as_uuid=True),
+                         ForeignKey('public.core_registers.id', ondelete='CASCADE'),
+                         nullable=False,
+                         info={"display_name": "Registro", "description": "registro que menciona la entidad"})
+    entity_id = Column(UUID(as_uuid=True), nullable=False, info={"display_name": "ID Entidad", "description": "id de la entidad mencionada"})
+    field_name = Column(String(255), nullable=False, info={"display_name": "Campo", "description": "campo del detail donde se menciona la entidad"})
+    form_id = Column(UUID(as_uuid=True),
+                     ForeignKey('public.forms.id'),
+                     nullable=False,
+                     info={"display_name": "Formulario", "description": "formulario del registro"})
+    created_at = Column(TIMESTAMP, nullable=False, info={"display_name": "Fecha", "description": "fecha de creación del registro"})
+    
+    def __init__(self, **kwargs):
+        super(CoreRegisterMentionModel, self).__init__(**kwargs)
+    
+    def __hash__(self):
+        return hash(self.id)
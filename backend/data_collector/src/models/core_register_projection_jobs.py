@@ -0,0 +1,48 @@
+from dataclasses import dataclass
+from sqlalchemy import Column, Integer, TIMESTAMP, ForeignKey, Index, func, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Enum as SQLEnum
+import enum
+
+from core.models.base_class import Model
+
+
+class ProjectionJobStatus(enum.Enum):
+    pending = "pending"
+    processing = "processing"
+
+
+@dataclass
+class CoreRegisterProjectionJobModel(Model):
+    """ CoreRegisterProjectionJobModel - Cola durable de proyecciones asíncronas de core_registers a entidades """
+    
+    __tablename__ = "core_register_projection_jobs"
+    __table_args__ = (
+        Index('idx_core_register_projection_jobs_status_created', 'status', 'created_at'),
+        {"schema": "public", "extend_existing": True}
+    )
+    
+    id = Column(UUID(as_uuid=True),
+                primary_key=True,
+                server_default=text('uuid_generate_v4()'),
+                unique=True,
+                nullable=False)
+    register_id = Column(UUID(as_uuid=True),
+                         ForeignKey('public.core_registers.id', ondelete='CASCADE'),
+                         nullable=False,
+                         unique=True,
+                         info={"display_name": "Registro", "description": "registro pendiente de proyectar"})
+    status = Column(SQLEnum(ProjectionJobStatus, name='projection_job_status', values_callable=lambda x: [e.value for e in x]),
+                    nullable=False,
+                    server_default=ProjectionJobStatus.pending.value,
+                    info={"display_name": "Estado", "description": "estado del trabajo"})
+    attempts = Column(Integer, nullable=False, server_default=text('0'), info={"display_name": "Intentos", "description": "intentos de proyección"})
+    locked_at = Column(TIMESTAMP, nullable=True, info={"display_name": "Tomado", "description": "fecha en que un worker tomó el trabajo"})
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.current_timestamp())
+    
+    def __init__(self, **kwargs):
+        super(CoreRegisterProjectionJobModel, self).__init__(**kwargs)
+    
+    def __hash__(self):
+        return hash(self.id)
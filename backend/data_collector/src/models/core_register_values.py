@@ -0,0 +1,43 @@
+from dataclasses import dataclass
+from sqlalchemy import Column, String, Text, Numeric, TIMESTAMP, ForeignKey, Index, func, text
+from sqlalchemy.dialects.postgresql import UUID
+
+from core.models.base_class import Model
+
+@dataclass
+class CoreRegisterValueModel(Model):
+    """ CoreRegisterValueModel - Valores tipados de los campos de core_registers.detail (mantenido por trigger) """
+    
+    __tablename__ = "core_register_values"
+    __table_args__ = (
+        Index('idx_core_register_values_text', 'form_id', 'field_name', 'value_text'),
+        Index('idx_core_register_values_num', 'form_id', 'field_name', 'value_num'),
+        Index('idx_core_register_values_ts', 'form_id', 'field_name', 'value_ts'),
+        Index('idx_core_register_values_register', 'register_id'),
+        {"schema": "public", "extend_existing": True}
+    )
+    
+    id = Column(UUID(as_uuid=True),
+                primary_key=True,
+                server_default=text('uuid_generate_v4()'),
+                unique=True,
+                nullable=False)
+    register_id = Column(UUID(as_uuid=True),
+                         ForeignKey('public.core_registers.id', ondelete='CASCADE'),
+                         nullable=False,
+                         info={"display_name": "Registro", "description": "registro al que pertenece el valor"})
+    form_id = Column(UUID(as_uuid=True),
+                     ForeignKey('public.forms.id'),
+                     nullable=False,
+                     info={"display_name": "Formulario", "description": "formulario del registro"})
+    field_name = Column(String(255), nullable=False, info={"display_name": "Campo", "description": "nombre del campo en el detail"})
+    value_text = Column(Text, nullable=True, info={"display_name": "Valor", "description": "valor como texto (id para entidades)"})
+    value_num = Column(Numeric, nullable=True, info={"display_name": "Valor numérico", "description": "valor si es numérico"})
+    value_ts = Column(TIMESTAMP, nullable=True, info={"display_name": "Valor fecha", "description": "valor si es una fecha"})
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    
+    def __init__(self, **kwargs):
+        super(CoreRegisterValueModel, self).__init__(**kwargs)
+    
+    def __hash__(self):
+        return hash(self.id)
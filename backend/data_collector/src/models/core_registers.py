@@ -1,6 +1,7 @@
 from dataclasses import dataclass
-from sqlalchemy import Column, String, Text, TIMESTAMP, ForeignKey, ARRAY, func, text, Numeric
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy import Column, String, Text, TIMESTAMP, ForeignKey, ARRAY, Index, func, text, Numeric
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
+from sqlalchemy.orm import deferred
 from sqlalchemy import Enum as SQLEnum
 from geoalchemy2 import Geometry
 import enum
@@ -18,7 +19,11 @@ class CoreRegisterModel(Model):
     """ CoreRegisterModel """
     
     __tablename__ = "core_registers"
-    __table_args__ = {"schema": "public", "extend_existing": True}
+    __table_args__ = (
+        Index('uq_core_registers_idempotency_key', 'idempotency_key', unique=True,
+              postgresql_where=text('idempotency_key IS NOT NULL')),
+        {"schema": "public", "extend_existing": True}
+    )
     
     id = Column(UUID(as_uuid=True),
                 primary_key=True,
@@ -44,6 +49,12 @@ class CoreRegisterModel(Model):
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.current_timestamp())
     disabled_at = Column(TIMESTAMP, nullable=True, default=None)
+    # Clave enviada por el cliente en la carga por lotes para que los reintentos no dupliquen registros
+    idempotency_key = Column(String(255), nullable=True, info={"display_name": "Clave de idempotencia", "description": "clave del cliente para reintentos seguros"})
+    # Columnas de búsqueda mantenidas por trigger a partir del detail (ver resources/register_search.py).
+    # Son diferidas para no cargarlas al leer registros.
+    search_text = deferred(Column(Text, nullable=True, info={"display_name": "Texto de búsqueda", "description": "valores visibles del detail normalizados para búsqueda"}))
+    search_vector = deferred(Column(TSVECTOR, nullable=True, info={"display_name": "Vector de búsqueda", "description": "tsvector del detail para búsqueda de texto"}))
     
     def __init__(self, **kwargs):
         super(CoreRegisterModel, self).__init__(**kwargs)
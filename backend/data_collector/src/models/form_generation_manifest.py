@@ -0,0 +1,31 @@
+from dataclasses import dataclass
+from sqlalchemy import Column, String, TIMESTAMP, func, text
+from sqlalchemy.dialects.postgresql import UUID
+
+from core.models.base_class import Model
+
+
+@dataclass
+class FormGenerationManifestModel(Model):
+    """ FormGenerationManifestModel - Huella de las entradas de cada formulario autogenerado desde config.yaml """
+    
+    __tablename__ = "form_generation_manifest"
+    __table_args__ = {"schema": "public", "extend_existing": True}
+    
+    id = Column(UUID(as_uuid=True),
+                primary_key=True,
+                server_default=text('uuid_generate_v4()'),
+                unique=True,
+                nullable=False)
+    form_key = Column(String(255), nullable=False, unique=True, info={"display_name": "Clave", "description": "módulo, nombre y entidad (o id) del formulario en config.yaml"})
+    form_id = Column(UUID(as_uuid=True), nullable=False, info={"display_name": "Formulario", "description": "formulario generado"})
+    schema_form_id = Column(UUID(as_uuid=True), nullable=True, info={"display_name": "Schema", "description": "schema_form vigente al generar"})
+    fingerprint = Column(String(64), nullable=False, info={"display_name": "Huella", "description": "hash de la firma del modelo, la configuración del formulario y la versión de tools"})
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.current_timestamp())
+    
+    def __init__(self, **kwargs):
+        super(FormGenerationManifestModel, self).__init__(**kwargs)
+    
+    def __hash__(self):
+        return hash(self.id)
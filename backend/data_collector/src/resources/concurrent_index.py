@@ -0,0 +1,61 @@
+"""
+Creación de índices con CREATE INDEX CONCURRENTLY IF NOT EXISTS.
+
+Si un CREATE INDEX CONCURRENTLY anterior falló o se interrumpió (cancelación, violación
+de unicidad, reinicio), el índice queda en pg_index con indisvalid = false: no se usa en
+las consultas pero IF NOT EXISTS lo da por existente y nunca se vuelve a construir.
+create_index_concurrently elimina primero (DROP INDEX CONCURRENTLY) el índice inválido
+con el mismo nombre y luego ejecuta la sentencia.
+
+Las sentencias las generan typeahead_index_ddl, unique_field_index_ddl y
+filter_index_ddl, todas con la forma
+'CREATE INDEX CONCURRENTLY IF NOT EXISTS <índice> ON <esquema.tabla> ...'.
+"""
+import logging
+import re
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+_CREATE_INDEX = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)\s+ON\s+(?:(\w+)\.)?\w+",
+    re.IGNORECASE
+)
+
+_INVALID_INDEX_SQL = text("""
+    SELECT n.nspname
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indexrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relname = :index_name
+      AND n.nspname = COALESCE(:schema, current_schema())
+      AND NOT i.indisvalid
+""")
+
+
+def drop_invalid_index(connection, index_name: str, schema: str = None) -> bool:
+    """
+    Elimina (CONCURRENTLY) el índice si existe y está marcado como inválido.
+    La conexión debe estar en autocommit.
+
+    Returns:
+        True si se eliminó un índice inválido
+    """
+    schema_name = connection.execute(_INVALID_INDEX_SQL, {"index_name": index_name, "schema": schema}).scalar()
+    if schema_name is None:
+        return False
+    logger.warning("Índice inválido %s.%s: se elimina para volver a crearlo", schema_name, index_name)
+    connection.exec_driver_sql(f'DROP INDEX CONCURRENTLY IF EXISTS "{schema_name}"."{index_name}"')
+    return True
+
+
+def create_index_concurrently(connection, ddl: str) -> None:
+    """
+    Ejecuta un CREATE INDEX CONCURRENTLY IF NOT EXISTS, eliminando antes el índice
+    inválido con el mismo nombre si lo hay. La conexión debe estar en autocommit.
+    """
+    match = _CREATE_INDEX.search(ddl)
+    if match:
+        drop_invalid_index(connection, match.group(1), match.group(2))
+    connection.exec_driver_sql(ddl)
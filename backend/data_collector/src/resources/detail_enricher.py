@@ -0,0 +1,267 @@
+"""
+Enriquecimiento por lotes del detail de core_registers.
+
+Agrupa todos los registros de una página para resolver display_names y valores
+representativos de entidades con un número constante de consultas:
+- a lo sumo 1 consulta para los schema_forms de la página (los artefactos compilados se cachean)
+- 1 consulta para las entidades referenciables involucradas
+- 1 consulta IN (...) por tipo de entidad mencionada
+"""
+import re
+from typing import Dict, Any, List, Optional, Iterable, Tuple, TYPE_CHECKING
+from uuid import UUID
+from sqlalchemy.orm import Session
+
+if TYPE_CHECKING:
+    from ..schemas import DetailArray
+
+_PLACEHOLDER_RE = re.compile(r'\{\{(\w+)\}\}')
+
+
+def get_instruction_entity_type(instruction_data: Dict[str, Any]) -> Optional[str]:
+    """
+    Obtiene el entity_type de una instrucción tipo entity (schema_gather.type_value == 'entity').
+
+    El valor se busca en el input con name 'entity_type' de schema_input; puede venir
+    como string directo o como lista de objetos {value: ...}.
+    """
+    schema_gather = instruction_data.get('schema_gather') or {}
+    if not isinstance(schema_gather, dict) or schema_gather.get('type_value') != 'entity':
+        return None
+
+    for input_item in instruction_data.get('schema_input') or []:
+        if isinstance(input_item, dict) and input_item.get('name') == 'entity_type':
+            value = input_item.get('value')
+            if isinstance(value, list) and len(value) > 0:
+                first_item = value[0]
+                if isinstance(first_item, dict):
+                    return first_item.get('value')
+                return first_item
+            if isinstance(value, str):
+                return value
+            return None
+    return None
+
+
+def get_instruction_entity_filter(instruction_data: Dict[str, Any]) -> Optional[str]:
+    """
+    Obtiene el filtro (input 'filter' de schema_input) de una instrucción tipo entity;
+    puede venir como string directo o como lista de strings u objetos {value: ...}.
+    """
+    schema_gather = instruction_data.get('schema_gather') or {}
+    if not isinstance(schema_gather, dict) or schema_gather.get('type_value') != 'entity':
+        return None
+
+    for input_item in instruction_data.get('schema_input') or []:
+        if isinstance(input_item, dict) and input_item.get('name') == 'filter':
+            value = input_item.get('value')
+            if isinstance(value, list) and len(value) > 0:
+                value = value[0]
+                if isinstance(value, dict):
+                    value = value.get('value')
+            return value if isinstance(value, str) and value.strip() else None
+    return None
+
+
+def get_template_placeholders(template: Optional[str]) -> List[str]:
+    """Lista los placeholders {{campo}} de un template de representative_value (sin duplicados)."""
+    if not template:
+        return []
+    return list(dict.fromkeys(_PLACEHOLDER_RE.findall(template)))
+
+
+def render_representative_value(template: str, values: Dict[str, Any]) -> Optional[str]:
+    """
+    Construye el valor representativo reemplazando {{campo}} por los valores dados.
+    Los valores None se reemplazan por cadena vacía y se colapsan los espacios múltiples.
+    """
+    result = _PLACEHOLDER_RE.sub(
+        lambda match: str(values.get(match.group(1))) if values.get(match.group(1)) is not None else '',
+        template
+    )
+    result = ' '.join(result.split())
+    return result or None
+
+
+def _extract_entity_ids(item_value: Any) -> List[Any]:
+    """Extrae los ids mencionados en un value de tipo entity (id, {id, ...} o [{id, ...}, ...])."""
+    if item_value is None or item_value == '':
+        return []
+    values = item_value if isinstance(item_value, list) else [item_value]
+    ids = []
+    for value in values:
+        if isinstance(value, dict):
+            value = value.get('id')
+        if value is not None and value != '':
+            ids.append(value)
+    return ids
+
+
+def _normalize_id(value: Any, expects_uuid: bool) -> Optional[Any]:
+    """Normaliza un id para usarlo en un IN (...). Devuelve None si no es válido para la columna."""
+    if not expects_uuid:
+        return value
+    if isinstance(value, UUID):
+        return value
+    try:
+        return UUID(str(value))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def _id_key(value: Any) -> str:
+    """Clave canónica de un id para cruzar valores del detail con filas de la BD."""
+    try:
+        return str(UUID(str(value)))
+    except (ValueError, TypeError, AttributeError):
+        return str(value)
+
+
+def _pk_expects_uuid(model_class) -> bool:
+    try:
+        return model_class.__table__.c['id'].type.python_type is UUID
+    except (KeyError, NotImplementedError, AttributeError):
+        return False
+
+
+def resolve_representative_values(
+    db: Session,
+    ids_by_entity: Dict[str, set],
+    templates: Dict[str, str],
+    find_model
+) -> Dict[Tuple[str, str], str]:
+    """
+    Resuelve los valores representativos de un conjunto de (entity_name, id).
+
+    Ejecuta una sola consulta IN (...) por entity_name seleccionando únicamente
+    id y las columnas que el template necesita; el template se renderiza en memoria.
+
+    Returns:
+        Diccionario (entity_name, str(id)) -> valor representativo
+    """
+    resolved = {}
+    for entity_name, raw_ids in ids_by_entity.items():
+        template = templates.get(entity_name)
+        if not template or not raw_ids:
+            continue
+
+        model_class = find_model(entity_name)
+        if not model_class or not hasattr(model_class, '__table__'):
+            continue
+
+        table_columns = model_class.__table__.c
+        if 'id' not in table_columns:
+            continue
+        placeholders = [p for p in get_template_placeholders(template) if p in table_columns]
+
+        expects_uuid = _pk_expects_uuid(model_class)
+        ids = {normalized for normalized in (_normalize_id(v, expects_uuid) for v in raw_ids) if normalized is not None}
+        if not ids:
+            continue
+
+        columns = [table_columns['id']] + [table_columns[p] for p in placeholders]
+        rows = db.query(*columns).filter(table_columns['id'].in_(list(ids))).all()
+        for row in rows:
+            values = row._asdict()
+            display = render_representative_value(template, values)
+            if display:
+                resolved[(entity_name, _id_key(values['id']))] = display
+    return resolved
+
+
+def enrich_details_batch(
+    items: Iterable[Tuple[Optional["DetailArray"], Optional[UUID]]],
+    db: Session,
+    find_model
+) -> List[Optional["DetailArray"]]:
+    """
+    Enriquece el detail de varios registros a la vez con display_name y entity_display_value.
+
+    Args:
+        items: Pares (detail, schema_form_id) de cada registro, en el orden de la página
+        db: Sesión de base de datos
+        find_model: Función entity_name -> clase del modelo
+
+    Returns:
+        Lista de details enriquecidos, en el mismo orden que items
+    """
+    from ..models.referencable_entities import ReferencableEntityModel
+    from .schema_artifacts import get_compiled_schema_forms
+
+    items = list(items)
+    schema_form_ids = {schema_form_id for detail, schema_form_id in items if detail and schema_form_id}
+    if not schema_form_ids:
+        return [detail for detail, _ in items]
+
+    # 1. Display names y tipos de entidad desde los artefactos compilados de los schemas
+    #    (solo se consultan los schema_forms que aún no están en caché)
+    schema_maps = {
+        schema_id: (compiled.display_names, compiled.entity_types)
+        for schema_id, compiled in get_compiled_schema_forms(db, schema_form_ids).items()
+    }
+
+    # 2. Templates de las entidades referenciables en una sola consulta
+    entity_types = {
+        entity_type
+        for _, entity_type_map in schema_maps.values()
+        for entity_type in entity_type_map.values()
+    }
+    templates = {}
+    if entity_types:
+        ref_rows = db.query(
+            ReferencableEntityModel.entity_name,
+            ReferencableEntityModel.representative_value
+        ).filter(
+            ReferencableEntityModel.entity_name.in_(list(entity_types)),
+            ReferencableEntityModel.disabled_at.is_(None)
+        ).all()
+        for entity_name, representative_value in ref_rows:
+            if representative_value and entity_name not in templates:
+                templates[entity_name] = representative_value
+
+    # 3. Recolectar todos los pares (entity_name, id) de la página
+    ids_by_entity: Dict[str, set] = {}
+    for detail, schema_form_id in items:
+        if not detail or schema_form_id not in schema_maps:
+            continue
+        _, entity_type_map = schema_maps[schema_form_id]
+        for item in detail:
+            if not isinstance(item, dict):
+                continue
+            entity_type = entity_type_map.get(item.get('name'))
+            if entity_type and entity_type in templates:
+                ids_by_entity.setdefault(entity_type, set()).update(
+                    _id_key(entity_id) for entity_id in _extract_entity_ids(item.get('value'))
+                )
+
+    # 4. Una consulta IN (...) por tipo de entidad
+    resolved = resolve_representative_values(db, ids_by_entity, templates, find_model)
+
+    # 5. Enriquecer en memoria
+    enriched_items = []
+    for detail, schema_form_id in items:
+        if not detail or schema_form_id not in schema_maps:
+            enriched_items.append(detail)
+            continue
+        display_name_map, entity_type_map = schema_maps[schema_form_id]
+        enriched_detail = []
+        for item in detail:
+            if not isinstance(item, dict):
+                enriched_detail.append(item)
+                continue
+            item_copy = item.copy()
+            item_name = item.get('name')
+            if item_name and item_name in display_name_map:
+                item_copy['display_name'] = display_name_map[item_name]
+            entity_type = entity_type_map.get(item_name) if item_name else None
+            if entity_type:
+                displays = [
+                    resolved[(entity_type, _id_key(entity_id))]
+                    for entity_id in _extract_entity_ids(item.get('value'))
+                    if (entity_type, _id_key(entity_id)) in resolved
+                ]
+                if displays:
+                    item_copy['entity_display_value'] = ', '.join(displays)
+            enriched_detail.append(item_copy)
+        enriched_items.append(enriched_detail)
+    return enriched_items
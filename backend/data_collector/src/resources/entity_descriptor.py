@@ -0,0 +1,240 @@
+"""
+Descriptores precalculados de entidades referenciables (get_entity_data).
+
+Un EntityDescriptor reúne lo que get_entity_data necesita saber del modelo y del
+representative_value, calculado una vez por (entidad, plantilla):
+- columnas de texto (búsqueda) y de geometría (se leen como WKT)
+- plantilla representative_value compilada en partes (literal, columna)
+- proyección: solo id y las columnas que usa la plantilla
+- expresión de typeahead (en minúsculas, inmutable) e índices sobre ella
+"""
+import re
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import Text, cast, func, literal
+
+_PLACEHOLDER_RE = re.compile(r'\{\{(\w+)\}\}')
+_TEXT_TYPE_MARKERS = ('varchar', 'string', 'text', 'char')
+
+MAX_DESCRIPTORS = 256
+
+
+def _is_text_column(column) -> bool:
+    column_type_str = str(column.type).lower()
+    if any(marker in column_type_str for marker in _TEXT_TYPE_MARKERS):
+        return True
+    try:
+        return column.type.python_type == str
+    except (NotImplementedError, AttributeError, TypeError):
+        # Algunos tipos (como Geometry) no implementan python_type
+        return False
+
+
+def _has_immutable_text_cast(column) -> bool:
+    if _is_text_column(column):
+        return True
+    try:
+        return column.type.python_type in (UUID, int, Decimal, bool)
+    except (NotImplementedError, AttributeError, TypeError):
+        return False
+
+
+def _is_geometry_column(column) -> bool:
+    from geoalchemy2 import Geometry
+    return isinstance(column.type, Geometry)
+
+
+def compile_template(template: Optional[str]) -> Tuple[Tuple[str, Optional[str]], ...]:
+    """
+    Compila una plantilla '{{first_name}} {{last_name}}' en partes (literal, columna).
+
+    Cada parte es un texto literal seguido opcionalmente del placeholder a reemplazar.
+    """
+    if not template:
+        return ()
+    parts = []
+    position = 0
+    for match in _PLACEHOLDER_RE.finditer(template):
+        parts.append((template[position:match.start()], match.group(1)))
+        position = match.end()
+    if position < len(template):
+        parts.append((template[position:], None))
+    return tuple(parts)
+
+
+def _format_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if value.__class__.__name__ in ('WKBElement', 'WKTElement'):
+        return getattr(value, 'desc', None) or str(value)
+    return str(value)
+
+
+@dataclass(frozen=True)
+class EntityDescriptor:
+    """Metadatos compilados de una entidad referenciable para una plantilla dada."""
+    entity_name: str
+    model_class: Any
+    id_column: Any
+    text_columns: Tuple[Any, ...]
+    geometry_columns: frozenset
+    template_parts: Tuple[Tuple[str, Optional[str]], ...]
+    template_columns: Tuple[str, ...]
+    # True si la plantilla usa atributos que no son columnas (se carga la entidad completa)
+    needs_full_model: bool
+    # Columnas cuyo cast a texto es inmutable (indexables): texto, uuid, enteros, numeric, boolean
+    immutable_text_columns: frozenset = frozenset()
+
+    def projection(self) -> List[Any]:
+        """Columnas a seleccionar: id y las que usa la plantilla (geometrías como WKT)."""
+        columns = [self.id_column.label('id')]
+        for name in self.template_columns:
+            column = getattr(self.model_class, name)
+            if name in self.geometry_columns:
+                column = func.ST_AsText(column)
+            columns.append(column.label(name))
+        return columns
+
+    def render(self, row: Any) -> str:
+        """Construye el name de una fila (de la proyección o de la entidad completa)."""
+        if not self.template_parts:
+            return _format_value(row.id)
+        rendered = []
+        for text_part, placeholder in self.template_parts:
+            rendered.append(text_part)
+            if placeholder is not None:
+                rendered.append(_format_value(getattr(row, placeholder, None)))
+        return "".join(rendered)
+
+    def typeahead_expression(self):
+        """
+        Valor representativo en minúsculas construido con || y coalesce (inmutable),
+        para que coincida con el índice de typeahead de la entidad.
+        """
+        if not self.template_parts or self.needs_full_model:
+            return func.lower(cast(self.id_column, Text))
+        expression = None
+        for text_part, placeholder in self.template_parts:
+            pieces = []
+            if text_part:
+                pieces.append(literal(text_part, Text))
+            if placeholder is not None:
+                pieces.append(func.coalesce(cast(getattr(self.model_class, placeholder), Text), ''))
+            for piece in pieces:
+                expression = piece if expression is None else expression.op('||')(piece)
+        return func.lower(expression)
+
+    @property
+    def typeahead_indexable(self) -> bool:
+        """True si la expresión de typeahead puede indexarse (todas sus columnas tienen cast inmutable a texto)."""
+        if self.needs_full_model:
+            return False
+        return all(name in self.immutable_text_columns for name in self.template_columns)
+
+    def search_filters(self, search: str) -> List[Any]:
+        """Filtros ilike sobre las columnas de texto."""
+        pattern = f"%{search}%"
+        return [column.ilike(pattern) for column in self.text_columns]
+
+
+def build_descriptor(entity_name: str, model_class: Any, template: Optional[str]) -> EntityDescriptor:
+    """Construye el descriptor inspeccionando el modelo una sola vez."""
+    columns = list(model_class.__table__.columns)
+    column_names = {column.name for column in columns}
+    primary_key = next((column for column in columns if column.primary_key), None)
+    id_column = getattr(model_class, primary_key.name if primary_key is not None else 'id')
+
+    text_columns = []
+    geometry_columns = set()
+    immutable_text_columns = {column.name for column in columns if not _is_geometry_column(column) and _has_immutable_text_cast(column)}
+    for column in columns:
+        if _is_geometry_column(column):
+            geometry_columns.add(column.name)
+            continue
+        if _is_text_column(column):
+            model_column = getattr(model_class, column.name, None)
+            if model_column is not None:
+                text_columns.append(model_column)
+
+    template_parts = compile_template(template)
+    template_columns = []
+    for _, placeholder in template_parts:
+        if placeholder is not None and placeholder not in template_columns:
+            template_columns.append(placeholder)
+
+    return EntityDescriptor(
+        entity_name=entity_name,
+        model_class=model_class,
+        id_column=id_column,
+        text_columns=tuple(text_columns),
+        geometry_columns=frozenset(geometry_columns),
+        template_parts=template_parts,
+        template_columns=tuple(name for name in template_columns if name in column_names),
+        needs_full_model=any(name not in column_names for name in template_columns),
+        immutable_text_columns=frozenset(immutable_text_columns)
+    )
+
+
+_descriptors: Dict[Tuple[str, Any, Optional[str]], EntityDescriptor] = {}
+_lock = threading.Lock()
+
+
+def get_entity_descriptor(entity_name: str, model_class: Any, template: Optional[str]) -> EntityDescriptor:
+    """Descriptor cacheado por (entidad, modelo, plantilla); una plantilla distinta genera otro descriptor."""
+    key = (entity_name, model_class, template)
+    descriptor = _descriptors.get(key)
+    if descriptor is None:
+        descriptor = build_descriptor(entity_name, model_class, template)
+        with _lock:
+            if len(_descriptors) >= MAX_DESCRIPTORS:
+                _descriptors.clear()
+            _descriptors[key] = descriptor
+    return descriptor
+
+
+def clear_entity_descriptors() -> None:
+    with _lock:
+        _descriptors.clear()
+
+
+def typeahead_index_names(descriptor: EntityDescriptor) -> Tuple[str, str]:
+    """
+    Nombres de los índices de typeahead (trigram y prefijo). Incluyen un hash de la
+    plantilla: si el representative_value cambia se crean índices nuevos.
+    """
+    import hashlib
+    table_name = descriptor.model_class.__table__.name
+    template = "".join(f"{text_part}{{{{{placeholder}}}}}" if placeholder else text_part
+                       for text_part, placeholder in descriptor.template_parts)
+    digest = hashlib.md5(template.encode("utf-8")).hexdigest()[:8]
+    prefix = f"idx_{table_name}"[:40]
+    return f"{prefix}_typeahead_trgm_{digest}", f"{prefix}_typeahead_prefix_{digest}"
+
+
+def typeahead_index_ddl(descriptor: EntityDescriptor, dialect) -> List[str]:
+    """
+    Sentencias CREATE INDEX CONCURRENTLY para el typeahead de la entidad:
+    - GIN trigram para similitud (<%) y subcadenas
+    - B-tree text_pattern_ops para búsquedas por prefijo (LIKE 'x%')
+
+    Ejecutar con create_index_concurrently (reconstruye los índices inválidos).
+    """
+    table = descriptor.model_class.__table__
+    expression = descriptor.typeahead_expression().compile(
+        dialect=dialect, compile_kwargs={"literal_binds": True}
+    )
+    qualified_table = f"{table.schema}.{table.name}" if table.schema else table.name
+    trgm_name, prefix_name = typeahead_index_names(descriptor)
+    return [
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {trgm_name} ON {qualified_table} USING gin (({expression}) gin_trgm_ops)",
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {prefix_name} ON {qualified_table} (({expression}) text_pattern_ops)",
+    ]
@@ -0,0 +1,153 @@
+"""
+Utilidades para la exportación de core_registers a Excel en modo streaming.
+
+Las columnas dinámicas se obtienen de las instructions de los schema_forms del
+formulario (no de un recorrido previo de los registros), de modo que las filas
+pueden escribirse a medida que se leen de la base de datos.
+"""
+import zlib
+from uuid import UUID
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, Optional, Set, Tuple
+
+EXPORT_CHUNK_SIZE = 64 * 1024
+# Registros leídos por bloque del cursor; las URLs de medias se resuelven por bloque
+EXPORT_BATCH_SIZE = 1000
+# Nivel de compresión del estimador de tamaño (el mismo que usa zipfile con ZIP_DEFLATED)
+EXPORT_SIZE_ESTIMATE_LEVEL = 6
+
+
+class ExportSizeEstimator:
+    """
+    Estima el tamaño del xlsx mientras se escriben las filas, para rechazar una exportación
+    demasiado grande sin terminar de generarla.
+
+    El xlsx es un zip (deflate) de XML que contiene los valores de las celdas más el
+    marcado; se comprimen con deflate solo los valores, así que en la práctica el estimado
+    queda por debajo del tamaño final y no rechaza exportaciones que caben en el límite
+    (la validación sobre el archivo terminado se mantiene).
+    """
+
+    def __init__(self, level: int = EXPORT_SIZE_ESTIMATE_LEVEL):
+        self._compressor = zlib.compressobj(level)
+        self.size = 0
+
+    def add_row(self, row: List[Any]) -> None:
+        data = "\t".join("" if value is None else str(value) for value in row) + "\n"
+        self.size += len(self._compressor.compress(data.encode("utf-8")))
+
+    def flush(self) -> int:
+        """Vacía el compresor (sin cerrarlo) y devuelve el tamaño estimado en bytes."""
+        self.size += len(self._compressor.flush(zlib.Z_SYNC_FLUSH))
+        return self.size
+
+
+def build_export_columns(schemas: Iterable[Optional[Dict[str, Any]]]) -> List[Tuple[str, str]]:
+    """
+    Construye la lista de columnas dinámicas (name, header) a partir de los schemas del formulario.
+
+    Los schemas deben venir del más reciente al más antiguo: se respeta el orden de
+    las instructions del schema vigente y se agregan al final los campos que solo
+    existen en versiones anteriores (registros capturados con un schema previo).
+    """
+    columns: Dict[str, str] = {}
+    for schema in schemas:
+        if not schema:
+            continue
+        for instruction_data in schema.get('instructions', []) or []:
+            if not isinstance(instruction_data, dict):
+                continue
+            name = instruction_data.get('name')
+            if not name or name in columns:
+                continue
+            columns[name] = instruction_data.get('display_name') or name
+    return list(columns.items())
+
+
+def media_key(media_id: Any) -> str:
+    """Clave canónica de un media id (UUID o string) para cruzar el detail con las URLs resueltas."""
+    return str(media_id).lower()
+
+
+def collect_media_ids(items: Iterable[Optional[Dict[str, Any]]]) -> Set[str]:
+    """Obtiene los media ids (type_value == 'media') de un conjunto de items del detail."""
+    media_ids = set()
+    for item in items:
+        if not item or item.get('type_value') != 'media':
+            continue
+        value_data = item.get('value')
+        if value_data and isinstance(value_data, (str, UUID)):
+            media_ids.add(str(value_data))
+    return media_ids
+
+
+def format_detail_value(item: Dict[str, Any], resolve_media_url: Callable[[Any], Optional[str]]) -> str:
+    """
+    Convierte el value de un item del detail al texto de la celda.
+
+    - Entidad {id, display_name}: display_name
+    - Lista de entidades [{id, display_name}, ...]: display_names separados por comas
+    - Media: URL firmada obtenida con resolve_media_url
+    - Resto: representación en texto del valor
+    """
+    value_data = item.get('value')
+
+    if isinstance(value_data, dict) and 'id' in value_data and 'display_name' in value_data:
+        value = value_data.get('display_name', '')
+    elif isinstance(value_data, list) and len(value_data) > 0:
+        if all(isinstance(obj, dict) and 'id' in obj and 'display_name' in obj for obj in value_data):
+            value = ', '.join(obj.get('display_name', '') for obj in value_data)
+        else:
+            value = ', '.join(str(v) for v in value_data)
+    elif item.get('type_value') == 'media':
+        value = resolve_media_url(value_data) if value_data else ''
+    else:
+        value = value_data if value_data is not None else ''
+
+    if isinstance(value, dict):
+        value = str(value)
+    return str(value) if value else ''
+
+
+def iter_file_chunks(file_obj: IO[bytes], chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Lee un archivo desde el inicio en bloques y lo cierra al terminar (o si el cliente se desconecta)."""
+    try:
+        file_obj.seek(0)
+        while True:
+            chunk = file_obj.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        file_obj.close()
+
+
+def build_template_excel(columns: List[Dict[str, Any]]) -> bytes:
+    """
+    Genera la plantilla Excel de carga masiva: fila 1 con las cabeceras (display_name)
+    y fila 2 con las pistas (Identificador en la columna del identificador lógico).
+    """
+    from io import BytesIO
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Datos"[:31]
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF", size=11)
+    thin = Side(style="thin")
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    for col_num, col in enumerate(columns, 1):
+        # Usar display_name del info del modelo (ej: "Código" en vez de "code") para cabeceras legibles
+        cell = ws.cell(row=1, column=col_num, value=col.get("display_name") or col["name"])
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
+        cell.border = border
+    for col_num, col in enumerate(columns, 1):
+        hint = "Identificador" if col.get("is_logical_identifier") else ""
+        cell = ws.cell(row=2, column=col_num, value=hint)
+        cell.border = border
+    bio = BytesIO()
+    wb.save(bio)
+    return bio.getvalue()
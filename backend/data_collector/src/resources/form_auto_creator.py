@@ -4,171 +4,30 @@ Funciones para crear formularios automáticamente basados en las entidades defin
 Estas funciones son específicas del módulo data_collector y se usan para generar
 formularios automáticamente desde modelos SQLAlchemy.
 """
-import sys
-import importlib
-import inspect as py_inspect  # Renombrar para evitar conflicto con sqlalchemy.inspect
-from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union
 from uuid import uuid4
 from sqlalchemy import inspect as sqlalchemy_inspect
+import copy
 import json
 
+from .model_registry import get_model_by_tablename
+from .tool_catalog import ToolCatalog, get_tool_catalog
+
 
 def find_model_by_entity_name(entity_name: str, container) -> Optional[Any]:
     """
     Busca un modelo de SQLAlchemy por nombre de entidad.
     
-    Busca en todos los módulos cargados el modelo que tenga __tablename__ = entity_name
+    Usa el registro precalculado de modelos (búsqueda O(1) por __tablename__).
     
     Args:
         entity_name: Nombre de la entidad (ej: 'farmers', 'farms')
-        container: Container con acceso a las bases de datos
+        container: Container con acceso a las bases de datos (se mantiene por compatibilidad)
         
     Returns:
         La clase del modelo o None si no se encuentra
     """
-    try:
-        from core.models.base_class import Model as BaseModel
-        
-        # Normalizar entity_name a minúsculas para comparación
-        entity_name_lower = entity_name.lower()
-        
-        print(f"    🔍 Buscando modelo para entidad '{entity_name}' (normalizado: '{entity_name_lower}')...")
-        
-        # PRIMERO: Buscar en todos los módulos registrados en sys.modules
-        modules_checked = []
-        for module_name, module in sys.modules.items():
-            if not module_name.startswith('modules.'):
-                continue
-            
-            # Buscar modelos en el módulo
-            if hasattr(module, 'models'):
-                models_module = getattr(module, 'models')
-                modules_checked.append(module_name)
-                for attr_name in dir(models_module):
-                    # Omitir atributos privados y especiales
-                    if attr_name.startswith('_'):
-                        continue
-                    
-                    try:
-                        attr = getattr(models_module, attr_name)
-                        # Verificar que sea una clase y que herede de BaseModel
-                        if (py_inspect.isclass(attr) and 
-                            issubclass(attr, BaseModel) and 
-                            attr is not BaseModel):
-                            # Verificar que tenga __tablename__ y que coincida
-                            if hasattr(attr, '__tablename__'):
-                                tablename = attr.__tablename__
-                                if isinstance(tablename, str) and tablename.lower() == entity_name_lower:
-                                    print(f"    ✓ Modelo encontrado en sys.modules: {module_name}.models.{attr_name} (tablename: {tablename})")
-                                    return attr
-                    except Exception as e:
-                        continue
-        
-        if modules_checked:
-            print(f"    ℹ️  Módulos revisados en sys.modules: {', '.join(modules_checked)}")
-        
-        # SEGUNDO: Si no se encuentra, intentar importar módulos dinámicamente
-        # Buscar en backend/modules/
-        # __file__ está en: backend/modules/data_collector/src/resources/form_auto_creator.py
-        # Necesitamos llegar a: backend/modules/
-        current_file = Path(__file__).resolve()
-        # Buscar el directorio "modules" en el path del archivo usando parts
-        parts = list(current_file.parts)
-        try:
-            modules_index = parts.index("modules")
-            # Crear path hasta "modules" inclusive (sin incluir lo que viene después)
-            modules_path = Path(*parts[:modules_index + 1])
-            print(f"    📂 Path calculado para modules: {modules_path}")
-        except ValueError:
-            # Si no encontramos "modules" en el path, usar cálculo relativo
-            # current_file.parent = resources/
-            # current_file.parent.parent = src/
-            # current_file.parent.parent.parent = data_collector/
-            # current_file.parent.parent.parent.parent = modules/
-            modules_path = current_file.parent.parent.parent.parent
-            print(f"    📂 Path calculado (fallback): {modules_path}")
-        
-        if not modules_path.exists():
-            print(f"    ⚠️  Directorio modules no existe: {modules_path}")
-            print(f"    🔍 Partes del path actual: {current_file.parts}")
-        else:
-            print(f"    🔍 Buscando en directorio: {modules_path}")
-            modules_imported = []
-            for module_dir in modules_path.iterdir():
-                if not module_dir.is_dir() or module_dir.name.startswith('_'):
-                    continue
-                
-                try:
-                    # Intentar importar el módulo de modelos
-                    models_module_path = f"modules.{module_dir.name}.src.models"
-                    models_module = None
-                    
-                    # Intentar importar si no está en sys.modules
-                    if models_module_path not in sys.modules:
-                        try:
-                            print(f"    📦 Intentando importar: {models_module_path}")
-                            models_module = importlib.import_module(models_module_path)
-                            modules_imported.append(models_module_path)
-                        except Exception as import_error:
-                            # Si falla, intentar con backend.modules
-                            try:
-                                models_module_path_alt = f"backend.modules.{module_dir.name}.src.models"
-                                print(f"    📦 Intentando importar (alternativo): {models_module_path_alt}")
-                                models_module = importlib.import_module(models_module_path_alt)
-                                models_module_path = models_module_path_alt
-                                modules_imported.append(models_module_path)
-                            except Exception as alt_error:
-                                print(f"    ⚠️  No se pudo importar {models_module_path}: {import_error}")
-                                continue
-                    else:
-                        models_module = sys.modules[models_module_path]
-                        modules_imported.append(f"{models_module_path} (ya en sys.modules)")
-                    
-                    if not models_module:
-                        continue
-                    
-                    # Buscar modelos en el módulo usando __all__ si está disponible
-                    model_names = []
-                    if hasattr(models_module, '__all__'):
-                        model_names = models_module.__all__
-                        print(f"    📋 Usando __all__ de {models_module_path}: {model_names}")
-                    else:
-                        # Si no hay __all__, buscar en dir()
-                        model_names = [name for name in dir(models_module) if not name.startswith('_')]
-                        print(f"    📋 Buscando en dir() de {models_module_path}: {len(model_names)} atributos")
-                    
-                    for attr_name in model_names:
-                        try:
-                            attr = getattr(models_module, attr_name)
-                            if (py_inspect.isclass(attr) and 
-                                issubclass(attr, BaseModel) and 
-                                attr is not BaseModel):
-                                if hasattr(attr, '__tablename__'):
-                                    tablename = attr.__tablename__
-                                    print(f"    🔎 Revisando {attr_name}: __tablename__ = '{tablename}'")
-                                    if isinstance(tablename, str) and tablename.lower() == entity_name_lower:
-                                        print(f"    ✓ Modelo encontrado importando dinámicamente: {models_module_path}.{attr_name} (tablename: {tablename})")
-                                        return attr
-                        except Exception as e:
-                            print(f"    ⚠️  Error revisando {attr_name}: {e}")
-                            continue
-                except Exception as e:
-                    print(f"    ⚠️  Error procesando módulo {module_dir.name}: {e}")
-                    continue
-            
-            if modules_imported:
-                print(f"    ℹ️  Módulos importados dinámicamente: {', '.join(modules_imported)}")
-        
-        print(f"    ❌ No se encontró modelo con __tablename__ = '{entity_name}' en ningún módulo")
-        
-    except Exception as e:
-        print(f"⚠️  Error al buscar modelo para entidad {entity_name}: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
-    
-    return None
+    return get_model_by_tablename(entity_name)
 
 
 def get_model_relationships(model_class) -> List[Dict[str, Any]]:
@@ -468,230 +327,31 @@ def get_model_attributes(model_class) -> List[Dict[str, Any]]:
 
 def get_action_tools(container) -> List[Dict[str, Any]]:
     """
-    Obtiene todas las action_tools desde la base de datos o desde seeds como fallback.
+    Obtiene todas las action_tools desde el catálogo en memoria (base de datos o seeds
+    como fallback; ver tool_catalog.py).
     
     Args:
         container: Container con acceso a servicios y bases de datos
         
     Returns:
-        Lista de diccionarios con las tools disponibles
+        Lista de diccionarios con las tools disponibles (copias: pueden modificarse)
     """
-    from sqlalchemy.orm import Session
-    
-    tools = []
-    
-    try:
-        # Intentar obtener desde la base de datos
-        from ..models.action_tools import ActionToolModel
-        
-        db = container.get("core_db", "databases")
-        if isinstance(db, Session):
-            tools_db = db.query(ActionToolModel).filter(
-                ActionToolModel.disabled_at.is_(None)
-            ).all()
-            
-            print(f"      📊 Tools desde BD: {len(tools_db)}")
-            
-            for tool in tools_db:
-                tools.append({
-                    "id": str(tool.id),
-                    "name": tool.name,
-                    "description": tool.description,
-                    "place_holder": tool.place_holder,
-                    "schema_input": tool.schema_input or [],
-                    "schema_variables": tool.schema_variables or [],
-                    "config_form": tool.config_form or {},
-                    "on_action": tool.on_action
-                })
-            
-            if tools:
-                print(f"      ✅ Retornando {len(tools)} tools desde BD")
-                return tools
-    except Exception as e:
-        print(f"      ⚠️  Error obteniendo tools desde BD: {e}")
-        # Si hay un error (por ejemplo, tabla no existe), hacer rollback para limpiar la transacción
-        db = container.get("core_db", "databases")
-        if isinstance(db, Session):
-            try:
-                db.rollback()
-            except Exception as rollback_error:
-                # Si el rollback también falla, no hacer nada más
-                pass
-    
-    # Fallback: obtener desde seeds (que ahora carga desde tools.json)
-    print(f"      🔄 Intentando cargar tools desde seeds (tools.json)...")
-    try:
-        from ...seeds.seeds import get_seeds
-        seeds = get_seeds()
-        tools_data = seeds.get("action_tools", [])
-        
-        print(f"      📊 Tools desde seeds: {len(tools_data)}")
-        
-        for tool in tools_data:
-            tools.append({
-                "id": tool.get("id"),
-                "name": tool.get("name"),
-                "description": tool.get("description"),
-                "place_holder": tool.get("place_holder"),
-                "schema_input": tool.get("schema_input", []),
-                "schema_variables": tool.get("schema_variables", []),
-                "config_form": tool.get("config_form", {}),
-                "on_action": tool.get("on_action")
-            })
-        
-        print(f"      ✅ Retornando {len(tools)} tools desde seeds")
-    except Exception as e:
-        print(f"      ❌ Error obteniendo tools desde seeds (tools.json): {e}")
-        import traceback
-        traceback.print_exc()
-    
-    return tools
+    return copy.deepcopy(list(get_tool_catalog(container.get("core_db", "databases")).tools))
 
 
-def find_tool_by_type_value(tools: List[Dict[str, Any]], type_value: str) -> Optional[Dict[str, Any]]:
+def find_tool_by_type_value(tools: Union[ToolCatalog, List[Dict[str, Any]]], type_value: str) -> Optional[Dict[str, Any]]:
     """
     Encuentra una tool apropiada basándose en el type_value del atributo.
     
     Args:
-        tools: Lista de tools disponibles
+        tools: Catálogo de tools (o lista de tools, que se indexa en el momento)
         type_value: Tipo de valor del atributo (text, number, boolean, date, entity, text_long, text_short, options)
         
     Returns:
         La tool más apropiada o None
     """
-    # Caso especial: options (ENUMs) debe mapear a herramienta de selección
-    if type_value == "options":
-        print(f"      🔍 Buscando tool para type_value 'options' (ENUM)...")
-        # Buscar tool con gather.type_value "option" o "options"
-        for tool in tools:
-            config_form = tool.get("config_form", {})
-            gather = config_form.get("gather", {})
-            gather_type = gather.get("type_value")
-            if gather_type in ["option", "options"]:
-                print(f"      ✅ Tool encontrada con gather.type_value='{gather_type}': {tool.get('name')}")
-                return tool
-        print(f"      ⚠️  No se encontró tool para type_value 'options'")
-    
-    # Caso especial: entity debe mapear a "Entidades"
-    if type_value == "entity":
-        print(f"      🔍 Buscando tool para type_value 'entity'...")
-        # Primero buscar por nombre exacto "Entidades"
-        for tool in tools:
-            tool_name = tool.get("name", "").strip()
-            if tool_name.lower() == "entidades" or tool_name == "Entidades":
-                print(f"      ✅ Tool 'Entidades' encontrada por nombre: {tool_name}")
-                return tool
-        
-        # Si no encuentra "Entidades", buscar cualquier tool con type_value "entity" en gather
-        for tool in tools:
-            config_form = tool.get("config_form", {})
-            gather = config_form.get("gather", {})
-            gather_type = gather.get("type_value")
-            if gather_type == "entity":
-                print(f"      ✅ Tool encontrada con gather.type_value='entity': {tool.get('name')}")
-                return tool
-        
-        # Si aún no encuentra, buscar tools que tengan "entity" en el nombre o descripción
-        for tool in tools:
-            tool_name = tool.get("name", "").lower()
-            tool_desc = tool.get("description", "").lower()
-            if "entidad" in tool_name or "entity" in tool_name or "entidad" in tool_desc or "entity" in tool_desc:
-                print(f"      ✅ Tool encontrada con 'entidad' en nombre/descripción: {tool.get('name')}")
-                return tool
-        
-        print(f"      ⚠️  No se encontró tool para type_value 'entity'")
-    
-    # Caso especial: boolean debe mapear a "Si/No"
-    if type_value == "boolean":
-        for tool in tools:
-            if tool.get("name") == "Si/No":
-                return tool
-        # Si no encuentra "Si/No", buscar cualquier tool con type_value "option"
-        for tool in tools:
-            config_form = tool.get("config_form", {})
-            gather = config_form.get("gather", {})
-            gather_type = gather.get("type_value")
-            if gather_type == "option":
-                return tool
-    
-    # Caso especial: text_long debe mapear a "Texto largo"
-    if type_value == "text_long":
-        for tool in tools:
-            if tool.get("name") == "Texto largo":
-                return tool
-        # Si no encuentra "Texto largo", buscar cualquier tool de texto
-        for tool in tools:
-            config_form = tool.get("config_form", {})
-            gather = config_form.get("gather", {})
-            gather_type = gather.get("type_value")
-            if gather_type == "text":
-                return tool
-    
-    # Caso especial: text_short debe mapear a "Texto corto" o "Texto"
-    if type_value == "text_short":
-        # Preferir "Texto corto"
-        for tool in tools:
-            if tool.get("name") == "Texto corto":
-                return tool
-        # Si no encuentra "Texto corto", buscar "Texto"
-        for tool in tools:
-            if tool.get("name") == "Texto":
-                return tool
-        # Si no encuentra ninguno, buscar cualquier tool de texto
-        for tool in tools:
-            config_form = tool.get("config_form", {})
-            gather = config_form.get("gather", {})
-            gather_type = gather.get("type_value")
-            if gather_type == "text":
-                return tool
-    
-    # Mapeo de type_value a config_form.gather.type_value
-    type_mapping = {
-        "text": "text",  # Fallback para compatibilidad
-        "number": "number",
-        "date": "date",
-        "timestamp": "date",
-        "datetime": "date"
-    }
-    
-    target_type = type_mapping.get(type_value, "text")
-    
-    # Buscar tool que coincida con el type_value
-    for tool in tools:
-        config_form = tool.get("config_form", {})
-        gather = config_form.get("gather", {})
-        gather_type = gather.get("type_value")
-        
-        if gather_type == target_type:
-            # Preferencias por nombre para cada tipo
-            if type_value == "number":
-                # Preferir "Número" sobre "Calculadora"
-                if tool.get("name") == "Número":
-                    return tool
-            elif type_value in ["date", "timestamp", "datetime"]:
-                # Preferir "Fecha"
-                if tool.get("name") == "Fecha":
-                    return tool
-    
-    # Si no se encontró con preferencias, retornar la primera coincidencia
-    for tool in tools:
-        config_form = tool.get("config_form", {})
-        gather = config_form.get("gather", {})
-        gather_type = gather.get("type_value")
-        
-        if gather_type == target_type:
-            return tool
-    
-    # Si no se encuentra, buscar la primera tool de texto como fallback
-    for tool in tools:
-        config_form = tool.get("config_form", {})
-        gather = config_form.get("gather", {})
-        gather_type = gather.get("type_value")
-        
-        if gather_type == "text":
-            return tool
-    
-    return None
+    catalog = tools if isinstance(tools, ToolCatalog) else ToolCatalog.from_tools(list(tools))
+    return catalog.find(type_value)
 
 
 def _generate_schema_conditions(schema_input: List[Dict[str, Any]], schema_variables: Optional[List[Dict[str, Any]]], next_instruction_id: Optional[str] = None, always_generate: bool = True) -> List[Dict[str, Any]]:
@@ -1347,19 +1007,11 @@ def generate_schema_from_model(model_class, form_name: str, container, entity_ma
             if field_name and field_name not in {a["name"] for a in all_attributes}:
                 attributes_to_process.append(attributes_dict[field_name])
     
-    # Obtener todas las tools disponibles
-    print(f"    🔧 Obteniendo tools desde container...")
-    tools = get_action_tools(container)
-    print(f"    🛠️  Tools disponibles: {len(tools)}")
-    if tools:
-        print(f"      Nombres de tools: {[t.get('name') for t in tools[:5]]}...")
-        # Mostrar más detalles de las primeras tools
-        for i, tool in enumerate(tools[:3]):
-            print(f"        Tool {i+1}: {tool.get('name')} - config_form.gather.type_value: {tool.get('config_form', {}).get('gather', {}).get('type_value', 'N/A')}")
-    else:
-        print(f"    ⚠️  NO HAY TOOLS DISPONIBLES - Esto causará que se use el schema básico")
+    # Catálogo de tools (en memoria, indexado por nombre y type_value)
+    catalog = get_tool_catalog(container.get("core_db", "databases") if container else None)
+    print(f"    🛠️  Tools disponibles: {len(catalog.tools)}")
     
-    if not tools:
+    if not catalog.tools:
         print("⚠️  No se encontraron action_tools, usando schema básico")
         print("⚠️  Esto generará solo UNA instrucción con todos los atributos en lugar de una por atributo")
         # Fallback al método anterior si no hay tools
@@ -1375,23 +1027,24 @@ def generate_schema_from_model(model_class, form_name: str, container, entity_ma
         print(f"    📝 Procesando atributo {idx + 1}/{len(attributes_to_process)}: {attr['name']} (type_value: {attr.get('type_value', 'N/A')})")
         
         # Buscar la tool apropiada para este tipo de atributo
-        tool = find_tool_by_type_value(tools, attr["type_value"])
+        tool = catalog.find(attr["type_value"])
         
         if not tool:
             print(f"      ⚠️  No se encontró tool para type_value '{attr['type_value']}', intentando fallbacks...")
             # Intentar diferentes fallbacks según el tipo
-            if attr["type_value"] in ["text_short", "text_long"]:
-                tool = find_tool_by_type_value(tools, "text")
-            elif attr["type_value"] == "number":
-                tool = find_tool_by_type_value(tools, "number")
+            if attr["type_value"] == "number":
+                tool = catalog.find("number")
             else:
-                tool = find_tool_by_type_value(tools, "text")
+                tool = catalog.find("text")
             
-            if not tool and tools:
+            if not tool:
                 # Último recurso: usar la primera tool disponible
-                tool = tools[0]
+                tool = catalog.tools[0]
                 print(f"      ⚠️  Usando primera tool disponible como fallback: {tool.get('name')}")
         
+        # La instrucción hereda estructuras de la tool: trabajar sobre una copia del catálogo
+        tool = copy.deepcopy(tool)
+        
         if tool:
             print(f"      ✓ Tool encontrada: {tool.get('name')} (id: {tool.get('id')})")
             print(f"         - config_form.gather.type_value: {tool.get('config_form', {}).get('gather', {}).get('type_value', 'N/A')}")
@@ -0,0 +1,221 @@
+"""
+Manifiesto de formularios autogenerados (generate_form_entities).
+
+Por cada formulario de config.yaml se guarda en form_generation_manifest una huella
+de todo lo que determina su schema:
+- firma estructural del modelo (columnas, tipos, enums, claves foráneas, info y
+  relaciones), calculada sin imprimir nada
+- configuración del formulario en config.yaml (entityMap, display_name, descripción, id)
+- entidades referenciables (config.yaml y tabla referencable_entities), de donde sale
+  el representative_value de los campos entity
+- versión de las action_tools
+- FORM_GENERATOR_VERSION (subirla al cambiar la lógica de generación)
+
+Al iniciar, un formulario cuya huella coincide y cuyo schema vigente es el registrado
+se omite sin generar el schema; solo se regeneran los que cambiaron, opcionalmente
+en paralelo (FORM_GENERATION_WORKERS), cada hilo con su propia sesión.
+"""
+import hashlib
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import inspect as sqlalchemy_inspect
+from sqlalchemy.orm import Session, sessionmaker
+
+logger = logging.getLogger(__name__)
+
+# Subir al cambiar generate_schema_from_model: invalida todas las huellas
+FORM_GENERATOR_VERSION = 1
+
+
+@dataclass
+class FormGenerationJob:
+    """Formulario de config.yaml con sus entradas resueltas."""
+    module_name: str
+    form_key: str
+    form_name: str
+    form_id: Optional[str]
+    form_description: str
+    entity_name: str
+    entity_map: List[Dict[str, Any]]
+    entity_map_mode: str
+    form_display_name: Optional[str]
+    model_class: Any
+    fingerprint: str
+    schema: Optional[Dict[str, Any]] = None
+
+
+def _stable_hash(data: Any) -> str:
+    payload = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def form_manifest_key(module_name: Optional[str], form_config: Dict[str, Any]) -> str:
+    """Clave del formulario en el manifiesto: su id de config.yaml o módulo:nombre:entidad."""
+    if form_config.get("id"):
+        return f"id:{str(form_config['id']).lower()}"
+    entity_name = (form_config.get("entity") or "").lower()
+    return f"{module_name}:{form_config.get('name')}:{entity_name}"[:255]
+
+
+def model_attributes_signature(model_class) -> List[Any]:
+    """
+    Firma estructural del modelo: columnas (tipo, enums, nulabilidad, unicidad, claves
+    foráneas e info) y relaciones. Misma información que usa get_model_attributes.
+    """
+    table = model_class.__table__
+    columns = []
+    for column in table.columns:
+        columns.append([
+            column.name,
+            str(column.type),
+            list(getattr(column.type, "enums", None) or []),
+            bool(column.nullable),
+            bool(column.primary_key),
+            bool(column.unique),
+            sorted(str(fk.target_fullname) for fk in column.foreign_keys),
+            dict(column.info or {}),
+        ])
+    relationships = []
+    for rel_name, rel in sqlalchemy_inspect(model_class).mapper.relationships.items():
+        secondary = rel.secondary
+        relationships.append([
+            rel_name,
+            getattr(getattr(rel.mapper, "class_", None), "__tablename__", None),
+            getattr(secondary, "name", secondary) if secondary is not None else None,
+            dict(rel.info or {}),
+        ])
+    return [table.name, columns, sorted(relationships, key=lambda item: item[0])]
+
+
+def referencable_entities_version(db: Session, referencable_entities_map: Dict[str, Dict[str, Any]]) -> str:
+    """Hash de las entidades referenciables de config.yaml y de la tabla referencable_entities."""
+    from ..models.referencable_entities import ReferencableEntityModel
+
+    try:
+        rows = db.query(
+            ReferencableEntityModel.entity_name,
+            ReferencableEntityModel.representative_value
+        ).filter(ReferencableEntityModel.disabled_at.is_(None)).all()
+        stored = sorted([row.entity_name, row.representative_value] for row in rows)
+    except Exception:
+        db.rollback()
+        stored = None
+    return _stable_hash([referencable_entities_map, stored])
+
+
+def compute_form_fingerprint(
+    model_class,
+    form_config: Dict[str, Any],
+    referencable_version: str,
+    tools_version: Any
+) -> str:
+    """Huella de las entradas que determinan el schema generado del formulario."""
+    return _stable_hash({
+        "generator": FORM_GENERATOR_VERSION,
+        "model": model_attributes_signature(model_class),
+        "form": form_config,
+        "referencable_entities": referencable_version,
+        "tools": tools_version,
+    })
+
+
+def load_manifest(db: Session) -> Dict[str, Any]:
+    """Entradas del manifiesto por form_key (vacío si la tabla aún no existe)."""
+    from ..models.form_generation_manifest import FormGenerationManifestModel
+
+    try:
+        return {row.form_key: row for row in db.query(FormGenerationManifestModel).all()}
+    except Exception as e:
+        logger.warning("No se pudo leer form_generation_manifest: %s", e)
+        db.rollback()
+        return {}
+
+
+def is_form_unchanged(entry, fingerprint: str, active_schema_ids: Dict[UUID, Optional[UUID]]) -> bool:
+    """True si la huella coincide y el formulario sigue activo con el schema registrado."""
+    if entry is None or entry.fingerprint != fingerprint:
+        return False
+    if entry.form_id not in active_schema_ids:
+        return False
+    return active_schema_ids[entry.form_id] == entry.schema_form_id
+
+
+def save_manifest_entry(db: Session, form_key: str, form_id: UUID, schema_form_id: Optional[UUID], fingerprint: str) -> None:
+    """Crea o actualiza la entrada del formulario y hace commit."""
+    from ..models.form_generation_manifest import FormGenerationManifestModel
+
+    try:
+        entry = db.query(FormGenerationManifestModel).filter(
+            FormGenerationManifestModel.form_key == form_key
+        ).first()
+        if entry is None:
+            db.add(FormGenerationManifestModel(
+                form_key=form_key,
+                form_id=form_id,
+                schema_form_id=schema_form_id,
+                fingerprint=fingerprint
+            ))
+        else:
+            entry.form_id = form_id
+            entry.schema_form_id = schema_form_id
+            entry.fingerprint = fingerprint
+        db.commit()
+    except Exception as e:
+        # El manifiesto es solo una optimización: en el peor caso se regenera al próximo inicio
+        logger.warning("No se pudo guardar el manifiesto de '%s': %s", form_key, e)
+        db.rollback()
+
+
+class _SessionContainer:
+    """Container que entrega una sesión propia del hilo como core_db."""
+
+    def __init__(self, container, session: Session):
+        self._container = container
+        self._session = session
+
+    def get(self, name, *args, **kwargs):
+        if name == "core_db":
+            return self._session
+        return self._container.get(name, *args, **kwargs)
+
+
+def generate_schemas(
+    jobs: List[FormGenerationJob],
+    container,
+    build_schema: Callable[[FormGenerationJob, Any], Dict[str, Any]],
+    workers: int = 1
+) -> List[Tuple[FormGenerationJob, Optional[Exception]]]:
+    """
+    Genera el schema de cada trabajo (job.schema). Con workers > 1 usa un pool de hilos;
+    cada hilo consulta la base con su propia sesión (la sesión del container no es
+    segura entre hilos). La escritura de formularios y schemas queda a cargo de quien llama.
+
+    Returns:
+        Lista (job, error) en el orden de entrada; error es None si se generó el schema
+    """
+    def _run(job: FormGenerationJob, job_container) -> Tuple[FormGenerationJob, Optional[Exception]]:
+        try:
+            job.schema = build_schema(job, job_container)
+            return job, None
+        except Exception as e:
+            return job, e
+
+    if workers <= 1 or len(jobs) <= 1:
+        return [_run(job, container) for job in jobs]
+
+    session_factory = sessionmaker(bind=container.get("core_db", "databases").get_bind())
+
+    def _run_with_session(job: FormGenerationJob) -> Tuple[FormGenerationJob, Optional[Exception]]:
+        session = session_factory()
+        try:
+            return _run(job, _SessionContainer(container, session))
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(jobs)), thread_name_prefix="form-generation") as executor:
+        return list(executor.map(_run_with_session, jobs))
@@ -0,0 +1,111 @@
+"""
+GET condicionales (ETag / If-None-Match) con cuerpos pre-serializados.
+
+El ETag se deriva de una versión barata de calcular (ej. schema_id y updated_at del
+formulario), sin construir la respuesta. Si el cliente envía un If-None-Match que
+coincide se responde 304 sin cuerpo; si no, el JSON se toma del caché de cuerpos
+serializados por (recurso, versión) o se serializa una sola vez.
+
+El caché es LRU y está acotado en entradas (HTTP_BODY_CACHE_SIZE) y en bytes
+(HTTP_BODY_CACHE_MAX_BYTES). Una versión nueva genera otra clave: las anteriores
+salen por LRU sin necesidad de invalidarlas.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from ..environment import HTTP_BODY_CACHE_SIZE, HTTP_BODY_CACHE_MAX_BYTES
+
+# El cliente debe revalidar siempre (If-None-Match); el 304 evita reenviar el cuerpo
+CACHE_CONTROL = "no-cache"
+
+
+def make_etag(resource: Hashable, version: Any) -> str:
+    """ETag fuerte a partir del recurso y su versión."""
+    digest = hashlib.sha256(repr((resource, version)).encode("utf-8")).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110): acepta '*', listas y prefijo W/."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class SerializedBodyCache:
+    """Caché LRU (recurso, versión) -> cuerpo JSON serializado."""
+
+    def __init__(self, max_entries: int = HTTP_BODY_CACHE_SIZE, max_bytes: int = HTTP_BODY_CACHE_MAX_BYTES):
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[Hashable, Any], bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: Tuple[Hashable, Any], build: Callable[[], bytes]) -> bytes:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                return body
+        body = build()
+        if len(body) > self.max_bytes:
+            return body
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = body
+            self._size += len(body)
+            while self._entries and (len(self._entries) > self.max_entries or self._size > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+        return body
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+_body_cache = SerializedBodyCache()
+
+
+def get_body_cache() -> SerializedBodyCache:
+    return _body_cache
+
+
+def conditional_json_response(
+    request: Request,
+    resource: Hashable,
+    version: Any,
+    serialize: Callable[[], bytes]
+) -> Response:
+    """
+    Respuesta JSON condicional.
+
+    Args:
+        request: Request (se lee If-None-Match)
+        resource: Identificador del recurso, incluidos los parámetros de la consulta
+        version: Versión del recurso; si cambia, cambia el ETag
+        serialize: Construye y serializa el cuerpo (solo si no está en caché)
+    """
+    etag = make_etag(resource, version)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    body = _body_cache.get_or_build((resource, version), serialize)
+    return Response(content=body, media_type="application/json", headers=headers)
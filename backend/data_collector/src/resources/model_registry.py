@@ -0,0 +1,269 @@
+"""
+Registro precalculado de modelos SQLAlchemy por nombre de tabla.
+
+Reemplaza la búsqueda por sys.modules/dir() en cada llamada: el índice
+tablename -> modelo se construye una vez y las búsquedas son O(1) y sin logs.
+
+El índice se reconstruye:
+- explícitamente con invalidate_model_registry() (ej. al cargar un módulo en caliente)
+- ante un tablename desconocido, solo si se importaron módulos nuevos desde la
+  última construcción (len(sys.modules) cambió), lo que también es O(1)
+
+La metadata inspeccionada (columnas y relaciones) se calcula una vez por modelo.
+"""
+import importlib
+import inspect as py_inspect
+import sys
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import inspect as sqlalchemy_inspect
+
+
+@dataclass(frozen=True)
+class ColumnMetadata:
+    """Metadata de una columna del modelo."""
+    name: str
+    nullable: bool
+    primary_key: bool
+    unique: bool
+    foreign_key_tables: Tuple[str, ...]
+    info: Dict[str, Any] = field(default_factory=dict, hash=False, compare=False)
+
+
+@dataclass(frozen=True)
+class RelationshipMetadata:
+    """Metadata de una relación del modelo."""
+    name: str
+    target_table: Optional[str]
+    secondary_table: Optional[str]
+    uselist: bool
+
+    @property
+    def is_many_to_many(self) -> bool:
+        return self.secondary_table is not None
+
+
+@dataclass(frozen=True)
+class ModelMetadata:
+    """Columnas y relaciones inspeccionadas de un modelo."""
+    tablename: str
+    columns: Dict[str, ColumnMetadata]
+    relationships: Dict[str, RelationshipMetadata]
+    primary_keys: Tuple[str, ...]
+
+    @property
+    def column_names(self) -> frozenset:
+        return frozenset(self.columns)
+
+    @property
+    def many_to_many(self) -> Dict[str, RelationshipMetadata]:
+        return {name: rel for name, rel in self.relationships.items() if rel.is_many_to_many}
+
+
+def _table_name(table: Any) -> Optional[str]:
+    if table is None:
+        return None
+    if isinstance(table, str):
+        return table.split('.')[-1]
+    return getattr(table, 'name', None)
+
+
+def _is_unique_column(column, table) -> bool:
+    if column.unique or column.primary_key:
+        return True
+    for constraint in getattr(table, 'constraints', ()):
+        if type(constraint).__name__ == 'UniqueConstraint' and len(constraint.columns) == 1 and column in constraint.columns:
+            return True
+    return False
+
+
+def inspect_model(model_class) -> ModelMetadata:
+    """Inspecciona columnas y relaciones de un modelo SQLAlchemy."""
+    table = model_class.__table__
+    columns = {}
+    for column in table.columns:
+        columns[column.name] = ColumnMetadata(
+            name=column.name,
+            nullable=bool(column.nullable),
+            primary_key=bool(column.primary_key),
+            unique=_is_unique_column(column, table),
+            foreign_key_tables=tuple(
+                name for name in (_table_name(getattr(fk.column, 'table', None)) for fk in column.foreign_keys) if name
+            ),
+            info=dict(column.info or {})
+        )
+
+    relationships = {}
+    mapper = sqlalchemy_inspect(model_class).mapper
+    for rel_name, rel in mapper.relationships.items():
+        relationships[rel_name] = RelationshipMetadata(
+            name=rel_name,
+            target_table=_table_name(getattr(rel.mapper, 'local_table', None)),
+            secondary_table=_table_name(rel.secondary),
+            uselist=bool(rel.uselist)
+        )
+
+    return ModelMetadata(
+        tablename=table.name,
+        columns=columns,
+        relationships=relationships,
+        primary_keys=tuple(column.name for column in table.primary_key.columns)
+    )
+
+
+class ModelRegistry:
+    """Índices tablename -> modelo y tablename -> ModelMetadata."""
+
+    def __init__(self):
+        self._models: Dict[str, Any] = {}
+        self._metadata: Dict[str, ModelMetadata] = {}
+        self._built = False
+        self._modules_seen = 0
+        self._imported_packages = False
+        self._lock = threading.RLock()
+
+    def invalidate(self) -> None:
+        """Descarta los índices; se reconstruyen en la próxima búsqueda."""
+        with self._lock:
+            self._built = False
+            self._metadata = {}
+
+    def get_model(self, tablename: str) -> Optional[Any]:
+        """Devuelve el modelo con ese __tablename__ (sin distinguir mayúsculas) o None."""
+        if not tablename:
+            return None
+        key = tablename.lower().strip()
+        if not self._built:
+            self._build()
+        model = self._models.get(key)
+        if model is None and len(sys.modules) != self._modules_seen:
+            self._build()
+            model = self._models.get(key)
+        return model
+
+    def get_metadata(self, tablename: str) -> Optional[ModelMetadata]:
+        """Devuelve la metadata inspeccionada del modelo (calculada una vez)."""
+        model = self.get_model(tablename)
+        if model is None:
+            return None
+        key = model.__tablename__.lower()
+        metadata = self._metadata.get(key)
+        if metadata is None:
+            with self._lock:
+                metadata = self._metadata.get(key)
+                if metadata is None:
+                    metadata = inspect_model(model)
+                    self._metadata[key] = metadata
+        return metadata
+
+    def get_all_models(self) -> Dict[str, Any]:
+        if not self._built:
+            self._build()
+        return dict(self._models)
+
+    def _build(self) -> None:
+        with self._lock:
+            if not self._imported_packages:
+                _import_module_models()
+                self._imported_packages = True
+            models = {}
+            for model in _iter_core_registry_models():
+                models.setdefault(model.__tablename__.lower().strip(), model)
+            for model in _iter_loaded_models():
+                models.setdefault(model.__tablename__.lower().strip(), model)
+            self._models = models
+            self._metadata = {key: value for key, value in self._metadata.items() if key in models}
+            self._modules_seen = len(sys.modules)
+            self._built = True
+
+
+def _model_base():
+    from core.models.base_class import Model as BaseModel
+    return BaseModel
+
+
+def _is_model(attr, base) -> bool:
+    return (
+        py_inspect.isclass(attr)
+        and issubclass(attr, base)
+        and attr is not base
+        and isinstance(getattr(attr, '__tablename__', None), str)
+        and hasattr(attr, '__table__')
+    )
+
+
+def _iter_core_registry_models():
+    """Modelos ya registrados en el registro centralizado de core (si existe)."""
+    try:
+        from core.models.registry import get_registry
+        registered = get_registry().get_all_models()
+    except Exception:
+        return []
+    if isinstance(registered, dict):
+        registered = registered.values()
+    return [model for model in registered if isinstance(getattr(model, '__tablename__', None), str)]
+
+
+def _iter_loaded_models():
+    """Modelos de los paquetes models ya importados (modules.<nombre>.models / .src.models)."""
+    base = _model_base()
+    for module_name, module in list(sys.modules.items()):
+        if module is None or not module_name.startswith(('modules.', 'backend.modules.')):
+            continue
+        if module_name.endswith('.models'):
+            models_module = module
+        else:
+            models_module = getattr(module, 'models', None)
+            if models_module is None or not hasattr(models_module, '__dict__'):
+                continue
+        names = getattr(models_module, '__all__', None) or [n for n in vars(models_module) if not n.startswith('_')]
+        for attr_name in names:
+            attr = getattr(models_module, attr_name, None)
+            if _is_model(attr, base):
+                yield attr
+
+
+def _import_module_models() -> None:
+    """Importa una vez los paquetes models de todos los módulos del directorio modules."""
+    modules_path = Path(__file__).resolve().parent.parent.parent.parent
+    if not modules_path.exists():
+        return
+    for module_dir in sorted(modules_path.iterdir()):
+        if not module_dir.is_dir() or module_dir.name.startswith(('_', '.')):
+            continue
+        candidates = [
+            f"{prefix}.{module_dir.name}.{suffix}"
+            for suffix in ('src.models', 'models')
+            for prefix in ('modules', 'backend.modules')
+        ]
+        for models_module_path in candidates:
+            if models_module_path in sys.modules:
+                break
+            try:
+                importlib.import_module(models_module_path)
+                break
+            except Exception:
+                continue
+
+
+_registry = ModelRegistry()
+
+
+def get_model_registry() -> ModelRegistry:
+    return _registry
+
+
+def invalidate_model_registry() -> None:
+    """Invalida el registro (llamar al cargar un módulo nuevo en tiempo de ejecución)."""
+    _registry.invalidate()
+
+
+def get_model_by_tablename(tablename: str) -> Optional[Any]:
+    return _registry.get_model(tablename)
+
+
+def get_model_metadata(tablename: str) -> Optional[ModelMetadata]:
+    return _registry.get_metadata(tablename)
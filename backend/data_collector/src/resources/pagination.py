@@ -0,0 +1,288 @@
+"""
+Paginación compartida para los endpoints de listado.
+
+Soporta dos modos sobre la misma query ordenada por (sort_column, id):
+- page/per_page: OFFSET/LIMIT clásico (compatibilidad con los clientes existentes)
+- cursor: keyset pagination; el cursor opaco codifica (sort_value, id) del último
+  elemento entregado, por lo que el costo de cada página es constante sin importar
+  la profundidad.
+
+Cada página devuelve next_cursor (también en modo page), de modo que un cliente
+puede empezar con page=1 y continuar con cursores (scroll infinito).
+
+El total se controla con count:
+- exact: COUNT(*) de la query
+- estimated: estimación del planner (EXPLAIN); si es pequeña se hace el COUNT exacto
+- none: no se cuenta (total = None)
+"""
+import base64
+import binascii
+import enum
+import json
+import logging
+from collections import namedtuple
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, List, Optional
+from uuid import UUID
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.orm.attributes import InstrumentedAttribute
+
+logger = logging.getLogger(__name__)
+
+COUNT_MODES = ("exact", "estimated", "none")
+# Por debajo de esta estimación el COUNT exacto es barato y más preciso
+ESTIMATE_EXACT_THRESHOLD = 10000
+
+_SORT_LABEL = "_pagination_sort"
+_ID_LABEL = "_pagination_id"
+
+
+@dataclass
+class Page:
+    """Resultado de una página: items, total (None si count=none) y cursor a la siguiente página."""
+    items: List[Any]
+    total: Optional[int]
+    next_cursor: Optional[str]
+
+
+def resolve_sort_column(model, sort_by: Optional[str], default):
+    """
+    Devuelve la columna del modelo por la que se ordena, o default si sort_by
+    no corresponde a una columna (ej. relaciones, métodos o campos inexistentes).
+    """
+    if not sort_by:
+        return default
+    attr = getattr(model, sort_by, None)
+    if isinstance(attr, InstrumentedAttribute) and hasattr(attr.property, "columns"):
+        return attr
+    return default
+
+
+def _encode_value(value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(value, enum.Enum):
+        value = value.value
+    if isinstance(value, datetime):
+        return {"t": "dt", "v": value.isoformat()}
+    if isinstance(value, date):
+        return {"t": "d", "v": value.isoformat()}
+    if isinstance(value, time):
+        return {"t": "tm", "v": value.isoformat()}
+    if isinstance(value, UUID):
+        return {"t": "u", "v": str(value)}
+    if isinstance(value, Decimal):
+        return {"t": "n", "v": str(value)}
+    if isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def _decode_value(value: Any) -> Any:
+    if not isinstance(value, dict):
+        return value
+    kind, raw = value.get("t"), value.get("v")
+    if kind == "dt":
+        return datetime.fromisoformat(raw)
+    if kind == "d":
+        return date.fromisoformat(raw)
+    if kind == "tm":
+        return time.fromisoformat(raw)
+    if kind == "u":
+        return UUID(raw)
+    if kind == "n":
+        return Decimal(raw)
+    raise ValueError("Cursor inválido")
+
+
+def _sort_key(sort_column) -> str:
+    return getattr(sort_column, "key", None) or str(sort_column)
+
+
+def encode_cursor(sort_column, descending: bool, sort_value: Any, row_id: Any) -> str:
+    """Codifica un cursor opaco con la posición (sort_value, id) y el orden con el que fue generado."""
+    payload = {
+        "s": _sort_key(sort_column),
+        "d": 1 if descending else 0,
+        "v": _encode_value(sort_value),
+        "i": _encode_value(row_id),
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_column, descending: bool):
+    """
+    Decodifica un cursor y valida que corresponda al mismo ordenamiento.
+
+    Returns:
+        Tupla (sort_value, id)
+
+    Raises:
+        ValueError: Si el cursor está mal formado o fue generado con otro ordenamiento
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        sort_value = _decode_value(payload["v"])
+        row_id = _decode_value(payload["i"])
+    except (ValueError, KeyError, TypeError, binascii.Error, UnicodeError):
+        raise ValueError("Cursor inválido")
+    if payload.get("s") != _sort_key(sort_column) or payload.get("d") != (1 if descending else 0):
+        raise ValueError("El cursor no corresponde al ordenamiento solicitado (sort_by/order)")
+    return sort_value, row_id
+
+
+def _keyset_filter(sort_column, id_column, descending: bool, nulls_last: bool, sort_value: Any, row_id: Any):
+    """Condición "después de (sort_value, id)" según la dirección y la ubicación de los NULL."""
+    if descending:
+        id_after = id_column < row_id
+        sort_after = sort_column < sort_value
+    else:
+        id_after = id_column > row_id
+        sort_after = sort_column > sort_value
+
+    if sort_value is None:
+        after_nulls = and_(sort_column.is_(None), id_after)
+        return after_nulls if nulls_last else or_(after_nulls, sort_column.isnot(None))
+
+    after_value = or_(sort_after, and_(sort_column == sort_value, id_after))
+    return or_(after_value, sort_column.is_(None)) if nulls_last else after_value
+
+
+def _statement(query):
+    return query.statement if isinstance(query, Query) else query
+
+
+def estimate_count(query, db: Optional[Session] = None) -> Optional[int]:
+    """
+    Estimación del número de filas de la query según el planner de PostgreSQL.
+    Devuelve None si no se pudo estimar.
+    """
+    db = db if db is not None else query.session
+    try:
+        statement = _statement(query.order_by(None)).compile(
+            dialect=db.get_bind().dialect,
+            compile_kwargs={"literal_binds": True}
+        )
+        with db.begin_nested():
+            plan = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}").scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception as e:
+        logger.debug("No se pudo estimar el conteo de la query: %s", e)
+        return None
+
+
+def count_query(query, count: str = "exact", db: Optional[Session] = None) -> Optional[int]:
+    """
+    Cuenta las filas de la query según el modo (exact, estimated o none).
+
+    query puede ser una Query del ORM o un Select (en ese caso se requiere db).
+    """
+    if count not in COUNT_MODES:
+        raise ValueError(f"Modo de conteo inválido: {count}. Use {', '.join(COUNT_MODES)}")
+    if count == "none":
+        return None
+    if count == "estimated":
+        estimate = estimate_count(query, db)
+        if estimate is not None and estimate >= ESTIMATE_EXACT_THRESHOLD:
+            return estimate
+    if isinstance(query, Query):
+        return query.order_by(None).count()
+    return db.execute(
+        select(func.count()).select_from(query.order_by(None).subquery())
+    ).scalar() or 0
+
+
+def paginate(
+    query,
+    sort_column,
+    id_column,
+    descending: bool = False,
+    page: int = 1,
+    per_page: int = 10,
+    cursor: Optional[str] = None,
+    count: str = "exact",
+    count_source=None,
+    nulls_last: Optional[bool] = None,
+    db: Optional[Session] = None
+) -> Page:
+    """
+    Pagina una query ordenándola por (sort_column, id_column).
+
+    La query no debe tener order_by: el orden lo define esta función para que
+    los cursores sean estables (id desempata los valores repetidos).
+
+    Args:
+        query: Query del ORM o Select filtrado (puede seleccionar varias entidades/columnas)
+        sort_column: Columna de ordenamiento
+        id_column: Columna única que desempata (normalmente el id)
+        descending: Orden descendente
+        page: Número de página (solo si no se envía cursor)
+        per_page: Elementos por página
+        cursor: Cursor devuelto por la página anterior (next_cursor)
+        count: exact, estimated o none
+        count_source: Query alternativa (más liviana) para contar; por defecto query
+        nulls_last: Ubicación de los NULL de sort_column; por defecto la de PostgreSQL
+            (al final en ASC, al inicio en DESC)
+        db: Sesión; requerida si query es un Select
+
+    Returns:
+        Page con items (filas con la misma forma que la query original), total y next_cursor
+
+    Raises:
+        ValueError: Si el cursor o el modo de conteo son inválidos
+    """
+    is_orm_query = isinstance(query, Query)
+    if not is_orm_query and db is None:
+        raise ValueError("Se requiere db para paginar un Select")
+    if nulls_last is None:
+        nulls_last = not descending
+
+    total = count_query(count_source if count_source is not None else query, count, db)
+
+    single_entity = len(query.column_descriptions) == 1 and is_orm_query
+    keyset_query = query.add_columns(sort_column.label(_SORT_LABEL), id_column.label(_ID_LABEL))
+
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor, sort_column, descending)
+        keyset_query = keyset_query.where(
+            _keyset_filter(sort_column, id_column, descending, nulls_last, sort_value, row_id)
+        )
+    elif page > 1:
+        keyset_query = keyset_query.offset((page - 1) * per_page)
+
+    sort_order = sort_column.desc() if descending else sort_column.asc()
+    keyset_query = keyset_query.order_by(
+        sort_order.nulls_last() if nulls_last else sort_order.nulls_first(),
+        id_column.desc() if descending else id_column.asc()
+    )
+
+    # Se pide un elemento extra para saber si hay página siguiente sin contar
+    keyset_query = keyset_query.limit(per_page + 1)
+    rows = keyset_query.all() if is_orm_query else db.execute(keyset_query).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = encode_cursor(sort_column, descending, last[-2], last[-1])
+
+    return Page(items=_strip_pagination_columns(rows, single_entity), total=total, next_cursor=next_cursor)
+
+
+def _strip_pagination_columns(rows: List[Any], single_entity: bool) -> List[Any]:
+    """Quita las columnas auxiliares del cursor conservando el acceso por posición y por nombre."""
+    if not rows:
+        return []
+    if single_entity:
+        return [row[0] for row in rows]
+    row_type = namedtuple("PageRow", rows[0]._fields[:-2], rename=True)
+    return [row_type(*row[:-2]) for row in rows]
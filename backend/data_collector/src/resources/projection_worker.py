@@ -0,0 +1,273 @@
+"""
+Proyección asíncrona de core_registers a sus tablas de entidad.
+
+create_register(async_projection=True) guarda el registro con status=partial y, en la
+misma transacción, una fila en core_register_projection_jobs (cola durable: sobrevive
+reinicios). Un pool de workers (hilos o procesos, ver environment.py) toma los trabajos
+con FOR UPDATE SKIP LOCKED, ejecuta process_register_to_entity y deja el registro en
+success o failed; el trabajo se elimina al terminar.
+
+Si un worker cae a mitad de una proyección, el trabajo queda en processing y se retoma
+pasados PROJECTION_LOCK_TIMEOUT segundos, hasta PROJECTION_MAX_ATTEMPTS intentos.
+"""
+import logging
+import multiprocessing
+import threading
+import traceback
+from typing import Callable, List, Optional
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..environment import (
+    PROJECTION_WORKERS,
+    PROJECTION_WORKER_MODE,
+    PROJECTION_POLL_INTERVAL,
+    PROJECTION_MAX_ATTEMPTS,
+    PROJECTION_LOCK_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+WORKER_MODES = ("thread", "process")
+
+_ENQUEUE_SQL = text("""
+    INSERT INTO core_register_projection_jobs (register_id)
+    VALUES (:register_id)
+    ON CONFLICT (register_id) DO UPDATE
+        SET status = 'pending', attempts = 0, locked_at = NULL, updated_at = now()
+""")
+
+_CLAIM_SQL = text("""
+    UPDATE core_register_projection_jobs
+    SET status = 'processing', attempts = attempts + 1, locked_at = now(), updated_at = now()
+    WHERE id = (
+        SELECT id FROM core_register_projection_jobs
+        WHERE status = 'pending'
+           OR (status = 'processing' AND locked_at < now() - make_interval(secs => :lock_timeout))
+        ORDER BY created_at
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, register_id, attempts
+""")
+
+_DELETE_JOB_SQL = text("DELETE FROM core_register_projection_jobs WHERE id = :job_id")
+
+_PENDING_SQL = text("SELECT EXISTS (SELECT 1 FROM core_register_projection_jobs)")
+
+
+def enqueue_projection(db: Session, register_id: UUID) -> None:
+    """Encola la proyección de un registro dentro de la transacción actual (no hace commit)."""
+    db.execute(_ENQUEUE_SQL, {"register_id": register_id})
+
+
+def run_next_projection_job(
+    db: Session,
+    max_attempts: int = PROJECTION_MAX_ATTEMPTS,
+    lock_timeout: int = PROJECTION_LOCK_TIMEOUT
+) -> bool:
+    """
+    Toma un trabajo pendiente y proyecta su registro.
+
+    El trabajo se marca como processing en su propia transacción; la proyección, el
+    estado final del registro y la eliminación del trabajo se confirman juntos.
+
+    Returns:
+        False si no había trabajos disponibles
+    """
+    from ..models.core_registers import CoreRegisterModel, RegisterStatus
+    from ..models.forms import FormModel, FormPurpose
+    from .register_processor import process_register_to_entity
+
+    claimed = db.execute(_CLAIM_SQL, {"lock_timeout": lock_timeout}).first()
+    db.commit()
+    if claimed is None:
+        return False
+
+    def _load_register():
+        return db.query(CoreRegisterModel).filter(CoreRegisterModel.id == claimed.register_id).first()
+
+    register = _load_register()
+    if register is not None:
+        if claimed.attempts > max_attempts:
+            register.status = RegisterStatus.failed
+            register.error = {'message': f'La proyección a entidad excedió {max_attempts} intentos'}
+        else:
+            try:
+                entity_id = process_register_to_entity(register, db, FormModel, FormPurpose)
+                if entity_id:
+                    register.status = RegisterStatus.success
+                    register.error = None
+                else:
+                    register.status = RegisterStatus.failed
+                    register.error = {'message': 'No se pudo procesar el registro a entidad'}
+            except Exception as e:
+                error = {'message': str(e), 'traceback': traceback.format_exc()}
+                db.rollback()
+                register = _load_register()
+                if register is not None:
+                    register.status = RegisterStatus.failed
+                    register.error = error
+
+    db.execute(_DELETE_JOB_SQL, {"job_id": claimed.id})
+    db.commit()
+    return True
+
+
+def _worker_loop(
+    session_factory: Callable[[], Session],
+    stop_event,
+    wake_event,
+    poll_interval: float,
+    max_attempts: int,
+    lock_timeout: int
+) -> None:
+    """Procesa trabajos hasta vaciar la cola y espera nuevos (o el intervalo de sondeo)."""
+    while not stop_event.is_set():
+        db = session_factory()
+        try:
+            while not stop_event.is_set() and run_next_projection_job(db, max_attempts, lock_timeout):
+                pass
+        except Exception as e:
+            logger.error("Error en worker de proyección: %s", e, exc_info=True)
+            try:
+                db.rollback()
+            except Exception:
+                pass
+        finally:
+            db.close()
+        if wake_event is not None:
+            wake_event.wait(poll_interval)
+            wake_event.clear()
+        else:
+            stop_event.wait(poll_interval)
+
+
+def _process_worker_main(database_url: str, stop_event, poll_interval: float, max_attempts: int, lock_timeout: int) -> None:
+    """Punto de entrada de un worker en modo process: usa su propio engine."""
+    from sqlalchemy import create_engine
+
+    engine = create_engine(database_url, pool_pre_ping=True, pool_size=1, max_overflow=0)
+    try:
+        _worker_loop(sessionmaker(bind=engine), stop_event, None, poll_interval, max_attempts, lock_timeout)
+    finally:
+        engine.dispose()
+
+
+def _engine_url(engine) -> str:
+    url = engine.url
+    if hasattr(url, "render_as_string"):
+        return url.render_as_string(hide_password=False)
+    return str(url)
+
+
+class ProjectionWorkerPool:
+    """Pool de workers que consume core_register_projection_jobs."""
+
+    def __init__(
+        self,
+        engine,
+        workers: int = PROJECTION_WORKERS,
+        mode: str = PROJECTION_WORKER_MODE,
+        poll_interval: float = PROJECTION_POLL_INTERVAL,
+        max_attempts: int = PROJECTION_MAX_ATTEMPTS,
+        lock_timeout: int = PROJECTION_LOCK_TIMEOUT
+    ):
+        if mode not in WORKER_MODES:
+            raise ValueError(f"Modo de worker inválido: {mode}. Use {', '.join(WORKER_MODES)}")
+        self.engine = engine
+        self.workers = max(1, workers)
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.lock_timeout = lock_timeout
+        self._workers: List = []
+        self._stop_event = None
+        self._wake_event = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    def start(self) -> None:
+        """Inicia los workers (idempotente)."""
+        with self._lock:
+            if self._workers:
+                return
+            if self.mode == "process":
+                context = multiprocessing.get_context()
+                self._stop_event = context.Event()
+                database_url = _engine_url(self.engine)
+                for index in range(self.workers):
+                    worker = context.Process(
+                        target=_process_worker_main,
+                        args=(database_url, self._stop_event, self.poll_interval, self.max_attempts, self.lock_timeout),
+                        name=f"projection-worker-{index}",
+                        daemon=True
+                    )
+                    worker.start()
+                    self._workers.append(worker)
+            else:
+                self._stop_event = threading.Event()
+                self._wake_event = threading.Event()
+                session_factory = sessionmaker(bind=self.engine)
+                for index in range(self.workers):
+                    worker = threading.Thread(
+                        target=_worker_loop,
+                        args=(session_factory, self._stop_event, self._wake_event, self.poll_interval, self.max_attempts, self.lock_timeout),
+                        name=f"projection-worker-{index}",
+                        daemon=True
+                    )
+                    worker.start()
+                    self._workers.append(worker)
+
+    def notify(self) -> None:
+        """Despierta a los workers en espera (en modo process esperan al siguiente sondeo)."""
+        if not self._workers:
+            self.start()
+        if self._wake_event is not None:
+            self._wake_event.set()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Detiene los workers; los trabajos en curso se retoman en el próximo inicio."""
+        with self._lock:
+            if not self._workers:
+                return
+            self._stop_event.set()
+            if self._wake_event is not None:
+                self._wake_event.set()
+            for worker in self._workers:
+                worker.join(timeout)
+            self._workers = []
+
+
+_pool: Optional[ProjectionWorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_projection_pool(container) -> ProjectionWorkerPool:
+    """Pool compartido del proceso, creado con la configuración de environment.py."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                db = container.get("core_db", "databases")
+                _pool = ProjectionWorkerPool(db.get_bind())
+    return _pool
+
+
+def resume_pending_projections(container) -> bool:
+    """
+    Inicia el pool si quedaron trabajos pendientes (ej. tras un reinicio).
+
+    Returns:
+        True si se iniciaron los workers
+    """
+    db = container.get("core_db", "databases")
+    if not db.execute(_PENDING_SQL).scalar():
+        return False
+    get_projection_pool(container).start()
+    return True
@@ -1,9 +1,219 @@
 """
 Funciones auxiliares para aplicar filtros a queries de entidades.
+
+Un filtro ('country_id=PE', 'farmers.country_id=districts.country_id', ...) se compila
+una sola vez por (entidad, filtro):
+- parse_filter: texto -> cláusulas (FilterClause), con caché
+- compile_filter: cláusulas -> condiciones SQLAlchemy, con los modelos resueltos por el
+  registro de modelos. Los filtros entre entidades se convierten en un semi-join
+  (EXISTS correlacionado), que no duplica filas ni altera el conteo de la paginación
+- filter_index_ddl: índices sugeridos para las columnas filtradas (parciales sobre
+  disabled_at IS NULL, que es como se consultan las entidades)
+
+Los filtros inválidos o rechazados se registran una vez, al compilarlos, y se ignoran.
 """
-from typing import Optional, Any
-from sqlalchemy.orm import Query
-from sqlalchemy.orm import Session
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Iterable, List, Optional, Tuple
+
+from sqlalchemy import exists
+from sqlalchemy.orm import Query, Session
+
+from ..environment import FILTER_CACHE_SIZE
+from .model_registry import get_model_by_tablename
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class FilterClause:
+    """
+    Cláusula 'left=right' de un filtro.
+
+    left_entity/right_entity son None si el lado no está calificado con una entidad;
+    si right_entity es None, right es un valor literal.
+    """
+    left_entity: Optional[str]
+    left_field: str
+    right_entity: Optional[str]
+    right: str
+
+    @property
+    def is_cross_entity(self) -> bool:
+        return self.right_entity is not None
+
+
+@dataclass(frozen=True)
+class CompiledFilter:
+    """Condiciones listas para query.filter y columnas que conviene indexar."""
+    entity_name: str
+    filter_str: str
+    conditions: Tuple[Any, ...]
+    # (modelo, columna) por las que filtra o busca cada condición
+    filtered_columns: Tuple[Tuple[Any, str], ...]
+
+
+def _split_qualified(side: str) -> Tuple[Optional[str], str]:
+    """'entity.field' -> ('entity', 'field'); 'field' -> (None, 'field')."""
+    if '.' not in side:
+        return None, side
+    entity, field_name = side.split('.', 1)
+    return entity.strip().lower(), field_name.strip()
+
+
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def parse_filter(filter_str: str) -> Tuple[FilterClause, ...]:
+    """
+    Parsea uno o múltiples filtros separados por coma.
+
+    Formatos soportados:
+    - 'field=value' (ej: 'country_id=PE')
+    - 'entity.field=value' (ej: 'districts.country_id=PE')
+    - 'entity.field=other_entity.field' (ej: 'farmers.country_id=districts.country_id')
+    - 'entity.field={{other_entity.field}}' (placeholder sin resolver, igual que el anterior)
+    """
+    clauses = []
+    for single_filter in (filter_str or '').split(','):
+        single_filter = single_filter.strip()
+        if not single_filter or '=' not in single_filter:
+            continue
+        left_side, right_side = (part.strip() for part in single_filter.split('=', 1))
+        if not left_side:
+            continue
+        left_entity, left_field = _split_qualified(left_side)
+
+        right_entity = None
+        right = right_side
+        if right_side.startswith('{{') and right_side.endswith('}}'):
+            right = right_side[2:-2].strip()
+            right_entity, right = _split_qualified(right)
+        elif left_entity is not None and '.' in right_side:
+            right_entity, right = _split_qualified(right_side)
+        clauses.append(FilterClause(left_entity, left_field, right_entity, right))
+    return tuple(clauses)
+
+
+def _active_condition(model_class):
+    disabled_at = getattr(model_class, 'disabled_at', None)
+    return disabled_at.is_(None) if disabled_at is not None else None
+
+
+def _compile_clause(clause: FilterClause, model_class: Any, entity_name: str):
+    """Devuelve (condición, columnas filtradas) o None si la cláusula no aplica."""
+    left_is_current = clause.left_entity is None or clause.left_entity == entity_name
+
+    if not clause.is_cross_entity:
+        # 'field=value' o 'entity.field=value': el campo debe ser de la entidad actual
+        if not left_is_current:
+            logger.warning("Filtro rechazado: la entidad '%s' no es la entidad actual '%s'", clause.left_entity, entity_name)
+            return None
+        column = getattr(model_class, clause.left_field, None)
+        if column is None:
+            logger.warning("Campo '%s' no existe en '%s', ignorando filtro", clause.left_field, entity_name)
+            return None
+        return column == clause.right, ((model_class, clause.left_field),)
+
+    right_is_current = clause.right_entity == entity_name
+    if not left_is_current and not right_is_current:
+        logger.warning(
+            "Filtro rechazado: ninguna entidad es la actual ('%s.%s=%s.%s', entidad actual: '%s')",
+            clause.left_entity, clause.left_field, clause.right_entity, clause.right, entity_name
+        )
+        return None
+
+    if left_is_current and right_is_current:
+        # Comparación entre columnas de la misma fila
+        left_column = getattr(model_class, clause.left_field, None)
+        right_column = getattr(model_class, clause.right, None)
+        if left_column is None or right_column is None:
+            logger.warning("Campos de filtro no encontrados en '%s'", entity_name)
+            return None
+        return left_column == right_column, ()
+
+    # Entre entidades: EXISTS sobre la otra entidad (activa) correlacionado con la actual
+    if left_is_current:
+        current_field, other_entity, other_field = clause.left_field, clause.right_entity, clause.right
+    else:
+        current_field, other_entity, other_field = clause.right, clause.left_entity, clause.left_field
+    other_model = get_model_by_tablename(other_entity)
+    current_column = getattr(model_class, current_field, None)
+    other_column = getattr(other_model, other_field, None) if other_model is not None else None
+    if other_model is None or current_column is None or other_column is None:
+        logger.warning(
+            "No se pudo aplicar filtro entre '%s' y '%s': modelo o campos no encontrados",
+            entity_name, other_entity
+        )
+        return None
+    criteria = [other_column == current_column]
+    active = _active_condition(other_model)
+    if active is not None:
+        criteria.append(active)
+    return exists().where(*criteria), ((other_model, other_field), (model_class, current_field))
+
+
+def _build_compiled_filter(entity_name: str, model_class: Any, filter_str: str) -> CompiledFilter:
+    conditions = []
+    filtered_columns = []
+    for clause in parse_filter(filter_str):
+        compiled = _compile_clause(clause, model_class, entity_name)
+        if compiled is None:
+            continue
+        condition, columns = compiled
+        conditions.append(condition)
+        filtered_columns.extend(column for column in columns if column not in filtered_columns)
+    return CompiledFilter(
+        entity_name=entity_name,
+        filter_str=filter_str,
+        conditions=tuple(conditions),
+        filtered_columns=tuple(filtered_columns)
+    )
+
+
+class CompiledFilterCache:
+    """Caché LRU (entidad, modelo, filtro) -> CompiledFilter."""
+
+    def __init__(self, max_entries: int = FILTER_CACHE_SIZE):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[Tuple[str, Any, str], CompiledFilter]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, entity_name: str, model_class: Any, filter_str: str) -> CompiledFilter:
+        key = (entity_name, model_class, filter_str)
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                return compiled
+        compiled = _build_compiled_filter(entity_name, model_class, filter_str)
+        with self._lock:
+            compiled = self._entries.setdefault(key, compiled)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def compiled_filters(self) -> List[CompiledFilter]:
+        with self._lock:
+            return list(self._entries.values())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = CompiledFilterCache()
+
+
+def compile_filter(entity_name: str, model_class: Any, filter_str: str) -> CompiledFilter:
+    """Filtro compilado para la entidad (cacheado)."""
+    return _cache.get(entity_name.lower(), model_class, filter_str.strip())
+
+
+def get_compiled_filters() -> List[CompiledFilter]:
+    """Filtros compilados en este proceso (para sugerir índices)."""
+    return _cache.compiled_filters()
 
 
 def apply_filter(
@@ -16,189 +226,88 @@ def apply_filter(
 ) -> Optional[Query]:
     """
     Aplica uno o múltiples filtros a la query según el formato especificado.
-    
+
     Formatos soportados:
     - Filtros simples: 'field=value' (ej: 'country_id=PE')
     - Múltiples filtros simples separados por coma: 'field1=value1,field2=value2' (ej: 'country_id=PE,status=active')
     - Filtros con entidades: 'entity.field=other_entity.field' (ej: 'farmers.value=countries.value')
     - Múltiples filtros con entidades separados por coma: 'entity1.field1=entity2.field1, entity3.field2=entity4.field2'
       (ej: 'farmers.value=countries.value, farmers.value2=departments.value3')
-    
+
     IMPORTANTE: Al menos una de las entidades en cada filtro debe ser la entidad actual que se está consultando.
     Por ejemplo, si se consulta 'districts', un filtro válido sería:
     - 'districts.country_id=countries.id' (districts es la entidad actual)
     - 'farmers.country_id=districts.country_id' (districts es la entidad actual)
     Pero NO sería válido: 'farmers.value=countries.value' (ninguna es districts)
-    
+
+    Los filtros entre entidades se aplican como semi-join: la entidad actual se incluye
+    si existe una fila activa de la otra entidad que cumple la igualdad.
+
     Args:
         query: Query de SQLAlchemy a filtrar
         model_class: Clase del modelo de la entidad actual
         filter_str: String con uno o múltiples filtros en formato 'left=right' separados por coma
-        db: Sesión de base de datos
+        db: Sesión de base de datos (se mantiene por compatibilidad)
         entity_name: Nombre de la entidad actual que se está consultando
-        container: Container de dependencias para buscar modelos
-        
+        container: Container de dependencias (se mantiene por compatibilidad)
+
     Returns:
-        Query filtrada o None si hay error
+        Query filtrada
     """
-    try:
-        if not filter_str or '=' not in filter_str:
-            return query
-        
-        # Dividir por comas para soportar múltiples filtros
-        filter_parts = [f.strip() for f in filter_str.split(',')]
-        
-        # Aplicar cada filtro individualmente
-        for single_filter in filter_parts:
-            if not single_filter:
-                continue
-            query = _apply_single_filter(query, model_class, single_filter, db, entity_name, container)
-        
+    if not filter_str or '=' not in filter_str:
         return query
+    try:
+        compiled = compile_filter(entity_name, model_class, filter_str)
     except Exception as e:
-        print(f"      ⚠️  Error al aplicar filtros '{filter_str}': {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error al compilar filtros '%s': %s", filter_str, e, exc_info=True)
         return query
+    for condition in compiled.conditions:
+        query = query.filter(condition)
+    return query
 
 
-def _apply_single_filter(
-    query: Query,
-    model_class: Any,
-    filter_str: str,
-    db: Session,
-    entity_name: str,
-    container: Any
-) -> Query:
+def _is_leading_indexed(model_class: Any, column_name: str) -> bool:
+    """True si el modelo declara un índice (o pk/unique) que empieza por la columna."""
+    table = model_class.__table__
+    column = table.c.get(column_name)
+    if column is None:
+        return True
+    if column.primary_key or column.index or column.unique:
+        return True
+    for index in table.indexes:
+        columns = list(index.columns)
+        if columns and columns[0] is column:
+            return True
+    for constraint in table.constraints:
+        columns = list(getattr(constraint, 'columns', []))
+        if type(constraint).__name__ == 'UniqueConstraint' and columns and columns[0] is column:
+            return True
+    return False
+
+
+def filter_index_name(model_class: Any, column_name: str) -> str:
+    return f"idx_{model_class.__table__.name}_{column_name}_filter"[:63]
+
+
+def filter_index_ddl(filters: Iterable[CompiledFilter]) -> List[str]:
     """
-    Aplica un solo filtro a la query y valida que al menos una entidad sea la actual.
-    
-    Args:
-        query: Query de SQLAlchemy a filtrar
-        model_class: Clase del modelo de la entidad actual
-        filter_str: String con un solo filtro en formato 'left=right'
-        db: Sesión de base de datos
-        entity_name: Nombre de la entidad actual que se está consultando
-        container: Container de dependencias para buscar modelos
-        
-    Returns:
-        Query filtrada
+    CREATE INDEX CONCURRENTLY para las columnas filtradas que el modelo no indexa.
+    Si el modelo tiene disabled_at el índice es parcial (WHERE disabled_at IS NULL).
+    Ejecutar con create_index_concurrently (reconstruye los índices inválidos).
     """
-    try:
-        if not filter_str or '=' not in filter_str:
-            return query
-        
-        parts = filter_str.split('=', 1)
-        if len(parts) != 2:
-            return query
-        
-        left_side = parts[0].strip()
-        right_side = parts[1].strip()
-        
-        # Caso 1: Filtro simple 'field=value'
-        # Este caso siempre es válido porque el campo pertenece a la entidad actual
-        if '.' not in left_side:
-            field_name = left_side
-            value = right_side
-            
-            # Verificar que el campo existe en el modelo
-            if hasattr(model_class, field_name):
-                field_column = getattr(model_class, field_name)
-                query = query.filter(field_column == value)
-                print(f"      ✓ Filtro aplicado: {field_name} = {value}")
-            else:
-                print(f"      ⚠️  Campo '{field_name}' no existe en el modelo, ignorando filtro")
-            return query
-        
-        # Caso 2: 'entity.field=value' o 'entity.field=current_entity.field'
-        left_parts = left_side.split('.', 1)
-        if len(left_parts) != 2:
-            return query
-        
-        left_entity = left_parts[0].strip()
-        left_field = left_parts[1].strip()
-        
-        # Verificar si right_side es otra entidad o un valor
-        if '.' in right_side:
-            # Caso 3: Comparación entre campos 'left_entity.field=right_entity.field'
-            # Ejemplo: 'farmer.country_id=districts.country_id' o 'districts.province_id={{farmers.province_id}}'
-            right_parts = right_side.split('.', 1)
-            if len(right_parts) != 2:
-                return query
-            
-            right_entity = right_parts[0].strip()
-            right_field = right_parts[1].strip()
-            
-            # Remover placeholders {{}} si existen
-            if right_field.startswith('{{') and right_field.endswith('}}'):
-                right_field = right_field[2:-2].strip()
-                # Si tiene formato entity.field dentro del placeholder, extraerlo
-                if '.' in right_field:
-                    placeholder_parts = right_field.split('.', 1)
-                    right_entity = placeholder_parts[0].strip()
-                    right_field = placeholder_parts[1].strip()
-            
-            # VALIDACIÓN: Al menos una de las entidades debe ser la entidad actual
-            left_is_current = left_entity.lower() == entity_name.lower()
-            right_is_current = right_entity.lower() == entity_name.lower()
-            
-            if not left_is_current and not right_is_current:
-                print(f"      ⚠️  Filtro rechazado: ninguna entidad es la actual. Filtro: '{filter_str}', Entidad actual: '{entity_name}'")
-                return query
-            
-            # Determinar qué entidad es la actual y cuál necesita join
-            # Si right_entity es la entidad actual, hacer join con left_entity
-            if right_is_current:
-                # Buscar el modelo de left_entity
-                from .form_auto_creator import find_model_by_entity_name
-                left_model_class = find_model_by_entity_name(left_entity.lower(), container)
-                
-                if left_model_class and hasattr(left_model_class, left_field) and hasattr(model_class, right_field):
-                    left_field_column = getattr(left_model_class, left_field)
-                    right_field_column = getattr(model_class, right_field)
-                    
-                    # Hacer join y filtrar: left_entity.field = current_entity.field
-                    query = query.join(left_model_class, left_field_column == right_field_column)
-                    query = query.filter(left_model_class.disabled_at.is_(None))
-                    print(f"      ✓ Filtro con join aplicado: {left_entity}.{left_field} = {right_entity}.{right_field}")
-                else:
-                    print(f"      ⚠️  No se pudo aplicar filtro con join: modelo o campos no encontrados")
-            # Si left_entity es la entidad actual, hacer join con right_entity
-            elif left_is_current:
-                # Buscar el modelo de right_entity
-                from .form_auto_creator import find_model_by_entity_name
-                right_model_class = find_model_by_entity_name(right_entity.lower(), container)
-                
-                if right_model_class and hasattr(model_class, left_field) and hasattr(right_model_class, right_field):
-                    left_field_column = getattr(model_class, left_field)
-                    right_field_column = getattr(right_model_class, right_field)
-                    
-                    # Hacer join y filtrar: current_entity.field = right_entity.field
-                    query = query.join(right_model_class, left_field_column == right_field_column)
-                    query = query.filter(right_model_class.disabled_at.is_(None))
-                    print(f"      ✓ Filtro con join aplicado: {left_entity}.{left_field} = {right_entity}.{right_field}")
-                else:
-                    print(f"      ⚠️  No se pudo aplicar filtro con join: modelo o campos no encontrados")
-            # Este caso no debería ocurrir debido a la validación anterior, pero lo mantenemos por seguridad
-            return query
-        else:
-            # Caso 2: 'entity.field=value'
-            # VALIDACIÓN: left_entity debe ser la entidad actual
-            if left_entity.lower() != entity_name.lower():
-                print(f"      ⚠️  Filtro rechazado: la entidad '{left_entity}' no es la entidad actual '{entity_name}'. Filtro: '{filter_str}'")
-                return query
-            
-            # Si left_entity es la entidad actual, aplicar filtro directo
-            if hasattr(model_class, left_field):
-                field_column = getattr(model_class, left_field)
-                query = query.filter(field_column == right_side)
-                print(f"      ✓ Filtro aplicado: {left_field} = {right_side}")
-            else:
-                print(f"      ⚠️  Campo '{left_field}' no existe en el modelo, ignorando filtro")
-            return query
-            
-    except Exception as e:
-        print(f"      ⚠️  Error al aplicar filtro '{filter_str}': {e}")
-        import traceback
-        traceback.print_exc()
-        return query
+    statements = []
+    seen = set()
+    for compiled in filters:
+        for model_class, column_name in compiled.filtered_columns:
+            key = (model_class.__table__.name, column_name)
+            if key in seen or _is_leading_indexed(model_class, column_name):
+                continue
+            seen.add(key)
+            table = model_class.__table__
+            qualified_table = f"{table.schema}.{table.name}" if table.schema else table.name
+            where = " WHERE disabled_at IS NULL" if 'disabled_at' in table.c else ""
+            statements.append(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {filter_index_name(model_class, column_name)} "
+                f"ON {qualified_table} ({column_name}){where}"
+            )
+    return statements
@@ -0,0 +1,183 @@
+"""
+Mantenimiento del índice core_register_mentions.
+
+Cada fila indica que un core_register menciona una entidad (por su id) en un campo
+del detail. Permite resolver "registros que mencionan la entidad X" y "última visita"
+con una búsqueda por índice (entity_id, created_at) en lugar de desempaquetar el
+ARRAY(JSONB) detail de todos los registros.
+
+Se considera mención:
+- value objeto con id: {"id": "...", "display_name": "..."}
+- value array de objetos con id: [{"id": "..."}, ...]
+- value string con type_value == "entity" (carga masiva)
+"""
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
+from uuid import UUID
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+if TYPE_CHECKING:
+    from ..schemas import DetailArray
+
+_UUID_REGEX = '^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$'
+
+_INSERT_MENTION_SQL = text("""
+    INSERT INTO core_register_mentions (register_id, entity_id, field_name, form_id, created_at)
+    SELECT r.id, :entity_id, :field_name, r.form_id, r.created_at
+    FROM core_registers r
+    WHERE r.id = :register_id
+    ON CONFLICT (register_id, field_name, entity_id) DO NOTHING
+""")
+
+# Misma regla de extracción que extract_register_mentions, en SQL, para un rango de ids
+_BACKFILL_MENTIONS_SQL = text(f"""
+    INSERT INTO core_register_mentions (register_id, entity_id, field_name, form_id, created_at)
+    SELECT DISTINCT r.id, mention.entity_id::uuid, item->>'name', r.form_id, r.created_at
+    FROM core_registers r
+    CROSS JOIN LATERAL unnest(r.detail) AS item
+    CROSS JOIN LATERAL (
+        SELECT item->'value'->>'id' AS entity_id
+        WHERE jsonb_typeof(item->'value') = 'object'
+        UNION ALL
+        SELECT val_item->>'id'
+        FROM jsonb_array_elements(
+            CASE WHEN jsonb_typeof(item->'value') = 'array' THEN item->'value' ELSE '[]'::jsonb END
+        ) AS val_item
+        WHERE jsonb_typeof(val_item) = 'object'
+        UNION ALL
+        SELECT item->>'value'
+        WHERE item->>'type_value' = 'entity' AND jsonb_typeof(item->'value') = 'string'
+    ) AS mention
+    WHERE r.id > :lower_id AND r.id <= :upper_id
+      AND item->>'name' IS NOT NULL
+      AND lower(mention.entity_id) ~ '{_UUID_REGEX}'
+    ON CONFLICT (register_id, field_name, entity_id) DO NOTHING
+""")
+
+
+def _to_uuid(value: Any) -> Optional[UUID]:
+    if isinstance(value, UUID):
+        return value
+    if not isinstance(value, str):
+        return None
+    try:
+        return UUID(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def extract_register_mentions(detail: Optional["DetailArray"]) -> List[Tuple[str, UUID]]:
+    """
+    Extrae las menciones (field_name, entity_id) del detail de un registro, sin duplicados.
+    """
+    mentions = []
+    if not detail:
+        return mentions
+
+    for item in detail:
+        if not isinstance(item, dict):
+            continue
+        field_name = item.get('name')
+        value = item.get('value')
+        if not field_name or value is None:
+            continue
+
+        if isinstance(value, dict):
+            candidates = [value.get('id')]
+        elif isinstance(value, list):
+            candidates = [v.get('id') for v in value if isinstance(v, dict)]
+        elif item.get('type_value') == 'entity':
+            candidates = [value]
+        else:
+            continue
+
+        for candidate in candidates:
+            entity_id = _to_uuid(candidate)
+            if entity_id is not None and (field_name, entity_id) not in mentions:
+                mentions.append((field_name, entity_id))
+    return mentions
+
+
+def save_register_mentions(db: Session, register) -> int:
+    """
+    Reemplaza las menciones de un registro dentro de la transacción actual (no hace commit).
+
+    El registro debe estar ya insertado (flush) para que exista su fila en core_registers.
+
+    Returns:
+        Número de menciones guardadas
+    """
+    db.execute(
+        text("DELETE FROM core_register_mentions WHERE register_id = :register_id"),
+        {"register_id": register.id}
+    )
+    mentions = extract_register_mentions(register.detail)
+    if mentions:
+        db.execute(_INSERT_MENTION_SQL, [
+            {"register_id": register.id, "entity_id": entity_id, "field_name": field_name}
+            for field_name, entity_id in mentions
+        ])
+    return len(mentions)
+
+
+def save_new_registers_mentions(db: Session, registers: List[Any]) -> int:
+    """
+    Guarda en un solo INSERT las menciones de registros recién insertados (no hace commit).
+
+    A diferencia de save_register_mentions no borra menciones previas, porque los
+    registros son nuevos.
+
+    Returns:
+        Número de menciones guardadas
+    """
+    params = [
+        {"register_id": register.id, "entity_id": entity_id, "field_name": field_name}
+        for register in registers
+        for field_name, entity_id in extract_register_mentions(register.detail)
+    ]
+    if params:
+        db.execute(_INSERT_MENTION_SQL, params)
+    return len(params)
+
+
+def backfill_register_mentions(db: Session, batch_size: int = 1000) -> Dict[str, int]:
+    """
+    Reconstruye core_register_mentions para todos los core_registers existentes.
+
+    Recorre core_registers por id en lotes (keyset); cada lote se procesa y confirma
+    en su propia transacción, por lo que puede reanudarse si se interrumpe.
+
+    Returns:
+        Diccionario con registers procesados, mentions insertadas y batches
+    """
+    lower_id = UUID(int=0)
+    processed = 0
+    inserted = 0
+    batches = 0
+
+    while True:
+        ids = db.execute(
+            text("SELECT id FROM core_registers WHERE id > :lower_id ORDER BY id LIMIT :batch_size"),
+            {"lower_id": lower_id, "batch_size": batch_size}
+        ).scalars().all()
+        if not ids:
+            break
+
+        upper_id = ids[-1]
+        try:
+            db.execute(
+                text("DELETE FROM core_register_mentions WHERE register_id > :lower_id AND register_id <= :upper_id"),
+                {"lower_id": lower_id, "upper_id": upper_id}
+            )
+            result = db.execute(_BACKFILL_MENTIONS_SQL, {"lower_id": lower_id, "upper_id": upper_id})
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        inserted += result.rowcount or 0
+        processed += len(ids)
+        batches += 1
+        lower_id = upper_id
+
+    return {"registers": processed, "mentions": inserted, "batches": batches}
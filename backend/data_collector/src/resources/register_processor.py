@@ -4,15 +4,12 @@ Funciones auxiliares para procesar registros de core_registers y guardarlos en e
 from typing import Dict, Any, List, Optional, TYPE_CHECKING
 from uuid import UUID
 from datetime import datetime
-import sys
-import importlib
-from pathlib import Path
-from sqlalchemy import inspect
 from sqlalchemy.orm import Session
-from core.models.base_class import Model as BaseModel
 import time
 import random
 
+from .model_registry import get_model_by_tablename, get_model_metadata
+
 if TYPE_CHECKING:
     from ..schemas import DetailArray, DetailItem
 
@@ -42,7 +39,7 @@ def find_model_by_entity_name(entity_name: str) -> Optional[Any]:
     """
     Busca un modelo de SQLAlchemy por nombre de entidad.
     
-    Usa el registro centralizado de modelos para acceso rápido.
+    Usa el registro precalculado de modelos (búsqueda O(1) por __tablename__).
     
     Args:
         entity_name: Nombre de la entidad (ej: 'farmers', 'farms', 'provinces')
@@ -50,238 +47,7 @@ def find_model_by_entity_name(entity_name: str) -> Optional[Any]:
     Returns:
         La clase del modelo o None si no se encuentra
     """
-    try:
-        # Normalizar entity_name a minúsculas para comparación
-        entity_name_lower = entity_name.lower().strip()
-        
-        print(f"    🔍 [register_processor] Buscando modelo para entidad '{entity_name}' (normalizado: '{entity_name_lower}')...")
-        
-        # PRIMERO: Intentar usar el registro centralizado de modelos
-        try:
-            from core.models.registry import get_model_by_tablename
-            model = get_model_by_tablename(entity_name_lower)
-            if model:
-                print(f"    ✓ [register_processor] Modelo encontrado en registro centralizado: {model.__name__} (tablename: {model.__tablename__})")
-                return model
-        except Exception as e:
-            print(f"    ⚠️  [register_processor] Error accediendo al registro: {e}")
-        
-        # SEGUNDO: Si no está en el registro, buscar en sys.modules y registrar
-        
-        # PRIMERO: Buscar en todos los módulos registrados en sys.modules
-        modules_checked = []
-        for module_name, module in sys.modules.items():
-            if not module_name.startswith('modules.'):
-                continue
-            
-            # Buscar modelos en el módulo (puede estar como module.models o modules.{name}.models)
-            models_module = None
-            if hasattr(module, 'models'):
-                models_module = getattr(module, 'models')
-                modules_checked.append(module_name)
-            elif module_name.endswith('.models'):
-                # También buscar directamente en módulos que terminan en .models
-                models_module = module
-                modules_checked.append(module_name)
-            
-            if models_module:
-                # Usar __all__ si está disponible para una búsqueda más eficiente
-                if hasattr(models_module, '__all__'):
-                    model_names = models_module.__all__
-                else:
-                    model_names = [name for name in dir(models_module) if not name.startswith('_')]
-                
-                for attr_name in model_names:
-                    if attr_name.startswith('_'):
-                        continue
-                    
-                    try:
-                        attr = getattr(models_module, attr_name)
-                        if (inspect.isclass(attr) and 
-                            issubclass(attr, BaseModel) and 
-                            attr is not BaseModel):
-                            if hasattr(attr, '__tablename__'):
-                                tablename = attr.__tablename__
-                                # Registrar en el registro centralizado para futuras búsquedas
-                                try:
-                                    from core.models.registry import register_model
-                                    register_model(attr)
-                                except Exception:
-                                    pass
-                                
-                                # Comparar normalizando ambos a minúsculas
-                                if isinstance(tablename, str) and tablename.lower().strip() == entity_name_lower:
-                                    print(f"    ✓ [register_processor] Modelo encontrado en sys.modules: {module_name}.{attr_name} (tablename: {tablename})")
-                                    return attr
-                    except Exception as e:
-                        continue
-        
-        if modules_checked:
-            print(f"    ℹ️  [register_processor] Módulos revisados en sys.modules: {', '.join(modules_checked[:5])}...")
-        
-        # SEGUNDO: Intentar importar módulos.models directamente (ej: modules.locations.models)
-        # Esto es útil para módulos que exponen models a través de sys.modules
-        try:
-            backend_path = Path(__file__).parent.parent.parent.parent
-            modules_path = backend_path / "modules"
-            
-            if modules_path.exists():
-                print(f"    🔍 [register_processor] Buscando en directorio: {modules_path}")
-                for module_dir in sorted(modules_path.iterdir()):  # Ordenar para consistencia
-                    if not module_dir.is_dir() or module_dir.name.startswith('_'):
-                        continue
-                    
-                    module_name = module_dir.name
-                    print(f"    🔍 [register_processor] Revisando módulo: {module_name}")
-                    
-                    # Intentar primero con modules.{name}.models (estructura estándar)
-                    models_module_paths = [
-                        f"modules.{module_name}.models",  # modules.locations.models
-                        f"modules.{module_name}.src.models",  # modules.locations.src.models
-                    ]
-                    
-                    for models_module_path in models_module_paths:
-                        try:
-                            models_module = None
-                            if models_module_path in sys.modules:
-                                models_module = sys.modules[models_module_path]
-                                print(f"    ✓ [register_processor] Módulo ya en sys.modules: {models_module_path}")
-                            else:
-                                try:
-                                    print(f"    📦 [register_processor] Intentando importar: {models_module_path}")
-                                    models_module = importlib.import_module(models_module_path)
-                                    print(f"    ✓ [register_processor] Módulo importado exitosamente: {models_module_path}")
-                                except ImportError as import_error:
-                                    print(f"    ⚠️  [register_processor] Error importando {models_module_path}: {import_error}")
-                                    # Intentar con backend.modules
-                                    try:
-                                        models_module_path_alt = models_module_path.replace("modules.", "backend.modules.")
-                                        print(f"    📦 [register_processor] Intentando importar (alternativo): {models_module_path_alt}")
-                                        models_module = importlib.import_module(models_module_path_alt)
-                                        models_module_path = models_module_path_alt
-                                        print(f"    ✓ [register_processor] Módulo importado exitosamente (alternativo): {models_module_path}")
-                                    except Exception as alt_error:
-                                        print(f"    ⚠️  [register_processor] Error importando alternativo {models_module_path_alt}: {alt_error}")
-                                        continue
-                                except Exception as import_error:
-                                    print(f"    ⚠️  [register_processor] Error inesperado importando {models_module_path}: {import_error}")
-                                    continue
-                            
-                            if not models_module:
-                                continue
-                            
-                            # Usar __all__ si está disponible, de lo contrario usar dir()
-                            if hasattr(models_module, '__all__'):
-                                model_names = models_module.__all__
-                                print(f"    📋 [register_processor] Usando __all__: {model_names}")
-                            else:
-                                model_names = [name for name in dir(models_module) if not name.startswith('_')]
-                                print(f"    📋 [register_processor] Modelos encontrados en dir(): {len(model_names)} modelos")
-                            
-                            for attr_name in model_names:
-                                if attr_name.startswith('_'):
-                                    continue
-                                
-                                try:
-                                    attr = getattr(models_module, attr_name)
-                                    if (inspect.isclass(attr) and 
-                                        issubclass(attr, BaseModel) and 
-                                        attr is not BaseModel):
-                                        if hasattr(attr, '__tablename__'):
-                                            tablename = attr.__tablename__
-                                            # Registrar en el registro centralizado para futuras búsquedas
-                                            try:
-                                                from core.models.registry import register_model
-                                                register_model(attr)
-                                            except Exception:
-                                                pass
-                                            
-                                            # Comparar normalizando ambos a minúsculas
-                                            if isinstance(tablename, str) and tablename.lower().strip() == entity_name_lower:
-                                                print(f"    ✓ [register_processor] Modelo encontrado importando dinámicamente: {models_module_path}.{attr_name} (tablename: {tablename})")
-                                                return attr
-                                except Exception as e:
-                                    continue
-                            
-                            # Si encontramos el módulo y lo revisamos, no intentar con el siguiente path
-                            break
-                        except Exception as e:
-                            print(f"    ⚠️  [register_processor] Error procesando {models_module_path}: {e}")
-                            import traceback
-                            traceback.print_exc()
-                            continue
-        except Exception as e:
-            print(f"    ⚠️  [register_processor] Error en búsqueda dinámica: {e}")
-            import traceback
-            traceback.print_exc()
-        
-        # TERCERO: Último intento - buscar directamente en archivos de modelos
-        # Esto es útil cuando el módulo no está cargado en sys.modules
-        try:
-            backend_path = Path(__file__).parent.parent.parent.parent
-            modules_path = backend_path / "modules"
-            
-            if modules_path.exists():
-                print(f"    🔍 [register_processor] Último intento: búsqueda directa en archivos")
-                for module_dir in sorted(modules_path.iterdir()):
-                    if not module_dir.is_dir() or module_dir.name.startswith('_'):
-                        continue
-                    
-                    # Buscar en src/models/
-                    models_dir = module_dir / "src" / "models"
-                    if not models_dir.exists():
-                        continue
-                    
-                    # Buscar archivos .py en el directorio de modelos
-                    for model_file in models_dir.glob("*.py"):
-                        if model_file.name.startswith('_') or model_file.name == "__init__.py":
-                            continue
-                        
-                        try:
-                            # Construir el path del módulo
-                            model_module_path = f"modules.{module_dir.name}.src.models.{model_file.stem}"
-                            print(f"    📦 [register_processor] Intentando importar modelo directo: {model_module_path}")
-                            
-                            model_module = importlib.import_module(model_module_path)
-                            
-                            # Buscar clases en el módulo
-                            for attr_name in dir(model_module):
-                                if attr_name.startswith('_') or not attr_name.endswith('Model'):
-                                    continue
-                                
-                                try:
-                                    attr = getattr(model_module, attr_name)
-                                    if (inspect.isclass(attr) and 
-                                        issubclass(attr, BaseModel) and 
-                                        attr is not BaseModel):
-                                        if hasattr(attr, '__tablename__'):
-                                            tablename = attr.__tablename__
-                                            # Registrar en el registro centralizado para futuras búsquedas
-                                            try:
-                                                from core.models.registry import register_model
-                                                register_model(attr)
-                                            except Exception:
-                                                pass
-                                            
-                                            if isinstance(tablename, str) and tablename.lower().strip() == entity_name_lower:
-                                                print(f"    ✓ [register_processor] Modelo encontrado en archivo directo: {model_module_path}.{attr_name} (tablename: {tablename})")
-                                                return attr
-                                except Exception:
-                                    continue
-                        except Exception as e:
-                            continue
-        except Exception as e:
-            print(f"    ⚠️  [register_processor] Error en búsqueda directa de archivos: {e}")
-        
-        print(f"    ❌ [register_processor] No se encontró modelo con __tablename__ = '{entity_name}' en ningún módulo")
-        
-    except Exception as e:
-        print(f"⚠️  Error al buscar modelo para entidad {entity_name}: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
-    
-    return None
+    return get_model_by_tablename(entity_name)
 
 
 def _convert_value_by_type(value: Any, type_value: str) -> Any:
@@ -354,6 +120,10 @@ def _convert_value_by_type(value: Any, type_value: str) -> Any:
         return value
 
 
+# Tablas intermedias dinámicas que ya existían (evita consultar information_schema en cada registro)
+_existing_intermediate_tables = set()
+
+
 def _create_and_populate_intermediate_table(
     db: Session,
     source_entity_name: str,
@@ -372,6 +142,9 @@ def _create_and_populate_intermediate_table(
         - {relation_name}_id: UUID (se infiere el tipo de la entidad destino)
         - created_at: TIMESTAMP
     
+    No hace commit: trabaja en un savepoint de la transacción actual; si falla, solo
+    se revierte el savepoint y el error se reporta sin interrumpir la proyección.
+    
     Args:
         db: Sesión de base de datos
         source_entity_name: Nombre de la entidad origen (ej: 'farmers')
@@ -379,9 +152,7 @@ def _create_and_populate_intermediate_table(
         relation_name: Nombre de la relación (ej: 'crops')
         target_entity_ids: Lista de IDs de entidades destino
     """
-    from sqlalchemy import Table, Column, ForeignKey, text
-    from sqlalchemy.dialects.postgresql import UUID as PostgresUUID
-    from datetime import datetime
+    from sqlalchemy import text
     
     # Nombre de la tabla intermedia: {source}_{relation}
     table_name = f"{source_entity_name}_{relation_name}"
@@ -391,62 +162,59 @@ def _create_and_populate_intermediate_table(
     target_column = f"{relation_name[:-1]}_id" if relation_name.endswith('s') else f"{relation_name}_id"
     
     try:
-        # Verificar si la tabla ya existe
-        check_table = text(f"""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables 
-                WHERE table_schema = 'public' 
-                AND table_name = :table_name
-            );
-        """)
-        
-        result = db.execute(check_table, {"table_name": table_name}).scalar()
-        
-        # Si no existe, crearla
-        if not result:
-            create_table_sql = text(f"""
-                CREATE TABLE IF NOT EXISTS {table_name} (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    {source_column} UUID NOT NULL,
-                    {target_column} UUID NOT NULL,
-                    created_at TIMESTAMP DEFAULT NOW(),
-                    UNIQUE({source_column}, {target_column})
-                );
+        with db.begin_nested():
+            if table_name not in _existing_intermediate_tables:
+                # Verificar si la tabla ya existe
+                check_table = text("""
+                    SELECT EXISTS (
+                        SELECT FROM information_schema.tables 
+                        WHERE table_schema = 'public' 
+                        AND table_name = :table_name
+                    );
+                """)
                 
-                -- Índices para mejorar performance
-                CREATE INDEX IF NOT EXISTS idx_{table_name}_{source_column} 
-                    ON {table_name}({source_column});
-                CREATE INDEX IF NOT EXISTS idx_{table_name}_{target_column} 
-                    ON {table_name}({target_column});
-            """)
+                if db.execute(check_table, {"table_name": table_name}).scalar():
+                    _existing_intermediate_tables.add(table_name)
+                else:
+                    db.execute(text(f"""
+                        CREATE TABLE IF NOT EXISTS {table_name} (
+                            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+                            {source_column} UUID NOT NULL,
+                            {target_column} UUID NOT NULL,
+                            created_at TIMESTAMP DEFAULT NOW(),
+                            UNIQUE({source_column}, {target_column})
+                        );
+                        
+                        -- Índices para mejorar performance
+                        CREATE INDEX IF NOT EXISTS idx_{table_name}_{source_column} 
+                            ON {table_name}({source_column});
+                        CREATE INDEX IF NOT EXISTS idx_{table_name}_{target_column} 
+                            ON {table_name}({target_column});
+                    """))
+                    print(f"    ✅ Tabla intermedia '{table_name}' creada")
             
-            db.execute(create_table_sql)
-            db.commit()
-            print(f"    ✅ Tabla intermedia '{table_name}' creada")
-        
-        # Limpiar relaciones existentes para esta entidad origen
-        delete_existing = text(f"""
-            DELETE FROM {table_name} WHERE {source_column} = :source_id;
-        """)
-        db.execute(delete_existing, {"source_id": str(source_entity_id)})
-        
-        # Insertar las nuevas relaciones
-        for target_id in target_entity_ids:
-            insert_relation = text(f"""
-                INSERT INTO {table_name} ({source_column}, {target_column})
-                VALUES (:source_id, :target_id)
-                ON CONFLICT ({source_column}, {target_column}) DO NOTHING;
-            """)
-            db.execute(insert_relation, {
-                "source_id": str(source_entity_id),
-                "target_id": str(target_id)
-            })
+            # Reemplazar las relaciones de la entidad origen
+            db.execute(
+                text(f"DELETE FROM {table_name} WHERE {source_column} = :source_id"),
+                {"source_id": str(source_entity_id)}
+            )
+            
+            target_ids = [str(target_id) for target_id in target_entity_ids]
+            if target_ids:
+                # Un solo INSERT para todas las relaciones
+                db.execute(text(f"""
+                    INSERT INTO {table_name} ({source_column}, {target_column})
+                    SELECT CAST(:source_id AS UUID), target_id
+                    FROM unnest(CAST(:target_ids AS UUID[])) AS target_id
+                    ON CONFLICT ({source_column}, {target_column}) DO NOTHING;
+                """), {
+                    "source_id": str(source_entity_id),
+                    "target_ids": target_ids
+                })
         
-        db.commit()
         print(f"    ✅ {len(target_entity_ids)} relaciones insertadas en '{table_name}'")
         
     except Exception as e:
-        db.rollback()
         print(f"    ❌ Error creando/poblando tabla intermedia '{table_name}': {e}")
         import traceback
         traceback.print_exc()
@@ -467,10 +235,15 @@ def _resolve_fk_strings_to_uuids(db: Session, model_class, filtered_data: Dict[s
     """
     Si una columna FK tiene un valor string que no es UUID (ej: DNI "72117500"),
     intenta buscar la entidad referenciada por dni/code/name y reemplazar con el UUID.
+    
+    Cada búsqueda se ejecuta en un savepoint para que un error (ej. tipo incompatible)
+    no invalide la transacción del registro.
     """
     result = dict(filtered_data)
-    inspector = inspect(model_class)
-    for col in inspector.columns:
+    metadata = get_model_metadata(model_class.__tablename__)
+    if metadata is None:
+        return result
+    for col in metadata.columns.values():
         if col.name not in result:
             continue
         val = result[col.name]
@@ -479,35 +252,59 @@ def _resolve_fk_strings_to_uuids(db: Session, model_class, filtered_data: Dict[s
         if _is_valid_uuid_string(val):
             continue
         # Es string pero no UUID - puede ser identificador lógico (DNI, code, etc.)
-        fks = [fk for fk in col.foreign_keys if fk.target_column is not None]
-        if not fks:
-            continue
-        fk = fks[0]
-        target_table = fk.column.table.name if hasattr(fk.column, 'table') else None
-        if not target_table:
+        if not col.foreign_key_tables:
             continue
+        target_table = col.foreign_key_tables[0]
         target_model = find_model_by_entity_name(target_table)
         if not target_model:
             continue
         val_str = str(val).strip()
-        found = None
+        found_id = None
         for attr in ("dni", "code", "name"):
             if hasattr(target_model, attr):
                 try:
-                    found = db.query(target_model).filter(getattr(target_model, attr) == val_str).first()
-                    if found:
+                    with db.begin_nested():
+                        found_id = db.query(target_model.id).filter(getattr(target_model, attr) == val_str).limit(1).scalar()
+                    if found_id:
                         break
                 except Exception:
-                    try:
-                        db.rollback()
-                    except Exception:
-                        pass
                     continue
-        if found:
-            result[col.name] = found.id
+        if found_id:
+            result[col.name] = found_id
     return result
 
 
+def _to_uuid(value: Any) -> Optional[UUID]:
+    if isinstance(value, UUID):
+        return value
+    if isinstance(value, dict):
+        value = value.get("id")
+    try:
+        return UUID(str(value))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def _load_related_entities(db: Session, target_model, entity_ids: list) -> list:
+    """
+    Carga las entidades relacionadas con una sola consulta IN, conservando el orden
+    de entity_ids y omitiendo (con aviso) los ids que no existen.
+    """
+    ids = []
+    for entity_id in entity_ids:
+        uuid_value = _to_uuid(entity_id)
+        if uuid_value is not None and uuid_value not in ids:
+            ids.append(uuid_value)
+    if not ids:
+        return []
+    
+    found = {entity.id: entity for entity in db.query(target_model).filter(target_model.id.in_(ids)).all()}
+    missing = [str(entity_id) for entity_id in ids if entity_id not in found]
+    if missing:
+        print(f"    ⚠️  No se encontraron entidades con IDs {', '.join(missing)} en tabla '{target_model.__tablename__}'")
+    return [found[entity_id] for entity_id in ids if entity_id in found]
+
+
 def extract_entity_data_from_detail(detail: "DetailArray") -> tuple[Dict[str, Any], Dict[str, list]]:
     """
     Extrae los datos de la entidad desde el array detail del registro.
@@ -582,243 +379,138 @@ def extract_entity_data_from_detail(detail: "DetailArray") -> tuple[Dict[str, An
     return entity_data, many_to_many_data
 
 
+# Campos del sistema que no se toman del detail
+_SYSTEM_FIELDS = {'id', 'created_at', 'updated_at', 'disabled_at'}
+
+
 def process_register_to_entity(
     register,
     db: Session,
     FormModel,
-    FormPurpose
+    FormPurpose,
+    form=None
 ) -> Optional[UUID]:
     """
     Procesa un registro de core_registers y si proviene de un formulario ENTITY,
     guarda los datos en la tabla correspondiente.
     
+    No hace commit: la proyección se ejecuta en un savepoint de la transacción del
+    llamador, de modo que el registro y su entidad se confirman juntos. Si la
+    proyección falla, solo se revierte el savepoint y la excepción se propaga.
+    
     Args:
         register: Instancia de CoreRegisterModel a procesar
         db: Sesión de base de datos
         FormModel: Clase del modelo FormModel
         FormPurpose: Enum FormPurpose
+        form: Formulario del registro si el llamador ya lo cargó (evita otra consulta)
         
     Returns:
         UUID del registro creado/actualizado en la entidad, o None si no se procesó
     """
-    try:
-        # Obtener el formulario asociado
+    # Obtener el formulario asociado
+    if form is None:
         form = db.query(FormModel).filter(FormModel.id == register.form_id).first()
-        
-        if not form:
-            print(f"⚠️  No se encontró formulario con id {register.form_id}")
-            return None
-        
-        # Verificar si el formulario es de tipo ENTITY
-        if form.form_purpose != FormPurpose.entity:
-            # No es un formulario de entidad, no procesar
-            return None
-        
-        # Obtener el nombre de la entidad desde el formulario
-        entity_name = form.entity_name
-        
-        if not entity_name:
-            print(f"⚠️  Formulario {form.id} tiene form_purpose=ENTITY pero no tiene entity_name")
-            return None
-        
-        # Buscar el modelo de la entidad
-        model_class = find_model_by_entity_name(entity_name)
-        
-        if not model_class:
-            print(f"⚠️  No se encontró modelo para entidad '{entity_name}'")
-            return None
-        
-        sys.stderr.write(f"    [register_processor] Extrayendo entity_data del detail...\n")
-        sys.stderr.flush()
-        # Extraer los datos del detail
-        # Ahora devuelve: (entity_data, many_to_many_data)
-        entity_data, many_to_many_data = extract_entity_data_from_detail(register.detail or [])
-        sys.stderr.write(f"    [register_processor] entity_data keys: {list(entity_data.keys())}\n")
-        sys.stderr.flush()
-        
-        if not entity_data and not many_to_many_data:
-            print(f"⚠️  No se encontraron datos en el detail del registro {register.id}")
-            return None
-        
-        sys.stderr.write(f"    [register_processor] Inspeccionando modelo {model_class.__name__}...\n")
-        sys.stderr.flush()
-        # Obtener los atributos del modelo para validar qué campos podemos usar
-        model_inspector = inspect(model_class)
-        model_columns = {col.name for col in model_inspector.columns}
-        sys.stderr.write(f"    [register_processor] Creando/actualizando entidad...\n")
-        sys.stderr.flush()
-        
-        # Obtener relationships many-to-many del modelo
-        model_relationships = {}
-        if hasattr(model_inspector, 'mapper') and hasattr(model_inspector.mapper, 'relationships'):
-            for rel_name, rel_obj in model_inspector.mapper.relationships.items():
-                # Solo relaciones many-to-many (tienen secondary table)
-                if hasattr(rel_obj, 'secondary') and rel_obj.secondary is not None:
-                    model_relationships[rel_name] = rel_obj
-                    print(f"    🔗 Relación many-to-many detectada en modelo: {rel_name}")
-        
-        # Separar datos en: columnas directas y relaciones many-to-many
-        filtered_data = {}
-        m2m_data = {}
-        
-        # Procesar datos de columnas directas (incluyendo FKs de relaciones uno a uno/muchos)
-        for key, value in entity_data.items():
-            # Omitir campos del sistema
-            if key in ['id', 'created_at', 'updated_at', 'disabled_at']:
-                continue
+    
+    if not form:
+        print(f"⚠️  No se encontró formulario con id {register.form_id}")
+        return None
+    
+    # Verificar si el formulario es de tipo ENTITY
+    if form.form_purpose != FormPurpose.entity:
+        # No es un formulario de entidad, no procesar
+        return None
+    
+    # Obtener el nombre de la entidad desde el formulario
+    entity_name = form.entity_name
+    
+    if not entity_name:
+        print(f"⚠️  Formulario {form.id} tiene form_purpose=ENTITY pero no tiene entity_name")
+        return None
+    
+    # Buscar el modelo de la entidad
+    model_class = find_model_by_entity_name(entity_name)
+    
+    if not model_class:
+        print(f"⚠️  No se encontró modelo para entidad '{entity_name}'")
+        return None
+    
+    # Extraer los datos del detail: (entity_data, many_to_many_data)
+    entity_data, many_to_many_data = extract_entity_data_from_detail(register.detail or [])
+    
+    if not entity_data and not many_to_many_data:
+        print(f"⚠️  No se encontraron datos en el detail del registro {register.id}")
+        return None
+    
+    # Columnas y relaciones many-to-many del modelo (metadata precalculada en el registro de modelos)
+    model_metadata = get_model_metadata(entity_name)
+    model_columns = model_metadata.column_names
+    model_relationships = model_metadata.many_to_many
+    
+    # Columnas directas (incluye foreign keys de relaciones uno a uno/muchos)
+    filtered_data = {
+        key: value for key, value in entity_data.items()
+        if key not in _SYSTEM_FIELDS and key in model_columns
+    }
+    
+    # Heredar identity_id del core_register si la tabla destino tiene ese campo
+    if 'identity_id' in model_columns and register.identity_id:
+        filtered_data['identity_id'] = register.identity_id
+    
+    # Relaciones many-to-many: las que no están definidas en el modelo usan tabla intermedia dinámica
+    m2m_data = dict(many_to_many_data)
+    
+    if not filtered_data and not m2m_data:
+        print(f"⚠️  No hay datos válidos para insertar en la entidad '{entity_name}'")
+        return None
+    
+    try:
+        with db.begin_nested():
+            # Resolver valores string en columnas FK: si farmer_id="72117500" (DNI), buscar farmer por dni
+            filtered_data = _resolve_fk_strings_to_uuids(db, model_class, filtered_data)
             
-            # Si es una columna del modelo (incluye foreign keys)
-            if key in model_columns:
-                filtered_data[key] = value
-
-        # Resolver valores string en columnas FK: si farmer_id="72117500" (DNI), buscar farmer por dni
-        filtered_data = _resolve_fk_strings_to_uuids(db, model_class, filtered_data)
-        
-        # Heredar identity_id del core_register si la tabla destino tiene ese campo
-        if 'identity_id' in model_columns and register.identity_id:
-            filtered_data['identity_id'] = register.identity_id
-            print(f"    🔑 Heredando identity_id del core_register: {register.identity_id}")
-        
-        # Procesar relaciones many-to-many detectadas en el detail
-        for field_name, entity_ids in many_to_many_data.items():
-            # Buscar si existe una relación con ese nombre en el modelo
-            if field_name in model_relationships:
-                m2m_data[field_name] = entity_ids
-                print(f"    🔗 Campo many-to-many '{field_name}' con {len(entity_ids)} entidades")
-            else:
-                # Si no existe la relación en el modelo, intentar crear tabla intermedia
-                print(f"    ⚠️  Relación '{field_name}' no definida en modelo, se creará tabla intermedia")
-                # Guardamos igualmente para procesamiento posterior
-                m2m_data[field_name] = entity_ids
-        
-        if not filtered_data and not m2m_data:
-            print(f"⚠️  No hay datos válidos para insertar en la entidad '{entity_name}'")
-            return None
-        
-        # Si ya existe un entity_id, actualizar el registro existente
-        if register.entity_id:
-            existing_entity = db.query(model_class).filter(
-                model_class.id == register.entity_id
-            ).first()
+            # Si ya existe un entity_id, actualizar el registro existente
+            entity = None
+            if register.entity_id:
+                entity = db.query(model_class).filter(model_class.id == register.entity_id).first()
             
-            if existing_entity:
-                # Actualizar las columnas directas
+            if entity is not None:
                 for key, value in filtered_data.items():
-                    setattr(existing_entity, key, value)
-                
-                # Heredar identity_id del core_register si la tabla destino tiene ese campo y aún no está establecido
-                if 'identity_id' in model_columns and register.identity_id:
-                    if not getattr(existing_entity, 'identity_id', None):
-                        setattr(existing_entity, 'identity_id', register.identity_id)
-                        print(f"    🔑 Heredando identity_id del core_register en actualización: {register.identity_id}")
-                
-                existing_entity.updated_at = datetime.utcnow()
-                
-                # Actualizar relaciones many-to-many
-                pending_m2m_for_update = {}
-                
-                for rel_name, entity_ids in m2m_data.items():
-                    if hasattr(existing_entity, rel_name) and rel_name in model_relationships:
-                        # Relación definida en el modelo - usar ORM
-                        rel_obj = model_relationships[rel_name]
-                        target_model = rel_obj.mapper.class_
-                        
-                        # entity_ids es una lista de UUIDs
-                        related_entities = []
-                        for entity_id in entity_ids:
-                            related_entity = db.query(target_model).filter(target_model.id == entity_id).first()
-                            if related_entity:
-                                related_entities.append(related_entity)
-                            else:
-                                print(f"    ⚠️  No se encontró entidad con ID {entity_id} en tabla '{target_model.__tablename__}'")
-                        
-                        # Reemplazar la colección de relaciones
-                        setattr(existing_entity, rel_name, related_entities)
-                        print(f"    ✅ Relación many-to-many '{rel_name}' actualizada con {len(related_entities)} items")
-                    else:
-                        # Relación NO definida en el modelo - crear tabla intermedia dinámica
-                        pending_m2m_for_update[rel_name] = entity_ids
-                
-                db.commit()
-                db.refresh(existing_entity)
-                
-                # Procesar relaciones muchos a muchos que requieren tabla intermedia dinámica
-                for rel_name, entity_ids in pending_m2m_for_update.items():
-                    _create_and_populate_intermediate_table(
-                        db, entity_name, existing_entity.id, rel_name, entity_ids
-                    )
-                
-                # Asegurar que el core_register tenga el entity_id actualizado
-                register.entity_id = existing_entity.id
-                register.entity_name = entity_name
-                db.commit()
-                db.refresh(register)  # Refrescar el registro para asegurar que los cambios se reflejen
-                
-                print(f"✅ Registro actualizado en entidad '{entity_name}' (ID: {existing_entity.id})")
-                return existing_entity.id
-        
-        # Crear un nuevo registro en la entidad
-        # Nota: Si no hay filtered_data pero sí hay m2m_data, igual crear la entidad vacía
-        sys.stderr.write(f"    [register_processor] Instanciando {model_class.__name__} con filtered_data...\n")
-        sys.stderr.flush()
-        new_entity = model_class(**filtered_data) if filtered_data else model_class()
-        # si es una compra, crear el ticket_number
-        if (getattr(new_entity, 'ticket_number', None) is None) and entity_name == 'purchases':
-            new_entity.ticket_number = _generar_numero_recibo_fecha_timestamp_aleatorio()
-        
-        sys.stderr.write(f"    [register_processor] db.add + flush...\n")
-        sys.stderr.flush()
-        db.add(new_entity)
-        db.flush()  # Flush para obtener el ID antes de commit
-        sys.stderr.write(f"    [register_processor] flush OK, commit...\n")
-        sys.stderr.flush()
-        
-        # Establecer relaciones many-to-many
-        pending_m2m_data = {}  # Para procesar después del commit
-        
-        for rel_name, entity_ids in m2m_data.items():
-            if hasattr(new_entity, rel_name) and rel_name in model_relationships:
-                # Relación definida en el modelo - usar ORM
-                rel_obj = model_relationships[rel_name]
-                target_model = rel_obj.mapper.class_
-                
-                # entity_ids es una lista de UUIDs
-                related_entities = []
-                for entity_id in entity_ids:
-                    related_entity = db.query(target_model).filter(target_model.id == entity_id).first()
-                    if related_entity:
-                        related_entities.append(related_entity)
-                    else:
-                        print(f"    ⚠️  No se encontró entidad con ID {entity_id} en tabla '{target_model.__tablename__}'")
-                
-                # Establecer la colección de relaciones
-                setattr(new_entity, rel_name, related_entities)
-                print(f"    ✅ Relación many-to-many '{rel_name}' establecida con {len(related_entities)} items")
+                    setattr(entity, key, value)
+                entity.updated_at = datetime.utcnow()
             else:
-                # Relación NO definida en el modelo - crear tabla intermedia dinámica
-                pending_m2m_data[rel_name] = entity_ids
-        
-        db.commit()
-        db.refresh(new_entity)
-        
-        # Procesar relaciones muchos a muchos que requieren tabla intermedia dinámica
-        for rel_name, entity_ids in pending_m2m_data.items():
-            _create_and_populate_intermediate_table(
-                db, entity_name, new_entity.id, rel_name, entity_ids
-            )
-        
-        # Actualizar el core_register con el entity_id
-        register.entity_id = new_entity.id
-        register.entity_name = entity_name
-        db.commit()
-        db.refresh(register)  # Refrescar el registro para asegurar que los cambios se reflejen
-        
-        print(f"✅ Registro creado en entidad '{entity_name}' (ID: {new_entity.id})")
-        return new_entity.id
-        
+                # Nota: si no hay filtered_data pero sí m2m_data, igual se crea la entidad vacía
+                entity = model_class(**filtered_data) if filtered_data else model_class()
+                # si es una compra, crear el ticket_number
+                if (getattr(entity, 'ticket_number', None) is None) and entity_name == 'purchases':
+                    entity.ticket_number = _generar_numero_recibo_fecha_timestamp_aleatorio()
+                db.add(entity)
+            
+            # Relaciones definidas en el modelo: una consulta IN por relación
+            pending_m2m_data = {}
+            for rel_name, entity_ids in m2m_data.items():
+                if rel_name in model_relationships and hasattr(entity, rel_name):
+                    target_model = get_model_by_tablename(model_relationships[rel_name].target_table)
+                    related_entities = _load_related_entities(db, target_model, entity_ids)
+                    setattr(entity, rel_name, related_entities)
+                else:
+                    pending_m2m_data[rel_name] = entity_ids
+            
+            # Flush para obtener el ID de la entidad
+            db.flush()
+            
+            # Relaciones que requieren tabla intermedia dinámica
+            for rel_name, entity_ids in pending_m2m_data.items():
+                _create_and_populate_intermediate_table(
+                    db, entity_name, entity.id, rel_name, entity_ids
+                )
     except Exception as e:
-        db.rollback()
         print(f"❌ Error al procesar registro {register.id} a entidad: {e}")
-        import traceback
-        traceback.print_exc()
         raise
+    
+    # Enlazar el core_register con la entidad (se guarda con la transacción del llamador)
+    register.entity_id = entity.id
+    register.entity_name = entity_name
+    
+    print(f"✅ Registro guardado en entidad '{entity_name}' (ID: {entity.id})")
+    return entity.id
@@ -0,0 +1,49 @@
+"""
+Búsqueda de texto sobre core_registers.
+
+Usa las columnas search_text y search_vector, que un trigger mantiene a partir de
+los valores visibles del detail (ver migración create_core_registers_search):
+- search_text: texto en minúsculas y sin tildes, con índice GIN trigram (búsqueda parcial)
+- search_vector: tsvector con la configuración es_unaccent, con índice GIN (búsqueda por palabras)
+
+Un registro coincide si el término coincide por palabras (websearch_to_tsquery) o
+aparece como subcadena; la relevancia combina ts_rank_cd y word_similarity.
+"""
+from sqlalchemy import cast, func, or_
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION
+
+from ..models.core_registers import CoreRegisterModel
+
+SEARCH_CONFIG = "es_unaccent"
+
+
+def escape_like(term: str) -> str:
+    """Escapa los comodines de LIKE (\\, % y _) de un término; usar con escape='\\'."""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def register_search_filter(search: str):
+    """
+    Construye el filtro y la expresión de relevancia para buscar en core_registers.
+
+    Returns:
+        Tupla (filtro, relevancia); la relevancia es float8 y está etiquetada como 'search_rank'
+    """
+    term = search.strip()
+    ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, term)
+    normalized = func.lower(func.unaccent(term))
+    pattern = func.lower(func.unaccent(f"%{escape_like(term)}%"))
+
+    match = or_(
+        CoreRegisterModel.search_vector.op("@@")(ts_query),
+        CoreRegisterModel.search_text.like(pattern, escape="\\")
+    )
+    # ts_rank_cd y word_similarity son real (float4); la relevancia se usa como columna
+    # del cursor de paginación, así que se pasa a float8 para que el valor que vuelve en
+    # el cursor (float de Python) compare exactamente con el de la fila
+    rank = cast(
+        func.ts_rank_cd(CoreRegisterModel.search_vector, ts_query)
+        + func.word_similarity(normalized, func.coalesce(CoreRegisterModel.search_text, "")),
+        DOUBLE_PRECISION
+    ).label("search_rank")
+    return match, rank
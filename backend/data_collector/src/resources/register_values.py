@@ -0,0 +1,116 @@
+"""
+Filtros estructurados sobre las respuestas de core_registers.
+
+Usa core_register_values, que un trigger mantiene con una fila por campo del detail
+(ver migración create_core_register_values) e índices B-tree por
+(form_id, field_name, value_text | value_num | value_ts).
+
+Sintaxis del parámetro filters (condiciones separadas por coma, todas deben cumplirse):
+- campo=valor        igualdad exacta sobre el valor como texto (id para entidades)
+- campo=v1|v2|v3     el valor es uno de la lista (IN)
+- campo!=valor       el registro no tiene ese valor en el campo
+- campo>valor, campo>=valor, campo<valor, campo<=valor
+                     rango numérico si el valor es un número, de fecha si es YYYY-MM-DD[...],
+                     y de texto en otro caso
+
+Ejemplo: certificacion=organic,area>2
+"""
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import select
+
+from ..models.core_registers import CoreRegisterModel
+from ..models.core_register_values import CoreRegisterValueModel
+
+_CONDITION_RE = re.compile(r'^\s*([\w.-]+)\s*(>=|<=|!=|=|>|<)\s*(.*?)\s*$')
+_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}')
+
+RANGE_OPERATORS = (">", ">=", "<", "<=")
+
+
+@dataclass(frozen=True)
+class RegisterValueFilter:
+    """Condición sobre el valor de un campo: operador ('=', 'in', '!=', '>', '>=', '<', '<=') y valores."""
+    field_name: str
+    operator: str
+    values: Tuple[str, ...]
+
+
+def parse_register_filters(filters: Optional[str]) -> List[RegisterValueFilter]:
+    """
+    Interpreta el parámetro filters.
+
+    Raises:
+        ValueError: Si alguna condición no tiene el formato esperado
+    """
+    if not filters or not filters.strip():
+        return []
+    parsed = []
+    for condition in filters.split(","):
+        if not condition.strip():
+            continue
+        match = _CONDITION_RE.match(condition)
+        if not match or not match.group(3):
+            raise ValueError(
+                f"Filtro inválido: '{condition.strip()}'. Use campo=valor, campo=v1|v2, campo!=valor o campo>valor"
+            )
+        field_name, operator, raw_value = match.groups()
+        if operator == "=" and "|" in raw_value:
+            values = tuple(dict.fromkeys(value.strip() for value in raw_value.split("|") if value.strip()))
+            parsed.append(RegisterValueFilter(field_name, "in", values))
+        else:
+            parsed.append(RegisterValueFilter(field_name, operator, (raw_value,)))
+    return parsed
+
+
+def _typed_column_and_value(value: str):
+    """Columna y valor para comparar rangos: numérico, fecha o texto."""
+    try:
+        return CoreRegisterValueModel.value_num, Decimal(value)
+    except InvalidOperation:
+        pass
+    if _DATE_RE.match(value):
+        try:
+            return CoreRegisterValueModel.value_ts, datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    return CoreRegisterValueModel.value_text, value
+
+
+def register_value_condition(form_id: UUID, value_filter: RegisterValueFilter):
+    """
+    Condición sobre CoreRegisterModel.id: semi-join con core_register_values
+    restringido a (form_id, field_name), que resuelven los índices B-tree.
+    """
+    subquery = select(CoreRegisterValueModel.register_id).where(
+        CoreRegisterValueModel.form_id == form_id,
+        CoreRegisterValueModel.field_name == value_filter.field_name
+    )
+    operator = value_filter.operator
+    if operator == "in":
+        subquery = subquery.where(CoreRegisterValueModel.value_text.in_(value_filter.values))
+    elif operator in ("=", "!="):
+        subquery = subquery.where(CoreRegisterValueModel.value_text == value_filter.values[0])
+    else:
+        column, value = _typed_column_and_value(value_filter.values[0])
+        comparisons = {
+            ">": column > value,
+            ">=": column >= value,
+            "<": column < value,
+            "<=": column <= value,
+        }
+        subquery = subquery.where(comparisons[operator])
+
+    if operator == "!=":
+        return CoreRegisterModel.id.notin_(subquery)
+    return CoreRegisterModel.id.in_(subquery)
+
+
+def register_value_conditions(form_id: UUID, filters: Optional[str]) -> list:
+    """Condiciones (AND) para aplicar con query.filter(*condiciones)."""
+    return [register_value_condition(form_id, value_filter) for value_filter in parse_register_filters(filters)]
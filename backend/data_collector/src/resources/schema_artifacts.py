@@ -0,0 +1,281 @@
+"""
+Artefactos compilados de schema_forms.
+
+Un schema_form es inmutable (create_form_schema siempre inserta una fila nueva), así
+que lo que se deriva de schema['instructions'] se calcula una vez por schema_form_id
+y se guarda en un caché LRU del proceso, acotado a SCHEMA_ARTIFACT_CACHE_SIZE entradas:
+- name -> instrucción
+- display names y tipos de entidad de los campos entity (enriquecimiento del detail)
+- columnas base de la plantilla, identificador lógico y campos únicos
+- filtros de los campos entity (para indexar las columnas que filtran)
+- columnas resueltas y bytes de la plantilla Excel, por (entity_name, formularios
+  relacionados): dependen del identificador lógico de las entidades referenciadas,
+  cuyo formulario puede cambiar de schema
+
+Los diccionarios del artefacto se comparten entre llamadas: no deben modificarse.
+"""
+import copy
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from ..environment import SCHEMA_ARTIFACT_CACHE_SIZE
+from .detail_enricher import get_instruction_entity_filter, get_instruction_entity_type
+from .form_auto_creator import _get_logical_identifier_fields, get_schema_columns_for_template
+from .unique_validation import get_unique_fields
+
+# Variantes de plantilla (entity_name, formularios relacionados) guardadas por artefacto
+MAX_TEMPLATE_VARIANTS = 8
+
+
+@dataclass(frozen=True)
+class CompiledSchemaForm:
+    """Datos derivados de un schema_form, calculados una sola vez."""
+    schema_form_id: UUID
+    schema: Dict[str, Any]
+    instructions_by_name: Dict[str, Dict[str, Any]]
+    display_names: Dict[str, str]
+    entity_types: Dict[str, str]
+    template_columns: Tuple[Dict[str, Any], ...]
+    logical_identifier: Optional[str]
+    unique_fields: Tuple[str, ...]
+    # (entity_type, filtro) de los campos entity que filtran la entidad referenciada
+    entity_filters: Tuple[Tuple[str, str], ...]
+    # (entity_name, dependencias) -> TemplateArtifact
+    _templates: "OrderedDict" = field(default_factory=OrderedDict, repr=False, compare=False)
+    _lock: Any = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @property
+    def foreign_key_tables(self) -> Tuple[str, ...]:
+        """Entidades referenciadas por las columnas entity de la plantilla."""
+        return tuple(dict.fromkeys(
+            table for table in (_foreign_key_table(column) for column in self.template_columns) if table
+        ))
+
+    def get_template(self, key: Tuple, build_columns: Callable[[], List[Dict[str, Any]]]) -> "TemplateArtifact":
+        """Devuelve (o construye y guarda) la variante de plantilla para la clave dada."""
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None:
+                self._templates.move_to_end(key)
+                return template
+        template = TemplateArtifact(columns=tuple(build_columns()))
+        with self._lock:
+            template = self._templates.setdefault(key, template)
+            while len(self._templates) > MAX_TEMPLATE_VARIANTS:
+                self._templates.popitem(last=False)
+        return template
+
+
+@dataclass
+class TemplateArtifact:
+    """Columnas resueltas de la plantilla y, una vez generados, los bytes del Excel."""
+    columns: Tuple[Dict[str, Any], ...]
+    excel: Optional[bytes] = None
+
+    def get_excel(self, build_excel: Callable[[List[Dict[str, Any]]], bytes]) -> bytes:
+        if self.excel is None:
+            self.excel = build_excel(list(self.columns))
+        return self.excel
+
+
+def _foreign_key_table(column: Dict[str, Any]) -> Optional[str]:
+    """Tabla referenciada por una columna entity (foreign_key_table o {prefijo}s si termina en _id)."""
+    if column.get("type_value") != "entity":
+        return None
+    if column.get("foreign_key_table"):
+        return column["foreign_key_table"]
+    name = column.get("name", "")
+    if name.endswith("_id"):
+        return f"{name[:-3]}s"
+    return None
+
+
+def compile_schema_form(schema_form_id: UUID, schema: Optional[Dict[str, Any]]) -> CompiledSchemaForm:
+    """Recorre schema['instructions'] una sola vez y construye el artefacto."""
+    schema = schema or {}
+    instructions_by_name = {}
+    display_names = {}
+    entity_types = {}
+    entity_filters = []
+    for instruction_data in schema.get('instructions', []) or []:
+        if not isinstance(instruction_data, dict):
+            continue
+        name = instruction_data.get('name')
+        if not name:
+            continue
+        instructions_by_name.setdefault(name, instruction_data)
+        display_name = instruction_data.get('display_name')
+        if display_name:
+            display_names[name] = display_name
+        entity_type = get_instruction_entity_type(instruction_data)
+        if entity_type:
+            entity_types[name] = entity_type
+            entity_filter = get_instruction_entity_filter(instruction_data)
+            if entity_filter:
+                entity_filters.append((entity_type, entity_filter))
+
+    logical_fields = _get_logical_identifier_fields(schema)
+    return CompiledSchemaForm(
+        schema_form_id=schema_form_id,
+        schema=schema,
+        instructions_by_name=instructions_by_name,
+        display_names=display_names,
+        entity_types=entity_types,
+        template_columns=tuple(get_schema_columns_for_template(schema)),
+        logical_identifier=logical_fields[0] if len(logical_fields) == 1 else None,
+        unique_fields=tuple(get_unique_fields(schema)),
+        entity_filters=tuple(entity_filters)
+    )
+
+
+def resolve_template_columns(
+    compiled: CompiledSchemaForm,
+    entity_name: Optional[str],
+    related_logical_identifiers: Dict[str, Optional[str]],
+    find_model: Callable[[str], Any],
+    all_models: Callable[[], Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Columnas de la plantilla Excel con nombres y display_names resueltos.
+
+    Las columnas entity cuya entidad tiene formulario con identificador lógico se
+    renombran a {prefijo}_{identificador} (ej: farmer_dni en vez de farmer_id); las
+    demás columnas entity se omiten. Los display_names salen del info de las columnas
+    del modelo de la entidad (o del modelo que más columnas comparte con la plantilla).
+    """
+    columns = []
+    for base_column in compiled.template_columns:
+        col = dict(base_column)
+        if col.get("type_value") != "entity":
+            columns.append(col)
+            continue
+        fk_table = _foreign_key_table(col)
+        if not fk_table:
+            continue
+        col["foreign_key_table"] = fk_table
+        lid_field = related_logical_identifiers.get(fk_table)
+        if not lid_field:
+            continue
+        original_name = col["name"]
+        prefix = original_name[:-3] if original_name.endswith("_id") else original_name
+        new_name = f"{prefix}_{lid_field}"
+        col["schema_field_name"] = original_name
+        col["name"] = new_name
+        col["display_name"] = new_name
+        try:
+            rel_model = find_model(fk_table)
+            if rel_model and hasattr(rel_model, "__table__") and lid_field in rel_model.__table__.c:
+                sa_col = rel_model.__table__.c[lid_field]
+                if getattr(sa_col, "info", None) and isinstance(sa_col.info, dict) and sa_col.info.get("display_name"):
+                    col["display_name"] = sa_col.info["display_name"]
+        except Exception:
+            pass
+        columns.append(col)
+
+    # display_name desde el modelo (column.info["display_name"])
+    model_class = find_model(entity_name) if entity_name else None
+    if not model_class:
+        non_entity_names = {c.get("name") for c in columns if c.get("type_value") != "entity" and c.get("name")}
+        if non_entity_names:
+            best_match, best_count = None, 0
+            try:
+                for _tablename, mod in all_models().items():
+                    if not hasattr(mod, "__table__"):
+                        continue
+                    match_count = len(non_entity_names & set(mod.__table__.c.keys()))
+                    if match_count > best_count:
+                        best_count, best_match = match_count, mod
+            except Exception:
+                pass
+            model_class = best_match
+    if model_class and hasattr(model_class, "__table__"):
+        display_map = {}
+        for sa_col in model_class.__table__.c:
+            if getattr(sa_col, "info", None) and isinstance(sa_col.info, dict) and sa_col.info.get("display_name"):
+                display_map[sa_col.key] = sa_col.info["display_name"]
+        for col in columns:
+            if col.get("type_value") == "entity":
+                continue
+            attr_name = col.get("name")
+            if attr_name and attr_name in display_map:
+                col["display_name"] = display_map[attr_name]
+    return columns
+
+
+class SchemaArtifactCache:
+    """Caché LRU schema_form_id -> CompiledSchemaForm."""
+
+    def __init__(self, max_entries: int = SCHEMA_ARTIFACT_CACHE_SIZE):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[UUID, CompiledSchemaForm]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, db: Session, schema_form_ids: Iterable[UUID]) -> Dict[UUID, CompiledSchemaForm]:
+        """Artefactos de varios schema_forms; los que faltan se leen en una sola consulta."""
+        from ..models.schema_forms import SchemaFormModel
+
+        found = {}
+        missing = []
+        with self._lock:
+            for schema_form_id in dict.fromkeys(schema_form_ids):
+                if schema_form_id is None:
+                    continue
+                compiled = self._entries.get(schema_form_id)
+                if compiled is not None:
+                    self._entries.move_to_end(schema_form_id)
+                    found[schema_form_id] = compiled
+                else:
+                    missing.append(schema_form_id)
+
+        if missing:
+            rows = db.query(SchemaFormModel.id, SchemaFormModel.schema).filter(
+                SchemaFormModel.id.in_(missing)
+            ).all()
+            compiled_rows = {row.id: compile_schema_form(row.id, row.schema) for row in rows}
+            with self._lock:
+                for schema_form_id, compiled in compiled_rows.items():
+                    # Si otro hilo lo compiló mientras tanto, conservar ese
+                    compiled = self._entries.setdefault(schema_form_id, compiled)
+                    self._entries.move_to_end(schema_form_id)
+                    found[schema_form_id] = compiled
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return found
+
+    def get(self, db: Session, schema_form_id: Optional[UUID]) -> Optional[CompiledSchemaForm]:
+        if schema_form_id is None:
+            return None
+        return self.get_many(db, [schema_form_id]).get(schema_form_id)
+
+    def invalidate(self, schema_form_id: Optional[UUID] = None) -> None:
+        """Descarta un artefacto (o todos). Solo hace falta si un schema_form se modifica fuera de la API."""
+        with self._lock:
+            if schema_form_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(schema_form_id, None)
+
+
+_cache = SchemaArtifactCache()
+
+
+def get_schema_artifact_cache() -> SchemaArtifactCache:
+    return _cache
+
+
+def get_compiled_schema_form(db: Session, schema_form_id: Optional[UUID]) -> Optional[CompiledSchemaForm]:
+    return _cache.get(db, schema_form_id)
+
+
+def get_compiled_schema_forms(db: Session, schema_form_ids: Iterable[UUID]) -> Dict[UUID, CompiledSchemaForm]:
+    return _cache.get_many(db, schema_form_ids)
+
+
+def copy_template_columns(columns: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copia de las columnas cacheadas (quien llama puede modificarlas)."""
+    return copy.deepcopy(columns)
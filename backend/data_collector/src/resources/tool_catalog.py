@@ -0,0 +1,251 @@
+"""
+Catálogo en memoria de action_tools.
+
+Las tools se leen una vez (de action_tools o, si la tabla está vacía o no existe, de
+los seeds tools.json) y se indexan por nombre y por config_form.gather.type_value.
+La tool que corresponde a cada type_value de atributo se resuelve una sola vez por
+catálogo, así que generar el schema de una entidad es O(atributos).
+
+El catálogo guarda un sello de versión (cantidad de tools y últimas fechas de
+creación y actualización). create_tool/update_tool lo invalidan en el proceso; los
+cambios hechos desde otro proceso se detectan comparando el sello cada
+TOOL_CATALOG_REFRESH_SECONDS segundos.
+
+Los diccionarios del catálogo se comparten entre llamadas: no deben modificarse.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..environment import TOOL_CATALOG_REFRESH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+SEEDS_VERSION = ("seeds",)
+
+# type_value del atributo -> config_form.gather.type_value buscado
+_GATHER_TYPE_BY_TYPE_VALUE = {
+    "text": "text",
+    "number": "number",
+    "date": "date",
+    "timestamp": "date",
+    "datetime": "date"
+}
+
+# Tool preferida (por nombre) para los type_value genéricos
+_PREFERRED_NAME_BY_TYPE_VALUE = {
+    "number": "Número",
+    "date": "Fecha",
+    "timestamp": "Fecha",
+    "datetime": "Fecha"
+}
+
+
+def _gather_type(tool: Dict[str, Any]) -> Optional[str]:
+    return ((tool.get("config_form") or {}).get("gather") or {}).get("type_value")
+
+
+@dataclass(frozen=True)
+class ToolCatalog:
+    """Tools disponibles indexadas por nombre y por gather.type_value."""
+    tools: Tuple[Dict[str, Any], ...]
+    version: Tuple
+    by_name: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    by_gather_type: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # type_value -> tool resuelta (o None), calculada una vez
+    _resolved: Dict[str, Optional[Dict[str, Any]]] = field(default_factory=dict, repr=False, compare=False)
+
+    @classmethod
+    def from_tools(cls, tools: List[Dict[str, Any]], version: Tuple = ()) -> "ToolCatalog":
+        by_name = {}
+        by_gather_type = {}
+        for tool in tools:
+            by_name.setdefault(tool.get("name"), tool)
+            gather_type = _gather_type(tool)
+            if gather_type:
+                by_gather_type.setdefault(gather_type, tool)
+        return cls(tools=tuple(tools), version=version, by_name=by_name, by_gather_type=by_gather_type)
+
+    def get_by_name(self, name: str) -> Optional[Dict[str, Any]]:
+        return self.by_name.get(name)
+
+    def find(self, type_value: str) -> Optional[Dict[str, Any]]:
+        """Tool apropiada para el type_value de un atributo (O(1) tras la primera vez)."""
+        if type_value not in self._resolved:
+            self._resolved[type_value] = self._resolve(type_value)
+        return self._resolved[type_value]
+
+    def _first_with_gather_type(self, *gather_types: str) -> Optional[Dict[str, Any]]:
+        """Primera tool (en orden del catálogo) con alguno de los gather.type_value."""
+        candidates = [self.by_gather_type[t] for t in gather_types if t in self.by_gather_type]
+        if not candidates:
+            return None
+        positions = {id(tool): index for index, tool in enumerate(self.tools)}
+        return min(candidates, key=lambda tool: positions[id(tool)])
+
+    def _resolve(self, type_value: str) -> Optional[Dict[str, Any]]:
+        # Caso especial: options (ENUMs) debe mapear a herramienta de selección
+        if type_value == "options":
+            tool = self._first_with_gather_type("option", "options")
+            if tool:
+                return tool
+
+        # Caso especial: entity debe mapear a "Entidades"
+        if type_value == "entity":
+            for tool in self.tools:
+                if (tool.get("name") or "").strip().lower() == "entidades":
+                    return tool
+            tool = self.by_gather_type.get("entity")
+            if tool:
+                return tool
+            for tool in self.tools:
+                text = f"{tool.get('name') or ''} {tool.get('description') or ''}".lower()
+                if "entidad" in text or "entity" in text:
+                    return tool
+
+        # Caso especial: boolean debe mapear a "Si/No"
+        if type_value == "boolean":
+            tool = self.by_name.get("Si/No") or self.by_gather_type.get("option")
+            if tool:
+                return tool
+
+        # Caso especial: text_long debe mapear a "Texto largo"
+        if type_value == "text_long":
+            tool = self.by_name.get("Texto largo") or self.by_gather_type.get("text")
+            if tool:
+                return tool
+
+        # Caso especial: text_short debe mapear a "Texto corto" o "Texto"
+        if type_value == "text_short":
+            tool = self.by_name.get("Texto corto") or self.by_name.get("Texto") or self.by_gather_type.get("text")
+            if tool:
+                return tool
+
+        target_type = _GATHER_TYPE_BY_TYPE_VALUE.get(type_value, "text")
+        preferred = self.by_name.get(_PREFERRED_NAME_BY_TYPE_VALUE.get(type_value))
+        if preferred is not None and _gather_type(preferred) == target_type:
+            return preferred
+        return self.by_gather_type.get(target_type) or self.by_gather_type.get("text")
+
+
+def _tool_to_dict(tool) -> Dict[str, Any]:
+    return {
+        "id": str(tool.id),
+        "name": tool.name,
+        "description": tool.description,
+        "place_holder": tool.place_holder,
+        "schema_input": tool.schema_input or [],
+        "schema_variables": tool.schema_variables or [],
+        "config_form": tool.config_form or {},
+        "on_action": tool.on_action
+    }
+
+
+def _seed_to_dict(tool: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": tool.get("id"),
+        "name": tool.get("name"),
+        "description": tool.get("description"),
+        "place_holder": tool.get("place_holder"),
+        "schema_input": tool.get("schema_input", []),
+        "schema_variables": tool.get("schema_variables", []),
+        "config_form": tool.get("config_form", {}),
+        "on_action": tool.get("on_action")
+    }
+
+
+def get_tools_stamp(db: Session) -> Tuple:
+    """Sello de versión de action_tools: (cantidad, max(created_at), max(updated_at))."""
+    from ..models.action_tools import ActionToolModel
+
+    row = db.query(
+        func.count(ActionToolModel.id),
+        func.max(ActionToolModel.created_at),
+        func.max(ActionToolModel.updated_at)
+    ).one()
+    return tuple(value.isoformat() if hasattr(value, "isoformat") else value for value in row)
+
+
+def _load_from_db(db: Session, stamp: Tuple) -> Optional[ToolCatalog]:
+    from ..models.action_tools import ActionToolModel
+
+    rows = db.query(ActionToolModel).filter(
+        ActionToolModel.disabled_at.is_(None)
+    ).order_by(ActionToolModel.created_at, ActionToolModel.id).all()
+    if not rows:
+        return None
+    return ToolCatalog.from_tools([_tool_to_dict(row) for row in rows], stamp)
+
+
+def _load_from_seeds(version: Tuple = SEEDS_VERSION) -> ToolCatalog:
+    from ...seeds.seeds import get_seeds
+
+    try:
+        tools_data = get_seeds().get("action_tools", [])
+    except Exception as e:
+        logger.error("Error obteniendo tools desde seeds (tools.json): %s", e, exc_info=True)
+        tools_data = []
+    return ToolCatalog.from_tools([_seed_to_dict(tool) for tool in tools_data], version)
+
+
+class ToolCatalogCache:
+    """Catálogo compartido del proceso con invalidación por sello de versión."""
+
+    def __init__(self, refresh_seconds: float = TOOL_CATALOG_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._catalog: Optional[ToolCatalog] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._catalog = None
+
+    def get(self, db: Optional[Session]) -> ToolCatalog:
+        catalog = self._catalog
+        if catalog is not None and time.monotonic() - self._checked_at < self.refresh_seconds:
+            return catalog
+
+        stamp = None
+        if isinstance(db, Session):
+            try:
+                stamp = get_tools_stamp(db)
+            except Exception as e:
+                # La tabla puede no existir aún: se usan los seeds
+                logger.warning("No se pudo leer action_tools: %s", e)
+                db.rollback()
+
+        with self._lock:
+            catalog = self._catalog
+            if catalog is None or (stamp is not None and catalog.version != stamp):
+                catalog = None
+                if stamp is not None:
+                    try:
+                        catalog = _load_from_db(db, stamp)
+                    except Exception as e:
+                        logger.warning("No se pudieron cargar las tools desde BD: %s", e)
+                        db.rollback()
+                if catalog is None:
+                    # Con el sello de la tabla (vacía) no se vuelven a leer los seeds hasta que cambie
+                    catalog = _load_from_seeds(stamp or SEEDS_VERSION)
+                self._catalog = catalog
+            self._checked_at = time.monotonic()
+            return catalog
+
+
+_cache = ToolCatalogCache()
+
+
+def get_tool_catalog(db: Optional[Session]) -> ToolCatalog:
+    """Catálogo de tools vigente (se recarga solo si cambió el sello de versión)."""
+    return _cache.get(db)
+
+
+def invalidate_tool_catalog() -> None:
+    """Descarta el catálogo del proceso (llamar al crear o modificar tools)."""
+    _cache.invalidate()
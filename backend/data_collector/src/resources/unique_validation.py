@@ -0,0 +1,235 @@
+"""
+Validación de campos únicos por lotes.
+
+Cada campo se resuelve con una sola consulta:
+- columna del modelo: valores de unnest(:values) con EXISTS columna = CAST(valor AS <tipo>)
+- atributo dinámico: valores de unnest(:values) con EXISTS entity_value->>'campo' = valor
+- registro complementario: core_register_values.value_text = ANY(:values)
+
+Los campos de entidad marcados is_unique en el schema tienen índices (ver
+unique_field_index_ddl); core_register_values está indexada por
+(form_id, field_name, value_text). La validación no recorre toda la tabla.
+"""
+import hashlib
+import json
+from datetime import date, datetime, time
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional, Sequence, Set
+from uuid import UUID
+
+from sqlalchemy import BigInteger, Boolean, Float, Numeric, SmallInteger, String, any_, bindparam, cast, exists, func
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
+from sqlalchemy.orm import Session
+
+from ..models.core_register_values import CoreRegisterValueModel
+
+
+def value_to_text(value: Any) -> str:
+    """Representación textual de un valor (la que devuelve ->> en JSONB)."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, UUID):
+        return str(value)
+    return json.dumps(value)
+
+
+def register_value_texts(value: Any) -> List[str]:
+    """
+    Textos con que core_register_values guarda un valor del detail (mismas reglas que
+    core_register_value_rows en la migración create_core_register_values): un objeto
+    (referencia a entidad) por su 'id', una lista por cada elemento y un escalar por su texto.
+    """
+    texts = []
+    for element in (value if isinstance(value, list) else [value]):
+        if isinstance(element, dict):
+            element = element.get("id")
+        if element is not None:
+            texts.append(value_to_text(element))
+    return texts
+
+
+def _text_values(values: Sequence[Any]) -> List[str]:
+    return list(dict.fromkeys(value_to_text(value) for value in values if value is not None))
+
+
+def _values_param(values: List[str]):
+    return bindparam("values", values, type_=ARRAY(String))
+
+
+_BOOL_TEXTS = {"t", "true", "y", "yes", "on", "1", "f", "false", "n", "no", "off", "0"}
+
+_PARSERS = {
+    int: int,
+    float: float,
+    Decimal: Decimal,
+    UUID: UUID,
+    datetime: datetime.fromisoformat,
+    date: date.fromisoformat,
+    time: time.fromisoformat,
+}
+
+
+def _is_castable(text_value: str, column_type) -> bool:
+    """
+    Indica si CAST(valor AS tipo de la columna) no fallará en PostgreSQL. Un valor que no
+    puede convertirse (p. ej. 'abc' en una columna numérica, UUID o fecha) no puede existir
+    en la columna, y enviarlo en el unnest haría fallar la consulta de todo el lote.
+    """
+    if isinstance(column_type, Boolean):
+        return text_value.strip().lower() in _BOOL_TEXTS
+    if isinstance(column_type, PG_UUID):
+        # Con as_uuid=False python_type es str, pero PostgreSQL igual valida el UUID
+        python_type = UUID
+    else:
+        try:
+            python_type = column_type.python_type
+        except NotImplementedError:
+            return True
+    parser = _PARSERS.get(python_type)
+    if parser is None:
+        return True
+    if python_type in (int, float, Decimal) and "_" in text_value:
+        # Python acepta separadores '_' en números; PostgreSQL no
+        return False
+    try:
+        parsed = parser(text_value.strip())
+    except (ValueError, TypeError, ArithmeticError):
+        return False
+    if python_type is int:
+        bits = 16 if isinstance(column_type, SmallInteger) else 64 if isinstance(column_type, BigInteger) else 32
+        return -2 ** (bits - 1) <= parsed < 2 ** (bits - 1)
+    if isinstance(column_type, Numeric) and not isinstance(column_type, Float) and column_type.precision is not None:
+        # numeric(p, s): la parte entera admite p - s dígitos
+        try:
+            return abs(Decimal(parsed)).to_integral_value() < Decimal(10) ** (column_type.precision - (column_type.scale or 0))
+        except InvalidOperation:
+            return False
+    return True
+
+
+def find_existing_entity_values(
+    db: Session,
+    model_class,
+    field_name: str,
+    values: Sequence[Any],
+    exclude_id: Optional[UUID] = None
+) -> Set[str]:
+    """
+    Devuelve los valores de entrada (como texto, ver value_to_text) que ya existen en la
+    entidad para el campo.
+
+    Se devuelven los valores tal como llegaron y no el texto que produce PostgreSQL para
+    la columna: la comparación es tipada (1.5 = 1.50, '2024-01-01T00:00:00' =
+    '2024-01-01 00:00:00', UUID sin importar mayúsculas), así que el texto almacenado
+    puede diferir del enviado. Los valores que no pueden convertirse al tipo de la columna
+    se consideran inexistentes.
+
+    Raises:
+        ValueError: Si el campo no es columna del modelo y no hay entity_value
+    """
+    text_values = _text_values(values)
+    column = model_class.__table__.columns.get(field_name)
+    if column is not None:
+        text_values = [text_value for text_value in text_values if _is_castable(text_value, column.type)]
+    if not text_values:
+        return set()
+
+    value = func.unnest(_values_param(text_values)).column_valued("value")
+    if column is not None:
+        condition = getattr(model_class, field_name) == cast(value, column.type)
+    elif hasattr(model_class, 'entity_value'):
+        condition = model_class.entity_value[field_name].astext == value
+    else:
+        raise ValueError(
+            f"El campo '{field_name}' no existe en la entidad '{model_class.__tablename__}' "
+            f"y no hay campo 'entity_value' para atributos dinámicos"
+        )
+
+    criteria = [condition, model_class.disabled_at.is_(None)]
+    if exclude_id:
+        criteria.append(model_class.id != exclude_id)
+    query = db.query(value).filter(exists().where(*criteria))
+    return {row[0] for row in query.distinct()}
+
+
+def find_existing_complementary_values(
+    db: Session,
+    form_id: UUID,
+    field_name: str,
+    values: Sequence[Any]
+) -> Set[str]:
+    """
+    Devuelve (como texto) los valores que ya existen en los registros del formulario para
+    el campo, según core_register_values: los objetos se comparan por su 'id' y las listas
+    por cada elemento (ver register_value_texts); un valor existe si alguno de sus textos
+    está en el resultado.
+    """
+    text_values = list(dict.fromkeys(
+        text for value in values if value is not None for text in register_value_texts(value)
+    ))
+    if not text_values:
+        return set()
+    query = db.query(CoreRegisterValueModel.value_text.label("value")).filter(
+        CoreRegisterValueModel.form_id == form_id,
+        CoreRegisterValueModel.field_name == field_name,
+        CoreRegisterValueModel.value_text == any_(_values_param(text_values))
+    )
+    return {row.value for row in query.distinct()}
+
+
+def get_unique_fields(schema: Optional[Dict[str, Any]]) -> List[str]:
+    """Nombres de campo marcados is_unique o is_logical_identifier en el schema_gather."""
+    if not schema or not isinstance(schema.get("instructions"), list):
+        return []
+    out = []
+    for instruction in schema["instructions"]:
+        schema_gather = instruction.get("schema_gather")
+        if schema_gather is None:
+            continue
+        gather_fields = schema_gather if isinstance(schema_gather, list) else [schema_gather]
+        for field in gather_fields:
+            if not isinstance(field, dict):
+                continue
+            if field.get("is_unique") is True or field.get("is_logical_identifier") is True:
+                name = field.get("name")
+                if name and name not in out:
+                    out.append(name)
+    return out
+
+
+def _quote_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _index_name(table_name: str, *parts: str) -> str:
+    digest = hashlib.md5("|".join(parts).encode("utf-8")).hexdigest()[:10]
+    return f"idx_{table_name[:30]}_uq_{digest}"
+
+
+def unique_field_index_ddl(model_class, field_name: str) -> Optional[str]:
+    """
+    Sentencia CREATE INDEX CONCURRENTLY para validar un campo único de una entidad sin
+    recorrer la tabla.
+
+    - columna del modelo: índice sobre la columna (None si ya es única o clave primaria)
+    - atributo dinámico: índice de expresión sobre entity_value->>'campo'
+
+    Ejecutar con create_index_concurrently (reconstruye los índices inválidos).
+    """
+    table = model_class.__table__
+    column = table.columns.get(field_name)
+    if column is not None:
+        from .model_registry import get_model_metadata
+        metadata = get_model_metadata(table.name)
+        if metadata is not None and metadata.columns[field_name].unique:
+            return None
+        expression = f'"{column.name}"'
+    elif hasattr(model_class, 'entity_value'):
+        expression = f"(entity_value->>{_quote_literal(field_name)})"
+    else:
+        return None
+    qualified_table = f"{table.schema}.{table.name}" if table.schema else table.name
+    return (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {_index_name(table.name, field_name)} "
+        f"ON {qualified_table} ({expression}) WHERE disabled_at IS NULL"
+    )
@@ -3,7 +3,6 @@ from fastapi.responses import StreamingResponse
 from starlette.requests import Request
 from typing import Optional, Dict, Any
 from uuid import UUID
-from io import BytesIO
 import jwt
 # Usar importación relativa para evitar problemas durante la inicialización del módulo
 from .schemas import (
@@ -11,12 +10,18 @@ from .schemas import (
     FormSchemaCreate,
     ActionToolCreate, ActionToolUpdate, ActionToolResponse, PaginatedActionToolResponse,
     CoreRegisterCreate, CoreRegisterUpdate, CoreRegisterResponse, PaginatedCoreRegisterResponse,
+    RegisterProjectionResponse,
+    CoreRegisterBatchCreate, CoreRegisterBatchResponse,
     ReferencableEntityResponse, PaginatedReferencableEntityResponse,
     PaginatedEntityListItemResponse,
     PaginatedEntityDataResponse,
-    UniqueFieldValidationRequest, UniqueFieldValidationResponse, UniqueFieldComplementaryValidationRequest, UniqueFieldComplementaryValidationResponse
+    EntityTypeaheadResponse,
+    UniqueFieldValidationRequest, UniqueFieldValidationResponse, UniqueFieldComplementaryValidationRequest, UniqueFieldComplementaryValidationResponse,
+    UniqueFieldBatchValidationRequest, UniqueFieldBatchValidationResponse
 )
 
+from .resources.http_cache import conditional_json_response
+
 router = APIRouter(
     prefix="/data-collector",
     tags=["Data Collector"]
@@ -61,6 +66,7 @@ def get_identity_from_token(request: Request) -> Optional[UUID]:
 # Form routes
 @router.get("/forms", response_model=PaginatedFormResponse)
 def get_forms(
+    request: Request,
     page: int = Query(1, ge=1, description="Número de página"),
     per_page: int = Query(10, ge=1, le=100, description="Elementos por página"),
     sort_by: Optional[str] = Query(None, description="Campo por el cual ordenar"),
@@ -68,8 +74,20 @@ def get_forms(
     search: str = Query("", description="Texto de búsqueda"),
     svc=Depends(get_funcionalities)
 ):
-    """Lista todos los formularios paginados"""
-    return svc.get_forms(page=page, per_page=per_page, sort_by=sort_by, order=order, search=search)
+    """
+    Lista todos los formularios paginados.
+    
+    Responde con ETag; si el cliente envía If-None-Match con el mismo valor y no hubo
+    cambios en los formularios, responde 304 sin cuerpo.
+    """
+    return conditional_json_response(
+        request,
+        ("forms", page, per_page, sort_by, order, search),
+        svc.get_forms_version(),
+        lambda: svc.get_forms(
+            page=page, per_page=per_page, sort_by=sort_by, order=order, search=search
+        ).model_dump_json().encode("utf-8")
+    )
 
 @router.post("/forms", response_model=FormResponse, status_code=201)
 def create_form(form_data: FormCreate, svc=Depends(get_funcionalities)):
@@ -99,17 +117,27 @@ def update_form(
     return form
 
 @router.get("/forms/{form_id}", response_model=FormWithSchemaResponse)
-def get_form_by_id(form_id: UUID, svc=Depends(get_funcionalities)):
+def get_form_by_id(form_id: UUID, request: Request, svc=Depends(get_funcionalities)):
     """
     Obtiene un formulario por su ID incluyendo su schema.
     
     Busca el form por form_id, obtiene su schema_id, busca el schema_form
     y devuelve el form con el schema como atributo adicional.
+    
+    El ETag se deriva de schema_id y updated_at: con If-None-Match igual responde 304
+    sin cuerpo. El JSON de cada versión se serializa una sola vez.
     """
-    form_with_schema = svc.get_form_by_id(form_id)
-    if not form_with_schema:
+    version = svc.get_form_version(form_id)
+    if version is None:
         raise HTTPException(status_code=404, detail="Formulario no encontrado")
-    return form_with_schema
+    
+    def _serialize() -> bytes:
+        form_with_schema = svc.get_form_by_id(form_id)
+        if not form_with_schema:
+            raise HTTPException(status_code=404, detail="Formulario no encontrado")
+        return form_with_schema.model_dump_json().encode("utf-8")
+    
+    return conditional_json_response(request, ("form", str(form_id)), version, _serialize)
 
 @router.post("/forms/{form_id}/schema", response_model=FormWithSchemaResponse, status_code=201)
 def create_form_schema(
@@ -144,6 +172,7 @@ def archive_form(form_id: UUID, svc=Depends(get_funcionalities)):
 # Action Tool routes
 @router.get("/tools", response_model=PaginatedActionToolResponse)
 def get_tools(
+    request: Request,
     page: int = Query(1, ge=1, description="Número de página"),
     per_page: int = Query(10, ge=1, le=100, description="Elementos por página"),
     sort_by: Optional[str] = Query(None, description="Campo por el cual ordenar"),
@@ -151,8 +180,19 @@ def get_tools(
     search: str = Query("", description="Texto de búsqueda"),
     svc=Depends(get_funcionalities)
 ):
-    """Lista todas las tools paginadas"""
-    return svc.get_tools(page=page, per_page=per_page, sort_by=sort_by, order=order, search=search)
+    """
+    Lista todas las tools paginadas.
+    
+    Responde con ETag; con If-None-Match igual y sin cambios en las tools responde 304.
+    """
+    return conditional_json_response(
+        request,
+        ("tools", page, per_page, sort_by, order, search),
+        svc.get_tools_version(),
+        lambda: svc.get_tools(
+            page=page, per_page=per_page, sort_by=sort_by, order=order, search=search
+        ).model_dump_json().encode("utf-8")
+    )
 
 @router.post("/tools", response_model=ActionToolResponse, status_code=201)
 def create_tool(tool_data: ActionToolCreate, svc=Depends(get_funcionalities)):
@@ -185,35 +225,54 @@ def get_registers_by_form(
     search: str = Query("", description="Texto de búsqueda"),
     start_date: Optional[str] = Query(None, description="Fecha inicio (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="Fecha fin (YYYY-MM-DD)"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (next_cursor); reemplaza a page"),
+    count: str = Query("exact", description="Conteo del total: exact, estimated o none"),
+    filters: Optional[str] = Query(None, description="Filtros por respuesta separados por coma (ej: 'certificacion=organic,area>2')"),
     svc=Depends(get_funcionalities)
 ):
     """
     Lista todos los registros de un formulario paginados
     
     **Filtros disponibles:**
-    - `search`: Búsqueda en el campo detail (JSONB)
+    - `search`: Búsqueda de texto en los valores del detail (sin distinguir tildes ni mayúsculas); sin `sort_by` los resultados se ordenan por relevancia
     - `start_date`: Filtro por fecha de creación desde (formato: YYYY-MM-DD)
     - `end_date`: Filtro por fecha de creación hasta (formato: YYYY-MM-DD)
+    - `filters`: Condiciones sobre las respuestas del formulario, separadas por coma:
+      `campo=valor`, `campo=v1|v2` (uno de la lista), `campo!=valor` y rangos
+      `campo>valor`, `>=`, `<`, `<=` (numéricos, de fecha YYYY-MM-DD o de texto)
     - `sort_by`: Campo para ordenar
     - `order`: Orden ascendente (asc) o descendente (desc)
     
     Si no se envían las fechas, no se aplica el filtro de fecha.
+    
+    **Paginación:**
+    - `page`/`per_page`: paginación por número de página
+    - `cursor`: paginación por cursor (costo constante en páginas profundas); usar el
+      `next_cursor` de la respuesta anterior con el mismo `sort_by`/`order`
+    - `count`: `exact` (COUNT), `estimated` (estimación del planner) o `none` (total = null)
     """
-    return svc.get_registers_by_form(
-        form_id=form_id, 
-        page=page, 
-        per_page=per_page, 
-        sort_by=sort_by, 
-        order=order, 
-        search=search,
-        start_date=start_date,
-        end_date=end_date
-    )
+    try:
+        return svc.get_registers_by_form(
+            form_id=form_id, 
+            page=page, 
+            per_page=per_page, 
+            sort_by=sort_by, 
+            order=order, 
+            search=search,
+            start_date=start_date,
+            end_date=end_date,
+            cursor=cursor,
+            count=count,
+            filters=filters
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/registers", response_model=CoreRegisterResponse, status_code=201)
 def create_register(
     request: Request,
     register_data: CoreRegisterCreate,
+    async_projection: bool = Query(False, description="Proyectar a la entidad en segundo plano (responde con status=partial)"),
     svc=Depends(get_funcionalities)
 ):
     """
@@ -238,6 +297,8 @@ def create_register(
     Las entidades se detectan automáticamente por su estructura (presencia de campos 'id' y 'display_name').
     
     Si el formulario tiene `form_purpose=ENTITY`, también guarda los datos en la tabla correspondiente.
+    Con `async_projection=true` el registro se guarda con `status=partial` y la entidad se crea en
+    segundo plano; el resultado se consulta en `GET /registers/{register_id}/projection`.
     
     **Autenticación**: El `identity_id` se obtiene automáticamente del token de autenticación.
     No es necesario enviarlo en el body de la petición.
@@ -253,10 +314,52 @@ def create_register(
         else:
             print("⚠️  No se pudo obtener identity_id del token")
         
-        return svc.create_register(register_data)
+        return svc.create_register(register_data, async_projection=async_projection)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/registers/batch", response_model=CoreRegisterBatchResponse)
+def create_registers_batch(
+    request: Request,
+    batch: CoreRegisterBatchCreate,
+    svc=Depends(get_funcionalities)
+):
+    """
+    Crea varios registros (de uno o más formularios) en una sola petición.
+    
+    Pensado para la sincronización de dispositivos que capturan registros offline:
+    - Cada registro tiene la misma estructura que `POST /registers` y opcionalmente un
+      `idempotency_key`; reenviar un lote con las mismas claves no duplica registros
+      (se informan como `duplicate` con el registro existente)
+    - La respuesta trae un resultado por registro (`created`, `duplicate` o `error`) en el
+      orden recibido; un error en un registro no impide guardar los demás
+    - Con `async_projection=true` las entidades de formularios ENTITY se crean en segundo plano
+    
+    **Autenticación**: El `identity_id` se obtiene del token de autenticación.
+    """
+    try:
+        identity_id = get_identity_from_token(request)
+        return svc.create_registers_batch(batch, identity_sub=identity_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/registers/{register_id}/projection", response_model=RegisterProjectionResponse)
+def get_register_projection(
+    register_id: UUID,
+    svc=Depends(get_funcionalities)
+):
+    """
+    Consulta el resultado de la proyección de un registro a su entidad.
+    
+    - `status=partial` y `pending=true`: la proyección sigue en cola
+    - `status=success`: `entity_id` contiene el id de la entidad creada/actualizada
+    - `status=failed`: `error` contiene el motivo
+    """
+    try:
+        return svc.get_register_projection(register_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
 @router.get("/forms/{form_id}/registers/export/excel")
 def export_registers_to_excel(
     form_id: UUID,
@@ -278,8 +381,11 @@ def export_registers_to_excel(
     El límite se valida por el tamaño real del archivo generado, no por cantidad de registros.
     Esto asegura que formularios con muchos campos no generen archivos excesivamente grandes.
     
+    Los registros se leen por bloques y el Excel se genera en modo write-only, por lo que
+    el consumo de memoria no depende de la cantidad de registros exportados.
+    
     **Filtros disponibles:**
-    - `search`: Búsqueda en el campo detail (JSONB)
+    - `search`: Búsqueda de texto en los valores del detail (sin distinguir tildes ni mayúsculas)
     - `start_date`: Filtro por fecha de creación desde (formato: YYYY-MM-DD)
     - `end_date`: Filtro por fecha de creación hasta (formato: YYYY-MM-DD)
     - `sort_by`: Campo para ordenar
@@ -294,12 +400,12 @@ def export_registers_to_excel(
     **Recomendación:** Use filtros de fecha para exportaciones grandes.
     
     El archivo Excel incluye:
-    - Hoja "Registros": Datos con columnas fijas + columnas dinámicas del detail
+    - Hoja "Registros": Datos con columnas fijas + columnas dinámicas del detail (según las instructions del schema)
     - Hoja "Información": Metadatos de la exportación
     - Columna "Usuario Registro": Username obtenido desde el módulo auth
     """
     try:
-        excel_bytes, filename = svc.export_core_registers_to_excel(
+        excel_chunks, filename = svc.export_core_registers_to_excel(
             form_id=form_id,
             sort_by=sort_by,
             order=order,
@@ -309,12 +415,9 @@ def export_registers_to_excel(
             max_file_size_mb=max_file_size_mb
         )
         
-        # Crear un nuevo BytesIO con los bytes y asegurarse de que esté en la posición correcta
-        output_buffer = BytesIO(excel_bytes)
-        output_buffer.seek(0)
-        
+        # El archivo se envía por bloques desde el archivo temporal generado
         return StreamingResponse(
-            output_buffer,
+            excel_chunks,
             media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             headers={
                 "Content-Disposition": f'attachment; filename="{filename}"',
@@ -396,6 +499,33 @@ def get_entity_data(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener datos: {str(e)}")
 
+@router.get("/entities/{entity_name}/typeahead", response_model=EntityTypeaheadResponse)
+def typeahead_entity_data(
+    entity_name: str,
+    q: str = Query("", description="Texto escrito por el usuario"),
+    limit: int = Query(10, ge=1, description="Cantidad máxima de resultados (tope DATA_COLLECTOR_TYPEAHEAD_MAX_LIMIT)"),
+    representative_value: Optional[str] = Query(None, description="Template para generar el campo 'name' (ej: '{{first_name}} {{dni}}')"),
+    filter: Optional[str] = Query(None, description="Filtro(s) con el mismo formato que /entities/{entity_name}/data"),
+    svc=Depends(get_funcionalities)
+):
+    """
+    Typeahead para los selectores de entidades: devuelve los K mejores resultados
+    por prefijo y similitud de trigramas sobre el valor representativo, sin total.
+    Pensado para llamarse en cada pulsación; para listados paginados usar /data.
+    """
+    try:
+        return svc.typeahead_entity_data(
+            entity_name=entity_name,
+            q=q,
+            limit=limit,
+            representative_value=representative_value,
+            filter=filter
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener datos: {str(e)}")
+
 @router.get("/entities/{entity_id}/mentions", response_model=PaginatedCoreRegisterResponse)
 def get_registers_by_entity_mention(
     entity_id: UUID,
@@ -518,3 +648,35 @@ def validate_unique_field_complementary(
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/validate-unique-fields/batch", response_model=UniqueFieldBatchValidationResponse)
+def validate_unique_fields_batch(
+    validation_data: UniqueFieldBatchValidationRequest,
+    svc=Depends(get_funcionalities)
+):
+    """
+    Valida varios campos únicos con varios valores cada uno en una sola llamada.
+    
+    Con entity_name valida contra la entidad (columna o entity_value); con form_id,
+    contra los registros complementarios del formulario. Cada campo se resuelve con
+    una sola consulta.
+    
+    Ejemplo:
+        POST /data-collector/validate-unique-fields/batch
+        {
+            "entity_name": "farmers",
+            "fields": {"dni": ["12345678", "87654321"]}
+        }
+        
+        Response:
+        {
+            "existing": {"dni": ["12345678"]},
+            "duplicated": {"dni": []}
+        }
+    """
+    try:
+        return svc.validate_unique_fields_batch(validation_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
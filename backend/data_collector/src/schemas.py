@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any, Generic, TypeVar, Union
 from typing_extensions import TypedDict
 from datetime import datetime
@@ -52,8 +52,9 @@ DetailArray = List[DetailItem]
 class PaginationsBase(BaseModel, Generic[DataT]):
     page: int = 1
     per_page: int = 10
-    total: int
+    total: Optional[int]  # None cuando count=none
     items: List[DataT] = []
+    next_cursor: Optional[str] = None  # Cursor para pedir la página siguiente (None si no hay más)
 
 # Form Schemas
 class FormCreate(BaseModel):
@@ -254,6 +255,45 @@ class CoreRegisterResponse(BaseModel):
 class PaginatedCoreRegisterResponse(PaginationsBase[CoreRegisterResponse]):
     pass
 
+# Carga de registros por lotes (sincronización offline)
+MAX_BATCH_REGISTERS = 500
+
+class CoreRegisterBatchItem(CoreRegisterCreate):
+    """Registro de un lote; idempotency_key permite reintentar el envío sin duplicar"""
+    idempotency_key: Optional[str] = Field(None, max_length=255)
+
+class CoreRegisterBatchCreate(BaseModel):
+    """Lote de registros de uno o más formularios"""
+    registers: List[CoreRegisterBatchItem] = Field(..., min_length=1, max_length=MAX_BATCH_REGISTERS)
+    async_projection: bool = False  # Proyectar las entidades en segundo plano (status=partial)
+
+class CoreRegisterBatchItemResult(BaseModel):
+    """Resultado de un registro del lote"""
+    index: int  # Posición del registro en el lote
+    idempotency_key: Optional[str] = None
+    result: str  # created | duplicate | error
+    register_id: Optional[UUID] = None
+    status: Optional[RegisterStatus] = None  # Status del registro (success, failed, partial)
+    entity_id: Optional[UUID] = None
+    error: Optional[Dict[str, Any]] = None
+
+class CoreRegisterBatchResponse(BaseModel):
+    """Resultado de la carga por lotes"""
+    results: List[CoreRegisterBatchItemResult]
+    created: int
+    duplicated: int
+    errors: int
+
+class RegisterProjectionResponse(BaseModel):
+    """Estado de la proyección de un registro a su entidad"""
+    register_id: UUID
+    status: RegisterStatus
+    pending: bool = False  # True mientras el trabajo de proyección asíncrona está en cola
+    entity_name: Optional[str] = None
+    entity_id: Optional[UUID] = None
+    error: Optional[Dict[str, Any]] = None
+    attempts: int = 0
+
 # Referencable Entity Schemas
 class ReferencableEntityResponse(BaseModel):
     id: UUID
@@ -298,6 +338,10 @@ class EntityDataItemResponse(BaseModel):
 class PaginatedEntityDataResponse(PaginationsBase[EntityDataItemResponse]):
     pass
 
+class EntityTypeaheadResponse(BaseModel):
+    """Top-K de datos de una entidad para typeahead (sin total)"""
+    items: List[EntityDataItemResponse]
+
 # Schema Form Request (para crear/actualizar schema de un form)
 class FormSchemaCreate(BaseModel):
     """Schema para crear/actualizar el schema de un formulario"""
@@ -340,3 +384,30 @@ class UniqueFieldComplementaryValidationRequest(BaseModel):
 class UniqueFieldComplementaryValidationResponse(BaseModel):
     """Respuesta de validación de campo único en registro complementario"""
     exist: bool  # True si el valor ya existe, False si no existe
+
+# Unique Field Batch Validation Schemas
+MAX_UNIQUE_VALIDATION_VALUES = 5000
+
+class UniqueFieldBatchValidationRequest(BaseModel):
+    """
+    Request para validar varios campos únicos con varios valores cada uno.
+    Indicar entity_name (entidad) o form_id (registro complementario), no ambos.
+    """
+    entity_name: Optional[str] = None  # Nombre de la entidad (ej: "farmers")
+    form_id: Optional[UUID] = None  # Formulario del registro complementario
+    fields: Dict[str, List[Any]]  # Campo -> valores a validar (ej: {"dni": ["123", "456"]})
+    entity_exclude_id: Optional[UUID] = None  # ID de la entidad a excluir (solo con entity_name)
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "entity_name": "farmers",
+                "fields": {"dni": ["12345678", "87654321"], "email": ["a@b.com"]},
+                "entity_exclude_id": None
+            }
+        }
+
+class UniqueFieldBatchValidationResponse(BaseModel):
+    """Respuesta de validación por lotes: valores ya existentes y repetidos dentro del lote, por campo"""
+    existing: Dict[str, List[Any]]  # Campo -> valores que ya existen
+    duplicated: Dict[str, List[Any]]  # Campo -> valores repetidos en el propio request
@@ -0,0 +1,54 @@
+"""
+Validación de campos únicos complementarios: los valores candidatos se normalizan como
+los guarda core_register_values (referencia a entidad por su 'id', listas por elemento),
+así que una referencia ya usada se informa como existente.
+"""
+import uuid
+
+import pytest
+
+unique_validation = pytest.importorskip("modules.data_collector.src.resources.unique_validation")
+functionalities = pytest.importorskip("modules.data_collector.src.functionalities")
+from modules.data_collector.src.schemas import UniqueFieldBatchValidationRequest
+
+register_value_texts = unique_validation.register_value_texts
+
+ENTITY_ID = "0b6a6c1e-3f0e-4c55-9a43-2f1d7a5c9e10"
+
+
+def test_entity_reference_is_normalized_to_its_id():
+    assert register_value_texts({"id": ENTITY_ID, "display_name": "Finca Norte"}) == [ENTITY_ID]
+
+
+def test_list_is_expanded_into_its_elements():
+    assert register_value_texts(["organic", {"id": ENTITY_ID}, 2]) == ["organic", ENTITY_ID, "2"]
+
+
+def test_scalars_keep_their_text():
+    assert register_value_texts("abc") == ["abc"]
+    assert register_value_texts(True) == ["true"]
+
+
+def test_batch_reports_existing_entity_reference(monkeypatch):
+    queried = {}
+
+    def fake_find(db, form_id, field_name, values):
+        queried["texts"] = [text for value in values for text in register_value_texts(value)]
+        return {ENTITY_ID}
+
+    monkeypatch.setattr(functionalities, "find_existing_complementary_values", fake_find)
+    svc = functionalities.Funcionalities.__new__(functionalities.Funcionalities)
+    monkeypatch.setattr(svc, "_get_db", lambda: None, raising=False)
+
+    reference = {"id": ENTITY_ID, "display_name": "Finca Norte"}
+    same_reference = {"id": ENTITY_ID, "display_name": "Finca norte (editada)"}
+    other_reference = {"id": str(uuid.uuid4()), "display_name": "Otra"}
+    response = svc.validate_unique_fields_batch(UniqueFieldBatchValidationRequest(
+        form_id=uuid.uuid4(),
+        fields={"finca": [reference, other_reference, same_reference]}
+    ))
+
+    assert ENTITY_ID in queried["texts"]
+    assert response.existing["finca"] == [reference, same_reference]
+    # Misma entidad aunque cambie display_name
+    assert response.duplicated["finca"] == [same_reference]
@@ -0,0 +1,66 @@
+"""
+GET /data-collector/forms/{form_id}/registers: la ruta pasa sus parámetros (incluido
+filters) a Funcionalities.get_registers_by_form, que debe aceptarlos.
+
+El servicio se reemplaza por uno que valida los argumentos contra la firma real y
+compila los filtros con register_value_conditions, sin base de datos.
+"""
+import inspect
+import uuid
+
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+routes = pytest.importorskip("modules.data_collector.src.routes")
+functionalities = pytest.importorskip("modules.data_collector.src.functionalities")
+from modules.data_collector.src.resources.register_values import register_value_conditions
+from modules.data_collector.src.schemas import PaginatedCoreRegisterResponse
+
+
+class _SignatureCheckingService:
+    def __init__(self):
+        self.calls = []
+
+    def get_registers_by_form(self, **kwargs):
+        # TypeError (-> 500) si la ruta envía un argumento que el servicio no declara
+        inspect.signature(functionalities.Funcionalities.get_registers_by_form).bind(self, **kwargs)
+        self.calls.append(kwargs)
+        register_value_conditions(kwargs["form_id"], kwargs.get("filters"))
+        return PaginatedCoreRegisterResponse(page=1, per_page=kwargs["per_page"], total=0, items=[])
+
+
+@pytest.fixture
+def client_and_service():
+    service = _SignatureCheckingService()
+    app = FastAPI()
+    app.include_router(routes.router)
+    app.dependency_overrides[routes.get_funcionalities] = lambda: service
+    return TestClient(app), service
+
+
+def test_registers_without_filters(client_and_service):
+    client, service = client_and_service
+    form_id = uuid.uuid4()
+
+    response = client.get(f"/data-collector/forms/{form_id}/registers")
+
+    assert response.status_code == 200
+    assert response.json()["total"] == 0
+    assert service.calls[0]["filters"] is None
+
+
+def test_registers_with_filters(client_and_service):
+    client, service = client_and_service
+    form_id = uuid.uuid4()
+
+    response = client.get(
+        f"/data-collector/forms/{form_id}/registers",
+        params={"filters": "certificacion=organic,area>2"}
+    )
+
+    assert response.status_code == 200
+    assert service.calls[0]["filters"] == "certificacion=organic,area>2"
+    assert len(register_value_conditions(form_id, service.calls[0]["filters"])) == 2
@@ -2,7 +2,7 @@
 from typing import Optional, List, Literal
 from uuid import UUID
 from sqlalchemy.orm import Session, aliased
-from sqlalchemy import func as sql_func, text, select, case, and_, or_, literal_column, cast, Text, exists
+from sqlalchemy import func as sql_func, text, select, case, and_, or_
 from .models.farmers import FarmerModel
 from .models.farm_plots import FarmPlotModel
 from .models.farms import FarmModel
@@ -12,8 +12,10 @@ from .models.plot_sections import PlotSectionModel
 from .models.plot_crops import PlotCropModel
 from modules.deforesting.src.models.deforestation_requests import DeforestationRequestModel, DeforestationRequestStatusEnum
 from modules.data_collector.src.models.core_registers import CoreRegisterModel
+from modules.data_collector.src.models.core_register_mentions import CoreRegisterMentionModel
 from modules.data_collector.src.models.forms import FormModel
 from modules.data_collector.src.schemas import CoreRegisterResponse, PaginatedCoreRegisterResponse, FormInfo
+from modules.data_collector.src.resources.pagination import paginate
 from modules.locations.src.models.countries import CountryModel
 from modules.locations.src.models.departments import DepartmentModel
 from modules.locations.src.models.provinces import ProvinceModel
@@ -65,7 +67,9 @@ class Funcionalities:
         sort_by: Optional[str] = None,
         order: Optional[str] = "asc",
         search: str = "",
-        status: Optional[Literal["activo", "inactivo"]] = None
+        status: Optional[Literal["activo", "inactivo"]] = None,
+        cursor: Optional[str] = None,
+        count: str = "exact"
     ) -> PaginatedResponse:
         """
         Obtiene farmers paginados usando SQLAlchemy ORM.
@@ -84,34 +88,24 @@ class Funcionalities:
         # CTE 1: farmer_visits - Calcula la iºltima fecha de visita para cada farmer
         # ============================================================================
         
-        # Subquery para verificar si el farmer esta en los detalles del registro
-        # detail es un ARRAY(JSONB) con estructura: [{"type_value": "entity", "value": {"id": "farmer-uuid", "display_name": "..."}}]
-        # Usamos unnest para iterar sobre el array, cada elemento ya es JSONB
-        detail_elem = sql_func.unnest(CoreRegisterModel.detail).alias("detail_elem")
-        farmer_in_detail = (
-            exists(
-                select(literal_column("1"))
-                .select_from(detail_elem)
-                .where(
-                    and_(
-                        literal_column("detail_elem->>'type_value'") == 'entity',
-                        literal_column("detail_elem->'value'->>'id'") == cast(FarmerModel.id, Text)
-                    )
-                )
-            )
-        )
-        
+        # Las menciones de entidades en core_registers.detail se indexan en
+        # core_register_mentions (entity_id, created_at), por lo que la ultima visita
+        # se resuelve con un join por indice en lugar de desempaquetar cada detail
         farmer_visits_cte = (
             select(
                 FarmerModel.id.label('farmer_id'),
                 sql_func.max(CoreRegisterModel.created_at).label('last_visit_date')
             )
             .select_from(FarmerModel)
+            .outerjoin(
+                CoreRegisterMentionModel,
+                CoreRegisterMentionModel.entity_id == FarmerModel.id
+            )
             .outerjoin(
                 CoreRegisterModel,
                 and_(
-                    CoreRegisterModel.disabled_at.is_(None),
-                    farmer_in_detail
+                    CoreRegisterModel.id == CoreRegisterMentionModel.register_id,
+                    CoreRegisterModel.disabled_at.is_(None)
                 )
             )
             .where(FarmerModel.disabled_at.is_(None))
@@ -199,46 +193,21 @@ class Funcionalities:
             filters.append(farmer_status_cte.c.status == status_value)
         
         # ============================================================================
-        # Query para contar total
+        # Construir ordenamiento (sort_column, id)
         # ============================================================================
         
-        count_query = select(sql_func.count()).select_from(farmer_status_cte)
-        if filters:
-            count_query = count_query.where(and_(*filters))
-        
-        total = db.execute(count_query).scalar() or 0
-        
-        # ============================================================================
-        # Construir ordenamiento
-        # ============================================================================
-        
-        order_by_clauses = []
-        if sort_by:
-            order_dir = 'desc' if order and order.lower() == "desc" else 'asc'
-            
-            if sort_by == "last_visit_date":
-                col = farmer_status_cte.c.last_visit_date
-                order_by_clauses.append(col.desc().nullslast() if order_dir == 'desc' else col.asc().nullslast())
-            elif sort_by == "status":
-                col = farmer_status_cte.c.status
-                order_by_clauses.append(col.desc() if order_dir == 'desc' else col.asc())
-            elif sort_by in ["first_name", "last_name", "dni", "code", "email", "created_at", "updated_at"]:
-                col = getattr(farmer_status_cte.c, sort_by)
-                order_by_clauses.append(col.desc() if order_dir == 'desc' else col.asc())
-            else:
-                order_by_clauses.append(farmer_status_cte.c.created_at.desc())
+        nulls_last = None
+        descending = bool(order and order.lower() == "desc")
+        if sort_by == "last_visit_date":
+            sort_column = farmer_status_cte.c.last_visit_date
+            nulls_last = True
+        elif sort_by in ["status", "first_name", "last_name", "dni", "code", "email", "created_at", "updated_at"]:
+            sort_column = getattr(farmer_status_cte.c, sort_by)
         else:
-            order_by_clauses.append(farmer_status_cte.c.created_at.desc())
+            sort_column, descending = farmer_status_cte.c.created_at, True
         
         # ============================================================================
-        # Calcular paginacion
-        # ============================================================================
-        
-        offset = (page - 1) * per_page
-        total_pages = (total + per_page - 1) // per_page if total > 0 else 0
-        
-        # ============================================================================
-        # Query principal con paginacion
+        # Query principal con paginacion (page/per_page o cursor)
         # ============================================================================
         
         main_query = select(farmer_status_cte).select_from(farmer_status_cte)
@@ -246,13 +215,21 @@ class Funcionalities:
         if filters:
             main_query = main_query.where(and_(*filters))
         
-        if order_by_clauses:
-            main_query = main_query.order_by(*order_by_clauses)
-        
-        main_query = main_query.limit(per_page).offset(offset)
-        
-        # Ejecutar query
-        results = db.execute(main_query).fetchall()
+        result_page = paginate(
+            main_query,
+            sort_column=sort_column,
+            id_column=farmer_status_cte.c.id,
+            descending=descending,
+            page=page,
+            per_page=per_page,
+            cursor=cursor,
+            count=count,
+            nulls_last=nulls_last,
+            db=db
+        )
+        results = result_page.items
+        total = result_page.total
+        total_pages = ((total + per_page - 1) // per_page if total > 0 else 0) if total is not None else None
         
         # Construir respuesta
         farmer_responses = []
@@ -319,7 +296,8 @@ class Funcionalities:
             total=total,
             page=page,
             page_size=per_page,
-            total_pages=total_pages
+            total_pages=total_pages,
+            next_cursor=result_page.next_cursor
         )
     
     def get_farmer_by_id(self, farmer_id: UUID) -> Optional[FarmerResponse]:
@@ -360,25 +338,14 @@ class Funcionalities:
         # Buscar la iºltima visita del farmer en core_registers usando ORM
         last_visit_date = None
         try:
-            detail_elem = sql_func.unnest(CoreRegisterModel.detail).alias("detail_elem")
-            farmer_in_detail_subq = (
-                exists(
-                    select(literal_column("1"))
-                    .select_from(detail_elem)
-                    .where(
-                        and_(
-                            literal_column("detail_elem->>'type_value'") == 'entity',
-                            literal_column("detail_elem->'value'->>'id'") == cast(farmer.id, Text)
-                        )
-                    )
-                )
-            )
-            
             result_visit = db.query(
                 sql_func.max(CoreRegisterModel.created_at)
+            ).join(
+                CoreRegisterMentionModel,
+                CoreRegisterMentionModel.register_id == CoreRegisterModel.id
             ).filter(
-                CoreRegisterModel.disabled_at.is_(None),
-                farmer_in_detail_subq
+                CoreRegisterMentionModel.entity_id == farmer.id,
+                CoreRegisterModel.disabled_at.is_(None)
             ).scalar()
             
             if result_visit:
@@ -48,6 +48,8 @@ def get_farmers(
     order: Optional[str] = Query("asc", description="Orden: 'asc' o 'desc'"),
     search: str = Query("", description="Texto de búsqueda"),
     status: Optional[str] = Query("todos", description="Filtro de estado: 'activos', 'inactivos' o 'todos'"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (next_cursor); reemplaza a page"),
+    count: str = Query("exact", description="Conteo del total: exact, estimated o none"),
     svc=Depends(get_funcionalities)
 ):
     """
@@ -62,7 +64,10 @@ def get_farmers(
     """
     # Si status es "todos", pasarlo como None para no aplicar filtro
     status_param = None if status == "todos" else status
-    return svc.get_farmers_paginated(page=page, per_page=per_page, sort_by=sort_by, order=order, search=search, status=status_param)
+    try:
+        return svc.get_farmers_paginated(page=page, per_page=per_page, sort_by=sort_by, order=order, search=search, status=status_param, cursor=cursor, count=count)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/{farmer_id}", response_model=FarmerResponse)
 def get_farmer(farmer_id: UUID, svc=Depends(get_funcionalities)):
@@ -82,10 +82,11 @@ class PaginationParams(BaseModel):
 
 class PaginatedResponse(BaseModel):
     items: list[FarmerResponse]
-    total: int
+    total: Optional[int]  # None cuando count=none
     page: int
     page_size: int
-    total_pages: int
+    total_pages: Optional[int]
+    next_cursor: Optional[str] = None
 
 # Plot Schemas
 class PlotResponse(BaseModel):
@@ -0,0 +1,31 @@
+"""add lot_dispatches lots_fingerprint
+
+Revision ID: d3e4f5a6b7c8
+Revises: c2d3e4f5a6b7
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd3e4f5a6b7c8'
+down_revision = 'c2d3e4f5a6b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    Agrega lot_dispatches.lots_fingerprint (sha256 de los ids de lotes ordenados y sin
+    repetir): un reintento con la misma clave de idempotencia pero otros lotes se rechaza.
+    Los despachos anteriores quedan con NULL y solo se comparan por centro de almacenamiento.
+    """
+    op.execute("ALTER TABLE IF EXISTS lot_dispatches ADD COLUMN IF NOT EXISTS lots_fingerprint VARCHAR(64);")
+
+
+def downgrade() -> None:
+    """
+    Elimina la columna lots_fingerprint.
+    """
+    op.execute("ALTER TABLE IF EXISTS lot_dispatches DROP COLUMN IF EXISTS lots_fingerprint;")
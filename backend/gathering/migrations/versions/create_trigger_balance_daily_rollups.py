@@ -0,0 +1,140 @@
+"""create trigger balance daily rollups
+
+Revision ID: c2d3e4f5a6b7
+Revises: b1c2d3e4f5a6
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c2d3e4f5a6b7'
+down_revision = 'b1c2d3e4f5a6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    Mantiene balance_daily_rollups (monto y número de balance_movements activos por día,
+    centro de acopio, acopiador y tipo de movimiento) con un trigger AFTER INSERT, UPDATE
+    y DELETE sobre balance_movements, igual que balance_snapshots. El día es la fecha de
+    created_at del movimiento.
+
+    Los resúmenes de gasto (get_gathering_summary, get_balance_gatherers_summary) leen
+    estos totales y siguen usando el mismo libro que antes (balance_movements).
+    Finalmente se calculan los totales de los movimientos existentes.
+    """
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS public.balance_daily_rollups (
+            id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+            day DATE NOT NULL,
+            gathering_center_id UUID NOT NULL REFERENCES public.gathering_centers(id),
+            gatherer_id UUID NULL REFERENCES public.gatherers(id),
+            type_movement balance_movement_type_enum NOT NULL,
+            amount NUMERIC(20, 2) NOT NULL DEFAULT 0,
+            movement_count INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT NOW()
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_balance_daily_rollups_bucket ON public.balance_daily_rollups
+            (day, gathering_center_id, COALESCE(gatherer_id, '00000000-0000-0000-0000-000000000000'::uuid), type_movement);
+        CREATE INDEX IF NOT EXISTS idx_balance_daily_rollups_center_day ON public.balance_daily_rollups (gathering_center_id, day);
+        CREATE INDEX IF NOT EXISTS idx_balance_daily_rollups_gatherer_day ON public.balance_daily_rollups (gatherer_id, day);
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION apply_balance_rollup_delta(
+            p_created_at TIMESTAMP,
+            p_gathering_center_id UUID,
+            p_gatherer_id UUID,
+            p_type_movement balance_movement_type_enum,
+            p_amount NUMERIC,
+            p_count INTEGER
+        )
+        RETURNS VOID AS $$
+        BEGIN
+            INSERT INTO balance_daily_rollups (day, gathering_center_id, gatherer_id, type_movement, amount, movement_count, updated_at)
+            VALUES (COALESCE(p_created_at, NOW())::date, p_gathering_center_id, p_gatherer_id, p_type_movement, p_amount, p_count, NOW())
+            ON CONFLICT (day, gathering_center_id, COALESCE(gatherer_id, '00000000-0000-0000-0000-000000000000'::uuid), type_movement)
+            DO UPDATE SET
+                amount = balance_daily_rollups.amount + EXCLUDED.amount,
+                movement_count = balance_daily_rollups.movement_count + EXCLUDED.movement_count,
+                updated_at = NOW();
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION update_balance_rollups_from_movement()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            -- Quitar el aporte anterior (UPDATE/DELETE de un movimiento activo)
+            IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.disabled_at IS NULL THEN
+                PERFORM apply_balance_rollup_delta(
+                    OLD.created_at,
+                    OLD.gathering_center_id,
+                    OLD.gatherer_id,
+                    OLD.type_movement,
+                    -OLD.ammount,
+                    -1
+                );
+            END IF;
+
+            -- Sumar el aporte nuevo (INSERT/UPDATE de un movimiento activo)
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.disabled_at IS NULL THEN
+                PERFORM apply_balance_rollup_delta(
+                    NEW.created_at,
+                    NEW.gathering_center_id,
+                    NEW.gatherer_id,
+                    NEW.type_movement,
+                    NEW.ammount,
+                    1
+                );
+            END IF;
+
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    op.execute("""
+        DROP TRIGGER IF EXISTS trigger_update_balance_rollups_from_movement ON balance_movements;
+
+        CREATE TRIGGER trigger_update_balance_rollups_from_movement
+        AFTER INSERT OR UPDATE OF ammount, type_movement, gathering_center_id, gatherer_id, created_at, disabled_at OR DELETE ON balance_movements
+        FOR EACH ROW
+        EXECUTE FUNCTION update_balance_rollups_from_movement();
+    """)
+
+    # Totales de los movimientos existentes
+    op.execute("""
+        INSERT INTO balance_daily_rollups (day, gathering_center_id, gatherer_id, type_movement, amount, movement_count, updated_at)
+        SELECT
+            created_at::date,
+            gathering_center_id,
+            gatherer_id,
+            type_movement,
+            SUM(ammount),
+            COUNT(*),
+            NOW()
+        FROM balance_movements
+        WHERE disabled_at IS NULL
+        GROUP BY created_at::date, gathering_center_id, gatherer_id, type_movement
+        ON CONFLICT (day, gathering_center_id, COALESCE(gatherer_id, '00000000-0000-0000-0000-000000000000'::uuid), type_movement)
+        DO UPDATE SET
+            amount = EXCLUDED.amount,
+            movement_count = EXCLUDED.movement_count,
+            updated_at = NOW();
+    """)
+
+
+def downgrade() -> None:
+    """
+    Elimina el trigger y las funciones PL/pgSQL de balance_daily_rollups (la tabla se conserva).
+    """
+    op.execute("DROP TRIGGER IF EXISTS trigger_update_balance_rollups_from_movement ON balance_movements;")
+
+    op.execute("DROP FUNCTION IF EXISTS update_balance_rollups_from_movement();")
+    op.execute("DROP FUNCTION IF EXISTS apply_balance_rollup_delta(TIMESTAMP, UUID, UUID, balance_movement_type_enum, NUMERIC, INTEGER);")
@@ -0,0 +1,143 @@
+"""create trigger balance snapshots
+
+Revision ID: s9t0u1v2w3x4
+Revises: p3q4r5s6t7u8
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 's9t0u1v2w3x4'
+down_revision = 'p3q4r5s6t7u8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    Mantiene balance_snapshots (saldo por centro de acopio y acopiador) con un trigger
+    AFTER INSERT, UPDATE (ammount, type_movement, centro, acopiador, disabled_at) y DELETE
+    sobre balance_movements. Las recargas suman y las compras restan.
+
+    El saldo se actualiza con INSERT ... ON CONFLICT DO UPDATE dentro de la misma
+    transacción que el movimiento: la fila del saldo queda bloqueada hasta el commit, así
+    las compras concurrentes de un mismo (centro, acopiador) se aplican en serie y el
+    saldo no pierde actualizaciones.
+    Finalmente se calculan los saldos de los movimientos existentes.
+    """
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS public.balance_snapshots (
+            id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+            gathering_center_id UUID NOT NULL REFERENCES public.gathering_centers(id),
+            gatherer_id UUID NULL REFERENCES public.gatherers(id),
+            balance NUMERIC(15, 2) NOT NULL DEFAULT 0,
+            movement_count INTEGER NOT NULL DEFAULT 0,
+            last_movement_at TIMESTAMP NULL,
+            updated_at TIMESTAMP DEFAULT NOW()
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_balance_snapshots_center_gatherer ON public.balance_snapshots
+            (gathering_center_id, COALESCE(gatherer_id, '00000000-0000-0000-0000-000000000000'::uuid));
+        CREATE INDEX IF NOT EXISTS idx_balance_snapshots_gatherer ON public.balance_snapshots (gatherer_id);
+    """)
+
+    # Movimientos de un centro/acopiador en el orden del resumen (created_at desc, id)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_bm_center_gatherer_created
+        ON public.balance_movements (gathering_center_id, gatherer_id, created_at, id);
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION apply_balance_snapshot_delta(
+            p_gathering_center_id UUID,
+            p_gatherer_id UUID,
+            p_amount NUMERIC,
+            p_count INTEGER,
+            p_movement_at TIMESTAMP
+        )
+        RETURNS VOID AS $$
+        BEGIN
+            INSERT INTO balance_snapshots (gathering_center_id, gatherer_id, balance, movement_count, last_movement_at, updated_at)
+            VALUES (p_gathering_center_id, p_gatherer_id, p_amount, p_count, p_movement_at, NOW())
+            ON CONFLICT (gathering_center_id, COALESCE(gatherer_id, '00000000-0000-0000-0000-000000000000'::uuid))
+            DO UPDATE SET
+                balance = balance_snapshots.balance + EXCLUDED.balance,
+                movement_count = balance_snapshots.movement_count + EXCLUDED.movement_count,
+                last_movement_at = GREATEST(balance_snapshots.last_movement_at, EXCLUDED.last_movement_at),
+                updated_at = NOW();
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION update_balance_snapshot_from_movement()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            -- Quitar el aporte anterior (UPDATE/DELETE de un movimiento activo)
+            IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.disabled_at IS NULL THEN
+                PERFORM apply_balance_snapshot_delta(
+                    OLD.gathering_center_id,
+                    OLD.gatherer_id,
+                    CASE WHEN OLD.type_movement = 'recharge' THEN -OLD.ammount ELSE OLD.ammount END,
+                    -1,
+                    NULL
+                );
+            END IF;
+
+            -- Sumar el aporte nuevo (INSERT/UPDATE de un movimiento activo)
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.disabled_at IS NULL THEN
+                PERFORM apply_balance_snapshot_delta(
+                    NEW.gathering_center_id,
+                    NEW.gatherer_id,
+                    CASE WHEN NEW.type_movement = 'recharge' THEN NEW.ammount ELSE -NEW.ammount END,
+                    1,
+                    COALESCE(NEW.created_at, NOW())
+                );
+            END IF;
+
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    op.execute("""
+        DROP TRIGGER IF EXISTS trigger_update_balance_snapshot_from_movement ON balance_movements;
+
+        CREATE TRIGGER trigger_update_balance_snapshot_from_movement
+        AFTER INSERT OR UPDATE OF ammount, type_movement, gathering_center_id, gatherer_id, disabled_at OR DELETE ON balance_movements
+        FOR EACH ROW
+        EXECUTE FUNCTION update_balance_snapshot_from_movement();
+    """)
+
+    # Saldos de los movimientos existentes
+    op.execute("""
+        INSERT INTO balance_snapshots (gathering_center_id, gatherer_id, balance, movement_count, last_movement_at, updated_at)
+        SELECT
+            gathering_center_id,
+            gatherer_id,
+            COALESCE(SUM(CASE WHEN type_movement = 'recharge' THEN ammount ELSE -ammount END), 0),
+            COUNT(*),
+            MAX(created_at),
+            NOW()
+        FROM balance_movements
+        WHERE disabled_at IS NULL
+        GROUP BY gathering_center_id, gatherer_id
+        ON CONFLICT (gathering_center_id, COALESCE(gatherer_id, '00000000-0000-0000-0000-000000000000'::uuid))
+        DO UPDATE SET
+            balance = EXCLUDED.balance,
+            movement_count = EXCLUDED.movement_count,
+            last_movement_at = EXCLUDED.last_movement_at,
+            updated_at = NOW();
+    """)
+
+
+def downgrade() -> None:
+    """
+    Elimina el trigger y las funciones PL/pgSQL de balance_snapshots (la tabla se conserva).
+    """
+    op.execute("DROP TRIGGER IF EXISTS trigger_update_balance_snapshot_from_movement ON balance_movements;")
+
+    op.execute("DROP FUNCTION IF EXISTS update_balance_snapshot_from_movement();")
+    op.execute("DROP FUNCTION IF EXISTS apply_balance_snapshot_delta(UUID, UUID, NUMERIC, INTEGER, TIMESTAMP);")
@@ -0,0 +1,152 @@
+"""create trigger lot aggregates
+
+Revision ID: p3q4r5s6t7u8
+Revises: m7n8o9p0q1r2
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'p3q4r5s6t7u8'
+down_revision = 'm7n8o9p0q1r2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    Mantiene lot_aggregates (fresh_weight, cost y purchase_count por lote) con triggers:
+    - purchases: AFTER INSERT, UPDATE (lot_id, quantity, price, disabled_at) y DELETE.
+      Se resta el aporte de la fila anterior si estaba activa y se suma el de la nueva si
+      lo está, así cubre altas, cambios, cambio de lote, deshabilitado y restauración.
+    - lots: AFTER INSERT crea la fila en cero, para que todo lote tenga sus totales.
+    Finalmente se calculan los totales de los datos existentes.
+    """
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS public.lot_aggregates (
+            lot_id UUID PRIMARY KEY REFERENCES public.lots(id) ON DELETE CASCADE,
+            fresh_weight NUMERIC(15, 2) NOT NULL DEFAULT 0,
+            cost NUMERIC(20, 4) NOT NULL DEFAULT 0,
+            purchase_count INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT NOW()
+        );
+        CREATE INDEX IF NOT EXISTS idx_lot_aggregates_fresh_weight ON public.lot_aggregates (fresh_weight, lot_id);
+        CREATE INDEX IF NOT EXISTS idx_lot_aggregates_cost ON public.lot_aggregates (cost, lot_id);
+    """)
+
+    # Suma (o resta) el aporte de una compra a los totales de su lote
+    op.execute("""
+        CREATE OR REPLACE FUNCTION apply_lot_aggregate_delta(
+            p_lot_id UUID,
+            p_quantity NUMERIC,
+            p_cost NUMERIC,
+            p_count INTEGER
+        )
+        RETURNS VOID AS $$
+        BEGIN
+            IF p_lot_id IS NULL THEN
+                RETURN;
+            END IF;
+
+            INSERT INTO lot_aggregates (lot_id, fresh_weight, cost, purchase_count, updated_at)
+            VALUES (p_lot_id, p_quantity, p_cost, p_count, NOW())
+            ON CONFLICT (lot_id) DO UPDATE SET
+                fresh_weight = lot_aggregates.fresh_weight + EXCLUDED.fresh_weight,
+                cost = lot_aggregates.cost + EXCLUDED.cost,
+                purchase_count = lot_aggregates.purchase_count + EXCLUDED.purchase_count,
+                updated_at = NOW();
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION update_lot_aggregates_from_purchase()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            -- Quitar el aporte anterior (UPDATE/DELETE de una compra activa)
+            IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.disabled_at IS NULL THEN
+                PERFORM apply_lot_aggregate_delta(
+                    OLD.lot_id,
+                    -COALESCE(OLD.quantity, 0),
+                    -COALESCE(OLD.quantity * OLD.price, 0),
+                    -1
+                );
+            END IF;
+
+            -- Sumar el aporte nuevo (INSERT/UPDATE de una compra activa)
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.disabled_at IS NULL THEN
+                PERFORM apply_lot_aggregate_delta(
+                    NEW.lot_id,
+                    COALESCE(NEW.quantity, 0),
+                    COALESCE(NEW.quantity * NEW.price, 0),
+                    1
+                );
+            END IF;
+
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    op.execute("""
+        DROP TRIGGER IF EXISTS trigger_update_lot_aggregates_from_purchase ON purchases;
+
+        CREATE TRIGGER trigger_update_lot_aggregates_from_purchase
+        AFTER INSERT OR UPDATE OF lot_id, quantity, price, disabled_at OR DELETE ON purchases
+        FOR EACH ROW
+        EXECUTE FUNCTION update_lot_aggregates_from_purchase();
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION create_lot_aggregate_from_lot()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            INSERT INTO lot_aggregates (lot_id) VALUES (NEW.id)
+            ON CONFLICT (lot_id) DO NOTHING;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    op.execute("""
+        DROP TRIGGER IF EXISTS trigger_create_lot_aggregate_from_lot ON lots;
+
+        CREATE TRIGGER trigger_create_lot_aggregate_from_lot
+        AFTER INSERT ON lots
+        FOR EACH ROW
+        EXECUTE FUNCTION create_lot_aggregate_from_lot();
+    """)
+
+    # Totales de los datos existentes
+    op.execute("""
+        INSERT INTO lot_aggregates (lot_id, fresh_weight, cost, purchase_count, updated_at)
+        SELECT
+            l.id,
+            COALESCE(SUM(p.quantity), 0),
+            COALESCE(SUM(p.quantity * p.price), 0),
+            COUNT(p.id),
+            NOW()
+        FROM lots l
+        LEFT JOIN purchases p ON p.lot_id = l.id AND p.disabled_at IS NULL
+        GROUP BY l.id
+        ON CONFLICT (lot_id) DO UPDATE SET
+            fresh_weight = EXCLUDED.fresh_weight,
+            cost = EXCLUDED.cost,
+            purchase_count = EXCLUDED.purchase_count,
+            updated_at = NOW();
+    """)
+
+
+def downgrade() -> None:
+    """
+    Elimina los triggers y funciones PL/pgSQL de lot_aggregates (la tabla se conserva).
+    """
+    op.execute("DROP TRIGGER IF EXISTS trigger_update_lot_aggregates_from_purchase ON purchases;")
+    op.execute("DROP TRIGGER IF EXISTS trigger_create_lot_aggregate_from_lot ON lots;")
+
+    op.execute("DROP FUNCTION IF EXISTS update_lot_aggregates_from_purchase();")
+    op.execute("DROP FUNCTION IF EXISTS create_lot_aggregate_from_lot();")
+    op.execute("DROP FUNCTION IF EXISTS apply_lot_aggregate_delta(UUID, NUMERIC, NUMERIC, INTEGER);")
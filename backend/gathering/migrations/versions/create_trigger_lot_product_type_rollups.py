@@ -0,0 +1,75 @@
+"""create trigger lot product type rollups
+
+Revision ID: b1c2d3e4f5a6
+Revises: v5w6x7y8z9a0
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b1c2d3e4f5a6'
+down_revision = 'v5w6x7y8z9a0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    purchase_daily_rollups agrupa las compras por el product_type del lote. Al cambiar
+    el product_type de un lote (update_lot), este trigger mueve el aporte de sus compras
+    activas del tipo anterior al nuevo, para que el tipo anterior no quede inflado y los
+    cambios posteriores de esas compras no dejen el tipo nuevo en negativo.
+    """
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION move_purchase_rollups_on_product_type()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            INSERT INTO purchase_daily_rollups (day, gathering_center_id, gatherer_id, product_type, amount, quantity, purchase_count, updated_at)
+            SELECT
+                p.created_at::date,
+                p.gathering_center_id,
+                p.gatherer_id,
+                t.product_type,
+                t.sign * SUM(ROUND(p.quantity * p.price, 2)),
+                t.sign * SUM(p.quantity),
+                t.sign * COUNT(*),
+                NOW()
+            FROM purchases p
+            CROSS JOIN (VALUES (OLD.product_type, -1), (NEW.product_type, 1)) AS t(product_type, sign)
+            WHERE p.lot_id = NEW.id
+              AND p.disabled_at IS NULL
+              AND p.gathering_center_id IS NOT NULL
+              AND p.gatherer_id IS NOT NULL
+            GROUP BY p.created_at::date, p.gathering_center_id, p.gatherer_id, t.product_type, t.sign
+            ON CONFLICT (day, gathering_center_id, gatherer_id, product_type) DO UPDATE SET
+                amount = purchase_daily_rollups.amount + EXCLUDED.amount,
+                quantity = purchase_daily_rollups.quantity + EXCLUDED.quantity,
+                purchase_count = purchase_daily_rollups.purchase_count + EXCLUDED.purchase_count,
+                updated_at = NOW();
+
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    op.execute("""
+        DROP TRIGGER IF EXISTS trigger_move_purchase_rollups_on_product_type ON lots;
+
+        CREATE TRIGGER trigger_move_purchase_rollups_on_product_type
+        AFTER UPDATE OF product_type ON lots
+        FOR EACH ROW
+        WHEN (OLD.product_type IS DISTINCT FROM NEW.product_type)
+        EXECUTE FUNCTION move_purchase_rollups_on_product_type();
+    """)
+
+
+def downgrade() -> None:
+    """
+    Elimina el trigger y la función PL/pgSQL.
+    """
+    op.execute("DROP TRIGGER IF EXISTS trigger_move_purchase_rollups_on_product_type ON lots;")
+
+    op.execute("DROP FUNCTION IF EXISTS move_purchase_rollups_on_product_type();")
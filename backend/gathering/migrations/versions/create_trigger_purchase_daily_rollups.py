@@ -0,0 +1,157 @@
+"""create trigger purchase daily rollups
+
+Revision ID: v5w6x7y8z9a0
+Revises: s9t0u1v2w3x4
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'v5w6x7y8z9a0'
+down_revision = 's9t0u1v2w3x4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    Mantiene purchase_daily_rollups (monto, cantidad y número de compras activas por día,
+    centro de acopio, acopiador y tipo de producto del lote) con un trigger AFTER INSERT,
+    UPDATE y DELETE sobre purchases, igual que lot_aggregates: se resta el aporte de la
+    fila anterior si estaba activa y se suma el de la nueva si lo está.
+
+    El día es la fecha de created_at de la compra (la misma que la del balance_movement
+    que genera). El monto es quantity * price redondeado a 2 decimales, como ammount.
+    Finalmente se calculan los totales de las compras existentes.
+    """
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS public.purchase_daily_rollups (
+            day DATE NOT NULL,
+            gathering_center_id UUID NOT NULL REFERENCES public.gathering_centers(id),
+            gatherer_id UUID NOT NULL REFERENCES public.gatherers(id),
+            product_type product_type_enum NOT NULL,
+            amount NUMERIC(20, 2) NOT NULL DEFAULT 0,
+            quantity NUMERIC(20, 2) NOT NULL DEFAULT 0,
+            purchase_count INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT NOW(),
+            PRIMARY KEY (day, gathering_center_id, gatherer_id, product_type)
+        );
+        CREATE INDEX IF NOT EXISTS idx_purchase_daily_rollups_center_day ON public.purchase_daily_rollups (gathering_center_id, day);
+        CREATE INDEX IF NOT EXISTS idx_purchase_daily_rollups_gatherer_day ON public.purchase_daily_rollups (gatherer_id, day);
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION apply_purchase_rollup_delta(
+            p_created_at TIMESTAMP,
+            p_gathering_center_id UUID,
+            p_gatherer_id UUID,
+            p_lot_id UUID,
+            p_amount NUMERIC,
+            p_quantity NUMERIC,
+            p_count INTEGER
+        )
+        RETURNS VOID AS $$
+        DECLARE
+            v_product_type product_type_enum;
+        BEGIN
+            IF p_gathering_center_id IS NULL OR p_gatherer_id IS NULL THEN
+                RETURN;
+            END IF;
+
+            SELECT product_type INTO v_product_type FROM lots WHERE id = p_lot_id;
+            IF v_product_type IS NULL THEN
+                RETURN;
+            END IF;
+
+            INSERT INTO purchase_daily_rollups (day, gathering_center_id, gatherer_id, product_type, amount, quantity, purchase_count, updated_at)
+            VALUES (COALESCE(p_created_at, NOW())::date, p_gathering_center_id, p_gatherer_id, v_product_type, p_amount, p_quantity, p_count, NOW())
+            ON CONFLICT (day, gathering_center_id, gatherer_id, product_type) DO UPDATE SET
+                amount = purchase_daily_rollups.amount + EXCLUDED.amount,
+                quantity = purchase_daily_rollups.quantity + EXCLUDED.quantity,
+                purchase_count = purchase_daily_rollups.purchase_count + EXCLUDED.purchase_count,
+                updated_at = NOW();
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION update_purchase_rollups_from_purchase()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            -- Quitar el aporte anterior (UPDATE/DELETE de una compra activa)
+            IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.disabled_at IS NULL THEN
+                PERFORM apply_purchase_rollup_delta(
+                    OLD.created_at,
+                    OLD.gathering_center_id,
+                    OLD.gatherer_id,
+                    OLD.lot_id,
+                    -ROUND(COALESCE(OLD.quantity * OLD.price, 0), 2),
+                    -COALESCE(OLD.quantity, 0),
+                    -1
+                );
+            END IF;
+
+            -- Sumar el aporte nuevo (INSERT/UPDATE de una compra activa)
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.disabled_at IS NULL THEN
+                PERFORM apply_purchase_rollup_delta(
+                    NEW.created_at,
+                    NEW.gathering_center_id,
+                    NEW.gatherer_id,
+                    NEW.lot_id,
+                    ROUND(COALESCE(NEW.quantity * NEW.price, 0), 2),
+                    COALESCE(NEW.quantity, 0),
+                    1
+                );
+            END IF;
+
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    op.execute("""
+        DROP TRIGGER IF EXISTS trigger_update_purchase_rollups_from_purchase ON purchases;
+
+        CREATE TRIGGER trigger_update_purchase_rollups_from_purchase
+        AFTER INSERT OR UPDATE OF lot_id, gathering_center_id, gatherer_id, quantity, price, created_at, disabled_at OR DELETE ON purchases
+        FOR EACH ROW
+        EXECUTE FUNCTION update_purchase_rollups_from_purchase();
+    """)
+
+    # Totales de las compras existentes
+    op.execute("""
+        INSERT INTO purchase_daily_rollups (day, gathering_center_id, gatherer_id, product_type, amount, quantity, purchase_count, updated_at)
+        SELECT
+            p.created_at::date,
+            p.gathering_center_id,
+            p.gatherer_id,
+            l.product_type,
+            SUM(ROUND(p.quantity * p.price, 2)),
+            SUM(p.quantity),
+            COUNT(*),
+            NOW()
+        FROM purchases p
+        JOIN lots l ON l.id = p.lot_id
+        WHERE p.disabled_at IS NULL
+          AND p.gathering_center_id IS NOT NULL
+          AND p.gatherer_id IS NOT NULL
+        GROUP BY p.created_at::date, p.gathering_center_id, p.gatherer_id, l.product_type
+        ON CONFLICT (day, gathering_center_id, gatherer_id, product_type) DO UPDATE SET
+            amount = EXCLUDED.amount,
+            quantity = EXCLUDED.quantity,
+            purchase_count = EXCLUDED.purchase_count,
+            updated_at = NOW();
+    """)
+
+
+def downgrade() -> None:
+    """
+    Elimina el trigger y las funciones PL/pgSQL de purchase_daily_rollups (la tabla se conserva).
+    """
+    op.execute("DROP TRIGGER IF EXISTS trigger_update_purchase_rollups_from_purchase ON purchases;")
+
+    op.execute("DROP FUNCTION IF EXISTS update_purchase_rollups_from_purchase();")
+    op.execute("DROP FUNCTION IF EXISTS apply_purchase_rollup_delta(TIMESTAMP, UUID, UUID, UUID, NUMERIC, NUMERIC, INTEGER);")
@@ -1,8 +1,8 @@
 from datetime import datetime, date
-from typing import Optional, List, Literal
+from typing import Optional, List, Literal, Dict
 from uuid import UUID
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case, cast, Date
+from sqlalchemy import func, case
 from .models.lots import LotModel
 from .models.gatherers import GathererModel
 from .models.gathering_centers import GatheringCenterModel
@@ -14,13 +14,14 @@ from .models.balance_movements import BalanceMovementModel, BalanceMovementTypeE
 from .models.lot_status_history import LotStatusHistoryModel
 from .models.lot_process_history import LotProcessHistoryModel
 from .models.lot_net_weight_history import LotNetWeightHistoryModel
-# Import from warehouse module
-from modules.warehouse.src.models.store_movement import StoreMovementModel, StoreMovementTypeEnum
+from .models.lot_aggregates import LotAggregateModel
 # Importar modelos de farmers
 from modules.farmers.src.models.farmers import FarmerModel
 from modules.farmers.src.models.farms import FarmModel
 # Importar modelo de auth
 from modules.auth.src.models.identities import IdentityModel
+# Paginación compartida (page/per_page o cursor)
+from modules.data_collector.src.resources.pagination import paginate, resolve_sort_column
 from .schemas import (
     LotCreate, LotUpdate, LotResponse, LotListItemResponse, PaginatedLotListResponse, PurchaseItemResponse,
     GatheringCenterCreate, GatheringCenterUpdate, GatheringCenterResponse, PaginatedGatheringCenterResponse,
@@ -32,10 +33,17 @@ from .schemas import (
     GathererByGatheringCenterResponse, PaginateGathererByGatheringCenterResponse, GatheringSummaryResponse, BalanceMovementTypeEnum, BalanceSummaryGatherersResponse,
     # Store movement dispatch schemas
     DispatchLotsRequest, DispatchLotsResponse,
+    PurchaseTrendPoint, PurchaseTrendResponse,
     # Schemas anidados
     GatheringCenterNested, GathererNested, FarmerNested, FarmNested, IdentityNested
 )
 from .resources import resolve_display_name
+from .resources.relation_loader import RelationLoader, GATHERING_CENTER, GATHERER, load_lot_certifications, load_lot_purchases
+from .resources.lot_aggregates import reconcile_lot_aggregates
+from .resources.balance_snapshots import get_snapshot_balance, reconcile_balance_snapshots
+from .resources.purchase_rollups import get_purchase_totals, get_purchase_trend, rebuild_purchase_rollups
+from .resources.balance_rollups import get_movement_totals, rebuild_balance_rollups
+from .resources.lot_dispatch import claim_dispatch, record_dispatched, dispatch_lots_bulk, lots_fingerprint
 
 class Funcionalities:
     def __init__(self, container, database_key: str = "core_db"):
@@ -149,36 +157,23 @@ class Funcionalities:
                            search: str = "",
                            status: Optional[Literal["activo", "en_stock", "despachado", "eliminado" ]] = None,
                            gathering_center_id: Optional[UUID] = None,
-                           current_store_center_id: Optional[UUID] = None
+                           current_store_center_id: Optional[UUID] = None,
+                           cursor: Optional[str] = None,
+                           count: str = "exact"
                            ) -> PaginatedLotListResponse:
-        """Obtiene lotes paginados con campos calculados (fresh_weight, cost, certificaciones y purchases)"""
+        """
+        Obtiene lotes paginados con campos calculados (fresh_weight, cost, certificaciones y purchases).
+        Soporta paginación por cursor (next_cursor) y count=exact|estimated|none.
+        """
         db = self._get_db()
         
-        # Subconsulta para fresh_weight (suma de quantity de compras)
-        fresh_weight_subq = db.query(
-            PurchaseModel.lot_id,
-            func.coalesce(func.sum(PurchaseModel.quantity), 0).label('fresh_weight')
-        ).filter(
-            PurchaseModel.disabled_at.is_(None)
-        ).group_by(PurchaseModel.lot_id).subquery()
-        
-        # Subconsulta para cost (suma de quantity * price)
-        cost_subq = db.query(
-            PurchaseModel.lot_id,
-            func.coalesce(func.sum(PurchaseModel.quantity * PurchaseModel.price), 0).label('cost')
-        ).filter(
-            PurchaseModel.disabled_at.is_(None)
-        ).group_by(PurchaseModel.lot_id).subquery()
-        
-        # Query principal con joins
+        # fresh_weight y cost vienen de lot_aggregates (mantenida por triggers sobre purchases)
         query = db.query(
             LotModel,
-            func.coalesce(fresh_weight_subq.c.fresh_weight, 0).label('fresh_weight'),
-            func.coalesce(cost_subq.c.cost, 0).label('cost')
-        ).outerjoin(
-            fresh_weight_subq, LotModel.id == fresh_weight_subq.c.lot_id
+            LotAggregateModel.fresh_weight,
+            LotAggregateModel.cost
         ).outerjoin(
-            cost_subq, LotModel.id == cost_subq.c.lot_id
+            LotAggregateModel, LotModel.id == LotAggregateModel.lot_id
         )
         
         # Aplicar filtro de centro de acopio si se proporciona
@@ -223,58 +218,54 @@ class Funcionalities:
                 LotModel.name.ilike(f"%{search}%")
             )
         
-        # Aplicar ordenamiento
-        if sort_by:
-            if sort_by == 'fresh_weight':
-                sort_column = fresh_weight_subq.c.fresh_weight
-            elif sort_by == 'cost':
-                sort_column = cost_subq.c.cost
-            else:
-                sort_column = getattr(LotModel, sort_by, None)
-            
-            if sort_column is not None:
-                if order and order.lower() == "desc":
-                    query = query.order_by(sort_column.desc())
-                else:
-                    query = query.order_by(sort_column.asc())
+        # Ordenamiento por (sort_column, id); por defecto created_at desc
+        if sort_by == 'fresh_weight':
+            sort_column = LotAggregateModel.fresh_weight
+        elif sort_by == 'cost':
+            sort_column = LotAggregateModel.cost
         else:
-            # Ordenamiento por defecto
-            query = query.order_by(LotModel.created_at.desc())
-        
-        total = query.count()
-        offset = (page - 1) * per_page
-        total_pages = (total + per_page - 1) // per_page
+            sort_column = resolve_sort_column(LotModel, sort_by, None)
+        if sort_column is not None:
+            descending = bool(order and order.lower() == "desc")
+        else:
+            sort_column, descending = LotModel.created_at, True
         
-        results = query.offset(offset).limit(per_page).all()
+        result_page = paginate(
+            query,
+            sort_column=sort_column,
+            id_column=LotModel.id,
+            descending=descending,
+            page=page,
+            per_page=per_page,
+            cursor=cursor,
+            count=count
+        )
+        results = result_page.items
+        total = result_page.total
+        total_pages = (total + per_page - 1) // per_page if total is not None else None
+        
+        # Certificaciones, compras y relaciones de toda la página: una consulta por tipo
+        lot_ids = [lot.id for lot, _, _ in results]
+        certifications_by_lot = load_lot_certifications(db, lot_ids)
+        purchases_by_lot = load_lot_purchases(db, lot_ids)
+        relations = RelationLoader(db).add_lots(lot for lot, _, _ in results)
+        for purchases in purchases_by_lot.values():
+            relations.add_purchases(purchases)
+        relations.load()
         
         # Construir respuesta con certificaciones y compras
         items = []
         for lot, fresh_weight, cost in results:
-            # Obtener certificaciones del lote
-            certifications = db.query(CertificationModel.name).join(
-                LotCertificationModel, 
-                CertificationModel.id == LotCertificationModel.certification_id
-            ).filter(
-                LotCertificationModel.lot_id == lot.id,
-                LotCertificationModel.disabled_at.is_(None)
-            ).all()
-            
-            cert_names = [cert[0] for cert in certifications]
-            
-            # Obtener compras del lote
-            purchases = db.query(PurchaseModel).filter(
-                PurchaseModel.lot_id == lot.id,
-                PurchaseModel.disabled_at.is_(None)
-            ).all()
+            cert_names = certifications_by_lot.get(lot.id, [])
             
             # Construir lista de compras con price_total y relaciones cargadas
             purchase_items = []
-            for purchase in purchases:
+            for purchase in purchases_by_lot.get(lot.id, []):
                 purchase_items.append(PurchaseItemResponse(
                     id=purchase.id,
-                    farmer=self._load_farmer(db, purchase.farmer_id),
-                    farm=self._load_farm(db, purchase.farm_id),
-                    gatherer=self._load_gatherer(db, purchase.gatherer_id),
+                    farmer=relations.farmer(purchase.farmer_id),
+                    farm=relations.farm(purchase.farm_id),
+                    gatherer=relations.gatherer(purchase.gatherer_id),
                     quantity=float(purchase.quantity),
                     price=float(purchase.price),
                     price_total=float(purchase.quantity * purchase.price),
@@ -282,22 +273,22 @@ class Funcionalities:
                     payment_method=purchase.payment_method,
                     purchase_date=purchase.purchase_date,
                     ticket_number=purchase.ticket_number,
-                    gathering_center=self._load_gathering_center(db, purchase.gathering_center_id),
-                    identity=self._load_identity(db, purchase.identity_id)
+                    gathering_center=relations.gathering_center(purchase.gathering_center_id),
+                    identity=relations.identity(purchase.identity_id)
                 ))
             
             items.append(LotListItemResponse(
                 id=lot.id,
                 name=lot.name,
-                fresh_weight=float(fresh_weight),
+                fresh_weight=float(fresh_weight or 0),
                 net_weight=float(lot.net_weight) if lot.net_weight else None,
                 created_at=lot.created_at,
-                gatherer=self._load_gatherer(db, lot.gatherer_id),
-                current_store_center=self._load_gathering_center(db, lot.current_store_center_id),
-                gathering_center=self._load_gathering_center(db, lot.gathering_center_id),
+                gatherer=relations.gatherer(lot.gatherer_id),
+                current_store_center=relations.gathering_center(lot.current_store_center_id),
+                gathering_center=relations.gathering_center(lot.gathering_center_id),
                 product_type=lot.product_type,
                 certifications=cert_names,
-                cost=float(cost),
+                cost=float(cost or 0),
                 current_process=lot.current_process,
                 current_status=lot.current_status,
                 purchases=purchase_items
@@ -308,38 +299,21 @@ class Funcionalities:
             total=total,
             page=page,
             page_size=per_page,
-            total_pages=total_pages
+            total_pages=total_pages,
+            next_cursor=result_page.next_cursor
         )
     
     def _get_lots_data(self, sort_by: Optional[str] = None, order: Optional[str] = "asc", search: str = "", status: Optional[Literal["activo", "en_stock", "despachado", "eliminado"]] = None, gathering_center_id: Optional[UUID] = None, current_store_center_id: Optional[UUID] = None) -> List[LotListItemResponse]:
         """Método interno que obtiene datos de lotes con la misma lógica que get_lots_paginated pero sin paginación"""
         db = self._get_db()
         
-        # Subconsulta para fresh_weight (suma de quantity de compras)
-        fresh_weight_subq = db.query(
-            PurchaseModel.lot_id,
-            func.coalesce(func.sum(PurchaseModel.quantity), 0).label('fresh_weight')
-        ).filter(
-            PurchaseModel.disabled_at.is_(None)
-        ).group_by(PurchaseModel.lot_id).subquery()
-        
-        # Subconsulta para cost (suma de quantity * price)
-        cost_subq = db.query(
-            PurchaseModel.lot_id,
-            func.coalesce(func.sum(PurchaseModel.quantity * PurchaseModel.price), 0).label('cost')
-        ).filter(
-            PurchaseModel.disabled_at.is_(None)
-        ).group_by(PurchaseModel.lot_id).subquery()
-        
-        # Query principal con joins
+        # fresh_weight y cost vienen de lot_aggregates (mantenida por triggers sobre purchases)
         query = db.query(
             LotModel,
-            func.coalesce(fresh_weight_subq.c.fresh_weight, 0).label('fresh_weight'),
-            func.coalesce(cost_subq.c.cost, 0).label('cost')
+            LotAggregateModel.fresh_weight,
+            LotAggregateModel.cost
         ).outerjoin(
-            fresh_weight_subq, LotModel.id == fresh_weight_subq.c.lot_id
-        ).outerjoin(
-            cost_subq, LotModel.id == cost_subq.c.lot_id
+            LotAggregateModel, LotModel.id == LotAggregateModel.lot_id
         )
         
         # Aplicar filtro de centro de acopio si se proporciona
@@ -367,9 +341,9 @@ class Funcionalities:
         # Aplicar ordenamiento
         if sort_by:
             if sort_by == 'fresh_weight':
-                sort_column = fresh_weight_subq.c.fresh_weight
+                sort_column = LotAggregateModel.fresh_weight
             elif sort_by == 'cost':
-                sort_column = cost_subq.c.cost
+                sort_column = LotAggregateModel.cost
             else:
                 sort_column = getattr(LotModel, sort_by, None)
             
@@ -383,37 +357,31 @@ class Funcionalities:
         
         results = query.all()
         
+        # Certificaciones, compras y relaciones de todos los lotes: una consulta por tipo
+        lot_ids = [lot.id for lot, _, _ in results]
+        certifications_by_lot = load_lot_certifications(db, lot_ids)
+        purchases_by_lot = load_lot_purchases(db, lot_ids)
+        relations = RelationLoader(db).add_lots(lot for lot, _, _ in results)
+        for purchases in purchases_by_lot.values():
+            relations.add_purchases(purchases)
+        relations.load()
+        
         # Construir respuesta con certificaciones y compras (mismo código que get_lots_paginated)
         items = []
         for lot, fresh_weight, cost in results:
-            # Obtener certificaciones del lote
-            certifications = db.query(CertificationModel.name).join(
-                LotCertificationModel, 
-                CertificationModel.id == LotCertificationModel.certification_id
-            ).filter(
-                LotCertificationModel.lot_id == lot.id,
-                LotCertificationModel.disabled_at.is_(None)
-            ).all()
-            
-            cert_names = [cert[0] for cert in certifications]
-            
-            # Obtener compras del lote
-            purchases = db.query(PurchaseModel).filter(
-                PurchaseModel.lot_id == lot.id,
-                PurchaseModel.disabled_at.is_(None)
-            ).all()
+            cert_names = certifications_by_lot.get(lot.id, [])
             
             # Construir lista de compras con price_total y relaciones cargadas
             purchase_items = []
-            for purchase in purchases:
+            for purchase in purchases_by_lot.get(lot.id, []):
                 purchase_items.append(PurchaseItemResponse(
                     id=purchase.id,
                     farmer_id=purchase.farmer_id,
-                    farmer=self._load_farmer(db, purchase.farmer_id),
+                    farmer=relations.farmer(purchase.farmer_id),
                     farm_id=purchase.farm_id,
-                    farm=self._load_farm(db, purchase.farm_id),
+                    farm=relations.farm(purchase.farm_id),
                     gatherer_id=purchase.gatherer_id,
-                    gatherer=self._load_gatherer(db, purchase.gatherer_id),
+                    gatherer=relations.gatherer(purchase.gatherer_id),
                     quantity=float(purchase.quantity),
                     price=float(purchase.price),
                     price_total=float(purchase.quantity * purchase.price),
@@ -422,22 +390,22 @@ class Funcionalities:
                     purchase_date=purchase.purchase_date,
                     ticket_number=purchase.ticket_number,
                     gathering_center_id=purchase.gathering_center_id,
-                    gathering_center=self._load_gathering_center(db, purchase.gathering_center_id),
+                    gathering_center=relations.gathering_center(purchase.gathering_center_id),
                     identity_id=purchase.identity_id,
-                    identity=self._load_identity(db, purchase.identity_id)
+                    identity=relations.identity(purchase.identity_id)
                 ))
             
             items.append(LotListItemResponse(
                 id=lot.id,
                 name=lot.name,
-                fresh_weight=float(fresh_weight),
+                fresh_weight=float(fresh_weight or 0),
                 net_weight=float(lot.net_weight) if lot.net_weight else None,
                 created_at=lot.created_at,
                 gatherer_id=lot.gatherer_id,
-                gatherer=self._load_gatherer(db, lot.gatherer_id),
+                gatherer=relations.gatherer(lot.gatherer_id),
                 product_type=lot.product_type,
                 certifications=cert_names,
-                cost=float(cost),
+                cost=float(cost or 0),
                 current_process=lot.current_process,
                 current_status=lot.current_status,
                 purchases=purchase_items
@@ -445,6 +413,29 @@ class Funcionalities:
         
         return items
     
+    def reconcile_lot_aggregates(self, lot_ids: Optional[List[UUID]] = None) -> Dict[str, int]:
+        """
+        Recalcula lot_aggregates (fresh_weight, cost, purchase_count) desde purchases.
+
+        Uso interno (mantenimiento), no se expone como API. Solo corrige los lotes cuyos
+        totales difieren de las compras activas, por lo que es seguro volver a ejecutarlo.
+
+        Args:
+            lot_ids: Lotes a reconciliar; por defecto todos
+
+        Returns:
+            Diccionario con la cantidad de lotes corregidos
+        """
+        db = self._get_db()
+        try:
+            result = reconcile_lot_aggregates(db, lot_ids)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        print(f"✅ lot_aggregates reconciliado: {result['fixed']} lotes corregidos")
+        return result
+
     def export_lots_to_excel(self, type_download: Literal["lots", "purchases"], sort_by: Optional[str] = None, order: Optional[str] = "asc", search: str = "", status: Optional[Literal["activo", "en_stock", "despachado", "eliminado"]] = None, gathering_center_id: Optional[UUID] = None, current_store_center_id: Optional[UUID] = None):
         """Exporta lotes a Excel con dos formatos posibles: 'lots' (una fila por lote) o 'purchases' (una fila por compra)"""
         from io import BytesIO
@@ -660,15 +651,8 @@ class Funcionalities:
         
             # Subconsulta para identity_id
             if identity_id is not None:
-                from modules.auth.src.models.identities import IdentityModel
-                identity_query = db.query(IdentityModel).filter(
-                    IdentityModel.sub == str(identity_id),
-                    IdentityModel.disabled_at.is_(None)
-                ).first()
-                identity_exists = identity_query is not None
-                if not identity_exists:
-                    print(f"⚠️ Identity {identity_id} from token not found in identities table; saving register without identity_id")
-                    raise ValueError("Identidad no encontrada")
+                from modules.auth.src.resources.identity_resolver import require_identity
+                identity_query = require_identity(db, identity_id)
 
             # Guardar valores anteriores para historial
             old_status = lot.current_status
@@ -1225,54 +1209,30 @@ class Funcionalities:
                 BalanceMovementModel.gathering_center_id == gathering_center_id
             )
 
-        # 🔹 Subquery: última PURCHASE
-        last_purchase_sq = (
+        # 🔹 Última PURCHASE
+        last_purchase_amount = (
             db.query(BalanceMovementModel.ammount)
             .filter(*base_filters)
             .order_by(BalanceMovementModel.created_at.desc())
             .limit(1)
-            .scalar_subquery()
+            .scalar()
         )
 
-        # 🔹 Query principal
-        result = (
-            db.query(
-                func.coalesce(last_purchase_sq, 0).label("last_purchase_amount"),
-                func.coalesce(
-                    func.sum(
-                        case(
-                            (
-                                cast(BalanceMovementModel.created_at, Date) == today,
-                                BalanceMovementModel.ammount,
-                            ),
-                            else_=0,
-                        )
-                    ),
-                    0,
-                ).label("today_expense"),
-                func.coalesce(
-                    func.sum(
-                        case(
-                            (
-                                func.date_trunc("month", BalanceMovementModel.created_at)
-                                == func.date_trunc("month", func.now()),
-                                BalanceMovementModel.ammount,
-                            ),
-                            else_=0,
-                        )
-                    ),
-                    0,
-                ).label("month_expense"),
-            )
-            .filter(*base_filters)
-            .one()
+        # 🔹 Gasto del día y del mes: PURCHASE de balance_movements, desde sus totales diarios
+        today_totals = get_movement_totals(
+            db, BalanceMovementTypeEnum.PURCHASE,
+            date_from=today, date_to=today, gathering_center_id=gathering_center_id
+        )
+        month_totals = get_movement_totals(
+            db, BalanceMovementTypeEnum.PURCHASE,
+            date_from=today.replace(day=1), date_to=today, gathering_center_id=gathering_center_id
         )
 
         return GatheringSummaryResponse(
             gathering_center_id=gathering_center_id,
-            last_purchase_amount=float(result.last_purchase_amount),
-            today_expense=float(result.today_expense),
-            month_expense=float(result.month_expense),
+            last_purchase_amount=float(last_purchase_amount or 0),
+            today_expense=today_totals["amount"],
+            month_expense=month_totals["amount"],
         )
         
     # ========== GATHERERS METHODS ==========
@@ -1986,15 +1946,8 @@ class Funcionalities:
         try:
             identity_id_to_use = data.identity_id
             if identity_id_to_use is not None:
-                from modules.auth.src.models.identities import IdentityModel
-                identity_query = db.query(IdentityModel).filter(
-                    IdentityModel.sub == str(identity_id_to_use),
-                    IdentityModel.disabled_at.is_(None)
-                ).first()
-                identity_exists = identity_query is not None
-                if not identity_exists:
-                    print(f"⚠️ Identity {identity_id_to_use} from token not found in identities table; saving register without identity_id")
-                    raise ValueError("Identidad no encontrada")
+                from modules.auth.src.resources.identity_resolver import require_identity
+                identity_query = require_identity(db, identity_id_to_use)
             data.identity_id = identity_query.id
             balance = BalanceMovementModel(**data.dict())
             db.add(balance)
@@ -2012,7 +1965,7 @@ class Funcionalities:
                 "purchase_id": balance.purchase_id,
                 "ammount": balance.ammount,
                 "identity_id": identity_query.id,
-                "identity": self._load_identity(db, identity_query.id),
+                "identity": IdentityNested.model_validate(identity_query),
                 "created_at": balance.created_at,
                 "disabled_at": balance.disabled_at
             }
@@ -2022,8 +1975,8 @@ class Funcionalities:
             db.rollback()
             raise e
         
-    def get_balances(self, gathering_center_id: Optional[UUID] = None, gatherer_id: Optional[UUID] = None, type_movement: Optional[BalanceMovementTypeEnum] = None, page: int = 1, page_size: int = 10) -> PaginatedBalanceMovementResponse:
-        """Obtiene movimientos de balance paginados con filtros opcionales"""
+    def get_balances(self, gathering_center_id: Optional[UUID] = None, gatherer_id: Optional[UUID] = None, type_movement: Optional[BalanceMovementTypeEnum] = None, page: int = 1, page_size: int = 10, cursor: Optional[str] = None, count: str = "exact") -> PaginatedBalanceMovementResponse:
+        """Obtiene movimientos de balance paginados con filtros opcionales (page/page_size o cursor)"""
         db = self._get_db()
         
         query = db.query(BalanceMovementModel).filter(BalanceMovementModel.disabled_at.is_(None))
@@ -2037,28 +1990,35 @@ class Funcionalities:
         if type_movement:
             query = query.filter(BalanceMovementModel.type_movement == type_movement)
         
-        query = query.order_by(BalanceMovementModel.created_at.desc())
-        
-        total = query.count()
-        offset = (page - 1) * page_size
-        total_pages = (total + page_size - 1) // page_size
-        
-        movements = query.offset(offset).limit(page_size).all()
+        result_page = paginate(
+            query,
+            sort_column=BalanceMovementModel.created_at,
+            id_column=BalanceMovementModel.id,
+            descending=True,
+            page=page,
+            per_page=page_size,
+            cursor=cursor,
+            count=count
+        )
+        movements = result_page.items
+        total = result_page.total
+        total_pages = (total + page_size - 1) // page_size if total is not None else None
         
-        # Construir respuestas con relaciones cargadas
+        # Construir respuestas con relaciones cargadas (una consulta por tipo de relación)
+        relations = RelationLoader(db).add_movements(movements).load()
         movement_responses = []
         for movement in movements:
             movement_dict = {
                 "id": movement.id,
                 "gathering_center_id": movement.gathering_center_id,
-                "gathering_center": self._load_gathering_center(db, movement.gathering_center_id),
+                "gathering_center": relations.gathering_center(movement.gathering_center_id),
                 "gatherer_id": movement.gatherer_id,
-                "gatherer": self._load_gatherer(db, movement.gatherer_id),
+                "gatherer": relations.gatherer(movement.gatherer_id),
                 "type_movement": movement.type_movement,
                 "purchase_id": movement.purchase_id,
                 "ammount": movement.ammount,
                 "identity_id": movement.identity_id,
-                "identity": self._load_identity(db, movement.identity_id),
+                "identity": relations.identity(movement.identity_id),
                 "created_at": movement.created_at,
                 "disabled_at": movement.disabled_at
             }
@@ -2069,7 +2029,8 @@ class Funcionalities:
             total=total,
             page=page,
             page_size=page_size,
-            total_pages=total_pages
+            total_pages=total_pages,
+            next_cursor=result_page.next_cursor
         )
     
     def export_balances_to_excel(self, gathering_center_id: Optional[UUID] = None, gatherer_id: Optional[UUID] = None, type_movement: Optional[BalanceMovementTypeEnum] = None):
@@ -2179,10 +2140,16 @@ class Funcionalities:
         
         return output
     
-    def get_balance_summary(self, gathering_center_id: UUID, gatherer_id: Optional[UUID]) -> BalanceSummaryResponse:
-        """Obtiene el resumen de balance para un acopiador en un centro de acopio"""
+    def get_balance_summary(self, gathering_center_id: UUID, gatherer_id: Optional[UUID], page: int = 1, page_size: int = 10, cursor: Optional[str] = None, count: str = "exact") -> BalanceSummaryResponse:
+        """
+        Obtiene el resumen de balance para un acopiador en un centro de acopio.
+        El saldo se lee de balance_snapshots; los movimientos se devuelven paginados
+        (page/page_size o cursor), más recientes primero.
+        """
         db = self._get_db()
         
+        total_balance = get_snapshot_balance(db, gathering_center_id, gatherer_id)
+        
         query = db.query(BalanceMovementModel).filter(
             BalanceMovementModel.gathering_center_id == gathering_center_id,
             BalanceMovementModel.disabled_at.is_(None)
@@ -2193,27 +2160,38 @@ class Funcionalities:
                 BalanceMovementModel.gatherer_id == gatherer_id
             )
 
-        movements = query.order_by(
-            BalanceMovementModel.created_at.desc()
-        ).all()
-        
-        # Calcular balance total
-        total_balance = sum(float(m.ammount) if m.type_movement == BalanceMovementTypeEnum.RECHARGE else -float(m.ammount) for m in movements)
-        
-        # Construir respuestas con relaciones cargadas
+        result_page = paginate(
+            query,
+            sort_column=BalanceMovementModel.created_at,
+            id_column=BalanceMovementModel.id,
+            descending=True,
+            page=page,
+            per_page=page_size,
+            cursor=cursor,
+            count=count
+        )
+        movements = result_page.items
+        total = result_page.total
+        total_pages = (total + page_size - 1) // page_size if total is not None else None
+        
+        # Construir respuestas con relaciones cargadas (una consulta por tipo de relación)
+        relations = RelationLoader(db).add_movements(movements)
+        relations.add(GATHERING_CENTER, gathering_center_id)
+        relations.add(GATHERER, gatherer_id)
+        relations.load()
         movement_responses = []
         for m in movements:
             movement_dict = {
                 "id": m.id,
                 "gathering_center_id": m.gathering_center_id,
-                "gathering_center": self._load_gathering_center(db, m.gathering_center_id),
+                "gathering_center": relations.gathering_center(m.gathering_center_id),
                 "gatherer_id": m.gatherer_id,
-                "gatherer": self._load_gatherer(db, m.gatherer_id),
+                "gatherer": relations.gatherer(m.gatherer_id),
                 "type_movement": m.type_movement,
                 "purchase_id": m.purchase_id,
                 "ammount": m.ammount,
                 "identity_id": m.identity_id,
-                "identity": self._load_identity(db, m.identity_id),
+                "identity": relations.identity(m.identity_id),
                 "created_at": m.created_at,
                 "disabled_at": m.disabled_at
             }
@@ -2221,51 +2199,151 @@ class Funcionalities:
         
         return BalanceSummaryResponse(
             gathering_center_id=gathering_center_id,
-            gathering_center=self._load_gathering_center(db, gathering_center_id),
+            gathering_center=relations.gathering_center(gathering_center_id),
             gatherer_id=gatherer_id,
-            gatherer=self._load_gatherer(db, gatherer_id) if gatherer_id else None,
+            gatherer=relations.gatherer(gatherer_id) if gatherer_id else None,
             total_balance=total_balance,
-            movements=movement_responses
+            movements=movement_responses,
+            total=total,
+            page=page,
+            page_size=page_size,
+            total_pages=total_pages,
+            next_cursor=result_page.next_cursor
         )
     
+    def reconcile_balance_snapshots(self, gathering_center_id: Optional[UUID] = None) -> Dict[str, int]:
+        """
+        Recalcula balance_snapshots desde balance_movements.
+
+        Uso interno (mantenimiento), no se expone como API. Solo corrige los saldos que
+        difieren de los movimientos activos, por lo que es seguro volver a ejecutarlo.
+
+        Args:
+            gathering_center_id: Centro a reconciliar; por defecto todos
+
+        Returns:
+            Diccionario con la cantidad de saldos corregidos
+        """
+        db = self._get_db()
+        try:
+            result = reconcile_balance_snapshots(db, gathering_center_id)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        print(f"✅ balance_snapshots reconciliado: {result['fixed']} saldos corregidos")
+        return result
+    
     def get_balance_gatherers_summary(self, gatherer_id: Optional[UUID]) -> BalanceSummaryResponse:
-        """Obtiene el resumen de balance para un acopiador en un centro de acopio"""
+        """
+        Obtiene el resumen de balance para todos o un acopiador en todos los centros de acopio.
+        Lee los totales diarios de balance_movements (balance_daily_rollups): sin gatherer_id
+        suma todos los movimientos con acopiador; con gatherer_id, solo sus PURCHASE.
+        """
         db = self._get_db()
         
-        query = db.query(BalanceMovementModel).filter(
-            BalanceMovementModel.gatherer_id.isnot(None),
-            BalanceMovementModel.disabled_at.is_(None)
+        today = date.today()
+        filters = dict(
+            type_movement=BalanceMovementTypeEnum.PURCHASE if gatherer_id else None,
+            gatherer_id=gatherer_id,
+            with_gatherer=True
         )
-
-        if gatherer_id:
-            query = query.filter(
-                BalanceMovementModel.gatherer_id == gatherer_id,
-                BalanceMovementModel.type_movement == BalanceMovementTypeEnum.PURCHASE
-            )
-
-        movements = query.order_by(
-            BalanceMovementModel.created_at.desc()
-        ).all()
+        totals = get_movement_totals(db, **filters)
+        daily = get_movement_totals(db, date_from=today, date_to=today, **filters)
+        monthly = get_movement_totals(db, date_from=today.replace(day=1), date_to=today, **filters)
         
-        # Calcular balance total
-        total_balance = sum(float(m.ammount) for m in movements)
-        today = datetime.today().date()
-        first_day_month = today.replace(day=1)
+        total_balance = totals["amount"]
         return BalanceSummaryGatherersResponse(
                     total_balance=total_balance,
-                    average_balance=total_balance / len(movements) if movements else 0,
-                    daily_amount=sum(
-                        float(m.ammount)
-                        for m in movements
-                        if m.created_at.date() == today
-                    ),
-                    monthly_amount=sum(
-                        float(m.ammount)
-                        for m in movements
-                        if m.created_at.date() >= first_day_month
-                    )
+                    average_balance=total_balance / totals["movement_count"] if totals["movement_count"] else 0,
+                    daily_amount=daily["amount"],
+                    monthly_amount=monthly["amount"]
                 )
     
+    def get_purchase_trend(
+        self,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        gathering_center_id: Optional[UUID] = None,
+        gatherer_id: Optional[UUID] = None,
+        product_type: Optional[str] = None,
+        granularity: str = "day"
+    ) -> PurchaseTrendResponse:
+        """
+        Obtiene la serie de compras por día o por mes del rango, con sus totales.
+        Lee purchase_daily_rollups, es decir, la tabla purchases (cantidad y tipo de producto
+        del lote), no los PURCHASE de balance_movements que usan los resúmenes de gasto.
+        """
+        db = self._get_db()
+        
+        filters = dict(
+            date_from=date_from,
+            date_to=date_to,
+            gathering_center_id=gathering_center_id,
+            gatherer_id=gatherer_id,
+            product_type=product_type
+        )
+        points = get_purchase_trend(db, granularity=granularity, **filters)
+        totals = get_purchase_totals(db, **filters)
+        
+        return PurchaseTrendResponse(
+            granularity=granularity,
+            date_from=date_from,
+            date_to=date_to,
+            total_amount=totals["amount"],
+            total_quantity=totals["quantity"],
+            purchase_count=totals["purchase_count"],
+            items=[PurchaseTrendPoint(**point) for point in points]
+        )
+    
+    def rebuild_purchase_rollups(self, date_from: Optional[date] = None, date_to: Optional[date] = None) -> Dict[str, int]:
+        """
+        Reconstruye purchase_daily_rollups desde purchases.
+
+        Uso interno (mantenimiento), no se expone como API. Recalcula el rango completo
+        en una transacción, por lo que es seguro volver a ejecutarlo.
+
+        Args:
+            date_from: Primer día a reconstruir; por defecto desde el inicio
+            date_to: Último día a reconstruir; por defecto hasta el final
+
+        Returns:
+            Diccionario con las filas eliminadas e insertadas
+        """
+        db = self._get_db()
+        try:
+            result = rebuild_purchase_rollups(db, date_from, date_to)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        print(f"✅ purchase_daily_rollups reconstruido: {result['inserted']} filas ({result['deleted']} reemplazadas)")
+        return result
+    
+    def rebuild_balance_rollups(self, date_from: Optional[date] = None, date_to: Optional[date] = None) -> Dict[str, int]:
+        """
+        Reconstruye balance_daily_rollups desde balance_movements.
+
+        Uso interno (mantenimiento), no se expone como API. Recalcula el rango completo
+        en una transacción, por lo que es seguro volver a ejecutarlo.
+
+        Args:
+            date_from: Primer día a reconstruir; por defecto desde el inicio
+            date_to: Último día a reconstruir; por defecto hasta el final
+
+        Returns:
+            Diccionario con las filas eliminadas e insertadas
+        """
+        db = self._get_db()
+        try:
+            result = rebuild_balance_rollups(db, date_from, date_to)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        print(f"✅ balance_daily_rollups reconstruido: {result['inserted']} filas ({result['deleted']} reemplazadas)")
+        return result
+    
     # ========== LOT CERTIFICATION METHODS ==========
     def get_certifications_by_lot(self, lot_id: UUID) -> List[LotCertificationWithDetailsResponse]:
         """Obtiene las certificaciones de un lote (solo las activas)"""
@@ -2376,18 +2454,19 @@ class Funcionalities:
         
         purchases = query.offset(offset).limit(per_page).all()
         
-        # Construir respuestas con relaciones cargadas
+        # Construir respuestas con relaciones cargadas (una consulta por tipo de relación)
+        relations = RelationLoader(db).add_purchases(purchases).load()
         purchase_responses = []
         for purchase in purchases:
             purchase_dict = {
                 "id": purchase.id,
                 "lot_id": purchase.lot_id,
                 "farmer_id": purchase.farmer_id,
-                "farmer": self._load_farmer(db, purchase.farmer_id),
+                "farmer": relations.farmer(purchase.farmer_id),
                 "farm_id": purchase.farm_id,
-                "farm": self._load_farm(db, purchase.farm_id),
+                "farm": relations.farm(purchase.farm_id),
                 "gatherer_id": purchase.gatherer_id,
-                "gatherer": self._load_gatherer(db, purchase.gatherer_id),
+                "gatherer": relations.gatherer(purchase.gatherer_id),
                 "quantity": purchase.quantity,
                 "price": purchase.price,
                 "presentation": purchase.presentation,
@@ -2395,9 +2474,9 @@ class Funcionalities:
                 "purchase_date": purchase.purchase_date,
                 "ticket_number": purchase.ticket_number,
                 "gathering_center_id": purchase.gathering_center_id,
-                "gathering_center": self._load_gathering_center(db, purchase.gathering_center_id),
+                "gathering_center": relations.gathering_center(purchase.gathering_center_id),
                 "identity_id": purchase.identity_id,
-                "identity": self._load_identity(db, purchase.identity_id),
+                "identity": relations.identity(purchase.identity_id),
                 "created_at": purchase.created_at,
                 "updated_at": purchase.updated_at,
                 "disabled_at": purchase.disabled_at
@@ -2505,12 +2584,16 @@ class Funcionalities:
         """
         Despacha lotes a un centro de almacenamiento.
         
-        Para cada lote:
-        1. Actualiza current_store_center_id del lote
-        2. Crea un store_movement de tipo INGRESO en la tabla del módulo warehouse
+        En una sola transacción y sin importar la cantidad de lotes:
+        1. Actualiza current_store_center_id de los lotes activos con peso (un UPDATE ... RETURNING)
+        2. Crea sus store_movement de tipo INGRESO en la tabla del módulo warehouse (un INSERT multi-fila)
+        
+        Si se envía idempotency_key, un reintento con la misma clave devuelve el resultado
+        del despacho original sin volver a crear movimientos. Reusar la clave con otro
+        centro de almacenamiento u otros lotes (sin importar orden ni repetidos) es un error.
         
         Args:
-            dispatch_data: Datos del despacho (lot_ids, store_center_id)
+            dispatch_data: Datos del despacho (lot_ids, store_center_id, idempotency_key)
             identity_id: ID de la identidad que registra el movimiento (del token)
             
         Returns:
@@ -2520,59 +2603,44 @@ class Funcionalities:
         
         try:
             # Verificar que el identity_id existe en el sistema
-            if identity_id is not None:
-                from modules.auth.src.models.identities import IdentityModel
-                identity_query = db.query(IdentityModel).filter(
-                    IdentityModel.sub == str(identity_id),
-                    IdentityModel.disabled_at.is_(None)
-                ).first()
-                identity_exists = identity_query is not None
-                if not identity_exists:
-                    print(f"⚠️ Identity {identity_id} from token not found in identities table; saving register without identity_id")
-                    raise ValueError("Identidad no encontrada")
+            if identity_id is None:
+                raise ValueError("Se requiere la identidad del token para despachar lotes")
+            from modules.auth.src.resources.identity_resolver import require_identity
+            identity_query = require_identity(db, identity_id)
 
-            # Obtener TODOS los lotes en una sola consulta (optimizado para listas largas)
-            lots = db.query(LotModel).filter(
-                LotModel.id.in_(dispatch_data.lot_ids),
-                LotModel.disabled_at.is_(None)
-            ).all()
-            
-            # Crear diccionario de lotes encontrados para acceso rápido
-            lots_dict = {lot.id: lot for lot in lots}
-            
-            # Reportar lotes no encontrados o deshabilitados
-            not_found_ids = set(dispatch_data.lot_ids) - set(lots_dict.keys())
-            if not_found_ids:
-                print(f"⚠️  {len(not_found_ids)} lote(s) no encontrado(s) o deshabilitado(s): {list(not_found_ids)[:5]}{'...' if len(not_found_ids) > 5 else ''}")
-            
-            dispatched_count = 0
-            skipped_no_weight = []
-            
-            # Procesar cada lote encontrado
-            for lot_id, lot in lots_dict.items():
-                # Verificar que el lote tenga peso
-                if not lot.net_weight or lot.net_weight <= 0:
-                    skipped_no_weight.append(lot_id)
-                    continue
-                
-                # Actualizar el current_store_center_id del lote
-                lot.current_store_center_id = dispatch_data.store_center_id
-                
-                # Crear el store_movement de tipo INGRESO
-                store_movement = StoreMovementModel(
-                    lot_id=lot_id,
-                    store_center_id=dispatch_data.store_center_id,
-                    type_movement=StoreMovementTypeEnum.INGRESO,
-                    weight_kg=lot.net_weight,
-                    identity_id=identity_query.id
+            lot_ids = list(dict.fromkeys(dispatch_data.lot_ids))
+            
+            dispatch_id = None
+            if dispatch_data.idempotency_key:
+                dispatch_id, previous = claim_dispatch(
+                    db,
+                    dispatch_data.idempotency_key,
+                    dispatch_data.store_center_id,
+                    identity_query.id,
+                    lot_ids
                 )
-                db.add(store_movement)
-                
-                dispatched_count += 1
+                if previous is not None:
+                    db.rollback()
+                    if previous.store_center_id != dispatch_data.store_center_id:
+                        raise ValueError("La clave de idempotencia ya se usó para un despacho a otro centro de almacenamiento")
+                    if previous.lots_fingerprint is not None and previous.lots_fingerprint != lots_fingerprint(lot_ids):
+                        raise ValueError("La clave de idempotencia ya se usó para un despacho de otros lotes")
+                    print(f"↩️  Despacho '{dispatch_data.idempotency_key}' ya registrado: {previous.dispatched_lots} lote(s)")
+                    return DispatchLotsResponse(
+                        message=f"{previous.dispatched_lots} lote(s) despachado(s) exitosamente",
+                        dispatched_lots=previous.dispatched_lots,
+                        replayed=True
+                    )
+            
+            dispatched_ids = dispatch_lots_bulk(db, lot_ids, dispatch_data.store_center_id, identity_query.id)
+            dispatched_count = len(dispatched_ids)
+            if dispatch_id is not None:
+                record_dispatched(db, dispatch_id, dispatched_count)
             
-            # Reportar lotes sin peso
-            if skipped_no_weight:
-                print(f"⚠️  {len(skipped_no_weight)} lote(s) sin peso (net_weight) omitido(s): {skipped_no_weight[:5]}{'...' if len(skipped_no_weight) > 5 else ''}")
+            # Reportar lotes no encontrados, deshabilitados o sin peso
+            skipped = len(lot_ids) - dispatched_count
+            if skipped:
+                print(f"⚠️  {skipped} lote(s) omitido(s): no encontrado(s), deshabilitado(s) o sin peso (net_weight)")
             
             # Commit de todos los cambios
             db.commit()
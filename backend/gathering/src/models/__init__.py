@@ -10,6 +10,11 @@ from .lot_process_history import LotProcessHistoryModel
 from .lot_net_weight_history import LotNetWeightHistoryModel
 from .purchases import PurchaseModel
 from .balance_movements import BalanceMovementModel
+from .lot_aggregates import LotAggregateModel
+from .balance_snapshots import BalanceSnapshotModel
+from .purchase_daily_rollups import PurchaseDailyRollupModel
+from .lot_dispatches import LotDispatchModel
+from .balance_daily_rollups import BalanceDailyRollupModel
 from .lot_status_transitions import LotStatusTransitionModel
 from .lot_process_transitions import LotProcessTransitionModel
 
@@ -25,6 +30,11 @@ __all__ = [
     'LotNetWeightHistoryModel',
     'PurchaseModel',
     'BalanceMovementModel',
+    'LotAggregateModel',
+    'BalanceSnapshotModel',
+    'PurchaseDailyRollupModel',
+    'LotDispatchModel',
+    'BalanceDailyRollupModel',
     'LotStatusTransitionModel',
     'LotProcessTransitionModel'
 ]
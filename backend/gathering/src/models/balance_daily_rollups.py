@@ -0,0 +1,39 @@
+from dataclasses import dataclass
+from sqlalchemy import Column, Date, Integer, Numeric, TIMESTAMP, func, text, ForeignKey, Enum as SQLEnum, Index
+from sqlalchemy.dialects.postgresql import UUID
+
+from core.models.base_class import Model
+from .balance_movements import BalanceMovementTypeEnum
+
+@dataclass
+class BalanceDailyRollupModel(Model):
+    """ BalanceDailyRollupModel - Totales diarios de balance_movements activos por centro, acopiador y tipo (mantenidos por trigger) """
+
+    __tablename__ = "balance_daily_rollups"
+    __table_args__ = (
+        # Una fila por (día, centro, acopiador, tipo); los movimientos sin acopiador comparten la fila con gatherer_id NULL
+        Index('uq_balance_daily_rollups_bucket', 'day', 'gathering_center_id',
+              text("COALESCE(gatherer_id, '00000000-0000-0000-0000-000000000000'::uuid)"), 'type_movement', unique=True),
+        Index('idx_balance_daily_rollups_center_day', 'gathering_center_id', 'day'),
+        Index('idx_balance_daily_rollups_gatherer_day', 'gatherer_id', 'day'),
+        {"schema": "public", "extend_existing": True}
+    )
+
+    id = Column(UUID(as_uuid=True),
+                primary_key=True,
+                server_default=text('uuid_generate_v4()'),
+                unique=True,
+                nullable=False)
+    day = Column(Date, nullable=False, info={"display_name": "Día", "description": "día de registro de los movimientos"})
+    gathering_center_id = Column(UUID(as_uuid=True), ForeignKey('public.gathering_centers.id'), nullable=False, info={"display_name": "Centro de Acopio", "description": "id del centro de acopio"})
+    gatherer_id = Column(UUID(as_uuid=True), ForeignKey('public.gatherers.id'), nullable=True, info={"display_name": "Acopiador", "description": "id del acopiador"})
+    type_movement = Column(SQLEnum(BalanceMovementTypeEnum, name='balance_movement_type_enum', values_callable=lambda x: [e.value for e in x]), nullable=False, info={"display_name": "Tipo de Movimiento", "description": "tipo de movimiento de balance"})
+    amount = Column(Numeric(precision=20, scale=2), nullable=False, server_default=text('0'), info={"display_name": "Monto", "description": "suma de ammount de los movimientos del día"})
+    movement_count = Column(Integer, nullable=False, server_default=text('0'), info={"display_name": "Movimientos", "description": "cantidad de movimientos del día"})
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.current_timestamp())
+
+    def __init__(self, **kwargs):
+        super(BalanceDailyRollupModel, self).__init__(**kwargs)
+
+    def __hash__(self):
+        return hash(self.id)
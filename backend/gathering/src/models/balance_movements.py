@@ -18,6 +18,7 @@ class BalanceMovementModel(Model):
         Index('idx_bm_center', 'gathering_center_id'),
         Index('idx_bm_purchase', 'purchase_id'),
         Index('idx_bm_disabled_at', 'disabled_at'),
+        Index('idx_bm_center_gatherer_created', 'gathering_center_id', 'gatherer_id', 'created_at', 'id'),
         {"schema": "public", "extend_existing": True}
     )
     
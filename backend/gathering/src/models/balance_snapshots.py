@@ -0,0 +1,36 @@
+from dataclasses import dataclass
+from sqlalchemy import Column, Integer, Numeric, TIMESTAMP, func, text, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+
+from core.models.base_class import Model
+
+@dataclass
+class BalanceSnapshotModel(Model):
+    """ BalanceSnapshotModel - Saldo vigente por centro de acopio y acopiador (mantenido por trigger sobre balance_movements) """
+
+    __tablename__ = "balance_snapshots"
+    __table_args__ = (
+        # Un saldo por (centro, acopiador); los movimientos sin acopiador comparten la fila con gatherer_id NULL
+        Index('uq_balance_snapshots_center_gatherer', 'gathering_center_id',
+              text("COALESCE(gatherer_id, '00000000-0000-0000-0000-000000000000'::uuid)"), unique=True),
+        Index('idx_balance_snapshots_gatherer', 'gatherer_id'),
+        {"schema": "public", "extend_existing": True}
+    )
+
+    id = Column(UUID(as_uuid=True),
+                primary_key=True,
+                server_default=text('uuid_generate_v4()'),
+                unique=True,
+                nullable=False)
+    gathering_center_id = Column(UUID(as_uuid=True), ForeignKey('public.gathering_centers.id'), nullable=False, info={"display_name": "Centro de Acopio", "description": "id del centro de acopio"})
+    gatherer_id = Column(UUID(as_uuid=True), ForeignKey('public.gatherers.id'), nullable=True, info={"display_name": "Acopiador", "description": "id del acopiador"})
+    balance = Column(Numeric(precision=15, scale=2), nullable=False, server_default=text('0'), info={"display_name": "Saldo", "description": "recargas menos compras de los movimientos activos"})
+    movement_count = Column(Integer, nullable=False, server_default=text('0'), info={"display_name": "Movimientos", "description": "cantidad de movimientos activos"})
+    last_movement_at = Column(TIMESTAMP, nullable=True, info={"display_name": "Último Movimiento", "description": "fecha del último movimiento aplicado"})
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.current_timestamp())
+
+    def __init__(self, **kwargs):
+        super(BalanceSnapshotModel, self).__init__(**kwargs)
+
+    def __hash__(self):
+        return hash(self.id)
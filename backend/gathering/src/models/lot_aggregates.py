@@ -0,0 +1,32 @@
+from dataclasses import dataclass
+from sqlalchemy import Column, Integer, TIMESTAMP, func, text, ForeignKey, Numeric, Index
+from sqlalchemy.dialects.postgresql import UUID
+
+from core.models.base_class import Model
+
+@dataclass
+class LotAggregateModel(Model):
+    """ LotAggregateModel - Totales de compras activas por lote (mantenidos por trigger sobre purchases) """
+
+    __tablename__ = "lot_aggregates"
+    __table_args__ = (
+        Index('idx_lot_aggregates_fresh_weight', 'fresh_weight', 'lot_id'),
+        Index('idx_lot_aggregates_cost', 'cost', 'lot_id'),
+        {"schema": "public", "extend_existing": True}
+    )
+
+    lot_id = Column(UUID(as_uuid=True),
+                    ForeignKey('public.lots.id', ondelete='CASCADE'),
+                    primary_key=True,
+                    nullable=False,
+                    info={"display_name": "Lote", "description": "id del lote"})
+    fresh_weight = Column(Numeric(precision=15, scale=2), nullable=False, server_default=text('0'), info={"display_name": "Peso Fresco", "description": "suma de quantity de las compras activas del lote"})
+    cost = Column(Numeric(precision=20, scale=4), nullable=False, server_default=text('0'), info={"display_name": "Costo", "description": "suma de quantity * price de las compras activas del lote"})
+    purchase_count = Column(Integer, nullable=False, server_default=text('0'), info={"display_name": "Compras", "description": "cantidad de compras activas del lote"})
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.current_timestamp())
+
+    def __init__(self, **kwargs):
+        super(LotAggregateModel, self).__init__(**kwargs)
+
+    def __hash__(self):
+        return hash(self.lot_id)
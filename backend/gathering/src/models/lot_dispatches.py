@@ -0,0 +1,31 @@
+from dataclasses import dataclass
+from sqlalchemy import Column, Integer, String, TIMESTAMP, func, text, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+
+from core.models.base_class import Model
+
+@dataclass
+class LotDispatchModel(Model):
+    """ LotDispatchModel - Despachos de lotes registrados por clave de idempotencia """
+
+    __tablename__ = "lot_dispatches"
+    __table_args__ = {"schema": "public", "extend_existing": True}
+
+    id = Column(UUID(as_uuid=True),
+                primary_key=True,
+                server_default=text('uuid_generate_v4()'),
+                unique=True,
+                nullable=False)
+    idempotency_key = Column(String(255), unique=True, nullable=False, info={"display_name": "Clave de Idempotencia", "description": "clave enviada por el cliente para no repetir el despacho"})
+    store_center_id = Column(UUID(as_uuid=True), ForeignKey('public.store_centers.id'), nullable=False, info={"display_name": "Centro de Almacenamiento", "description": "id del centro de almacenamiento destino"})
+    identity_id = Column(UUID(as_uuid=True), ForeignKey('public.identities.id'), nullable=False, info={"display_name": "Identidad", "description": "id de la identidad que realizó el despacho"})
+    lots_fingerprint = Column(String(64), nullable=True, info={"display_name": "Huella de Lotes", "description": "sha256 de los ids de lotes ordenados y sin repetir"})
+    requested_lots = Column(Integer, nullable=False, server_default=text('0'), info={"display_name": "Lotes Solicitados", "description": "cantidad de lotes enviados en el despacho"})
+    dispatched_lots = Column(Integer, nullable=False, server_default=text('0'), info={"display_name": "Lotes Despachados", "description": "cantidad de lotes despachados"})
+    created_at = Column(TIMESTAMP, server_default=func.now())
+
+    def __init__(self, **kwargs):
+        super(LotDispatchModel, self).__init__(**kwargs)
+
+    def __hash__(self):
+        return hash(self.id)
@@ -0,0 +1,32 @@
+from dataclasses import dataclass
+from sqlalchemy import Column, Date, Integer, Numeric, TIMESTAMP, func, text, ForeignKey, Enum as SQLEnum, Index
+from sqlalchemy.dialects.postgresql import UUID
+
+from core.models.base_class import Model
+from .lots import ProductTypeEnum
+
+@dataclass
+class PurchaseDailyRollupModel(Model):
+    """ PurchaseDailyRollupModel - Totales diarios de compras activas por centro, acopiador y tipo de producto (mantenidos por trigger sobre purchases) """
+
+    __tablename__ = "purchase_daily_rollups"
+    __table_args__ = (
+        Index('idx_purchase_daily_rollups_center_day', 'gathering_center_id', 'day'),
+        Index('idx_purchase_daily_rollups_gatherer_day', 'gatherer_id', 'day'),
+        {"schema": "public", "extend_existing": True}
+    )
+
+    day = Column(Date, primary_key=True, nullable=False, info={"display_name": "Día", "description": "día de registro de las compras"})
+    gathering_center_id = Column(UUID(as_uuid=True), ForeignKey('public.gathering_centers.id'), primary_key=True, nullable=False, info={"display_name": "Centro de Acopio", "description": "id del centro de acopio"})
+    gatherer_id = Column(UUID(as_uuid=True), ForeignKey('public.gatherers.id'), primary_key=True, nullable=False, info={"display_name": "Acopiador", "description": "id del acopiador"})
+    product_type = Column(SQLEnum(ProductTypeEnum, name='product_type_enum', values_callable=lambda x: [e.value for e in x]), primary_key=True, nullable=False, info={"display_name": "Tipo de Producto", "description": "tipo de producto del lote"})
+    amount = Column(Numeric(precision=20, scale=2), nullable=False, server_default=text('0'), info={"display_name": "Monto", "description": "suma de quantity * price de las compras del día"})
+    quantity = Column(Numeric(precision=20, scale=2), nullable=False, server_default=text('0'), info={"display_name": "Cantidad", "description": "suma de quantity de las compras del día"})
+    purchase_count = Column(Integer, nullable=False, server_default=text('0'), info={"display_name": "Compras", "description": "cantidad de compras del día"})
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.current_timestamp())
+
+    def __init__(self, **kwargs):
+        super(PurchaseDailyRollupModel, self).__init__(**kwargs)
+
+    def __hash__(self):
+        return hash((self.day, self.gathering_center_id, self.gatherer_id, self.product_type))
@@ -0,0 +1,100 @@
+"""
+Consultas sobre balance_daily_rollups.
+
+Los totales diarios de balance_movements (monto y número de movimientos activos por
+día, centro de acopio, acopiador y tipo de movimiento) los mantiene el trigger de la
+migración create_trigger_balance_daily_rollups. Los resúmenes de gasto leen estos
+totales en lugar de recorrer balance_movements, con la misma semántica que el libro.
+- get_movement_totals: monto y número de movimientos de un rango
+- rebuild_balance_rollups: recalcula un rango (o todo) desde balance_movements
+"""
+from datetime import date
+from typing import Dict, Optional
+from uuid import UUID
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from ..models.balance_daily_rollups import BalanceDailyRollupModel
+from ..models.balance_movements import BalanceMovementTypeEnum
+
+_DELETE_SQL = "DELETE FROM balance_daily_rollups WHERE TRUE {day_filter}"
+
+_INSERT_SQL = """
+    INSERT INTO balance_daily_rollups (day, gathering_center_id, gatherer_id, type_movement, amount, movement_count, updated_at)
+    SELECT
+        created_at::date,
+        gathering_center_id,
+        gatherer_id,
+        type_movement,
+        SUM(ammount),
+        COUNT(*),
+        NOW()
+    FROM balance_movements
+    WHERE disabled_at IS NULL
+      {movement_filter}
+    GROUP BY created_at::date, gathering_center_id, gatherer_id, type_movement
+"""
+
+
+def get_movement_totals(
+    db: Session,
+    type_movement: Optional[BalanceMovementTypeEnum] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    gathering_center_id: Optional[UUID] = None,
+    gatherer_id: Optional[UUID] = None,
+    with_gatherer: bool = False
+) -> Dict[str, float]:
+    """
+    Monto y número de movimientos activos del rango (fechas inclusivas).
+    with_gatherer=True excluye los movimientos sin acopiador.
+    """
+    query = db.query(
+        func.coalesce(func.sum(BalanceDailyRollupModel.amount), 0),
+        func.coalesce(func.sum(BalanceDailyRollupModel.movement_count), 0)
+    )
+    if type_movement:
+        query = query.filter(BalanceDailyRollupModel.type_movement == type_movement)
+    if date_from:
+        query = query.filter(BalanceDailyRollupModel.day >= date_from)
+    if date_to:
+        query = query.filter(BalanceDailyRollupModel.day <= date_to)
+    if gathering_center_id:
+        query = query.filter(BalanceDailyRollupModel.gathering_center_id == gathering_center_id)
+    if gatherer_id:
+        query = query.filter(BalanceDailyRollupModel.gatherer_id == gatherer_id)
+    elif with_gatherer:
+        query = query.filter(BalanceDailyRollupModel.gatherer_id.isnot(None))
+    amount, movement_count = query.one()
+    return {
+        "amount": float(amount),
+        "movement_count": int(movement_count)
+    }
+
+
+def rebuild_balance_rollups(db: Session, date_from: Optional[date] = None, date_to: Optional[date] = None) -> Dict[str, int]:
+    """
+    Recalcula balance_daily_rollups del rango indicado (o completo) desde balance_movements.
+    Bloquea la tabla contra escritura hasta el commit para que los triggers de movimientos
+    concurrentes esperen y no se pierdan aportes. No hace commit.
+
+    Returns:
+        Diccionario con las filas eliminadas ('deleted') e insertadas ('inserted')
+    """
+    params = {}
+    day_filter = ""
+    movement_filter = ""
+    if date_from:
+        params["date_from"] = date_from
+        day_filter += " AND day >= :date_from"
+        movement_filter += " AND created_at >= :date_from"
+    if date_to:
+        params["date_to"] = date_to
+        day_filter += " AND day <= :date_to"
+        movement_filter += " AND created_at < CAST(:date_to AS date) + 1"
+
+    db.execute(text("LOCK TABLE balance_daily_rollups IN EXCLUSIVE MODE"))
+    deleted = db.execute(text(_DELETE_SQL.format(day_filter=day_filter)), params).rowcount
+    inserted = db.execute(text(_INSERT_SQL.format(movement_filter=movement_filter)), params).rowcount
+    return {"deleted": deleted, "inserted": inserted}
@@ -0,0 +1,104 @@
+"""
+Saldos de balance_snapshots.
+
+El saldo por (centro de acopio, acopiador) lo mantiene el trigger de la migración
+create_trigger_balance_snapshots en la misma transacción que cada movimiento.
+- get_snapshot_balance: saldo de un centro (o de un acopiador en el centro) sin leer
+  los movimientos
+- reconcile_balance_snapshots: recalcula los saldos desde balance_movements y corrige
+  solo los que difieren
+"""
+from typing import Dict, Optional
+from uuid import UUID
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from ..models.balance_snapshots import BalanceSnapshotModel
+
+_EXPECTED_SQL = """
+    SELECT
+        gathering_center_id,
+        gatherer_id,
+        COALESCE(SUM(CASE WHEN type_movement = 'recharge' THEN ammount ELSE -ammount END), 0) AS balance,
+        COUNT(*) AS movement_count,
+        MAX(created_at) AS last_movement_at
+    FROM balance_movements
+    WHERE disabled_at IS NULL {center_filter}
+    GROUP BY gathering_center_id, gatherer_id
+"""
+
+_UPSERT_SQL = """
+    WITH expected AS ({expected})
+    INSERT INTO balance_snapshots (gathering_center_id, gatherer_id, balance, movement_count, last_movement_at, updated_at)
+    SELECT e.gathering_center_id, e.gatherer_id, e.balance, e.movement_count, e.last_movement_at, NOW()
+    FROM expected e
+    LEFT JOIN balance_snapshots s
+        ON s.gathering_center_id = e.gathering_center_id
+       AND s.gatherer_id IS NOT DISTINCT FROM e.gatherer_id
+    WHERE s.id IS NULL
+       OR s.balance IS DISTINCT FROM e.balance
+       OR s.movement_count IS DISTINCT FROM e.movement_count
+    ON CONFLICT (gathering_center_id, COALESCE(gatherer_id, '00000000-0000-0000-0000-000000000000'::uuid))
+    DO UPDATE SET
+        balance = EXCLUDED.balance,
+        movement_count = EXCLUDED.movement_count,
+        last_movement_at = EXCLUDED.last_movement_at,
+        updated_at = NOW()
+    RETURNING id
+"""
+
+# Saldos sin movimientos activos (todos deshabilitados o eliminados) vuelven a cero
+_RESET_SQL = """
+    WITH expected AS ({expected})
+    UPDATE balance_snapshots s
+    SET balance = 0, movement_count = 0, updated_at = NOW()
+    WHERE (s.balance <> 0 OR s.movement_count <> 0) {snapshot_filter}
+      AND NOT EXISTS (
+          SELECT 1 FROM expected e
+          WHERE e.gathering_center_id = s.gathering_center_id
+            AND e.gatherer_id IS NOT DISTINCT FROM s.gatherer_id
+      )
+    RETURNING s.id
+"""
+
+
+def get_snapshot_balance(db: Session, gathering_center_id: UUID, gatherer_id: Optional[UUID] = None) -> float:
+    """
+    Saldo vigente de un acopiador en el centro o, sin gatherer_id, del centro completo
+    (suma de los saldos de sus acopiadores).
+    """
+    query = db.query(func.coalesce(func.sum(BalanceSnapshotModel.balance), 0)).filter(
+        BalanceSnapshotModel.gathering_center_id == gathering_center_id
+    )
+    if gatherer_id:
+        query = query.filter(BalanceSnapshotModel.gatherer_id == gatherer_id)
+    return float(query.scalar() or 0)
+
+
+def reconcile_balance_snapshots(db: Session, gathering_center_id: Optional[UUID] = None) -> Dict[str, int]:
+    """
+    Recalcula los saldos del centro indicado (o de todos) desde balance_movements y
+    corrige los que difieren. Bloquea los saldos del alcance mientras recalcula para que
+    los movimientos concurrentes esperen. No hace commit.
+
+    Returns:
+        Diccionario con la cantidad de saldos corregidos ('fixed')
+    """
+    params = {}
+    center_filter = ""
+    snapshot_filter = ""
+    if gathering_center_id:
+        params["gathering_center_id"] = gathering_center_id
+        center_filter = "AND gathering_center_id = :gathering_center_id"
+        snapshot_filter = "AND s.gathering_center_id = :gathering_center_id"
+
+    lock_sql = "SELECT id FROM balance_snapshots"
+    if gathering_center_id:
+        lock_sql += " WHERE gathering_center_id = :gathering_center_id"
+    db.execute(text(lock_sql + " FOR UPDATE"), params)
+
+    expected = _EXPECTED_SQL.format(center_filter=center_filter)
+    fixed = db.execute(text(_UPSERT_SQL.format(expected=expected)), params).fetchall()
+    reset = db.execute(text(_RESET_SQL.format(expected=expected, snapshot_filter=snapshot_filter)), params).fetchall()
+    return {"fixed": len(fixed) + len(reset)}
@@ -0,0 +1,62 @@
+"""
+Reconciliación de lot_aggregates.
+
+Los totales por lote (fresh_weight, cost, purchase_count) los mantienen los triggers
+de la migración create_trigger_lot_aggregates. reconcile_lot_aggregates los recalcula
+desde purchases en una sola sentencia y corrige solo las filas que difieren (cargas
+hechas con los triggers deshabilitados, restauraciones de backups, etc.).
+"""
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
+from sqlalchemy.orm import Session
+
+_RECONCILE_SQL = """
+    WITH expected AS (
+        SELECT
+            l.id AS lot_id,
+            COALESCE(SUM(p.quantity), 0) AS fresh_weight,
+            COALESCE(SUM(p.quantity * p.price), 0) AS cost,
+            COUNT(p.id) AS purchase_count
+        FROM lots l
+        LEFT JOIN purchases p ON p.lot_id = l.id AND p.disabled_at IS NULL
+        {lot_filter}
+        GROUP BY l.id
+    )
+    INSERT INTO lot_aggregates (lot_id, fresh_weight, cost, purchase_count, updated_at)
+    SELECT e.lot_id, e.fresh_weight, e.cost, e.purchase_count, NOW()
+    FROM expected e
+    LEFT JOIN lot_aggregates a ON a.lot_id = e.lot_id
+    WHERE a.lot_id IS NULL
+       OR a.fresh_weight IS DISTINCT FROM e.fresh_weight
+       OR a.cost IS DISTINCT FROM e.cost
+       OR a.purchase_count IS DISTINCT FROM e.purchase_count
+    ON CONFLICT (lot_id) DO UPDATE SET
+        fresh_weight = EXCLUDED.fresh_weight,
+        cost = EXCLUDED.cost,
+        purchase_count = EXCLUDED.purchase_count,
+        updated_at = NOW()
+    RETURNING lot_id
+"""
+
+
+def reconcile_lot_aggregates(db: Session, lot_ids: Optional[List[UUID]] = None) -> Dict[str, int]:
+    """
+    Recalcula los totales de los lotes indicados (o de todos) y corrige los que difieren.
+    No hace commit.
+
+    Returns:
+        Diccionario con la cantidad de lotes corregidos ('fixed')
+    """
+    if lot_ids is not None:
+        if not lot_ids:
+            return {"fixed": 0}
+        statement = text(_RECONCILE_SQL.format(lot_filter="WHERE l.id = ANY(:lot_ids)")).bindparams(
+            bindparam("lot_ids", value=list(lot_ids), type_=ARRAY(PG_UUID(as_uuid=True)))
+        )
+    else:
+        statement = text(_RECONCILE_SQL.format(lot_filter=""))
+    fixed = db.execute(statement).fetchall()
+    return {"fixed": len(fixed)}
@@ -0,0 +1,109 @@
+"""
+Despacho masivo de lotes a un centro de almacenamiento.
+
+El despacho se resuelve con dos sentencias sin importar la cantidad de lotes:
+- UPDATE lots ... WHERE id = ANY(:lot_ids) AND net_weight > 0 RETURNING id, net_weight
+- un INSERT multi-fila en store_movement con los lotes actualizados
+
+Con una clave de idempotencia, el despacho se registra en lot_dispatches en la misma
+transacción (INSERT ... ON CONFLICT DO NOTHING). Un reintento con la misma clave espera
+a que el primero termine y, si este confirmó, devuelve su resultado sin volver a
+insertar movimientos. El despacho guarda una huella de los lotes (lots_fingerprint)
+para rechazar reintentos con la misma clave y otros lotes.
+"""
+import hashlib
+from typing import Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import bindparam, insert, text
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
+from sqlalchemy.orm import Session
+
+from ..models.lot_dispatches import LotDispatchModel
+from modules.warehouse.src.models.store_movement import StoreMovementModel, StoreMovementTypeEnum
+
+_CLAIM_SQL = """
+    INSERT INTO lot_dispatches (idempotency_key, store_center_id, identity_id, lots_fingerprint, requested_lots, dispatched_lots)
+    VALUES (:idempotency_key, :store_center_id, :identity_id, :lots_fingerprint, :requested_lots, 0)
+    ON CONFLICT (idempotency_key) DO NOTHING
+    RETURNING id
+"""
+
+_DISPATCH_SQL = """
+    UPDATE lots
+    SET current_store_center_id = :store_center_id, updated_at = NOW()
+    WHERE id = ANY(:lot_ids)
+      AND disabled_at IS NULL
+      AND net_weight > 0
+    RETURNING id, net_weight
+"""
+
+
+def lots_fingerprint(lot_ids: Iterable[UUID]) -> str:
+    """sha256 (hex) de los ids de lotes ordenados y sin repetir; no depende del orden enviado."""
+    joined = ",".join(sorted({str(lot_id) for lot_id in lot_ids}))
+    return hashlib.sha256(joined.encode("utf-8")).hexdigest()
+
+
+def claim_dispatch(
+    db: Session,
+    idempotency_key: str,
+    store_center_id: UUID,
+    identity_id: UUID,
+    lot_ids: List[UUID]
+) -> Tuple[Optional[UUID], Optional[LotDispatchModel]]:
+    """
+    Registra la clave de idempotencia del despacho con la huella de sus lotes.
+
+    Returns:
+        (id del despacho nuevo, None) si la clave no existía, o (None, despacho previo)
+        si ya se usó
+    """
+    row = db.execute(text(_CLAIM_SQL), {
+        "idempotency_key": idempotency_key,
+        "store_center_id": store_center_id,
+        "identity_id": identity_id,
+        "lots_fingerprint": lots_fingerprint(lot_ids),
+        "requested_lots": len(lot_ids)
+    }).first()
+    if row is not None:
+        return row.id, None
+    previous = db.query(LotDispatchModel).filter(
+        LotDispatchModel.idempotency_key == idempotency_key
+    ).one()
+    return None, previous
+
+
+def record_dispatched(db: Session, dispatch_id: UUID, dispatched_lots: int) -> None:
+    db.execute(
+        text("UPDATE lot_dispatches SET dispatched_lots = :dispatched_lots WHERE id = :dispatch_id"),
+        {"dispatched_lots": dispatched_lots, "dispatch_id": dispatch_id}
+    )
+
+
+def dispatch_lots_bulk(db: Session, lot_ids: List[UUID], store_center_id: UUID, identity_id: UUID) -> List[UUID]:
+    """
+    Asigna el centro de almacenamiento a los lotes activos con peso y crea su
+    store_movement de INGRESO (weight_kg = net_weight). No hace commit.
+
+    Returns:
+        Ids de los lotes despachados
+    """
+    if not lot_ids:
+        return []
+    statement = text(_DISPATCH_SQL).bindparams(
+        bindparam("lot_ids", value=list(dict.fromkeys(lot_ids)), type_=ARRAY(PG_UUID(as_uuid=True)))
+    )
+    dispatched = db.execute(statement, {"store_center_id": store_center_id}).fetchall()
+    if dispatched:
+        db.execute(insert(StoreMovementModel.__table__).values([
+            {
+                "lot_id": lot_id,
+                "store_center_id": store_center_id,
+                "type_movement": StoreMovementTypeEnum.INGRESO,
+                "weight_kg": net_weight,
+                "identity_id": identity_id
+            }
+            for lot_id, net_weight in dispatched
+        ]))
+    return [lot_id for lot_id, _ in dispatched]
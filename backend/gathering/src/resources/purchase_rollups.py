@@ -0,0 +1,153 @@
+"""
+Consultas sobre purchase_daily_rollups.
+
+Los totales diarios de compras (monto, cantidad y número de compras por día, centro de
+acopio, acopiador y tipo de producto) los mantienen el trigger de la migración
+create_trigger_purchase_daily_rollups y, cuando cambia el tipo de producto de un lote,
+el de create_trigger_lot_product_type_rollups. Los resúmenes y tendencias leen a lo sumo una
+fila por día y combinación de filtros, sin recorrer purchases ni balance_movements.
+- get_purchase_totals: totales de un rango de fechas
+- get_purchase_trend: serie por día o por mes
+- rebuild_purchase_rollups: recalcula un rango (o todo) desde purchases
+"""
+from datetime import date
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from ..models.lots import ProductTypeEnum
+from ..models.purchase_daily_rollups import PurchaseDailyRollupModel
+
+GRANULARITIES = ("day", "month")
+
+_DELETE_SQL = "DELETE FROM purchase_daily_rollups WHERE TRUE {day_filter}"
+
+_INSERT_SQL = """
+    INSERT INTO purchase_daily_rollups (day, gathering_center_id, gatherer_id, product_type, amount, quantity, purchase_count, updated_at)
+    SELECT
+        p.created_at::date,
+        p.gathering_center_id,
+        p.gatherer_id,
+        l.product_type,
+        SUM(ROUND(p.quantity * p.price, 2)),
+        SUM(p.quantity),
+        COUNT(*),
+        NOW()
+    FROM purchases p
+    JOIN lots l ON l.id = p.lot_id
+    WHERE p.disabled_at IS NULL
+      AND p.gathering_center_id IS NOT NULL
+      AND p.gatherer_id IS NOT NULL
+      {purchase_filter}
+    GROUP BY p.created_at::date, p.gathering_center_id, p.gatherer_id, l.product_type
+"""
+
+
+def _filtered_query(
+    query,
+    date_from: Optional[date],
+    date_to: Optional[date],
+    gathering_center_id: Optional[UUID],
+    gatherer_id: Optional[UUID],
+    product_type: Optional[str]
+):
+    if date_from:
+        query = query.filter(PurchaseDailyRollupModel.day >= date_from)
+    if date_to:
+        query = query.filter(PurchaseDailyRollupModel.day <= date_to)
+    if gathering_center_id:
+        query = query.filter(PurchaseDailyRollupModel.gathering_center_id == gathering_center_id)
+    if gatherer_id:
+        query = query.filter(PurchaseDailyRollupModel.gatherer_id == gatherer_id)
+    if product_type:
+        query = query.filter(PurchaseDailyRollupModel.product_type == ProductTypeEnum(getattr(product_type, "value", product_type)))
+    return query
+
+
+def get_purchase_totals(
+    db: Session,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    gathering_center_id: Optional[UUID] = None,
+    gatherer_id: Optional[UUID] = None,
+    product_type: Optional[str] = None
+) -> Dict[str, float]:
+    """Monto, cantidad y número de compras activas del rango (fechas inclusivas)."""
+    query = db.query(
+        func.coalesce(func.sum(PurchaseDailyRollupModel.amount), 0),
+        func.coalesce(func.sum(PurchaseDailyRollupModel.quantity), 0),
+        func.coalesce(func.sum(PurchaseDailyRollupModel.purchase_count), 0)
+    )
+    amount, quantity, purchase_count = _filtered_query(
+        query, date_from, date_to, gathering_center_id, gatherer_id, product_type
+    ).one()
+    return {
+        "amount": float(amount),
+        "quantity": float(quantity),
+        "purchase_count": int(purchase_count)
+    }
+
+
+def get_purchase_trend(
+    db: Session,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    gathering_center_id: Optional[UUID] = None,
+    gatherer_id: Optional[UUID] = None,
+    product_type: Optional[str] = None,
+    granularity: str = "day"
+) -> List[Dict[str, Any]]:
+    """Serie de totales por día o por mes (period es el primer día del mes), en orden de fecha."""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity inválida: '{granularity}' (usar {', '.join(GRANULARITIES)})")
+    if granularity == "month":
+        period = func.date_trunc("month", PurchaseDailyRollupModel.day).label("period")
+    else:
+        period = PurchaseDailyRollupModel.day.label("period")
+
+    query = db.query(
+        period,
+        func.sum(PurchaseDailyRollupModel.amount),
+        func.sum(PurchaseDailyRollupModel.quantity),
+        func.sum(PurchaseDailyRollupModel.purchase_count)
+    )
+    query = _filtered_query(query, date_from, date_to, gathering_center_id, gatherer_id, product_type)
+    rows = query.group_by(period).order_by(period).all()
+    return [
+        {
+            "period": row_period.date() if hasattr(row_period, "date") else row_period,
+            "amount": float(amount or 0),
+            "quantity": float(quantity or 0),
+            "purchase_count": int(purchase_count or 0)
+        }
+        for row_period, amount, quantity, purchase_count in rows
+    ]
+
+
+def rebuild_purchase_rollups(db: Session, date_from: Optional[date] = None, date_to: Optional[date] = None) -> Dict[str, int]:
+    """
+    Recalcula purchase_daily_rollups del rango indicado (o completo) desde purchases.
+    Bloquea la tabla contra escritura hasta el commit para que los triggers de compras
+    concurrentes esperen y no se pierdan aportes. No hace commit.
+
+    Returns:
+        Diccionario con las filas eliminadas ('deleted') e insertadas ('inserted')
+    """
+    params = {}
+    day_filter = ""
+    purchase_filter = ""
+    if date_from:
+        params["date_from"] = date_from
+        day_filter += " AND day >= :date_from"
+        purchase_filter += " AND p.created_at >= :date_from"
+    if date_to:
+        params["date_to"] = date_to
+        day_filter += " AND day <= :date_to"
+        purchase_filter += " AND p.created_at < CAST(:date_to AS date) + 1"
+
+    db.execute(text("LOCK TABLE purchase_daily_rollups IN EXCLUSIVE MODE"))
+    deleted = db.execute(text(_DELETE_SQL.format(day_filter=day_filter)), params).rowcount
+    inserted = db.execute(text(_INSERT_SQL.format(purchase_filter=purchase_filter)), params).rowcount
+    return {"deleted": deleted, "inserted": inserted}
@@ -0,0 +1,150 @@
+"""
+Carga por lotes de relaciones para los listados de gathering.
+
+Un RelationLoader vive lo que dura un request: primero se registran los ids de cada
+tipo de relación de toda la página (add / add_purchases / add_lots / add_movements),
+luego load() trae cada tipo con una sola consulta IN (...) y los objetos anidados
+(GatheringCenterNested, GathererNested, ...) se entregan desde memoria.
+
+Las certificaciones y compras de varios lotes se obtienen igual, con una consulta cada
+una (load_lot_certifications, load_lot_purchases). Así la cantidad de consultas de una
+página no depende de su tamaño.
+"""
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from ..models.certifications import CertificationModel
+from ..models.gatherers import GathererModel
+from ..models.gathering_centers import GatheringCenterModel
+from ..models.lot_certifications import LotCertificationModel
+from ..models.purchases import PurchaseModel
+from ..schemas import GatheringCenterNested, GathererNested, FarmerNested, FarmNested, IdentityNested
+from modules.farmers.src.models.farmers import FarmerModel
+from modules.farmers.src.models.farms import FarmModel
+from modules.auth.src.models.identities import IdentityModel
+
+GATHERING_CENTER = "gathering_center"
+GATHERER = "gatherer"
+FARMER = "farmer"
+FARM = "farm"
+IDENTITY = "identity"
+
+# tipo de relación -> (modelo, schema anidado)
+RELATIONS: Dict[str, Tuple[Any, Any]] = {
+    GATHERING_CENTER: (GatheringCenterModel, GatheringCenterNested),
+    GATHERER: (GathererModel, GathererNested),
+    FARMER: (FarmerModel, FarmerNested),
+    FARM: (FarmModel, FarmNested),
+    IDENTITY: (IdentityModel, IdentityNested),
+}
+
+
+class RelationLoader:
+    """Cargador de relaciones con alcance de request: una consulta IN por tipo."""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._pending: Dict[str, set] = defaultdict(set)
+        self._loaded: Dict[str, Dict[UUID, Any]] = defaultdict(dict)
+
+    def add(self, relation: str, *ids: Optional[UUID]) -> "RelationLoader":
+        """Registra ids a cargar (los None se ignoran)."""
+        loaded = self._loaded[relation]
+        self._pending[relation].update(i for i in ids if i and i not in loaded)
+        return self
+
+    def add_purchases(self, purchases: Iterable[Any]) -> "RelationLoader":
+        for purchase in purchases:
+            self.add(FARMER, purchase.farmer_id)
+            self.add(FARM, purchase.farm_id)
+            self.add(GATHERER, purchase.gatherer_id)
+            self.add(GATHERING_CENTER, purchase.gathering_center_id)
+            self.add(IDENTITY, purchase.identity_id)
+        return self
+
+    def add_lots(self, lots: Iterable[Any]) -> "RelationLoader":
+        for lot in lots:
+            self.add(GATHERER, lot.gatherer_id)
+            self.add(GATHERING_CENTER, lot.gathering_center_id, lot.current_store_center_id)
+        return self
+
+    def add_movements(self, movements: Iterable[Any]) -> "RelationLoader":
+        for movement in movements:
+            self.add(GATHERING_CENTER, movement.gathering_center_id)
+            self.add(GATHERER, movement.gatherer_id)
+            self.add(IDENTITY, movement.identity_id)
+        return self
+
+    def load(self) -> "RelationLoader":
+        """Trae los ids pendientes: una consulta por tipo de relación."""
+        for relation, ids in self._pending.items():
+            if not ids:
+                continue
+            model_class, nested_schema = RELATIONS[relation]
+            rows = self.db.query(model_class).filter(model_class.id.in_(list(ids))).all()
+            loaded = self._loaded[relation]
+            for row in rows:
+                loaded[row.id] = nested_schema.model_validate(row)
+            # Los ids inexistentes quedan registrados como None para no volver a consultarlos
+            for missing in ids - loaded.keys():
+                loaded[missing] = None
+        self._pending.clear()
+        return self
+
+    def get(self, relation: str, id_value: Optional[UUID]) -> Optional[Any]:
+        """Objeto anidado de la relación; si el id no se registró antes, lo carga solo."""
+        if not id_value:
+            return None
+        loaded = self._loaded[relation]
+        if id_value not in loaded:
+            self.add(relation, id_value).load()
+        return loaded.get(id_value)
+
+    def gathering_center(self, id_value: Optional[UUID]) -> Optional[GatheringCenterNested]:
+        return self.get(GATHERING_CENTER, id_value)
+
+    def gatherer(self, id_value: Optional[UUID]) -> Optional[GathererNested]:
+        return self.get(GATHERER, id_value)
+
+    def farmer(self, id_value: Optional[UUID]) -> Optional[FarmerNested]:
+        return self.get(FARMER, id_value)
+
+    def farm(self, id_value: Optional[UUID]) -> Optional[FarmNested]:
+        return self.get(FARM, id_value)
+
+    def identity(self, id_value: Optional[UUID]) -> Optional[IdentityNested]:
+        return self.get(IDENTITY, id_value)
+
+
+def load_lot_certifications(db: Session, lot_ids: List[UUID]) -> Dict[UUID, List[str]]:
+    """Nombres de las certificaciones activas de cada lote (una consulta)."""
+    certifications = defaultdict(list)
+    if not lot_ids:
+        return certifications
+    rows = db.query(LotCertificationModel.lot_id, CertificationModel.name).join(
+        CertificationModel,
+        CertificationModel.id == LotCertificationModel.certification_id
+    ).filter(
+        LotCertificationModel.lot_id.in_(lot_ids),
+        LotCertificationModel.disabled_at.is_(None)
+    ).all()
+    for lot_id, name in rows:
+        certifications[lot_id].append(name)
+    return certifications
+
+
+def load_lot_purchases(db: Session, lot_ids: List[UUID]) -> Dict[UUID, List[PurchaseModel]]:
+    """Compras activas de cada lote (una consulta)."""
+    purchases = defaultdict(list)
+    if not lot_ids:
+        return purchases
+    rows = db.query(PurchaseModel).filter(
+        PurchaseModel.lot_id.in_(lot_ids),
+        PurchaseModel.disabled_at.is_(None)
+    ).all()
+    for purchase in rows:
+        purchases[purchase.lot_id].append(purchase)
+    return purchases
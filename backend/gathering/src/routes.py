@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, Request, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from uuid import UUID
 from typing import Optional, List
+from datetime import date
 import jwt
 from .models.gathering_centers import GatheringCenterModel
 from .schemas import (
@@ -13,7 +14,8 @@ from .schemas import (
     BalanceMovementResponse, BalanceSummaryResponse, BalanceSummaryGatherersResponse, BalanceMovementCreate, PaginatedBalanceMovementResponse,
     GathererCreate, GathererUpdate, GathererResponse, PaginateGathererResponse, 
     GathererByGatheringCenterResponse, PaginateGathererByGatheringCenterResponse, GatheringSummaryResponse, BalanceMovementTypeEnum,
-    DispatchLotsRequest, DispatchLotsResponse
+    DispatchLotsRequest, DispatchLotsResponse,
+    PurchaseTrendResponse, ProductTypeEnum
 )
 
 router = APIRouter(
@@ -44,19 +46,26 @@ def get_lots(
     status: Optional[str] = Query(None, description="Filtro de estado: 'activo', 'en_stock', 'despachado', 'eliminado'"),
     gathering_center_id: Optional[UUID] = Query(None, description="ID del centro de acopio para filtrar"),
     current_store_center_id: Optional[UUID] = Query(None, description="ID del centro de almacenamiento actual para filtrar"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (next_cursor); reemplaza a page"),
+    count: str = Query("exact", description="Conteo del total: exact, estimated o none"),
     svc=Depends(get_funcionalities)
 ):
     """Obtiene una lista paginada de lotes con información detallada, campos calculados y compras"""
-    return svc.get_lots_paginated(
-        page=page, 
-        per_page=per_page, 
-        sort_by=sort_by, 
-        order=order, 
-        search=search, 
-        status=status,
-        gathering_center_id=gathering_center_id,
-        current_store_center_id=current_store_center_id
-    )
+    try:
+        return svc.get_lots_paginated(
+            page=page, 
+            per_page=per_page, 
+            sort_by=sort_by, 
+            order=order, 
+            search=search, 
+            status=status,
+            gathering_center_id=gathering_center_id,
+            current_store_center_id=current_store_center_id,
+            cursor=cursor,
+            count=count
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/lots/export/excel")
 def export_lots_excel(
@@ -455,16 +464,23 @@ def get_balances(
     type_movement: Optional[BalanceMovementTypeEnum] = Query(None, description="Tipo de movimiento (RECHARGE o PURCHASE)"),
     page: int = Query(1, ge=1, description="Número de página"),
     page_size: int = Query(10, ge=1, le=100, description="Elementos por página"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (next_cursor); reemplaza a page"),
+    count: str = Query("exact", description="Conteo del total: exact, estimated o none"),
     svc=Depends(get_funcionalities)
 ):
     """Obtiene movimientos de balance paginados con filtros opcionales"""
-    return svc.get_balances(
-        gathering_center_id=gathering_center_id,
-        gatherer_id=gatherer_id,
-        type_movement=type_movement,
-        page=page,
-        page_size=page_size
-    )
+    try:
+        return svc.get_balances(
+            gathering_center_id=gathering_center_id,
+            gatherer_id=gatherer_id,
+            type_movement=type_movement,
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+            count=count
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/balances/export/excel")
 def export_balances_to_excel(
@@ -532,10 +548,24 @@ def export_balances_to_excel(
 def get_balance_summary(
     gathering_center_id: UUID = Query(..., description="ID del centro de acopio"),
     gatherer_id: Optional[UUID] = Query(None, description="ID del acopiador"),
+    page: int = Query(1, ge=1, description="Número de página de movimientos"),
+    page_size: int = Query(10, ge=1, le=100, description="Movimientos por página"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (next_cursor); reemplaza a page"),
+    count: str = Query("exact", description="Conteo del total de movimientos: exact, estimated o none"),
     svc=Depends(get_funcionalities)
 ):
-    """Obtiene el resumen de balance para un acopiador en un centro de acopio"""
-    return svc.get_balance_summary(gathering_center_id, gatherer_id)
+    """Obtiene el resumen de balance para un acopiador en un centro de acopio (movimientos paginados)"""
+    try:
+        return svc.get_balance_summary(
+            gathering_center_id,
+            gatherer_id,
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+            count=count
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/balances/gatherers/summary", response_model=BalanceSummaryGatherersResponse)
 def get_balance_summary(
@@ -572,6 +602,29 @@ def get_purchases(
     """Obtiene una lista paginada de compras"""
     return svc.get_purchases_paginated(page=page, per_page=per_page, sort_by=sort_by, order=order, search=search)
 
+@router.get("/purchases/trend", response_model=PurchaseTrendResponse)
+def get_purchase_trend(
+    date_from: Optional[date] = Query(None, description="Fecha inicial (inclusive)"),
+    date_to: Optional[date] = Query(None, description="Fecha final (inclusive)"),
+    gathering_center_id: Optional[UUID] = Query(None, description="ID del centro de acopio"),
+    gatherer_id: Optional[UUID] = Query(None, description="ID del acopiador"),
+    product_type: Optional[ProductTypeEnum] = Query(None, description="Tipo de producto del lote"),
+    granularity: str = Query("day", description="Agrupación de la serie: day o month"),
+    svc=Depends(get_funcionalities)
+):
+    """Obtiene la serie de compras (monto, cantidad y número) por día o por mes en un rango de fechas"""
+    try:
+        return svc.get_purchase_trend(
+            date_from=date_from,
+            date_to=date_to,
+            gathering_center_id=gathering_center_id,
+            gatherer_id=gatherer_id,
+            product_type=product_type.value if product_type else None,
+            granularity=granularity
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/purchases/{purchase_id}", response_model=PurchaseResponse)
 def get_purchase(purchase_id: UUID, svc=Depends(get_funcionalities)):
     """Obtiene una compra específica por ID"""
@@ -645,10 +698,14 @@ def dispatch_lots(
     **Parámetros:**
     - **lot_ids**: Lista de UUIDs de los lotes a despachar
     - **store_center_id**: UUID del centro de almacenamiento destino
+    - **idempotency_key** (opcional, o header `Idempotency-Key`, máx. 255 caracteres): clave del
+      despacho; un reintento con la misma clave y los mismos lotes devuelve el resultado original
+      sin crear movimientos nuevos
     
     **Retorna:**
     - **message**: Mensaje de confirmación
     - **dispatched_lots**: Cantidad de lotes despachados exitosamente
+    - **replayed**: True si la clave ya se había usado
     
     **Notas:**
     - Los lotes que no existan, estén deshabilitados o no tengan peso registrado serán omitidos sin generar error
@@ -664,6 +721,12 @@ def dispatch_lots(
         else:
             print(f"🔑 Identity ID obtenido del token: {identity_id}")
         
+        if not dispatch_data.idempotency_key and request.headers.get("Idempotency-Key"):
+            idempotency_key = request.headers["Idempotency-Key"]
+            if len(idempotency_key) > 255:
+                raise ValueError("El header Idempotency-Key no puede superar 255 caracteres")
+            dispatch_data.idempotency_key = idempotency_key
+        
         return svc.dispatch_lots(dispatch_data, identity_id)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -1,6 +1,6 @@
-from pydantic import UUID1, BaseModel, model_validator
+from pydantic import UUID1, BaseModel, Field, model_validator
 from typing import Optional, List
-from datetime import datetime
+from datetime import datetime, date
 from uuid import UUID
 from enum import Enum
 
@@ -162,10 +162,11 @@ class LotListItemResponse(BaseModel):
 
 class PaginatedLotListResponse(BaseModel):
     items: List[LotListItemResponse]
-    total: int
+    total: Optional[int]  # None cuando count=none
     page: int
     page_size: int
-    total_pages: int
+    total_pages: Optional[int]
+    next_cursor: Optional[str] = None
 
 # ========== GATHERING CENTER SCHEMAS ==========
 class GatheringCenterCreate(BaseModel):
@@ -413,12 +414,14 @@ class DispatchLotsRequest(BaseModel):
     """Schema para despachar lotes a un centro de almacenamiento"""
     lot_ids: List[UUID]  # Lista de IDs de lotes a despachar
     store_center_id: UUID  # Centro de almacenamiento destino
+    idempotency_key: Optional[str] = Field(None, max_length=255)  # Clave para que un reintento no repita el despacho
     
     class Config:
         json_schema_extra = {
             "example": {
                 "lot_ids": ["123e4567-e89b-12d3-a456-426614174000", "234e5678-e89b-12d3-a456-426614174001"],
-                "store_center_id": "345e6789-e89b-12d3-a456-426614174002"
+                "store_center_id": "345e6789-e89b-12d3-a456-426614174002",
+                "idempotency_key": "despacho-2026-10-18-001"
             }
         }
 
@@ -426,6 +429,7 @@ class DispatchLotsResponse(BaseModel):
     """Schema para respuesta de despacho de lotes"""
     message: str
     dispatched_lots: int  # Cantidad de lotes despachados
+    replayed: bool = False  # True si la idempotency_key ya se había usado y se devolvió el despacho original
     
     class Config:
         json_schema_extra = {
@@ -466,10 +470,11 @@ class BalanceMovementResponse(BaseModel):
 
 class PaginatedBalanceMovementResponse(BaseModel):
     items: List[BalanceMovementResponse]
-    total: int
+    total: Optional[int]  # None cuando count=none
     page: int
     page_size: int
-    total_pages: int
+    total_pages: Optional[int]
+    next_cursor: Optional[str] = None
 
 class BalanceSummaryResponse(BaseModel):
     gathering_center_id: UUID  # Mantener para compatibilidad
@@ -477,7 +482,27 @@ class BalanceSummaryResponse(BaseModel):
     gatherer_id: Optional[UUID] = None  # Mantener para compatibilidad
     gatherer: Optional[GathererNested]  # Objeto anidado
     total_balance: float
-    movements: List[BalanceMovementResponse]
+    movements: List[BalanceMovementResponse]  # Página de movimientos (más recientes primero)
+    total: Optional[int] = None  # Total de movimientos; None cuando count=none
+    page: int = 1
+    page_size: Optional[int] = None
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+class PurchaseTrendPoint(BaseModel):
+    period: date  # Día, o primer día del mes si granularity=month
+    amount: float
+    quantity: float
+    purchase_count: int
+
+class PurchaseTrendResponse(BaseModel):
+    granularity: str
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    total_amount: float
+    total_quantity: float
+    purchase_count: int
+    items: List[PurchaseTrendPoint]
 
 class BalanceSummaryGatherersResponse(BaseModel):
     total_balance: float
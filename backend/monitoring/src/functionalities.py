@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import or_
 # Usar importaciones relativas para evitar problemas durante la inicialización del módulo
 from .models.audit_logs import AuditLogModel, AuditLogType
+from modules.data_collector.src.resources.pagination import paginate, resolve_sort_column
 from .schemas import (
     AuditLogCreate, AuditLogResponse, PaginatedAuditLogResponse
 )
@@ -24,9 +25,16 @@ class Funcionalities:
         per_page: int = 10,
         sort_by: Optional[str] = None,
         order: Optional[str] = "desc",
-        search: str = ""
+        search: str = "",
+        cursor: Optional[str] = None,
+        count: str = "exact"
     ) -> PaginatedAuditLogResponse:
-        """Lista todos los logs paginados"""
+        """
+        Lista todos los logs paginados.
+        
+        Soporta paginación por cursor (next_cursor) y count=exact|estimated|none
+        para no contar toda la tabla audit_logs en cada página.
+        """
         db = self._get_db()
         
         query = db.query(AuditLogModel)
@@ -46,30 +54,33 @@ class Funcionalities:
                     (AuditLogModel.action.isnot(None) & AuditLogModel.action.ilike(f"%{search}%"))
                 )
         
-        # Aplicar ordenamiento
-        if sort_by:
-            sort_column = getattr(AuditLogModel, sort_by, None)
-            if sort_column is not None:
-                if order and order.lower() == "desc":
-                    query = query.order_by(sort_column.desc())
-                else:
-                    query = query.order_by(sort_column.asc())
+        # Ordenamiento por (sort_column, created_at); created_at es la clave primaria
+        sort_column = resolve_sort_column(AuditLogModel, sort_by, None)
+        if sort_column is not None:
+            descending = bool(order and order.lower() == "desc")
         else:
-            # Ordenamiento por defecto
-            query = query.order_by(AuditLogModel.created_at.desc())
+            sort_column, descending = AuditLogModel.created_at, True
         
-        total = query.count()
-        offset = (page - 1) * per_page
-        total_pages = (total + per_page - 1) // per_page
-        
-        logs = query.offset(offset).limit(per_page).all()
+        result_page = paginate(
+            query,
+            sort_column=sort_column,
+            id_column=AuditLogModel.created_at,
+            descending=descending,
+            page=page,
+            per_page=per_page,
+            cursor=cursor,
+            count=count
+        )
+        total = result_page.total
+        total_pages = (total + per_page - 1) // per_page if total is not None else None
         
         return PaginatedAuditLogResponse(
-            items=[AuditLogResponse.model_validate(log) for log in logs],
+            items=[AuditLogResponse.model_validate(log) for log in result_page.items],
             total=total,
             page=page,
             page_size=per_page,
-            total_pages=total_pages
+            total_pages=total_pages,
+            next_cursor=result_page.next_cursor
         )
     
     def create_log(
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Request, Query
+from fastapi import APIRouter, Depends, Request, Query, HTTPException
 from typing import Optional
 # Usar importación relativa para evitar problemas durante la inicialización del módulo
 from .schemas import PaginatedAuditLogResponse
@@ -20,8 +20,13 @@ def get_logs(
     sort_by: Optional[str] = Query(None, description="Campo por el cual ordenar"),
     order: Optional[str] = Query("desc", description="Orden: 'asc' o 'desc'"),
     search: str = Query("", description="Texto de búsqueda (UUID o action)"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (next_cursor); reemplaza a page"),
+    count: str = Query("exact", description="Conteo del total: exact, estimated o none"),
     svc=Depends(get_funcionalities)
 ):
     """Lista todos los logs de auditoría paginados"""
-    return svc.get_logs(page=page, per_page=per_page, sort_by=sort_by, order=order, search=search)
+    try:
+        return svc.get_logs(page=page, per_page=per_page, sort_by=sort_by, order=order, search=search, cursor=cursor, count=count)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
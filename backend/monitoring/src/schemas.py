@@ -26,8 +26,9 @@ class AuditLogResponse(BaseModel):
 
 class PaginatedAuditLogResponse(BaseModel):
     items: list[AuditLogResponse]
-    total: int
+    total: Optional[int]  # None cuando count=none
     page: int
     page_size: int
-    total_pages: int
+    total_pages: Optional[int]
+    next_cursor: Optional[str] = None
 
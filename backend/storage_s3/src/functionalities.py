@@ -1,7 +1,8 @@
-from typing import Optional
+from typing import Optional, Iterable, Dict
 from uuid import UUID
 from sqlalchemy.orm import Session
 from .models.medias import MediaModel
+from .url_cache import presigned_url_cache
 from .schemas import MediaCreate, MediaUpdate, MediaResponse, PaginatedMediaResponse
 
 class Funcionalities:
@@ -78,27 +79,75 @@ class Funcionalities:
         Returns:
             url de descarga si se encuentra, None si no existe
         """
+        media_key = self._normalize_media_id(media_id)
+        if media_key is None:
+            return None
+        return self.get_urls_by_media_ids([media_key], expiration).get(media_key)
+
+    @staticmethod
+    def _normalize_media_id(media_id) -> Optional[UUID]:
+        if isinstance(media_id, UUID):
+            return media_id
+        try:
+            return UUID(str(media_id))
+        except (ValueError, TypeError, AttributeError):
+            return None
+
+    def get_urls_by_media_ids(self, media_ids: Iterable[UUID], expiration: int = 3600) -> Dict[UUID, str]:
+        """
+        Obtiene las urls firmadas de descarga de varios medias a la vez.
+        
+        Resuelve los paths con una sola consulta IN (...) y firma las URLs localmente
+        (la firma no requiere llamadas a S3). Las URLs se reutilizan desde cache mientras
+        no estén próximas a expirar, ni ellas ni las credenciales con que se firmaron.
+        
+        Args:
+            media_ids: UUIDs de los medias (se ignoran los ids inválidos)
+            expiration: Tiempo de expiración en segundos (por defecto 1 hora)
+            
+        Returns:
+            Diccionario media_id -> url; los medias inexistentes o deshabilitados no se incluyen
+        """
+        ids = {normalized for normalized in (self._normalize_media_id(m) for m in media_ids) if normalized is not None}
+        if not ids:
+            return {}
+        
         db = self._get_db()
         
-        media = db.query(MediaModel).filter(
-            MediaModel.id == media_id,
+        medias = db.query(MediaModel.id, MediaModel.path).filter(
+            MediaModel.id.in_(list(ids)),
             MediaModel.disabled_at.is_(None)
-        ).first()
+        ).all()
+        if not medias:
+            return {}
         
-        if not media:
-            return None
+        paths = {media_id: path for media_id, path in medias}
+        cached_urls = presigned_url_cache.get_many(set(paths.values()), expiration)
         
-        # obtengo la url firmada para descargar el archivo
-        storage_service = self.container.get("storage")
-        url = storage_service.get_presigned_url(
-            key=media.path,
-            expiration=expiration,
-            is_download=True
-        )
-        if not url:
-            return None
+        # Firmar solo las keys que no están en cache
+        missing_keys = set(paths.values()) - set(cached_urls)
+        if missing_keys:
+            storage_service = self.container.get("storage")
+            new_urls = {}
+            for key in missing_keys:
+                url = storage_service.get_presigned_url(
+                    key=key,
+                    expiration=expiration,
+                    is_download=True
+                )
+                if url:
+                    new_urls[key] = url
+            # Las URLs no sirven más allá del vencimiento de las credenciales que las firmaron
+            get_credentials_expiry = getattr(storage_service, "get_credentials_expiry", None)
+            credentials_expiry = get_credentials_expiry() if get_credentials_expiry else None
+            presigned_url_cache.set_many(new_urls, expiration, credentials_expiry=credentials_expiry)
+            cached_urls.update(new_urls)
         
-        return url
+        return {
+            media_id: cached_urls[path]
+            for media_id, path in paths.items()
+            if path in cached_urls
+        }
 
     def get_medias_paginated(
         self, 
@@ -11,7 +11,9 @@ from .schemas import (
     MediaCreate,
     MediaUpdate,
     MediaResponse,
-    PaginatedMediaResponse
+    PaginatedMediaResponse,
+    MediaUrlsRequest,
+    MediaUrlsResponse
 )
 
 router = APIRouter(
@@ -159,6 +161,26 @@ def create_media(media_data: MediaCreate, svc=Depends(get_funcionalities)):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/medias/urls", response_model=MediaUrlsResponse)
+def get_media_urls(request_data: MediaUrlsRequest, svc=Depends(get_funcionalities)):
+    """
+    Obtiene las URLs firmadas de descarga de varios medias en una sola llamada.
+    
+    Útil para resolver una galería completa. Los medias inexistentes o deshabilitados
+    se devuelven en `not_found`.
+    """
+    try:
+        urls = svc.get_urls_by_media_ids(request_data.media_ids, request_data.expiration)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al generar URLs de descarga: {str(e)}")
+    
+    return MediaUrlsResponse(
+        urls=urls,
+        not_found=[media_id for media_id in dict.fromkeys(request_data.media_ids) if media_id not in urls],
+        expiration=request_data.expiration
+    )
+
+
 @router.get("/medias/{media_id}", response_model=MediaResponse)
 def get_media(media_id: UUID, svc=Depends(get_funcionalities)):
     """
@@ -1,7 +1,7 @@
 """
 Schemas para las rutas de storage
 """
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
 from uuid import UUID
@@ -59,3 +59,14 @@ class PaginatedMediaResponse(BaseModel):
     page: int
     page_size: int
     total_pages: int
+
+class MediaUrlsRequest(BaseModel):
+    """Schema para obtener las URLs de descarga de varios medias"""
+    media_ids: list[UUID] = Field(..., min_length=1, max_length=500)
+    expiration: int = Field(3600, ge=1, le=604800)  # Segundos (máximo 7 días)
+
+class MediaUrlsResponse(BaseModel):
+    """Schema de respuesta con las URLs de descarga por media"""
+    urls: dict[UUID, str]
+    not_found: list[UUID]
+    expiration: int
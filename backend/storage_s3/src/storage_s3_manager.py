@@ -5,6 +5,7 @@ Este m??dulo implementa la interfaz est??ndar StorageInterface para AWS S3.
 """
 import sys
 from pathlib import Path
+from datetime import datetime
 from typing import Optional
 from botocore.config import Config as ConfigBotoCore
 from botocore.exceptions import ClientError
@@ -99,6 +100,15 @@ class StorageS3Manager(StorageInterface):
             )
         return self.client
     
+    def get_credentials_expiry(self) -> Optional[datetime]:
+        """
+        Vencimiento de las credenciales con que el cliente firma las URLs, o None si no
+        vencen (claves de acceso estáticas).
+        """
+        credentials = self.get_s3_client()._get_credentials()
+        # Solo las credenciales temporales (RefreshableCredentials) tienen vencimiento
+        return getattr(credentials, "_expiry_time", None)
+    
     def _initialize_client(self):
         """Inicializa el cliente de S3"""
         self.get_s3_client()
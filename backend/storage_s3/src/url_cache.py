@@ -0,0 +1,90 @@
+"""
+Cache en memoria de URLs pre-firmadas de descarga.
+
+Una URL firmada es válida hasta su expiración, por lo que puede reutilizarse para
+la misma key mientras le quede vigencia suficiente. Se descarta un poco antes de
+expirar (margen proporcional a la expiración solicitada) para que el cliente no
+reciba URLs a punto de vencer.
+
+Una URL deja de ser válida también cuando vencen las credenciales con que se firmó
+(credenciales temporales de STS o de un rol): la vigencia en cache se acota al
+vencimiento de las credenciales menos CREDENTIALS_EXPIRY_MARGIN.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+# Fracción de la expiración que se reserva como margen antes de volver a firmar
+REFRESH_MARGIN_RATIO = 0.1
+# Margen mínimo en segundos
+MIN_REFRESH_MARGIN = 30
+# Segundos antes del vencimiento de las credenciales en que se dejan de usar sus URLs
+CREDENTIALS_EXPIRY_MARGIN = 300
+# Cantidad máxima de URLs en cache (se descartan las menos usadas)
+MAX_ENTRIES = 10000
+
+
+class PresignedUrlCache:
+    """Cache LRU acotada (key, expiration) -> (url, expira_en)."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _refresh_margin(expiration: int) -> float:
+        return max(MIN_REFRESH_MARGIN, expiration * REFRESH_MARGIN_RATIO)
+
+    def get_many(self, keys: Iterable[str], expiration: int) -> Dict[str, str]:
+        """Devuelve las URLs vigentes en cache para las keys dadas (las vencidas se descartan)."""
+        now = time.monotonic()
+        margin = self._refresh_margin(expiration)
+        found = {}
+        with self._lock:
+            for key in keys:
+                cache_key = (key, expiration)
+                entry = self._entries.get(cache_key)
+                if entry is None:
+                    continue
+                url, expires_at = entry
+                if expires_at - now > margin:
+                    self._entries.move_to_end(cache_key)
+                    found[key] = url
+                else:
+                    del self._entries[cache_key]
+        return found
+
+    def set_many(self, urls: Dict[str, str], expiration: int, credentials_expiry: Optional[datetime] = None) -> None:
+        """
+        Guarda URLs recién firmadas con la expiración con la que fueron generadas.
+        Con credentials_expiry (vencimiento de las credenciales que firmaron) la vigencia
+        se acota a ese vencimiento menos CREDENTIALS_EXPIRY_MARGIN; si no queda vigencia
+        útil no se guardan.
+        """
+        ttl = expiration
+        if credentials_expiry is not None:
+            if credentials_expiry.tzinfo is None:
+                credentials_expiry = credentials_expiry.replace(tzinfo=timezone.utc)
+            remaining = (credentials_expiry - datetime.now(timezone.utc)).total_seconds()
+            ttl = min(ttl, remaining - CREDENTIALS_EXPIRY_MARGIN)
+        if ttl <= self._refresh_margin(expiration):
+            return
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            for key, url in urls.items():
+                cache_key = (key, expiration)
+                self._entries[cache_key] = (url, expires_at)
+                self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Instancia compartida por el proceso (Funcionalities puede instanciarse varias veces)
+presigned_url_cache = PresignedUrlCache()
@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func, case, cast, Date
 
 from modules.gathering.src.models.lots import LotModel
+from modules.data_collector.src.resources.pagination import paginate, resolve_sort_column
 
 from .models.store_centers import StoreCenterModel
 from .models.store_movement import StoreMovementModel
@@ -388,9 +389,11 @@ class Funcionalities:
         per_page: int = 10,
         sort_by: Optional[str] = None,
         order: Optional[str] = "desc",
-        search: str = ""
+        search: str = "",
+        cursor: Optional[str] = None,
+        count: str = "exact"
     ) -> PaginatedStoreMovementResponse:
-        """Obtiene movimientos de almacén paginados"""
+        """Obtiene movimientos de almacén paginados (page/per_page o cursor)"""
         db = self._get_db()
         
         query = db.query(StoreMovementModel)
@@ -408,30 +411,33 @@ class Funcionalities:
                 # Si no es un UUID válido, no aplicar filtro de búsqueda
                 pass
         
-        # Aplicar ordenamiento
-        if sort_by and isinstance(sort_by, str):
-            sort_column = getattr(StoreMovementModel, sort_by, None)
-            if sort_column is not None:
-                if order and order.lower() == "desc":
-                    query = query.order_by(sort_column.desc())
-                else:
-                    query = query.order_by(sort_column.asc())
+        # Ordenamiento por (sort_column, id); por defecto created_at desc
+        sort_column = resolve_sort_column(StoreMovementModel, sort_by, None) if isinstance(sort_by, str) else None
+        if sort_column is not None:
+            descending = bool(order and order.lower() == "desc")
         else:
-            # Ordenamiento por defecto
-            query = query.order_by(StoreMovementModel.created_at.desc())
-        
-        total = query.count()
-        offset = (page - 1) * per_page
-        total_pages = (total + per_page - 1) // per_page
+            sort_column, descending = StoreMovementModel.created_at, True
         
-        movements = query.offset(offset).limit(per_page).all()
+        result_page = paginate(
+            query,
+            sort_column=sort_column,
+            id_column=StoreMovementModel.id,
+            descending=descending,
+            page=page,
+            per_page=per_page,
+            cursor=cursor,
+            count=count
+        )
+        total = result_page.total
+        total_pages = (total + per_page - 1) // per_page if total is not None else None
         
         return PaginatedStoreMovementResponse(
-            items=[StoreMovementResponse.model_validate(movement) for movement in movements],
+            items=[StoreMovementResponse.model_validate(movement) for movement in result_page.items],
             total=total,
             page=page,
             page_size=per_page,
-            total_pages=total_pages
+            total_pages=total_pages,
+            next_cursor=result_page.next_cursor
         )
     
     def get_store_movement_by_id(self, movement_id: UUID) -> Optional[StoreMovementResponse]:
@@ -155,10 +155,15 @@ def get_store_movements(
     sort_by: Optional[str] = Query(None, description="Campo por el cual ordenar"),
     order: Optional[str] = Query("desc", description="Orden: 'asc' o 'desc'"),
     search: str = Query("", description="Texto de búsqueda (UUID de lot_id, store_center_id o identity_id)"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (next_cursor); reemplaza a page"),
+    count: str = Query("exact", description="Conteo del total: exact, estimated o none"),
     svc=Depends(get_funcionalities)
 ):
     """Obtiene una lista paginada de movimientos de almacén"""
-    return svc.get_store_movements_paginated(page=page, per_page=per_page, sort_by=sort_by, order=order, search=search)
+    try:
+        return svc.get_store_movements_paginated(page=page, per_page=per_page, sort_by=sort_by, order=order, search=search, cursor=cursor, count=count)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/store-movements/{movement_id}", response_model=StoreMovementResponse)
 def get_store_movement(movement_id: UUID, svc=Depends(get_funcionalities)):
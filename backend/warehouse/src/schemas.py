@@ -70,10 +70,11 @@ class StoreMovementResponse(BaseModel):
 
 class PaginatedStoreMovementResponse(BaseModel):
     items: List[StoreMovementResponse]
-    total: int
+    total: Optional[int]  # None cuando count=none
     page: int
     page_size: int
-    total_pages: int
+    total_pages: Optional[int]
+    next_cursor: Optional[str] = None
 
 # ========== WAREHOUSE SUMMARY SCHEMAS ==========
 class LotsSimpleResponse(BaseModel):